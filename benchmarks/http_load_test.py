@@ -0,0 +1,151 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This script load-tests the HTTP/JSON query server on localhost.
+
+Each client thread keeps one HTTP/1.1 connection open and sends a mix of
+point reads, filtered queries, statistics and conditional requests for a
+fixed duration. The script reports requests per second and latency
+percentiles as JSON.
+
+Usage:
+    python benchmarks/http_load_test.py [--url http://127.0.0.1:8080] [--clients 8] [--duration 10]
+
+Without --url, a server is started in-process on an in-memory copy of
+milk_samples.db.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.presentation.http_server import create_server
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Get a percentile of an already sorted list by nearest rank."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_client(host: str, port: int, paths: List[str], deadline: float, seed: int,
+               latencies: List[float], errors: List[int]) -> None:
+    """Send requests on one keep-alive connection until the deadline."""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    etags: Dict[str, str] = {}
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        headers = {"If-None-Match": etags[path]} if path in etags and rng.random() < 0.5 else {}
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local_latencies.append(time.perf_counter() - started)
+        if response.status >= 400:
+            local_errors += 1
+        elif response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+    latencies.extend(local_latencies)
+    errors.append(local_errors)
+
+def run_load_test(host: str, port: int, clients: int, duration: float, max_id: int) -> Dict[str, float]:
+    """
+    Run the load test against a server.
+
+    Args:
+        host (str): Server host
+        port (int): Server port
+        clients (int): Number of concurrent client connections
+        duration (float): Seconds to run
+        max_id (int): Highest sample ID to request
+
+    Returns:
+        Dict[str, float]: Request count, errors, requests/sec and latency percentiles in ms
+    """
+    paths = [f"/samples/{sample_id}" for sample_id in range(1, max_id + 1, max(1, max_id // 50))]
+    paths += ["/samples?province=AB&limit=50", "/samples?station=OTTAWA", "/stats", "/provinces",
+              "/cube?group_by=year", "/samples?start_from=1990-01-01&start_until=1990-12-31"]
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_client, args=(host, port, paths, deadline, seed, latencies, errors))
+               for seed in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 3)
+    }
+
+def main(argv: Optional[list] = None) -> None:
+    """Run the load test from the command line and print the results as JSON."""
+    parser = argparse.ArgumentParser(description="Load-test the milk sample HTTP server")
+    parser.add_argument("--url", help="server to test (default: start one in-process)")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--workers", type=int, default=8, help="server worker threads (in-process server)")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        max_id = 600
+    else:
+        db_config = DatabaseConfig.from_snapshot(os.path.join(PROJECT_ROOT, "milk_samples.db"))
+        service = MilkSampleDBService(MilkSampleDBRepository(db_config))
+        server = create_server(service, port=0, max_workers=args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[0], server.server_address[1]
+        max_id = service.repository.get_max_sample_id()
+
+    try:
+        results = run_load_test(host, port, args.clients, args.duration, max_id)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
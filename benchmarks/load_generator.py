@@ -0,0 +1,354 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This script runs a concurrent mixed workload against MilkSampleDBService.
+
+N reader threads and M writer threads share one DatabaseConfig (each thread
+gets its own connection) and pick operations from a weighted mix until the
+duration is over. For every operation the script reports throughput and
+p50/p95/p99/max latency, and counts SQLITE_BUSY/SQLITE_LOCKED errors and the
+retries spent on them. Latency includes retries, as a caller would see it.
+
+The database, pragma preset, busy timeout and retry policy are options, so
+runs can be compared to tune WAL, synchronous, cache and timeout settings.
+
+Usage:
+    python benchmarks/load_generator.py [--readers 8] [--writers 2] [--duration 10]
+        [--rows 10000] [--pragmas wal] [--pragma cache_size=-65536] [--busy-timeout-ms 5000]
+        [--retries 3] [--read-mix get_sample_by_id=60,query_samples=25,get_statistics=10,query_cube=5]
+        [--write-mix create=60,edit=30,delete=10] [--output results.json]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.run_benchmarks import percentile
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.observability.structured_logging import configure_logging
+from src.persistence.database_config import PRAGMA_PRESETS, DatabaseConfig, parse_pragmas
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.synthetic_dataset import SyntheticDatasetGenerator, learn_profile_from_csv
+
+DEFAULT_READ_MIX = "get_sample_by_id=60,query_samples=25,get_statistics=10,query_cube=5"
+DEFAULT_WRITE_MIX = "create=60,edit=30,delete=10"
+
+class WorkerState:
+    """
+    Per-thread state for one load generator worker.
+
+    Attributes:
+        rng (random.Random): The worker's own random source
+        created (List[int]): IDs of samples this worker created and has not deleted
+        timings (Dict[str, List[float]]): Latencies in seconds by operation
+        counts (Dict[str, Dict[str, int]]): errors, busy and retries by operation
+    """
+
+    def __init__(self, seed: int):
+        """Initialize the state with its own seeded random source."""
+        self.rng = random.Random(seed)
+        self.created: List[int] = []
+        self.timings: Dict[str, List[float]] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def count(self, operation: str, key: str, amount: int = 1) -> None:
+        """Add to the errors, busy or retries count of an operation."""
+        counts = self.counts.setdefault(operation, {'errors': 0, 'busy': 0, 'retries': 0})
+        counts[key] += amount
+
+class Workload:
+    """
+    The operations of the mixed workload, bound to one service and dataset.
+
+    Attributes:
+        service (MilkSampleDBService): Service under test
+        ids (List[int]): IDs of the initial samples
+        provinces (List[str]): Provinces present in the data
+    """
+
+    def __init__(self, service: MilkSampleDBService):
+        """Bind the operations to a service and sample the IDs and provinces it holds."""
+        self.service = service
+        self.ids = [record_id for record_id, _ in service.query_samples(limit=100000)]
+        self.provinces = service.get_available_provinces()
+        self.read_operations: Dict[str, Callable[[WorkerState], Any]] = {
+            'get_sample_by_id': lambda state: service.get_sample_by_id(state.rng.choice(self.ids)),
+            'get_samples_by_province': lambda state: service.get_samples_by_province(
+                state.rng.choice(self.provinces)),
+            'query_samples': lambda state: service.query_samples(limit=100, after_id=state.rng.choice(self.ids)),
+            'get_statistics': lambda state: service.get_statistics(),
+            'query_cube': lambda state: service.query_cube(['province', 'year']),
+        }
+        self.write_operations: Dict[str, Callable[[WorkerState], Any]] = {
+            'create': self.create,
+            'edit': self.edit,
+            'delete': self.delete,
+        }
+
+    def create(self, state: WorkerState) -> None:
+        """Create a sample and remember its ID for later edits and deletes."""
+        record_id, _ = self.service.create_new_sample("MILK", "WHOLE", "01-Jan-24", "31-Mar-24", "LOAD TEST", "ON",
+                                                      round(state.rng.uniform(0.01, 0.1), 4), 0.005, None)
+        state.created.append(record_id)
+
+    def edit(self, state: WorkerState) -> None:
+        """Change the activity of a sample."""
+        # Edit the worker's own samples when it has some, so writers rarely touch the same row
+        record_id = state.rng.choice(state.created) if state.created else state.rng.choice(self.ids)
+        self.service.edit_sample(record_id, sr90_activity=round(state.rng.uniform(0.01, 0.1), 4))
+
+    def delete(self, state: WorkerState) -> None:
+        """Delete a sample the worker created, or create one if it has none."""
+        # Only samples created during the run are deleted, so the initial IDs stay valid for readers
+        if state.created:
+            self.service.delete_sample(state.created.pop())
+        else:
+            self.create(state)
+
+def parse_mix(text: str, operations: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    Parse an operation mix such as "create=60,edit=30,delete=10".
+
+    Args:
+        text (str): Comma-separated name=weight pairs
+        operations (Dict[str, Any]): Known operations
+
+    Returns:
+        List[Tuple[str, float]]: (operation, weight) pairs with positive weights
+
+    Raises:
+        ValueError: If an operation is unknown, a weight is invalid or no weight is positive
+    """
+    mix = []
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in operations:
+            raise ValueError(f"Unknown operation '{name}', expected one of: {', '.join(operations)}")
+        value = float(weight) if weight else 1.0
+        if value < 0:
+            raise ValueError(f"Negative weight for {name}")
+        if value > 0:
+            mix.append((name, value))
+    if not mix:
+        raise ValueError("The operation mix is empty")
+    return mix
+
+def is_lock_error(error: sqlite3.Error) -> bool:
+    """Check whether an error is SQLITE_BUSY or SQLITE_LOCKED, i.e. worth retrying."""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        # Extended codes keep the primary code in the low byte
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+def run_worker(operations: Dict[str, Callable[[WorkerState], Any]], mix: List[Tuple[str, float]],
+               state: WorkerState, deadline: float, retries: int, backoff: float) -> None:
+    """
+    Run operations from a mix until the deadline.
+
+    Args:
+        operations (Dict[str, Callable]): Operations by name
+        mix (List[Tuple[str, float]]): (operation, weight) pairs
+        state (WorkerState): The worker's state, which collects the results
+        deadline (float): time.perf_counter() value to stop at
+        retries (int): Retries of an operation that failed with a lock error
+        backoff (float): Seconds before the first retry, doubled for each further retry
+    """
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    while time.perf_counter() < deadline:
+        name = state.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                operations[name](state)
+                state.timings.setdefault(name, []).append(time.perf_counter() - started)
+                break
+            except sqlite3.Error as e:
+                if not is_lock_error(e):
+                    state.count(name, 'errors')
+                    break
+                state.count(name, 'busy')
+                if attempt >= retries:
+                    state.count(name, 'errors')
+                    break
+                attempt += 1
+                state.count(name, 'retries')
+                # Jittered exponential backoff so retrying writers do not collide again
+                time.sleep(backoff * (2 ** (attempt - 1)) * (0.5 + state.rng.random()))
+
+def summarize(states: List[WorkerState], seconds: float) -> Dict[str, Dict[str, Any]]:
+    """Combine the workers' results into per-operation statistics."""
+    timings: Dict[str, List[float]] = {}
+    counts: Dict[str, Dict[str, int]] = {}
+    for state in states:
+        for name, values in state.timings.items():
+            timings.setdefault(name, []).extend(values)
+        for name, values in state.counts.items():
+            total = counts.setdefault(name, {'errors': 0, 'busy': 0, 'retries': 0})
+            for key, value in values.items():
+                total[key] += value
+    summary = {}
+    for name in sorted(set(timings) | set(counts)):
+        values = sorted(timings.get(name, []))
+        summary[name] = {
+            'calls': len(values),
+            'per_second': round(len(values) / seconds, 1) if seconds else 0.0,
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+            'max_ms': round((values[-1] if values else 0.0) * 1000, 3),
+            **counts.get(name, {'errors': 0, 'busy': 0, 'retries': 0})
+        }
+    return summary
+
+def run_load(service: MilkSampleDBService, readers: int, writers: int, duration: float,
+             read_mix: str = DEFAULT_READ_MIX, write_mix: str = DEFAULT_WRITE_MIX,
+             retries: int = 3, backoff: float = 0.002, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run the mixed workload against a service.
+
+    Args:
+        service (MilkSampleDBService): Service under test, with data already loaded
+        readers (int): Number of reader threads
+        writers (int): Number of writer threads
+        duration (float): Seconds to run
+        read_mix (str): Weighted read operations, see parse_mix
+        write_mix (str): Weighted write operations, see parse_mix
+        retries (int): Retries of an operation that failed with SQLITE_BUSY or SQLITE_LOCKED
+        backoff (float): Seconds before the first retry
+        seed (int): Seed for the workers' random choices
+
+    Returns:
+        Dict[str, Any]: Totals for reads and writes and statistics per operation
+    """
+    workload = Workload(service)
+    reads = parse_mix(read_mix, workload.read_operations)
+    writes = parse_mix(write_mix, workload.write_operations)
+    reader_states = [WorkerState(seed * 1000 + index) for index in range(readers)]
+    writer_states = [WorkerState(seed * 1000 + readers + index) for index in range(writers)]
+
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_worker, args=(workload.read_operations, reads, state, deadline,
+                                                         retries, backoff))
+               for state in reader_states]
+    threads += [threading.Thread(target=run_worker, args=(workload.write_operations, writes, state, deadline,
+                                                          retries, backoff))
+                for state in writer_states]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    report: Dict[str, Any] = {'seconds': round(seconds, 3)}
+    for role, states in (('reads', reader_states), ('writes', writer_states)):
+        operations = summarize(states, seconds)
+        calls = sum(entry['calls'] for entry in operations.values())
+        all_timings = sorted(value for state in states for values in state.timings.values() for value in values)
+        report[role] = {
+            'threads': len(states),
+            'calls': calls,
+            'per_second': round(calls / seconds, 1) if seconds else 0.0,
+            'p50_ms': round(percentile(all_timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(all_timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(all_timings, 0.99) * 1000, 3),
+            'max_ms': round((all_timings[-1] if all_timings else 0.0) * 1000, 3),
+            'errors': sum(entry['errors'] for entry in operations.values()),
+            'busy': sum(entry['busy'] for entry in operations.values()),
+            'retries': sum(entry['retries'] for entry in operations.values()),
+            'operations': operations
+        }
+    return report
+
+def main(argv: Optional[list] = None) -> int:
+    """Run the load generator from the command line; return the process exit status."""
+    parser = argparse.ArgumentParser(description="Run a concurrent mixed workload against the milk sample service")
+    parser.add_argument("--readers", type=int, default=8, help="reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="writer threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--db", help="existing database file to use (it is written to); "
+                                     "default: a temporary database with synthetic data")
+    parser.add_argument("--rows", type=int, default=10000, help="synthetic records in the temporary database")
+    parser.add_argument("--pragmas", choices=sorted(PRAGMA_PRESETS), default="default", help="pragma preset")
+    parser.add_argument("--pragma", action="append", default=[], metavar="NAME=VALUE",
+                        help="set one pragma, overriding the preset (repeatable)")
+    parser.add_argument("--busy-timeout-ms", type=float, default=5000.0,
+                        help="how long SQLite waits for a lock before SQLITE_BUSY")
+    parser.add_argument("--retries", type=int, default=3, help="retries after SQLITE_BUSY or SQLITE_LOCKED")
+    parser.add_argument("--backoff-ms", type=float, default=2.0, help="delay before the first retry")
+    parser.add_argument("--read-mix", default=DEFAULT_READ_MIX, help="weighted read operations")
+    parser.add_argument("--write-mix", default=DEFAULT_WRITE_MIX, help="weighted write operations")
+    parser.add_argument("--seed", type=int, default=0, help="seed for data and operation choices")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    configure_logging()
+    try:
+        pragmas = parse_pragmas(args.pragmas, args.pragma)
+    except ValueError as e:
+        parser.error(str(e))
+
+    options = {'pragmas': pragmas, 'busy_timeout': args.busy_timeout_ms / 1000}
+    with tempfile.TemporaryDirectory(prefix="milk_load_") as directory:
+        db_config = DatabaseConfig(args.db, **options) if args.db else DatabaseConfig.temporary(directory, **options)
+        try:
+            service = MilkSampleDBService(MilkSampleDBRepository(db_config))
+            if not args.db:
+                generator = SyntheticDatasetGenerator(learn_profile_from_csv(), args.seed)
+                generator.populate(service.repository, args.rows)
+            rows = service.get_sample_count()
+            # Lock errors are counted in the report; the repository would also log each one
+            persistence_logger = logging.getLogger("src.persistence")
+            previous_level = persistence_logger.level
+            persistence_logger.setLevel(logging.CRITICAL)
+            try:
+                results = run_load(service, args.readers, args.writers, args.duration, args.read_mix,
+                                   args.write_mix, args.retries, args.backoff_ms / 1000, args.seed)
+            finally:
+                persistence_logger.setLevel(previous_level)
+            settings = db_config.read_pragmas()
+        finally:
+            db_config.close()
+
+    report = {
+        'meta': {
+            'readers': args.readers,
+            'writers': args.writers,
+            'duration': args.duration,
+            'rows': rows,
+            'read_mix': args.read_mix,
+            'write_mix': args.write_mix,
+            'pragmas': settings,
+            'busy_timeout_ms': args.busy_timeout_ms,
+            'retries': args.retries,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        },
+        **results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This script benchmarks ingest, point reads, filtered lookups, aggregates,
+pagination and CRUD on synthetic datasets of several sizes.
+
+For each size a synthetic CSV file is generated (src.persistence.synthetic_dataset),
+imported with DataMigration.migrate_data, and then every operation is timed
+through MilkSampleDBService. Results are printed as JSON and can be compared
+with a stored baseline; the script exits with status 1 when an operation got
+slower than the allowed threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000] [--engine sqlite]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+        [--save-baseline baseline.json] [--slow-query-ms 5]
+        [--startup-runs 5] [--startup-budget-ms 150]
+
+With --slow-query-ms the SQLite engines time every statement and the report
+gains a "slow_queries" section with the most expensive statement shapes and
+their query plans.
+
+Cold start is measured first: the interactive viewer and the scripting CLI
+are imported in fresh interpreters with -X importtime. The "startup" section
+has the median import time of each and its heaviest imports, and the script
+exits with status 1 when a median is over --startup-budget-ms. Use
+--startup-runs 0 to skip it.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.data_migration import DataMigration
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.sharded_repository import ShardedMilkSampleDBRepository
+from src.persistence.synthetic_dataset import SyntheticDatasetGenerator, learn_profile_from_csv
+from src.observability.slow_queries import configure_slow_query_log
+
+ENGINES = ('sqlite', 'sqlite-memory', 'sharded', 'in-memory')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points whose cold import time is budgeted
+STARTUP_MODULES = ('src.presentation.milk_sample_db_view', 'src.presentation.cli')
+STARTUP_BUDGET_MS = 150.0
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Get a percentile of an already sorted list by nearest rank."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+@contextlib.contextmanager
+def open_engine(engine: str, directory: str) -> Iterator[Any]:
+    """
+    Create an empty repository for one dataset size.
+
+    Args:
+        engine (str): One of ENGINES
+        directory (str): Scratch directory for database files
+
+    Yields:
+        SampleRepository: The repository, released on exit
+    """
+    if engine == 'in-memory':
+        repository = InMemoryMilkSampleRepository()
+        repository.initialize_database()
+        yield repository
+    elif engine == 'sharded':
+        repository = ShardedMilkSampleDBRepository(tempfile.mkdtemp(prefix="shards_", dir=directory))
+        repository.initialize_database()
+        try:
+            yield repository
+        finally:
+            repository.close()
+    else:
+        db_config = DatabaseConfig(":memory:") if engine == 'sqlite-memory' else DatabaseConfig.temporary(directory)
+        try:
+            yield MilkSampleDBRepository(db_config)
+        finally:
+            db_config.close()
+
+def time_operation(name: str, size: int, operation: Callable[[int], Any],
+                   count: int, min_seconds: float = 0.0) -> Dict[str, Any]:
+    """
+    Time repeated calls of an operation.
+
+    Args:
+        name (str): Benchmark name
+        size (int): Dataset size
+        operation (Callable[[int], Any]): Called with the iteration number
+        count (int): Minimum number of calls
+        min_seconds (float): Keep calling until at least this much time has passed
+
+    Returns:
+        Dict[str, Any]: Timing summary in microseconds
+    """
+    timings = []
+    started = time.perf_counter()
+    iteration = 0
+    while iteration < count or time.perf_counter() - started < min_seconds:
+        before = time.perf_counter_ns()
+        operation(iteration)
+        timings.append((time.perf_counter_ns() - before) / 1000.0)
+        iteration += 1
+    total = sum(timings)
+    timings.sort()
+    return {
+        'name': name,
+        'size': size,
+        'calls': len(timings),
+        'median_us': round(percentile(timings, 0.50), 2),
+        'p95_us': round(percentile(timings, 0.95), 2),
+        'min_us': round(timings[0], 2),
+        'ops_per_second': round(len(timings) / (total / 1e6), 1) if total else 0.0
+    }
+
+def run_size(engine: str, size: int, generator: SyntheticDatasetGenerator,
+             directory: str, seed: int, min_seconds: float) -> List[Dict[str, Any]]:
+    """
+    Run every benchmark on one dataset size.
+
+    Args:
+        engine (str): One of ENGINES
+        size (int): Number of records
+        generator (SyntheticDatasetGenerator): Source of the dataset
+        directory (str): Scratch directory
+        seed (int): Seed for the random access patterns
+        min_seconds (float): Minimum time spent on each read benchmark
+
+    Returns:
+        List[Dict[str, Any]]: One timing summary per benchmark
+    """
+    csv_path = os.path.join(directory, f"synthetic_{size}.csv")
+    generator.write_csv(csv_path, size)
+    results = []
+    with open_engine(engine, directory) as repository:
+        service = MilkSampleDBService(repository)
+        migration = DataMigration(csv_path, repository)
+        results.append(time_operation("migrate_data", size, lambda _: migration.migrate_data(batch_size=1000), 1))
+        os.remove(csv_path)
+
+        rng = random.Random(seed)
+        ids = [record_id for record_id, _ in service.query_samples(limit=5000)]
+        ids = [rng.choice(ids) for _ in range(1000)]
+        provinces = service.get_available_provinces()
+        stations = service.get_available_stations()
+        page_size = 100
+        offsets = [rng.randrange(0, max(1, size - page_size)) for _ in range(100)]
+
+        reads = [
+            ("get_sample_by_id", lambda i: service.get_sample_by_id(ids[i % len(ids)]), 200),
+            ("get_samples_by_province", lambda i: service.get_samples_by_province(provinces[i % len(provinces)]), 5),
+            ("get_samples_by_station", lambda i: service.get_samples_by_station(stations[i % len(stations)]), 5),
+            ("get_statistics", lambda i: service.get_statistics(), 3),
+            ("page_by_offset", lambda i: service.get_all_samples_with_ids(page_size, offsets[i % len(offsets)]), 20),
+            ("page_by_keyset", lambda i: service.query_samples(limit=page_size, after_id=ids[i % len(ids)]), 20),
+            ("stream_all", lambda i: sum(1 for _ in service.iter_query_samples(page_size=5000)), 1),
+        ]
+        for name, operation, count in reads:
+            results.append(time_operation(name, size, operation, count, min_seconds))
+
+        created: List[int] = []
+        def create(i):
+            record_id, _ = service.create_new_sample("MILK", "WHOLE", "01-Jan-24", "31-Mar-24",
+                                                     "BENCHMARK", "ON", 0.05 + i * 1e-6, 0.005, 0.04)
+            created.append(record_id)
+        results.append(time_operation("create_sample", size, create, 200))
+        results.append(time_operation("edit_sample", size,
+                                      lambda i: service.edit_sample(created[i % len(created)], sr90_activity=0.06), 200))
+        results.append(time_operation("delete_sample", size, lambda i: service.delete_sample(created[i]), len(created)))
+    return results
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse the report python -X importtime writes to stderr.
+
+    Args:
+        output (str): The interpreter's stderr
+
+    Returns:
+        List[Tuple[str, int, int]]: (module, self microseconds, cumulative microseconds) in import order
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        columns = line[len("import time:"):].split("|")
+        if len(columns) != 3 or not columns[0].strip().isdigit():
+            continue
+        entries.append((columns[2].strip(), int(columns[0]), int(columns[1])))
+    return entries
+
+def measure_startup(module: str, runs: int, budget_ms: float, heaviest: int = 10) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters and time it with -X importtime.
+
+    Args:
+        module (str): Dotted module name, imported from the project root
+        runs (int): Number of interpreters to start
+        budget_ms (float): Allowed median import time
+        heaviest (int): Number of imports listed by their own time
+
+    Returns:
+        Dict[str, Any]: Median and minimum import and process times, the budget verdict and the heaviest imports
+
+    Raises:
+        subprocess.CalledProcessError: If the module cannot be imported
+    """
+    import_times: List[float] = []
+    process_times: List[float] = []
+    entries: List[Tuple[str, int, int]] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        process_times.append((time.perf_counter() - started) * 1000)
+        entries = parse_importtime(completed.stderr)
+        import_times.append(next(cumulative for name, _, cumulative in entries if name == module) / 1000)
+    import_times.sort()
+    process_times.sort()
+    median = percentile(import_times, 0.50)
+    return {
+        'module': module,
+        'runs': runs,
+        'import_median_ms': round(median, 2),
+        'import_min_ms': round(import_times[0], 2),
+        'process_median_ms': round(percentile(process_times, 0.50), 2),
+        'budget_ms': budget_ms,
+        'over_budget': median > budget_ms,
+        'heaviest_imports': [{'module': name, 'self_ms': round(own / 1000, 2)}
+                             for name, own, _ in sorted(entries, key=lambda entry: entry[1], reverse=True)[:heaviest]]
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare median timings with a baseline.
+
+    Args:
+        results (List[Dict[str, Any]]): Current timing summaries
+        baseline (Dict[str, Any]): A previous report from this script
+        threshold (float): Allowed slowdown, e.g. 0.25 for 25%
+
+    Returns:
+        List[Dict[str, Any]]: One entry per benchmark present in both, with the ratio and a regression flag
+    """
+    previous = {(entry['name'], entry['size']): entry for entry in baseline.get('results', [])}
+    comparison = []
+    for entry in results:
+        before = previous.get((entry['name'], entry['size']))
+        if before is None or not before['median_us']:
+            continue
+        ratio = entry['median_us'] / before['median_us']
+        comparison.append({
+            'name': entry['name'],
+            'size': entry['size'],
+            'baseline_median_us': before['median_us'],
+            'median_us': entry['median_us'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1.0 + threshold
+        })
+    return comparison
+
+def main(argv: Optional[list] = None) -> int:
+    """Run the benchmarks from the command line; return the process exit status."""
+    parser = argparse.ArgumentParser(description="Benchmark the milk sample service")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated dataset sizes")
+    parser.add_argument("--engine", choices=ENGINES, default="sqlite", help="repository implementation")
+    parser.add_argument("--seed", type=int, default=0, help="seed for data and access patterns")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum time per read benchmark")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--save-baseline", help="write the report to this file as the new baseline")
+    parser.add_argument("--slow-query-ms", type=float, help="time SQL statements and report the slowest shapes")
+    parser.add_argument("--startup-runs", type=int, default=5, help="cold imports timed per entry point (0 skips)")
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail when an entry point's median import time is over this")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    slow_query_log = configure_slow_query_log(args.slow_query_ms) if args.slow_query_ms is not None else None
+
+    startup = [measure_startup(module, args.startup_runs, args.startup_budget_ms)
+               for module in STARTUP_MODULES] if args.startup_runs > 0 else []
+
+    results: List[Dict[str, Any]] = []
+    generator = SyntheticDatasetGenerator(learn_profile_from_csv(), args.seed)
+    with tempfile.TemporaryDirectory(prefix="milk_benchmarks_") as directory:
+        for size in sizes:
+            results.extend(run_size(args.engine, size, generator, directory, args.seed, args.min_seconds))
+
+    report: Dict[str, Any] = {
+        'meta': {
+            'engine': args.engine,
+            'sizes': sizes,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        },
+        'startup': startup,
+        'results': results
+    }
+    if slow_query_log is not None:
+        configure_slow_query_log(None)
+        report['slow_queries'] = [stats.to_dict() for stats in slow_query_log.top()]
+    status = 1 if any(entry['over_budget'] for entry in startup) else 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            report['comparison'] = compare(results, json.load(file), args.threshold)
+        if any(entry['regression'] for entry in report['comparison']):
+            status = 1
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text + "\n")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
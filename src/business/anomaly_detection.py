@@ -0,0 +1,268 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the AnomalyDetector class which flags suspicious
+strontium-90 readings. It is part of the Business Layer.
+
+This module is responsible for:
+- Keeping a robust per-station baseline (median and MAD of log10 activity)
+- Flagging readings with a large robust z-score
+- Flagging order-of-magnitude jumps from the previous reading of a station
+- Flagging readings whose error is large compared to the activity
+- Checking only newly ingested rows and storing flags in a side table
+"""
+
+import math
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.model.sample_dates import sample_midpoint_ordinal
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+# Scale factor that makes the MAD a consistent estimator of the standard deviation
+MAD_SCALE = 1.4826
+
+# Rule names stored in the sample_anomalies table
+RULE_ROBUST_Z = "robust_z"
+RULE_MAGNITUDE_JUMP = "magnitude_jump"
+RULE_ERROR_RATIO = "error_ratio"
+RULE_NON_POSITIVE = "non_positive_activity"
+
+class StationBaseline:
+    """
+    Robust baseline of the log10 activity readings for one station.
+
+    Attributes:
+        log_values (List[float]): Sorted log10 activities
+        series (List[Tuple[float, float]]): (time, log10 activity) pairs sorted by time
+    """
+
+    def __init__(self):
+        """Initialize an empty baseline."""
+        self.log_values: List[float] = []
+        self.series: List[Tuple[float, float]] = []
+        self._summary: Optional[Tuple[float, float]] = None
+
+    def add(self, time: float, log_value: float) -> None:
+        """
+        Add a reading to the baseline.
+
+        Args:
+            time (float): Midpoint of the sampling period (ordinal days)
+            log_value (float): log10 of the activity
+        """
+        insort(self.log_values, log_value)
+        insort(self.series, (time, log_value))
+        self._summary = None
+
+    def median_and_mad(self) -> Tuple[float, float]:
+        """
+        Get the median and median absolute deviation of the readings.
+
+        Returns:
+            Tuple[float, float]: (median, MAD) of the log10 activities
+        """
+        if self._summary is None:
+            median = _sorted_median(self.log_values)
+            mad = _sorted_median(sorted(abs(value - median) for value in self.log_values))
+            self._summary = (median, mad)
+        return self._summary
+
+    def previous_reading(self, time: float) -> Optional[float]:
+        """
+        Get the log10 activity of the latest reading before a given time.
+
+        Args:
+            time (float): Time to look before
+
+        Returns:
+            Optional[float]: log10 activity of the previous reading, or None
+        """
+        index = bisect_left(self.series, (time, -math.inf))
+        return self.series[index - 1][1] if index > 0 else None
+
+def _sorted_median(values: List[float]) -> float:
+    """Get the median of an already sorted list."""
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+class AnomalyDetector:
+    """
+    An incremental batch detector of anomalous Sr-90 readings.
+
+    This class is responsible for:
+    1. Building per-station baselines from rows already checked
+    2. Checking new rows column by column against those baselines
+    3. Storing flags in the sample_anomalies table and advancing the watermark
+    4. Caching baselines in memory between scans
+
+    Rows are checked once, when they are first scanned. Rows edited after
+    they were checked are only re-examined by a full scan.
+
+    A sharded repository is scanned shard by shard, each shard with its own
+    watermark: global IDs interleave the shards, so one watermark over them
+    would skip rows later added to a smaller shard. A station belongs to one
+    province, so its baseline lives on a single shard either way.
+
+    Attributes:
+        repository (MilkSampleDBRepository): The database repository instance
+        z_threshold (float): Robust z-score above which a reading is flagged
+        jump_orders (float): Change in orders of magnitude flagged as a jump
+        error_ratio_threshold (float): Error-to-activity ratio above which a reading is flagged
+        min_baseline (int): Minimum readings in a baseline before z-scores are used
+    """
+
+    def __init__(self,
+                 repository: Optional[MilkSampleDBRepository] = None,
+                 z_threshold: float = 3.5,
+                 jump_orders: float = 2.0,
+                 error_ratio_threshold: float = 1.0,
+                 min_baseline: int = 5):
+        """
+        Initialize the detector.
+
+        Args:
+            repository (Optional[MilkSampleDBRepository]): Database repository instance
+            z_threshold (float): Robust z-score threshold
+            jump_orders (float): Orders-of-magnitude jump threshold
+            error_ratio_threshold (float): Error-to-activity ratio threshold
+            min_baseline (int): Minimum baseline size for z-scores
+        """
+        self.repository = repository or MilkSampleDBRepository()
+        self.z_threshold = z_threshold
+        self.jump_orders = jump_orders
+        self.error_ratio_threshold = error_ratio_threshold
+        self.min_baseline = min_baseline
+        self._baselines: Dict[str, StationBaseline] = {}
+        self._baseline_watermark: Optional[int] = None
+        # Detectors of the shards of a sharded repository, by shard key
+        self._shard_detectors: Dict[str, 'AnomalyDetector'] = {}
+
+    def scan(self, full: bool = False, batch_size: int = 10000) -> Dict[str, Any]:
+        """
+        Check rows that have not been checked yet and store any flags.
+
+        Args:
+            full (bool): Discard all flags and baselines and check every row
+            batch_size (int): Number of rows read from the database at a time
+
+        Returns:
+            Dict[str, Any]: Summary with the rows checked, flags per rule and the new
+            watermark (a dictionary of watermarks by shard key for a sharded repository)
+        """
+        # A repository made of shards, whose global IDs are not assigned in order, is scanned shard by shard
+        if getattr(self.repository, 'get_shard_repositories', None) is not None:
+            return self._scan_shards(full, batch_size)
+
+        watermark = 0 if full else self.repository.get_anomaly_watermark()
+        high_id = self.repository.get_max_sample_id()
+        # The first scan has no baselines to compare against, so it checks everything
+        full = full or watermark == 0
+
+        if full:
+            self._load_baselines(0, high_id, batch_size)
+        elif self._baseline_watermark != watermark:
+            self._load_baselines(0, watermark, batch_size)
+
+        new_batches = list(self.repository.iter_measurement_batches(batch_size, after_id=watermark,
+                                                                    through_id=high_id))
+        pending = [self._check_columns(columns) for columns in new_batches]
+        if not full:
+            # New rows join the baselines only after they have been checked
+            for columns in new_batches:
+                self._add_to_baselines(columns)
+
+        flags = [flag for batch in pending for flag in batch]
+        self.repository.store_anomalies(flags, high_id, replace_all=full)
+        self._baseline_watermark = high_id
+
+        by_rule: Dict[str, int] = {}
+        for _, rule, _, _ in flags:
+            by_rule[rule] = by_rule.get(rule, 0) + 1
+        return {
+            'rows_checked': sum(len(columns['id']) for columns in new_batches),
+            'flags_raised': len(flags),
+            'flags_by_rule': by_rule,
+            'watermark': high_id
+        }
+
+    def _scan_shards(self, full: bool, batch_size: int) -> Dict[str, Any]:
+        """Scan every shard of a sharded repository and combine the summaries."""
+        summary: Dict[str, Any] = {'rows_checked': 0, 'flags_raised': 0, 'flags_by_rule': {}, 'watermark': {}}
+        for key, shard in self.repository.get_shard_repositories():
+            detector = self._shard_detectors.get(key)
+            if detector is None:
+                detector = self._shard_detectors[key] = AnomalyDetector(
+                    shard, self.z_threshold, self.jump_orders, self.error_ratio_threshold, self.min_baseline)
+            shard_summary = detector.scan(full, batch_size)
+            summary['rows_checked'] += shard_summary['rows_checked']
+            summary['flags_raised'] += shard_summary['flags_raised']
+            for rule, count in shard_summary['flags_by_rule'].items():
+                summary['flags_by_rule'][rule] = summary['flags_by_rule'].get(rule, 0) + count
+            summary['watermark'][key] = shard_summary['watermark']
+        return summary
+
+    def _load_baselines(self, after_id: int, through_id: int, batch_size: int) -> None:
+        """Rebuild the cached baselines from rows in an ID range."""
+        self._baselines = {}
+        for columns in self.repository.iter_measurement_batches(batch_size, after_id=after_id,
+                                                                through_id=through_id):
+            self._add_to_baselines(columns)
+        self._baseline_watermark = through_id
+
+    def _add_to_baselines(self, columns: Dict[str, List[Any]]) -> None:
+        """Add the positive readings of a column batch to the station baselines."""
+        for station, start, stop, activity in zip(columns['station_name'], columns['start_date'],
+                                                 columns['stop_date'], columns['sr90_activity']):
+            if activity is None or activity <= 0:
+                continue
+            time = sample_midpoint_ordinal(start, stop)
+            baseline = self._baselines.get(station)
+            if baseline is None:
+                baseline = self._baselines[station] = StationBaseline()
+            baseline.add(time if time is not None else math.inf, math.log10(activity))
+
+    def _check_columns(self, columns: Dict[str, List[Any]]) -> List[Tuple[int, str, float, str]]:
+        """
+        Check one column batch against the cached baselines.
+
+        Args:
+            columns (Dict[str, List[Any]]): Batch from MilkSampleDBRepository.iter_measurement_batches
+
+        Returns:
+            List[Tuple[int, str, float, str]]: (sample_id, rule, score, detail) flags
+        """
+        flags: List[Tuple[int, str, float, str]] = []
+        for sample_id, station, start, stop, activity, error in zip(
+                columns['id'], columns['station_name'], columns['start_date'],
+                columns['stop_date'], columns['sr90_activity'], columns['sr90_error']):
+            if activity is None or activity <= 0:
+                flags.append((sample_id, RULE_NON_POSITIVE, 0.0, f"activity {activity} Bq/L"))
+                continue
+
+            log_value = math.log10(activity)
+            baseline = self._baselines.get(station)
+            if baseline is not None and len(baseline.log_values) >= self.min_baseline:
+                median, mad = baseline.median_and_mad()
+                if mad > 0:
+                    z_score = (log_value - median) / (MAD_SCALE * mad)
+                    if abs(z_score) > self.z_threshold:
+                        flags.append((sample_id, RULE_ROBUST_Z, z_score,
+                                      f"station median {10 ** median:.3g} Bq/L"))
+
+            if baseline is not None:
+                time = sample_midpoint_ordinal(start, stop)
+                previous = baseline.previous_reading(time if time is not None else math.inf)
+                if previous is not None and abs(log_value - previous) >= self.jump_orders:
+                    flags.append((sample_id, RULE_MAGNITUDE_JUMP, log_value - previous,
+                                  f"previous reading {10 ** previous:.3g} Bq/L"))
+
+            if error is not None and error / activity > self.error_ratio_threshold:
+                flags.append((sample_id, RULE_ERROR_RATIO, error / activity,
+                              f"error {error:.3g} Bq/L"))
+        return flags
@@ -0,0 +1,322 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the AsyncMilkSampleDBService class which exposes the
+MilkSampleDBService operations to asyncio code. It is part of the Business Layer.
+
+This module is responsible for:
+- Running blocking database reads on a bounded thread pool
+- Limiting how many operations are in flight at once
+- Serializing writes through a single writer task and thread
+- Streaming large results as async iterators
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.milk_sample_db_repository import ChangeLogPolicy
+
+class AsyncMilkSampleDBService:
+    """
+    An asyncio facade over MilkSampleDBService.
+
+    This class is responsible for:
+    1. Running reads on a thread pool; each worker thread keeps its own
+       SQLite connection through DatabaseConfig, so the pool doubles as a
+       connection pool
+    2. Capping the number of reads in flight with a semaphore
+    3. Feeding every write through a bounded queue to one writer task, which
+       runs them one at a time on a dedicated thread, so SQLite never sees
+       competing writers
+    4. Streaming samples and changes in batches as async iterators
+
+    Cancelling a read stops the caller waiting for it; the query itself runs
+    to completion in its thread. Cancelling a write that is still queued
+    stops it from running; a write that has started always completes.
+
+    Use it as an async context manager, or call start() and close():
+
+        async with AsyncMilkSampleDBService() as service:
+            sample = await service.get_sample_by_id(1)
+
+    Attributes:
+        service (MilkSampleDBService): The synchronous service doing the work
+        max_workers (int): Number of reader threads
+        max_concurrency (int): Maximum reads running or waiting for a thread
+        write_queue_size (int): Maximum queued writes before callers wait
+    """
+
+    def __init__(self,
+                 service: Optional[MilkSampleDBService] = None,
+                 max_workers: int = 8,
+                 max_concurrency: int = 64,
+                 write_queue_size: int = 256):
+        """
+        Initialize the facade. No threads are started until start().
+
+        Args:
+            service (Optional[MilkSampleDBService]): Service instance to wrap
+            max_workers (int): Number of reader threads
+            max_concurrency (int): Maximum reads in flight
+            write_queue_size (int): Maximum number of queued writes
+        """
+        self.service = service or MilkSampleDBService()
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.write_queue_size = write_queue_size
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        self._write_pool: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'AsyncMilkSampleDBService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Start the thread pools and the writer task on the running event loop."""
+        if self._writer_task is not None:
+            return
+        self._read_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sample-reader")
+        self._write_pool = ThreadPoolExecutor(1, thread_name_prefix="sample-writer")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._write_queue = asyncio.Queue(self.write_queue_size)
+        self._writer_task = asyncio.create_task(self._run_writer(), name="sample-writer")
+
+    async def close(self) -> None:
+        """Finish queued writes, stop the writer task and shut down the thread pools."""
+        if self._writer_task is None:
+            return
+        await self._write_queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+        self._read_pool.shutdown(wait=False, cancel_futures=True)
+        self._write_pool.shutdown(wait=True)
+
+    async def _read(self, function: Callable, *args, **kwargs) -> Any:
+        """Run a blocking read on the reader pool, within the concurrency limit."""
+        await self.start()
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._read_pool, partial(function, *args, **kwargs))
+
+    async def _write(self, function: Callable, *args, **kwargs) -> Any:
+        """Queue a blocking write for the writer task and wait for its result."""
+        await self.start()
+        result = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((partial(function, *args, **kwargs), result))
+        # Cancelling the caller cancels this future, which the writer then skips
+        return await result
+
+    async def _run_writer(self) -> None:
+        """Run queued writes one at a time until close() queues None."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._write_queue.get()
+            if item is None:
+                return
+            call, result = item
+            if result.cancelled():
+                continue
+            try:
+                value = await loop.run_in_executor(self._write_pool, call)
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+            else:
+                if not result.done():
+                    result.set_result(value)
+
+    async def get_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
+        """See MilkSampleDBService.get_sample_by_id."""
+        return await self._read(self.service.get_sample_by_id, record_id)
+
+    async def get_all_samples(self, limit: Optional[int] = None, offset: int = 0) -> List[MilkSampleRecord]:
+        """See MilkSampleDBService.get_all_samples."""
+        return await self._read(self.service.get_all_samples, limit, offset)
+
+    async def get_all_samples_with_ids(self, limit: Optional[int] = None,
+                                       offset: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """See MilkSampleDBService.get_all_samples_with_ids."""
+        return await self._read(self.service.get_all_samples_with_ids, limit, offset)
+
+    async def get_samples_by_province(self, province: str) -> List[MilkSampleRecord]:
+        """See MilkSampleDBService.get_samples_by_province."""
+        return await self._read(self.service.get_samples_by_province, province)
+
+    async def get_samples_by_station(self, station_name: str) -> List[MilkSampleRecord]:
+        """See MilkSampleDBService.get_samples_by_station."""
+        return await self._read(self.service.get_samples_by_station, station_name)
+
+    async def query_samples(self,
+                            province: Optional[str] = None,
+                            station_name: Optional[str] = None,
+                            start_from: Optional[date] = None,
+                            start_until: Optional[date] = None,
+                            limit: Optional[int] = None,
+                            offset: int = 0,
+                            after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """See MilkSampleDBService.query_samples."""
+        return await self._read(self.service.query_samples, province, station_name,
+                                start_from, start_until, limit, offset, after_id)
+
+    async def export_samples(self, destination: str, fmt: str = "csv", compress: Optional[bool] = None,
+                             page_size: int = 1000, **filters) -> Dict[str, Any]:
+        """See MilkSampleDBService.export_samples."""
+        return await self._read(self.service.export_samples, destination, fmt, compress, page_size, **filters)
+
+    async def get_sample_count(self) -> int:
+        """See MilkSampleDBService.get_sample_count."""
+        return await self._read(self.service.get_sample_count)
+
+    async def get_data_generation(self) -> int:
+        """See MilkSampleDBService.get_data_generation."""
+        return await self._read(self.service.get_data_generation)
+
+    async def get_available_provinces(self) -> List[str]:
+        """See MilkSampleDBService.get_available_provinces."""
+        return await self._read(self.service.get_available_provinces)
+
+    async def get_available_stations(self) -> List[str]:
+        """See MilkSampleDBService.get_available_stations."""
+        return await self._read(self.service.get_available_stations)
+
+    async def get_statistics(self) -> dict:
+        """See MilkSampleDBService.get_statistics."""
+        return await self._read(self.service.get_statistics)
+
+    async def get_detailed_statistics(self, batch_size: int = 1000) -> dict:
+        """See MilkSampleDBService.get_detailed_statistics."""
+        return await self._read(self.service.get_detailed_statistics, batch_size)
+
+    async def get_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """See MilkSampleDBService.get_anomalies."""
+        return await self._read(self.service.get_anomalies, rule)
+
+    async def query_cube(self, group_by: Sequence[str] = (), **filters) -> List[Dict[str, Any]]:
+        """See MilkSampleDBService.query_cube."""
+        return await self._read(self.service.query_cube, group_by, **filters)
+
+    async def create_new_sample(self,
+                                sample_type: str,
+                                type: str,
+                                start_date: str,
+                                stop_date: str,
+                                station_name: str,
+                                province: str,
+                                sr90_activity: float,
+                                sr90_error: Optional[float] = None,
+                                sr90_activity_per_calcium: Optional[float] = None) -> Tuple[int, MilkSampleRecord]:
+        """See MilkSampleDBService.create_new_sample."""
+        return await self._write(self.service.create_new_sample, sample_type, type, start_date, stop_date,
+                                 station_name, province, sr90_activity, sr90_error, sr90_activity_per_calcium)
+
+    async def edit_sample(self, record_id: int,
+                          **kwargs) -> Tuple[bool, Optional[MilkSampleRecord], Optional[MilkSampleRecord]]:
+        """See MilkSampleDBService.edit_sample."""
+        return await self._write(self.service.edit_sample, record_id, **kwargs)
+
+    async def delete_sample(self, record_id: int) -> Tuple[bool, Optional[MilkSampleRecord]]:
+        """See MilkSampleDBService.delete_sample."""
+        return await self._write(self.service.delete_sample, record_id)
+
+    async def apply_decay_correction(self, reference_date: date, batch_size: int = 10000) -> dict:
+        """See MilkSampleDBService.apply_decay_correction."""
+        return await self._write(self.service.apply_decay_correction, reference_date, batch_size)
+
+    async def detect_anomalies(self, full: bool = False) -> dict:
+        """See MilkSampleDBService.detect_anomalies."""
+        return await self._write(self.service.detect_anomalies, full)
+
+    async def compact_changes(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """See MilkSampleDBService.compact_changes."""
+        return await self._write(self.service.compact_changes, policy)
+
+    async def iter_samples(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream every (id, record) pair, fetching one batch per thread hop.
+
+        Each batch is a separate keyset query after the last ID seen, so no
+        cursor is left open on one reader thread's connection while the
+        next batch runs on another.
+
+        Args:
+            batch_size (int): Number of records fetched per batch
+
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+        """
+        after_id = 0
+        while True:
+            batch = await self._read(self.service.repository.query_samples,
+                                     limit=batch_size, after_id=after_id)
+            if not batch:
+                return
+            for item in batch:
+                yield item
+            after_id = batch[-1][0]
+
+    async def iter_query_samples(self, page_size: int = 1000,
+                                 **filters) -> AsyncIterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream the samples matching the filters, fetching one page per thread hop.
+
+        Args:
+            page_size (int): Number of samples fetched per page
+            **filters: Filters accepted by MilkSampleDBService.iter_query_samples
+
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+        """
+        samples = self.service.iter_query_samples(page_size=page_size, **filters)
+        try:
+            while True:
+                batch = await self._read(lambda: list(islice(samples, page_size)))
+                if not batch:
+                    return
+                for item in batch:
+                    yield item
+        finally:
+            try:
+                samples.close()
+            except ValueError:
+                # A cancelled fetch is still running in its thread and will finish on its own
+                pass
+
+    async def changes_since(self, seq: int = 0, limit: Optional[int] = None,
+                            batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the change log after a sequence number.
+
+        Args:
+            seq (int): Sequence number of the last change already applied
+            limit (Optional[int]): Maximum number of changes to yield
+            batch_size (int): Number of entries fetched per batch
+
+        Yields:
+            Dict[str, Any]: Entries as yielded by MilkSampleDBService.changes_since
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_limit = batch_size if remaining is None else min(batch_size, remaining)
+            entries = await self._read(self.service.repository.read_changes, seq, batch_limit)
+            if not entries:
+                return
+            for entry in entries:
+                yield entry
+            seq = entries[-1]['seq']
+            if remaining is not None:
+                remaining -= len(entries)
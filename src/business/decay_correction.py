@@ -0,0 +1,191 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the DecayCorrectionEngine class which decay-corrects
+strontium-90 measurements to a common reference date. It is part of the
+Business Layer.
+
+This module is responsible for:
+- Converting sampling periods to elapsed time from a reference date
+- Decay-correcting activity, error and activity per calcium in column batches
+- Propagating measurement and half-life uncertainty
+- Storing the corrected values in the milk_samples_decay_corrected table
+"""
+
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.model.sample_dates import sample_midpoint_ordinal
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+# Sr-90 half-life in years and its standard uncertainty
+SR90_HALF_LIFE_YEARS = 28.79
+SR90_HALF_LIFE_UNCERTAINTY_YEARS = 0.06
+DAYS_PER_YEAR = 365.25
+
+@dataclass
+class DecayCorrectedBatch:
+    """
+    Column-oriented result of decay-correcting one batch of records.
+
+    Attributes:
+        ids (array): Database IDs of the corrected records
+        decay_factors (array): Multiplier applied to each measurement
+        activities (array): Corrected Sr-90 activity in Bq/L
+        errors (List[Optional[float]]): Propagated uncertainty in Bq/L
+        activities_per_calcium (List[Optional[float]]): Corrected activity per calcium in Bq/g
+        skipped_ids (List[int]): IDs whose sampling dates could not be parsed
+    """
+    ids: array
+    decay_factors: array
+    activities: array
+    errors: List[Optional[float]]
+    activities_per_calcium: List[Optional[float]]
+    skipped_ids: List[int]
+
+    def rows(self) -> List[Tuple]:
+        """
+        Get the batch as rows ready for a bulk insert.
+
+        Returns:
+            List[Tuple]: (sample_id, decay_factor, activity, error, activity_per_calcium) rows
+        """
+        return list(zip(self.ids, self.decay_factors, self.activities,
+                        self.errors, self.activities_per_calcium))
+
+class DecayCorrectionEngine:
+    """
+    A batch engine that decay-corrects Sr-90 measurements to a reference date.
+
+    This class is responsible for:
+    1. Reading measurement columns from the repository in batches
+    2. Computing decay factors for whole columns at once
+    3. Propagating the uncertainty of the measurement and the half-life
+    4. Writing corrected values to the derived table in one bulk update
+
+    The correction for a sample measured at time t is
+    A_ref = A * exp(-ln(2) * (t_ref - t) / T_half), where t is the midpoint
+    of the sampling period.
+
+    Attributes:
+        repository (MilkSampleDBRepository): The database repository instance
+        half_life_years (float): Half-life used for the correction
+        half_life_uncertainty_years (float): Standard uncertainty of the half-life
+    """
+
+    def __init__(self,
+                 repository: Optional[MilkSampleDBRepository] = None,
+                 half_life_years: float = SR90_HALF_LIFE_YEARS,
+                 half_life_uncertainty_years: float = SR90_HALF_LIFE_UNCERTAINTY_YEARS):
+        """
+        Initialize the engine.
+
+        Args:
+            repository (Optional[MilkSampleDBRepository]): Database repository instance
+            half_life_years (float): Half-life in years (default: Sr-90)
+            half_life_uncertainty_years (float): Half-life standard uncertainty in years
+
+        Raises:
+            ValueError: If the half-life is not positive
+        """
+        if half_life_years <= 0:
+            raise ValueError("Half-life must be a positive number of years")
+        self.repository = repository or MilkSampleDBRepository()
+        self.half_life_years = half_life_years
+        self.half_life_uncertainty_years = half_life_uncertainty_years
+
+    def correct_columns(self, columns: Dict[str, List[Any]], reference_date: date) -> DecayCorrectedBatch:
+        """
+        Decay-correct one column-oriented batch of measurements.
+
+        Args:
+            columns (Dict[str, List[Any]]): Batch as produced by
+                MilkSampleDBRepository.iter_measurement_batches
+            reference_date (date): Date every value is corrected to
+
+        Returns:
+            DecayCorrectedBatch: Corrected columns for the rows with valid dates
+        """
+        reference_ordinal = reference_date.toordinal()
+        decay_constant = math.log(2) / (self.half_life_years * DAYS_PER_YEAR)
+        # Relative uncertainty of the decay factor per day elapsed
+        relative_half_life_error = (math.log(2) * self.half_life_uncertainty_years
+                                    / (self.half_life_years ** 2 * DAYS_PER_YEAR))
+
+        midpoints = [sample_midpoint_ordinal(start, stop)
+                     for start, stop in zip(columns['start_date'], columns['stop_date'])]
+        valid = [i for i, midpoint in enumerate(midpoints) if midpoint is not None]
+        skipped_ids = [columns['id'][i] for i, midpoint in enumerate(midpoints) if midpoint is None]
+
+        elapsed = array('d', (reference_ordinal - midpoints[i] for i in valid))
+        factors = array('d', (math.exp(-decay_constant * days) for days in elapsed))
+        activities = array('d', (columns['sr90_activity'][i] * factor for i, factor in zip(valid, factors)))
+
+        errors: List[Optional[float]] = []
+        for i, factor, days, activity in zip(valid, factors, elapsed, activities):
+            error = columns['sr90_error'][i]
+            if error is None:
+                errors.append(None)
+                continue
+            half_life_term = activity * relative_half_life_error * abs(days)
+            errors.append(math.hypot(error * factor, half_life_term))
+
+        per_calcium = [None if columns['sr90_activity_per_calcium'][i] is None
+                       else columns['sr90_activity_per_calcium'][i] * factor
+                       for i, factor in zip(valid, factors)]
+
+        return DecayCorrectedBatch(
+            ids=array('q', (columns['id'][i] for i in valid)),
+            decay_factors=factors,
+            activities=activities,
+            errors=errors,
+            activities_per_calcium=per_calcium,
+            skipped_ids=skipped_ids
+        )
+
+    def iter_corrected_batches(self, reference_date: date, batch_size: int = 10000) -> Iterator[DecayCorrectedBatch]:
+        """
+        Decay-correct every record in the database, one batch at a time.
+
+        Args:
+            reference_date (date): Date every value is corrected to
+            batch_size (int): Number of records per batch
+
+        Yields:
+            DecayCorrectedBatch: Corrected columns for each batch
+        """
+        for columns in self.repository.iter_measurement_batches(batch_size):
+            yield self.correct_columns(columns, reference_date)
+
+    def run(self, reference_date: date, batch_size: int = 10000) -> Dict[str, Any]:
+        """
+        Decay-correct every record and store the results in one bulk update.
+
+        Args:
+            reference_date (date): Date every value is corrected to
+            batch_size (int): Number of records per batch
+
+        Returns:
+            Dict[str, Any]: Summary with the number of rows written and skipped
+        """
+        skipped: List[int] = []
+
+        def row_batches():
+            for batch in self.iter_corrected_batches(reference_date, batch_size):
+                skipped.extend(batch.skipped_ids)
+                yield batch.rows()
+
+        written = self.repository.replace_decay_corrected(reference_date.isoformat(), row_batches())
+        return {
+            'reference_date': reference_date.isoformat(),
+            'half_life_years': self.half_life_years,
+            'rows_written': written,
+            'rows_skipped': len(skipped),
+            'skipped_ids': skipped
+        }
@@ -14,14 +14,25 @@ This module replaces the file-based service with database operations including:
 - DELETE: Remove milk sample records
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
-from typing import List, Optional, Tuple
+import math
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from src.model.milk_sample_record import MilkSampleRecord
-from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.model.sample_dates import parse_sample_date
+from src.observability.metrics import REGISTRY, count_cache, instrumented, lru_cache_collector
+from src.persistence.milk_sample_db_repository import ChangeLogPolicy, MilkSampleDBRepository
+from src.persistence.sample_repository import SampleRepository
+
+# Analysis, export and cache subsystems are imported by the methods that use them,
+# so building a service for a quick query does not load them
+if TYPE_CHECKING:
+    from src.business.anomaly_detection import AnomalyDetector
+    from src.persistence.columnar_cache import ColumnarCache
 
+# Date parsing is cached; report how well the cache works alongside the other metrics
+REGISTRY.add_collector(lru_cache_collector("sample_dates", parse_sample_date))
+
+@instrumented
 class MilkSampleDBService:
     """
     A service class that manages milk sample data and business logic using database operations.
@@ -39,10 +50,10 @@ class MilkSampleDBService:
     a clean interface for the presentation layer to interact with the data.
     
     Attributes:
-        repository (MilkSampleDBRepository): The database repository instance
+        repository (SampleRepository): The repository instance (SQLite by default)
     """
     
-    def __init__(self, repository: Optional[MilkSampleDBRepository] = None):
+    def __init__(self, repository: Optional[SampleRepository] = None):
         """
         Initialize the service with a database repository.
         
@@ -50,9 +61,15 @@ class MilkSampleDBService:
         the basic structure needed for the service to operate.
         
         Args:
-            repository (Optional[MilkSampleDBRepository]): Database repository instance
+            repository (Optional[SampleRepository]): Any SampleRepository implementation
         """
         self.repository = repository or MilkSampleDBRepository()
+        self._anomaly_detector: Optional['AnomalyDetector'] = None
+        # Cube query results for the current data generation
+        self._cube_cache: Dict[Tuple, List[Dict[str, Any]]] = {}
+        self._cube_cache_generation: Optional[int] = None
+        # Policy applied by compact_changes when none is given
+        self.change_log_policy = ChangeLogPolicy()
     
     def get_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
         """
@@ -126,6 +143,119 @@ class MilkSampleDBService:
         """
         return self.repository.read_samples_by_station(station_name)
     
+    def query_samples(self,
+                      province: Optional[str] = None,
+                      station_name: Optional[str] = None,
+                      start_from: Optional[date] = None,
+                      start_until: Optional[date] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0,
+                      after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Get samples matching every given filter.
+        
+        Filters that are None are ignored. Results are in ID order.
+        
+        Args:
+            province (Optional[str]): Province to filter by
+            station_name (Optional[str]): Station name to filter by
+            start_from (Optional[date]): Earliest sample start date (inclusive)
+            start_until (Optional[date]): Latest sample start date (inclusive)
+            limit (Optional[int]): Maximum number of samples to return
+            offset (int): Number of matching samples to skip
+            after_id (int): Only include samples with an ID greater than this
+            
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+        """
+        return self.repository.query_samples(province, station_name, start_from, start_until,
+                                             limit, offset, after_id)
+    
+    def iter_query_samples(self,
+                           province: Optional[str] = None,
+                           station_name: Optional[str] = None,
+                           start_from: Optional[date] = None,
+                           start_until: Optional[date] = None,
+                           limit: Optional[int] = None,
+                           offset: int = 0,
+                           page_size: int = 1000) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream the samples matching every given filter in ID order.
+    
+        Pages are fetched by keyset (IDs after the last one seen), so each
+        page costs the same however deep into the result it is and memory
+        stays bounded by page_size.
+    
+        Args:
+            province (Optional[str]): Province to filter by
+            station_name (Optional[str]): Station name to filter by
+            start_from (Optional[date]): Earliest sample start date (inclusive)
+            start_until (Optional[date]): Latest sample start date (inclusive)
+            limit (Optional[int]): Maximum number of samples to yield
+            offset (int): Number of matching samples to skip
+            page_size (int): Number of samples fetched per query
+    
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+        """
+        after_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_limit = page_size if remaining is None else min(page_size, remaining)
+            rows = self.repository.query_samples(province, station_name, start_from, start_until,
+                                                 batch_limit, offset, after_id)
+            yield from rows
+            if len(rows) < batch_limit:
+                return
+            offset = 0
+            after_id = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+    
+    def export_samples(self,
+                       destination: str,
+                       fmt: str = "csv",
+                       compress: Optional[bool] = None,
+                       page_size: int = 1000,
+                       **filters) -> Dict[str, Any]:
+        """
+        Export the samples matching the filters to a file.
+    
+        Rows are streamed page by page, so memory use does not grow with the
+        size of the export.
+    
+        Args:
+            destination (str): Output path
+            fmt (str): 'csv' (re-importable by DataMigration), 'jsonl' or 'columnar'
+            compress (Optional[bool]): gzip the output (default: when the path ends in .gz)
+            page_size (int): Number of samples fetched per query
+            **filters: Filters accepted by iter_query_samples
+    
+        Returns:
+            Dict[str, Any]: Export summary with format, rows, bytes, seconds and destination
+        """
+        from src.persistence.sample_export import write_samples
+        
+        rows = self.iter_query_samples(page_size=page_size, **filters)
+        return write_samples(rows, destination, fmt, compress)
+    
+    def load_columnar_cache(self, directory: str) -> 'ColumnarCache':
+        """
+        Open a memory-mapped columnar cache of every sample.
+        
+        The cache is built on first use and rebuilt whenever the repository
+        has changed since it was built, so it always matches the data.
+        
+        Args:
+            directory (str): Cache directory
+            
+        Returns:
+            ColumnarCache: An open cache; close it when done
+        """
+        from src.persistence.columnar_cache import load_columnar_cache
+        
+        return load_columnar_cache(directory, self.repository)
+    
     def get_sample_count(self) -> int:
         """
         Get the total number of samples in the database.
@@ -137,6 +267,18 @@ class MilkSampleDBService:
         """
         return self.repository.get_sample_count()
     
+    def get_data_generation(self) -> int:
+        """
+        Get the write generation of the underlying repository.
+        
+        The value changes whenever samples are created, edited or deleted,
+        so derived results can be cached against it.
+        
+        Returns:
+            int: Current write generation
+        """
+        return self.repository.get_generation()
+    
     def create_new_sample(self, 
                          sample_type: str,
                          type: str,
@@ -285,11 +427,7 @@ class MilkSampleDBService:
         Returns:
             List[str]: List of unique province names
         """
-        all_samples = self.repository.read_all_samples()
-        provinces = set()
-        for _, sample in all_samples:  # Unpack the tuple (id, record)
-            provinces.add(sample.province)
-        return sorted(list(provinces))
+        return self.repository.read_distinct_values('province')
     
     def get_available_stations(self) -> List[str]:
         """
@@ -298,45 +436,195 @@ class MilkSampleDBService:
         Returns:
             List[str]: List of unique station names
         """
-        all_samples = self.repository.read_all_samples()
-        stations = set()
-        for _, sample in all_samples:  # Unpack the tuple (id, record)
-            stations.add(sample.station_name)
-        return sorted(list(stations))
+        return self.repository.read_distinct_values('station_name')
     
     def get_statistics(self) -> dict:
         """
         Get comprehensive statistics about the milk sample data.
         
+        The counts and sums are computed by the repository, which lets a
+        sharded repository compute them on every shard in parallel.
+        
         Returns:
             dict: Dictionary containing various statistics
         """
-        total_count = self.repository.get_sample_count()
-        all_samples = self.repository.read_all_samples()
-        
-        # Calculate statistics
-        provinces = set()
-        stations = set()
-        total_activity = 0.0
-        valid_activity_count = 0
-        
-        for _, sample in all_samples:  # Unpack the tuple (id, record)
-            provinces.add(sample.province)
-            stations.add(sample.station_name)
-            if sample.sr90_activity is not None and sample.sr90_activity > 0:
-                total_activity += sample.sr90_activity
-                valid_activity_count += 1
-        
-        avg_activity = total_activity / valid_activity_count if valid_activity_count > 0 else 0
+        summary = self.repository.summarize_samples()
+        valid_activity_count = summary['valid_activity_readings']
+        avg_activity = summary['activity_sum'] / valid_activity_count if valid_activity_count > 0 else 0
         
         stats = {
-            'total_samples': total_count,
-            'unique_provinces': len(provinces),
-            'unique_stations': len(stations),
-            'provinces': sorted(list(provinces)),
-            'stations': sorted(list(stations)),
+            'total_samples': summary['total_samples'],
+            'unique_provinces': len(summary['provinces']),
+            'unique_stations': len(summary['stations']),
+            'provinces': sorted(summary['provinces']),
+            'stations': sorted(summary['stations']),
             'average_sr90_activity': avg_activity,
             'valid_activity_readings': valid_activity_count
         }
         
-        return stats 
\ No newline at end of file
+        return stats 
+    
+    def get_detailed_statistics(self, batch_size: int = 1000) -> dict:
+        """
+        Get Sr-90 activity statistics overall and per province, station and year.
+        
+        The samples are streamed from the repository in a single pass, so
+        memory use does not grow with the number of samples.
+        
+        Args:
+            batch_size (int): Number of rows fetched from the database at a time
+            
+        Returns:
+            dict: Dictionary with 'overall', 'by_province', 'by_station' and
+            'by_year' summaries (count, mean, stddev, min, max, median, p95, p99)
+        """
+        from src.business.streaming_statistics import SampleStatisticsAggregator
+        
+        aggregator = SampleStatisticsAggregator()
+        aggregator.add_all(self.repository.iter_samples(batch_size))
+        return aggregator.summary()
+    
+    def apply_decay_correction(self, reference_date: date, batch_size: int = 10000) -> dict:
+        """
+        Decay-correct every sample to a common reference date.
+        
+        The corrected activity, propagated error and activity per calcium are
+        written to the milk_samples_decay_corrected table in one bulk update.
+        
+        Args:
+            reference_date (date): Date every value is corrected to
+            batch_size (int): Number of records processed per batch
+            
+        Returns:
+            dict: Summary with the number of rows written and skipped
+        """
+        from src.business.decay_correction import DecayCorrectionEngine
+        
+        engine = DecayCorrectionEngine(self.repository)
+        return engine.run(reference_date, batch_size)
+    
+    def detect_anomalies(self, full: bool = False) -> dict:
+        """
+        Check newly ingested samples for anomalies and store any flags.
+        
+        Only samples added since the previous scan are checked, against
+        per-station baselines that are kept in memory between calls.
+        
+        Args:
+            full (bool): Discard existing flags and check every sample again
+            
+        Returns:
+            dict: Summary with the rows checked, flags per rule and the new watermark
+        """
+        if self._anomaly_detector is None:
+            from src.business.anomaly_detection import AnomalyDetector
+            
+            self._anomaly_detector = AnomalyDetector(self.repository)
+        return self._anomaly_detector.scan(full=full)
+    
+    def get_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the stored anomaly flags.
+        
+        Args:
+            rule (Optional[str]): Only return flags raised by this rule
+            
+        Returns:
+            List[Dict[str, Any]]: Flags with their sample, station and province
+        """
+        return self.repository.read_anomalies(rule)
+    
+    def query_cube(self, group_by: Sequence[str] = (), **filters) -> List[Dict[str, Any]]:
+        """
+        Answer a grouped Sr-90 question from the pre-aggregated sample cube.
+        
+        The cube holds one row per (province, station_name, year, quarter, type)
+        cell, so queries never scan the milk_samples table. Roll up by grouping
+        on fewer dimensions, or drill down by grouping on more and filtering,
+        for example query_cube(['year'], province='AB'). Results are cached
+        until the data generation changes, including writes made by other
+        processes, and each call returns its own copy of the rows.
+        
+        Args:
+            group_by (Sequence[str]): Dimensions to group by
+            **filters: Dimension values to filter on
+            
+        Returns:
+            List[Dict[str, Any]]: One row per group with the dimension values,
+            sample_count, average_sr90_activity and stddev_sr90_activity
+            
+        Raises:
+            ValueError: If an unknown dimension is requested
+        """
+        generation = self.repository.get_generation()
+        if generation != self._cube_cache_generation:
+            self._cube_cache = {}
+            self._cube_cache_generation = generation
+        
+        key = (tuple(group_by), tuple(sorted(filters.items())))
+        cached = self._cube_cache.get(key)
+        count_cache("cube", cached is not None)
+        if cached is not None:
+            # Copies, so a caller changing its rows cannot change the cache
+            return [dict(row) for row in cached]
+        
+        results = []
+        for row in self.repository.query_cube(group_by, filters):
+            count = row.pop('sample_count')
+            total = row.pop('activity_sum')
+            total_sq = row.pop('activity_sum_sq')
+            average = total / count
+            variance = (total_sq - count * average * average) / (count - 1) if count > 1 else 0.0
+            row['sample_count'] = count
+            row['average_sr90_activity'] = average
+            row['stddev_sr90_activity'] = math.sqrt(max(variance, 0.0))
+            results.append(row)
+        
+        if len(self._cube_cache) >= 256:
+            self._cube_cache.clear()
+        self._cube_cache[key] = results
+        return [dict(row) for row in results]
+    
+    def changes_since(self, seq: int = 0, limit: Optional[int] = None,
+                      batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the changes made after a sequence number, oldest first.
+        
+        A consumer stores the seq of the last entry it applied and passes it
+        back on the next sync. Entries carry the current record state, so
+        applying them in order brings a mirror up to date. An entry with op
+        'reset' means every record seen before it must be discarded.
+        
+        Args:
+            seq (int): Sequence number of the last change already applied
+            limit (Optional[int]): Maximum number of changes to yield
+            batch_size (int): Number of entries read from the log at a time
+            
+        Yields:
+            Dict[str, Any]: Entries with seq, op, sample_id, changed_at and record
+            
+        Raises:
+            ChangeLogTruncatedError: If changes after seq were removed and a full resync is needed
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_limit = batch_size if remaining is None else min(batch_size, remaining)
+            entries = self.repository.read_changes(seq, batch_limit)
+            if not entries:
+                return
+            yield from entries
+            seq = entries[-1]['seq']
+            if remaining is not None:
+                remaining -= len(entries)
+    
+    def compact_changes(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """
+        Compact the change log.
+        
+        Args:
+            policy (Optional[ChangeLogPolicy]): Compaction policy (default: change_log_policy)
+            
+        Returns:
+            int: Number of log entries removed
+        """
+        return self.repository.compact_change_log(policy or self.change_log_policy)
\ No newline at end of file
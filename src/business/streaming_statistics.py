@@ -0,0 +1,361 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains one-pass, mergeable statistics for strontium-90
+activity readings. It is part of the Business Layer.
+
+This module is responsible for:
+- Running mean, variance, minimum and maximum (Welford's algorithm)
+- Approximate quantiles with a bounded relative error (log-bucket sketch)
+- Summaries overall and per province, station and year
+- Merging partial results computed over separate chunks or shards
+"""
+
+import math
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+
+# Quantiles reported in every summary
+SUMMARY_QUANTILES = (("median", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+class RunningStats:
+    """
+    Running count, mean, variance, minimum and maximum of a stream of values.
+
+    Values are added one at a time with Welford's algorithm, and two partial
+    results are combined with the parallel formula of Chan et al., so the
+    result does not depend on how the stream was split.
+
+    Attributes:
+        count (int): Number of values seen
+        mean (float): Mean of the values seen
+        m2 (float): Sum of squared differences from the mean
+        minimum (Optional[float]): Smallest value seen
+        maximum (Optional[float]): Largest value seen
+    """
+
+    def __init__(self):
+        """Initialize empty running statistics."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """
+        Add a single value.
+
+        Args:
+            value (float): Value to add
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats") -> None:
+        """
+        Merge another set of running statistics into this one.
+
+        Args:
+            other (RunningStats): Partial result to merge
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> float:
+        """float: Sample variance, or 0.0 with fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """float: Sample standard deviation."""
+        return math.sqrt(self.variance)
+
+class QuantileSketch:
+    """
+    A mergeable quantile sketch with bounded relative error.
+
+    Positive values are counted in logarithmically sized buckets, so any
+    quantile estimate is within relative_accuracy of a true value from the
+    stream. Zero and negative values share a single bucket. Sketches with
+    the same accuracy are merged by adding bucket counts.
+
+    Attributes:
+        relative_accuracy (float): Maximum relative error of an estimate
+        max_buckets (int): Bucket limit; the lowest buckets are collapsed beyond it
+        count (int): Number of values seen
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy (float): Maximum relative error of an estimate
+            max_buckets (int): Maximum number of buckets kept
+
+        Raises:
+            ValueError: If relative_accuracy is not between 0 and 1
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """
+        Add a single value.
+
+        Args:
+            value (float): Value to add
+        """
+        self.count += 1
+        if value <= 0:
+            self._zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Merge another sketch into this one.
+
+        Args:
+            other (QuantileSketch): Sketch to merge
+
+        Raises:
+            ValueError: If the sketches use different accuracies
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, bucket_count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + bucket_count
+        self._zero_count += other._zero_count
+        self.count += other.count
+        while len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile of the values seen.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            Optional[float]: Estimated value, or None if the sketch is empty
+
+        Raises:
+            ValueError: If q is outside [0, 1]
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+    def _collapse(self) -> None:
+        """Fold the two lowest buckets together to stay within max_buckets."""
+        lowest, second = sorted(self._buckets)[:2]
+        self._buckets[second] += self._buckets.pop(lowest)
+
+class GroupStatistics:
+    """
+    Running statistics and a quantile sketch for one group of readings.
+
+    Attributes:
+        stats (RunningStats): Count, mean, variance, minimum and maximum
+        sketch (QuantileSketch): Quantile estimates
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize empty group statistics.
+
+        Args:
+            relative_accuracy (float): Relative accuracy of the quantile sketch
+        """
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float) -> None:
+        """
+        Add a single reading.
+
+        Args:
+            value (float): Sr-90 activity reading
+        """
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other: "GroupStatistics") -> None:
+        """
+        Merge another group's statistics into this one.
+
+        Args:
+            other (GroupStatistics): Partial result to merge
+        """
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the group.
+
+        Quantile estimates are clamped to the exact minimum and maximum.
+
+        Returns:
+            Dict[str, Any]: count, mean, stddev, min, max, median, p95 and p99
+        """
+        summary: Dict[str, Any] = {
+            'count': self.stats.count,
+            'mean': self.stats.mean if self.stats.count else None,
+            'stddev': self.stats.stddev if self.stats.count else None,
+            'min': self.stats.minimum,
+            'max': self.stats.maximum
+        }
+        for name, q in SUMMARY_QUANTILES:
+            estimate = self.sketch.quantile(q)
+            if estimate is not None:
+                estimate = min(max(estimate, self.stats.minimum), self.stats.maximum)
+            summary[name] = estimate
+        return summary
+
+class SampleStatisticsAggregator:
+    """
+    One-pass aggregator of Sr-90 activity statistics.
+
+    This class is responsible for:
+    1. Consuming records from any iterator, such as MilkSampleDBRepository.iter_samples
+    2. Keeping overall statistics and statistics per province, station and year
+    3. Merging partial aggregators built over separate chunks or shards
+    4. Producing a summary dictionary
+
+    Attributes:
+        relative_accuracy (float): Relative accuracy of every quantile sketch
+        overall (GroupStatistics): Statistics over all readings
+        groups (Dict[Tuple[str, Any], GroupStatistics]): Statistics keyed by
+            (dimension, value), e.g. ('province', 'AB') or ('year', 1984)
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty aggregator.
+
+        Args:
+            relative_accuracy (float): Relative accuracy of the quantile sketches
+        """
+        self.relative_accuracy = relative_accuracy
+        self.overall = GroupStatistics(relative_accuracy)
+        self.groups: Dict[Tuple[str, Any], GroupStatistics] = {}
+
+    def add(self, record: MilkSampleRecord) -> None:
+        """
+        Add a single record.
+
+        Records without an activity reading are ignored.
+
+        Args:
+            record (MilkSampleRecord): Record to add
+        """
+        value = record.sr90_activity
+        if value is None:
+            return
+        self.overall.add(value)
+        start = parse_sample_date(record.start_date)
+        keys = [('province', record.province), ('station', record.station_name)]
+        if start is not None:
+            keys.append(('year', start.year))
+        for key in keys:
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = GroupStatistics(self.relative_accuracy)
+            group.add(value)
+
+    def add_all(self, records: Iterable[Any]) -> "SampleStatisticsAggregator":
+        """
+        Add every record from an iterable.
+
+        Args:
+            records (Iterable[Any]): MilkSampleRecord objects or (id, record) tuples
+
+        Returns:
+            SampleStatisticsAggregator: This aggregator, for chaining
+        """
+        for item in records:
+            self.add(item[1] if isinstance(item, tuple) else item)
+        return self
+
+    def merge(self, other: "SampleStatisticsAggregator") -> "SampleStatisticsAggregator":
+        """
+        Merge a partial aggregator into this one.
+
+        Args:
+            other (SampleStatisticsAggregator): Partial result to merge
+
+        Returns:
+            SampleStatisticsAggregator: This aggregator, for chaining
+        """
+        self.overall.merge(other.overall)
+        for key, group in other.groups.items():
+            mine = self.groups.get(key)
+            if mine is None:
+                mine = self.groups[key] = GroupStatistics(self.relative_accuracy)
+            mine.merge(group)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize all statistics.
+
+        Returns:
+            Dict[str, Any]: Dictionary with an 'overall' summary and 'by_province',
+            'by_station' and 'by_year' dictionaries of summaries
+        """
+        result: Dict[str, Any] = {
+            'overall': self.overall.to_dict(),
+            'by_province': {},
+            'by_station': {},
+            'by_year': {}
+        }
+        for (dimension, value), group in sorted(self.groups.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            result[f'by_{dimension}'][value] = group.to_dict()
+        return result
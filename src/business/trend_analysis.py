@@ -0,0 +1,234 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the TrendAnalysisService class which fits a time trend
+to the strontium-90 activity of every station. It is part of the Business Layer.
+
+This module is responsible for:
+- Partitioning the measurements by station name
+- Fitting a linear trend and an exponential decay trend per station
+- Estimating an effective half-life and the goodness of fit
+- Fanning the independent station fits out across a process pool
+- Caching results by the data generation of the repository
+"""
+
+import os
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.sample_dates import sample_midpoint_ordinal
+
+DAYS_PER_YEAR = 365.25
+
+@dataclass
+class StationTrend:
+    """
+    Trend fit of Sr-90 activity over time for one station.
+
+    Times are measured in decimal years at the midpoint of each sampling period.
+
+    Attributes:
+        station_name (str): Name of the sampling station
+        sample_count (int): Number of samples used for the linear fit
+        first_year (float): Earliest sample time
+        last_year (float): Latest sample time
+        linear_slope (Optional[float]): Change in activity in Bq/L per year
+        linear_r_squared (Optional[float]): Coefficient of determination of the linear fit
+        decay_rate (Optional[float]): Slope of ln(activity) per year
+        half_life_years (Optional[float]): Effective half-life, None if activity is not decreasing
+        exponential_r_squared (Optional[float]): Coefficient of determination in log space
+    """
+    station_name: str
+    sample_count: int
+    first_year: float
+    last_year: float
+    linear_slope: Optional[float]
+    linear_r_squared: Optional[float]
+    decay_rate: Optional[float]
+    half_life_years: Optional[float]
+    exponential_r_squared: Optional[float]
+
+def _least_squares(times: List[float], values: List[float]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Fit values = a + b * times by ordinary least squares.
+
+    Args:
+        times (List[float]): Independent variable
+        values (List[float]): Dependent variable
+
+    Returns:
+        Tuple[Optional[float], Optional[float]]: (slope, r_squared), or (None, None)
+        when the times do not vary
+    """
+    count = len(times)
+    mean_t = math.fsum(times) / count
+    mean_v = math.fsum(values) / count
+    s_tt = math.fsum((t - mean_t) ** 2 for t in times)
+    if s_tt == 0:
+        return None, None
+    s_tv = math.fsum((t - mean_t) * (v - mean_v) for t, v in zip(times, values))
+    s_vv = math.fsum((v - mean_v) ** 2 for v in values)
+    slope = s_tv / s_tt
+    r_squared = (s_tv * s_tv) / (s_tt * s_vv) if s_vv > 0 else 1.0
+    return slope, r_squared
+
+def fit_station_trend(station_name: str, times_bytes: bytes, values_bytes: bytes,
+                      min_samples: int = 3) -> StationTrend:
+    """
+    Fit linear and exponential trends for one station.
+
+    The data arrives as the raw bytes of two float64 arrays so it can be sent
+    to a worker process cheaply.
+
+    Args:
+        station_name (str): Name of the station
+        times_bytes (bytes): Sample times in decimal years, as array('d') bytes
+        values_bytes (bytes): Sr-90 activities in Bq/L, as array('d') bytes
+        min_samples (int): Minimum number of samples required to fit a trend
+
+    Returns:
+        StationTrend: The fitted trend
+    """
+    times = array('d')
+    times.frombytes(times_bytes)
+    values = array('d')
+    values.frombytes(values_bytes)
+
+    linear_slope = linear_r2 = decay_rate = half_life = exponential_r2 = None
+    if len(times) >= min_samples:
+        linear_slope, linear_r2 = _least_squares(list(times), list(values))
+        positive = [(t, math.log(v)) for t, v in zip(times, values) if v > 0]
+        if len(positive) >= min_samples:
+            log_times, log_values = zip(*positive)
+            decay_rate, exponential_r2 = _least_squares(list(log_times), list(log_values))
+            if decay_rate is not None and decay_rate < 0:
+                half_life = math.log(2) / -decay_rate
+
+    return StationTrend(
+        station_name=station_name,
+        sample_count=len(times),
+        first_year=min(times) if times else 0.0,
+        last_year=max(times) if times else 0.0,
+        linear_slope=linear_slope,
+        linear_r_squared=linear_r2,
+        decay_rate=decay_rate,
+        half_life_years=half_life,
+        exponential_r_squared=exponential_r2
+    )
+
+def _fit_station_args(args: Tuple[str, bytes, bytes, int]) -> StationTrend:
+    """Unpack arguments for fit_station_trend when used with Executor.map."""
+    return fit_station_trend(*args)
+
+class TrendAnalysisService:
+    """
+    A service that fits Sr-90 activity trends for every station.
+
+    This class is responsible for:
+    1. Reading measurement columns through the MilkSampleDBService repository
+    2. Partitioning them by station into compact float64 arrays
+    3. Fitting each station in a process pool (or in-process for small inputs)
+    4. Caching the results until the data generation changes
+
+    Attributes:
+        service (MilkSampleDBService): The database service instance
+        max_workers (Optional[int]): Number of worker processes (None uses the CPU count)
+        min_samples (int): Minimum number of samples required to fit a trend
+        parallel_threshold (int): Minimum number of samples before a process pool is used
+    """
+
+    def __init__(self,
+                 service: Optional[MilkSampleDBService] = None,
+                 max_workers: Optional[int] = None,
+                 min_samples: int = 3,
+                 parallel_threshold: int = 50000):
+        """
+        Initialize the trend analysis service.
+
+        Args:
+            service (Optional[MilkSampleDBService]): Database service instance
+            max_workers (Optional[int]): Number of worker processes
+            min_samples (int): Minimum number of samples required to fit a trend
+            parallel_threshold (int): Minimum total samples before using a process pool
+        """
+        self.service = service or MilkSampleDBService()
+        self.max_workers = max_workers
+        self.min_samples = min_samples
+        self.parallel_threshold = parallel_threshold
+        self._cache: Optional[Tuple[int, Dict[str, StationTrend]]] = None
+
+    def partition_by_station(self, batch_size: int = 10000) -> Dict[str, Tuple[array, array]]:
+        """
+        Read all measurements and split them into per-station arrays.
+
+        Samples whose dates cannot be parsed are skipped.
+
+        Args:
+            batch_size (int): Number of rows read from the database at a time
+
+        Returns:
+            Dict[str, Tuple[array, array]]: Station name mapped to (times, activities)
+        """
+        partitions: Dict[str, Tuple[array, array]] = {}
+        for columns in self.service.repository.iter_measurement_batches(batch_size):
+            for station, start, stop, activity in zip(columns['station_name'], columns['start_date'],
+                                                     columns['stop_date'], columns['sr90_activity']):
+                midpoint = sample_midpoint_ordinal(start, stop)
+                if midpoint is None or activity is None:
+                    continue
+                partition = partitions.get(station)
+                if partition is None:
+                    partition = partitions[station] = (array('d'), array('d'))
+                partition[0].append(midpoint / DAYS_PER_YEAR)
+                partition[1].append(activity)
+        return partitions
+
+    def analyze(self, use_cache: bool = True) -> Dict[str, StationTrend]:
+        """
+        Fit a trend for every station.
+
+        Args:
+            use_cache (bool): Reuse the previous result if the data has not changed
+
+        Returns:
+            Dict[str, StationTrend]: Station name mapped to its trend, sorted by name
+        """
+        generation = self.service.get_data_generation()
+        if use_cache and self._cache is not None and self._cache[0] == generation:
+            return self._cache[1]
+
+        partitions = self.partition_by_station()
+        tasks = [(station, times.tobytes(), values.tobytes(), self.min_samples)
+                 for station, (times, values) in sorted(partitions.items())]
+        total_samples = sum(len(times) for times, _ in partitions.values())
+
+        if self.max_workers == 1 or len(tasks) < 2 or total_samples < self.parallel_threshold:
+            trends = [_fit_station_args(task) for task in tasks]
+        else:
+            workers = self.max_workers or os.cpu_count() or 1
+            chunk_size = max(1, len(tasks) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                trends = list(executor.map(_fit_station_args, tasks, chunksize=chunk_size))
+
+        results = {trend.station_name: trend for trend in trends}
+        self._cache = (generation, results)
+        return results
+
+    def get_station_trend(self, station_name: str) -> Optional[StationTrend]:
+        """
+        Get the trend for a single station.
+
+        Args:
+            station_name (str): Station name to look up
+
+        Returns:
+            Optional[StationTrend]: The trend, or None if the station has no samples
+        """
+        return self.analyze().get(station_name)
@@ -0,0 +1,67 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains helpers for parsing the sampling period dates stored on
+MilkSampleRecord objects. It is part of the Model Layer.
+
+The dataset stores dates as text such as "01-Jan-84", while records created
+through the application may use ISO dates such as "2024-01-01". Both formats
+are accepted here so every layer converts dates the same way.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+# Date formats accepted for start_date / stop_date, tried in order
+SAMPLE_DATE_FORMATS = ("%d-%b-%y", "%Y-%m-%d", "%d-%b-%Y")
+
+@lru_cache(maxsize=8192)
+def parse_sample_date(text: Optional[str]) -> Optional[date]:
+    """
+    Parse a sample date string into a date object.
+
+    The dataset only contains a few thousand distinct date strings, so the
+    results are cached and repeated values cost a dictionary lookup.
+
+    Args:
+        text (Optional[str]): Date string from a record
+
+    Returns:
+        Optional[date]: Parsed date, or None if the text is empty or not recognized
+    """
+    if not text:
+        return None
+    value = text.strip()
+    for date_format in SAMPLE_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+def sample_midpoint_ordinal(start_date: Optional[str], stop_date: Optional[str]) -> Optional[float]:
+    """
+    Get the midpoint of a sampling period as a proleptic Gregorian ordinal.
+
+    If only one of the two dates can be parsed, that date is used on its own.
+
+    Args:
+        start_date (Optional[str]): Start date of the sampling period
+        stop_date (Optional[str]): End date of the sampling period
+
+    Returns:
+        Optional[float]: Midpoint ordinal (days), or None if neither date parses
+    """
+    start = parse_sample_date(start_date)
+    stop = parse_sample_date(stop_date)
+    if start is None and stop is None:
+        return None
+    if start is None:
+        return float(stop.toordinal())
+    if stop is None:
+        return float(start.toordinal())
+    return (start.toordinal() + stop.toordinal()) / 2.0
@@ -0,0 +1,4 @@
+"""
+CST8002 - Practical Project 3
+Observability package initialization file.
+"""
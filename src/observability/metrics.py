@@ -0,0 +1,516 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the metrics registry used to instrument the
+repositories and the service.
+
+This module is responsible for:
+- Counting calls, errors and rows per method and recording latency histograms
+- Counting SQL statements and cache hits and misses
+- Turning instrumentation on and off at runtime
+- Exporting the metrics as a text summary, JSON or Prometheus text format
+
+Instrumentation is applied with the @instrumented class decorator. A call
+through an instrumented method costs one flag check while the registry is
+disabled, and two clock reads, a bisect and an unlocked update of the
+calling thread's own statistics while it is enabled.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency buckets: 1 us doubling up to about 16 s
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** exponent for exponent in range(25))
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "sr90"
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """
+    A fixed-bucket histogram of observed values.
+
+    Attributes:
+        bounds (Tuple[float, ...]): Upper bound of each bucket; a final overflow bucket is implied
+        counts (List[int]): Observations per bucket
+        count (int): Total observations
+        total (float): Sum of all observations
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            bounds (Tuple[float, ...]): Ascending bucket upper bounds
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value. The caller holds the registry lock or owns the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+
+        Args:
+            fraction (float): Quantile between 0 and 1
+
+        Returns:
+            float: Estimated value, or 0.0 with no observations
+        """
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[index] if index < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add the observations of a histogram with the same bounds."""
+        for index, bucket_count in enumerate(list(other.counts)):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+
+class CallStats:
+    """
+    Statistics of the calls to one method, recorded by one thread.
+
+    Attributes:
+        histogram (Histogram): Call latencies
+        rows (int): Rows returned
+        errors (int): Calls that raised
+    """
+
+    __slots__ = ("histogram", "rows", "errors")
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.histogram = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+class MetricsRegistry:
+    """
+    A thread-safe collection of counters and histograms.
+
+    This class is responsible for:
+    1. Storing counters and histograms keyed by name and labels
+    2. Holding the runtime on/off switch checked by instrumented code
+    3. Calling collectors that report values owned by other objects
+    4. Exporting snapshots as text, JSON or Prometheus format
+
+    Method calls are the hottest path, so each thread records them in its
+    own CallStats without taking the lock; snapshots add up every thread's
+    statistics, and those of finished threads are folded into the registry.
+
+    Attributes:
+        enabled (bool): Whether instrumented code records anything
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize an empty registry.
+
+        Args:
+            enabled (bool): Initial state of the on/off switch
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Dict[str, Dict[LabelSet, float]]]] = []
+        # Per-thread call statistics: (thread, {labels: CallStats})
+        self._local = threading.local()
+        self._call_shards: List[Tuple[threading.Thread, Dict[LabelSet, CallStats]]] = []
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Turn recording on or off; existing values are kept."""
+        self.enabled = enabled
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Set the help text exported for a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, labels: LabelSet = (), amount: float = 1) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Counter name
+            labels (LabelSet): Sorted (label, value) pairs
+            amount (float): Amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name: str, labels: LabelSet, value: float) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name (str): Histogram name
+            labels (LabelSet): Sorted (label, value) pairs
+            value (float): Observed value
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram()
+            histogram.observe(value)
+
+    def record_call(self, component: str, method: str, seconds: float, rows: Optional[int], failed: bool) -> None:
+        """
+        Record one instrumented call in the calling thread's statistics.
+
+        Args:
+            component (str): Class name of the instrumented object
+            method (str): Method name
+            seconds (float): Duration of the call
+            rows (Optional[int]): Rows returned, if the result is a collection
+            failed (bool): Whether the call raised
+        """
+        shard = getattr(self._local, 'calls', None)
+        if shard is None:
+            shard = self._local.calls = {}
+            with self._lock:
+                self._call_shards.append((threading.current_thread(), shard))
+        labels = (("component", component), ("method", method))
+        stats = shard.get(labels)
+        if stats is None:
+            stats = shard[labels] = CallStats()
+        stats.histogram.observe(seconds)
+        if rows is not None:
+            stats.rows += rows
+        if failed:
+            stats.errors += 1
+
+    @staticmethod
+    def _add_calls(histograms: Dict[LabelSet, Histogram], counters: Dict[str, Dict[LabelSet, float]],
+                   shard: Dict[LabelSet, CallStats]) -> None:
+        """Add one thread's call statistics to histogram and counter series."""
+        for labels, stats in list(shard.items()):
+            histogram = histograms.get(labels)
+            if histogram is None:
+                histogram = histograms[labels] = Histogram(stats.histogram.bounds)
+            histogram.merge(stats.histogram)
+            if stats.rows:
+                series = counters.setdefault("rows_returned_total", {})
+                series[labels] = series.get(labels, 0) + stats.rows
+            if stats.errors:
+                series = counters.setdefault("call_errors_total", {})
+                series[labels] = series.get(labels, 0) + stats.errors
+
+    def add_collector(self, collector: Callable[[], Dict[str, Dict[LabelSet, float]]]) -> None:
+        """
+        Register a function whose values are added to every snapshot as gauges.
+
+        Args:
+            collector (Callable): Returns {metric name: {labels: value}}
+        """
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Discard every recorded value."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            for _, shard in self._call_shards:
+                shard.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copy the current values.
+
+        Returns:
+            Dict[str, Any]: {'counters': ..., 'gauges': ..., 'histograms': ...}, each
+            mapping a metric name to a list of series with their labels
+        """
+        with self._lock:
+            live_shards = []
+            for thread, shard in self._call_shards:
+                if thread.is_alive():
+                    live_shards.append((thread, shard))
+                elif shard:
+                    self._add_calls(self._histograms.setdefault("call_seconds", {}), self._counters, shard)
+            self._call_shards = live_shards
+
+            all_counters = {name: dict(series) for name, series in self._counters.items()}
+            all_histograms = dict(self._histograms)
+            calls: Dict[LabelSet, Histogram] = {}
+            for labels, histogram in self._histograms.get("call_seconds", {}).items():
+                calls[labels] = Histogram(histogram.bounds)
+                calls[labels].merge(histogram)
+            for _, shard in live_shards:
+                self._add_calls(calls, all_counters, shard)
+            if calls:
+                all_histograms["call_seconds"] = calls
+
+            counters = {name: [{'labels': dict(labels), 'value': value} for labels, value in series.items()]
+                        for name, series in all_counters.items()}
+            histograms = {
+                name: [{
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': histogram.total,
+                    'p50': histogram.quantile(0.50),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': list(zip(histogram.bounds, histogram.counts))
+                } for labels, histogram in series.items()]
+                for name, series in all_histograms.items()
+            }
+        gauges: Dict[str, List[Dict[str, Any]]] = {}
+        for collector in self._collectors:
+            for name, series in collector().items():
+                gauges.setdefault(name, []).extend({'labels': dict(labels), 'value': value}
+                                                   for labels, value in series.items())
+        return {'enabled': self.enabled, 'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def to_json(self) -> str:
+        """Export a snapshot as JSON."""
+        snapshot = self.snapshot()
+        for series in snapshot['histograms'].values():
+            for entry in series:
+                entry['buckets'] = [[bound, count] for bound, count in entry['buckets'] if count]
+        return json.dumps(snapshot, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Export a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for kind, metrics in (("counter", snapshot['counters']), ("gauge", snapshot['gauges'])):
+            for name, series in sorted(metrics.items()):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for entry in series:
+                    lines.append(f"{full_name}{_format_labels(entry['labels'])} {_format_value(entry['value'])}")
+        for name, series in sorted(snapshot['histograms'].items()):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} histogram")
+            for entry in series:
+                cumulative = 0
+                for bound, count in entry['buckets']:
+                    cumulative += count
+                    labels = dict(entry['labels'], le=repr(bound))
+                    lines.append(f"{full_name}_bucket{_format_labels(labels)} {cumulative}")
+                labels = dict(entry['labels'], le="+Inf")
+                lines.append(f"{full_name}_bucket{_format_labels(labels)} {entry['count']}")
+                lines.append(f"{full_name}_sum{_format_labels(entry['labels'])} {_format_value(entry['sum'])}")
+                lines.append(f"{full_name}_count{_format_labels(entry['labels'])} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_text(self) -> str:
+        """Export a human-readable summary of calls, SQL statements and caches."""
+        snapshot = self.snapshot()
+        counters = snapshot['counters']
+        rows = {tuple(entry['labels'].values()): entry['value'] for entry in counters.get('rows_returned_total', [])}
+        errors = {tuple(entry['labels'].values()): entry['value'] for entry in counters.get('call_errors_total', [])}
+
+        lines = [f"{'Method':<60} {'Calls':>9} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} "
+                 f"{'p99 ms':>9} {'Rows':>10} {'Errors':>6}"]
+        calls = sorted(snapshot['histograms'].get('call_seconds', []), key=lambda entry: -entry['sum'])
+        for entry in calls:
+            key = tuple(entry['labels'].values())
+            mean = entry['sum'] / entry['count'] if entry['count'] else 0.0
+            lines.append(f"{'.'.join(key):<60} {entry['count']:>9} {mean * 1000:>9.3f} {entry['p50'] * 1000:>9.3f} "
+                         f"{entry['p95'] * 1000:>9.3f} {entry['p99'] * 1000:>9.3f} "
+                         f"{int(rows.get(key, 0)):>10} {int(errors.get(key, 0)):>6}")
+
+        statements = counters.get('sql_statements_total', [])
+        if statements:
+            lines.append("")
+            lines.append("SQL statements: " + ", ".join(
+                f"{entry['labels']['verb']}={int(entry['value'])}"
+                for entry in sorted(statements, key=lambda entry: -entry['value'])))
+
+        caches: Dict[str, Dict[str, float]] = {}
+        for entry in counters.get('cache_requests_total', []):
+            caches.setdefault(entry['labels']['cache'], {})[entry['labels']['result']] = entry['value']
+        for entry in snapshot['gauges'].get('cache_requests', []):
+            caches.setdefault(entry['labels']['cache'], {})[entry['labels']['result']] = entry['value']
+        if caches:
+            lines.append("")
+            for cache, results in sorted(caches.items()):
+                total = results.get('hit', 0) + results.get('miss', 0)
+                rate = results.get('hit', 0) / total if total else 0.0
+                lines.append(f"Cache {cache}: {int(results.get('hit', 0))} hits, "
+                             f"{int(results.get('miss', 0))} misses ({rate:.1%} hit rate)")
+        return "\n".join(lines)
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Format labels as {name="value",...} with Prometheus escaping."""
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+def _format_value(value: float) -> str:
+    """Format a sample value, keeping integers without a decimal point."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+# Process-wide registry used by the instrumented classes; set SR90_METRICS=0 to start disabled
+REGISTRY = MetricsRegistry(enabled=os.environ.get("SR90_METRICS", "1") != "0")
+REGISTRY.describe("call_seconds", "Latency of repository and service method calls")
+REGISTRY.describe("rows_returned_total", "Rows returned by repository and service methods")
+REGISTRY.describe("call_errors_total", "Repository and service method calls that raised")
+REGISTRY.describe("sql_statements_total", "SQL statements executed, by leading keyword")
+REGISTRY.describe("cache_requests_total", "Cache lookups by result")
+REGISTRY.describe("cache_requests", "Cache lookups by result, from caches that keep their own counts")
+REGISTRY.describe("http_request_seconds", "Latency of HTTP requests by endpoint")
+
+def _count_rows(result: Any) -> Optional[int]:
+    """Get the number of rows in a method result, or None if it is not a collection of rows."""
+    if isinstance(result, list):
+        return len(result)
+    if hasattr(result, "__dataclass_fields__"):
+        # A single record
+        return 1
+    return None
+
+def _wrap_method(component: str, name: str, method: Callable, registry: MetricsRegistry) -> Callable:
+    """Wrap one method to record its calls in the registry."""
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(*args, **kwargs) -> Iterator[Any]:
+            if not registry.enabled:
+                return (yield from method(*args, **kwargs))
+            started = time.perf_counter()
+            rows = 0
+            failed = False
+            try:
+                for item in method(*args, **kwargs):
+                    rows += 1
+                    yield item
+            except BaseException as e:
+                failed = not isinstance(e, GeneratorExit)
+                raise
+            finally:
+                # Measures the whole stream, including time the consumer spent between items
+                registry.record_call(component, name, time.perf_counter() - started, rows, failed)
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs) -> Any:
+        if not registry.enabled:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            registry.record_call(component, name, time.perf_counter() - started, None, True)
+            raise
+        registry.record_call(component, name, time.perf_counter() - started, _count_rows(result), False)
+        return result
+    return wrapper
+
+def instrumented(cls: Optional[type] = None, *, registry: Optional[MetricsRegistry] = None):
+    """
+    Class decorator that records every public method call in a registry.
+
+    Latency, call count, errors and (for list results and generators) rows
+    are recorded under the class name and method name. Methods starting
+    with an underscore, static methods, class methods and properties are
+    left alone.
+
+    Args:
+        cls (Optional[type]): The class, when used without arguments
+        registry (Optional[MetricsRegistry]): Registry to record into (default: REGISTRY)
+
+    Returns:
+        The decorated class, or a decorator when called with arguments
+    """
+    def decorate(target: type) -> type:
+        target_registry = registry or REGISTRY
+        for name, member in list(vars(target).items()):
+            if name.startswith("_") or not inspect.isfunction(member):
+                continue
+            setattr(target, name, _wrap_method(target.__name__, name, member, target_registry))
+        return target
+
+    return decorate(cls) if cls is not None else decorate
+
+def count_statement(statement: str, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Count one executed SQL statement by its leading keyword.
+
+    Suitable as an sqlite3 trace callback.
+
+    Args:
+        statement (str): The statement text
+        registry (Optional[MetricsRegistry]): Registry to record into (default: REGISTRY)
+    """
+    target = registry or REGISTRY
+    if not target.enabled:
+        return
+    text = statement.lstrip()
+    if text.startswith("--"):
+        # SQLite reports statements run by triggers as "-- <statement>"
+        verb = "TRIGGER"
+    else:
+        verb = text.split(None, 1)[0].upper() if text else "EMPTY"
+    target.inc("sql_statements_total", (("verb", verb),))
+
+def count_cache(cache: str, hit: bool, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Count one cache lookup.
+
+    Args:
+        cache (str): Cache name
+        hit (bool): Whether the value was found
+        registry (Optional[MetricsRegistry]): Registry to record into (default: REGISTRY)
+    """
+    (registry or REGISTRY).inc("cache_requests_total", (("cache", cache), ("result", "hit" if hit else "miss")))
+
+def lru_cache_collector(cache_name: str, function: Callable) -> Callable[[], Dict[str, Dict[LabelSet, float]]]:
+    """
+    Build a collector reporting the hit and miss counts of a functools.lru_cache function.
+
+    Args:
+        cache_name (str): Name used in the cache label
+        function (Callable): Function decorated with functools.lru_cache
+
+    Returns:
+        Callable: Collector for MetricsRegistry.add_collector
+    """
+    def collect() -> Dict[str, Dict[LabelSet, float]]:
+        info = function.cache_info()
+        return {'cache_requests': {(("cache", cache_name), ("result", "hit")): info.hits,
+                                   (("cache", cache_name), ("result", "miss")): info.misses}}
+    return collect
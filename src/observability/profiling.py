@@ -0,0 +1,233 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the profiling mode of the command-line entry points.
+
+This module is responsible for:
+- Running an operation under cProfile and, optionally, tracemalloc
+- Writing the raw pstats file and readable reports to a directory
+- Summarizing the hottest functions of the classes on the import path
+
+For each profiled operation three files are written, named after the
+operation and the time it started:
+- <label>-<time>.pstats: raw profile, for pstats or snakeviz
+- <label>-<time>.txt: top functions by cumulative time, then the hottest
+  functions in DataMigration, MilkSampleDBRepository and MilkSampleRecord
+- <label>-<time>-allocations.txt: top allocation sites (with --profile-memory)
+
+Only the calling thread is profiled; work handed to background threads
+(such as a reload started from the menu) is not included. The profilers
+are imported when profiling starts, so entry points that merely accept
+--profile do not pay for them.
+"""
+
+import io
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import argparse
+    import pstats
+    import tracemalloc
+
+# Source files of the functions summarized separately, by class
+FOCUS_MODULES: Dict[str, str] = {
+    'DataMigration': os.path.join("persistence", "data_migration.py"),
+    'MilkSampleDBRepository': os.path.join("persistence", "milk_sample_db_repository.py"),
+    'MilkSampleRecord': os.path.join("model", "milk_sample_record.py"),
+}
+
+DEFAULT_PROFILE_DIRECTORY = "profiles"
+
+@dataclass
+class ProfileOptions:
+    """
+    Settings of the profiling mode.
+
+    Attributes:
+        directory (str): Directory the reports are written to (created if missing)
+        memory (bool): Also trace memory allocations with tracemalloc
+        top (int): Number of functions and allocation sites in each report
+        frames (int): Stack frames kept per allocation
+    """
+    directory: str = DEFAULT_PROFILE_DIRECTORY
+    memory: bool = False
+    top: int = 25
+    frames: int = 1
+
+@dataclass
+class ProfileResult:
+    """
+    Outcome of one profiled operation, filled in when it finishes.
+
+    Attributes:
+        label (str): Name of the operation
+        seconds (float): Wall-clock time of the operation
+        pstats_path (str): Raw profile file
+        summary_path (str): Readable report of the hottest functions
+        allocations_path (Optional[str]): Allocation report, if memory was traced
+        peak_bytes (Optional[int]): Peak traced memory, if memory was traced
+        hottest (List[Tuple[str, int, float, float]]): (function, calls, own seconds,
+            cumulative seconds) of the focus functions, hottest first
+    """
+    label: str
+    seconds: float = 0.0
+    pstats_path: str = ""
+    summary_path: str = ""
+    allocations_path: Optional[str] = None
+    peak_bytes: Optional[int] = None
+    hottest: List[Tuple[str, int, float, float]] = field(default_factory=list)
+
+def add_profile_arguments(parser: 'argparse.ArgumentParser') -> None:
+    """
+    Add --profile, --profile-memory and --profile-top to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend
+    """
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIRECTORY, metavar="DIR",
+                        help=f"profile the operation and write reports to DIR (default: {DEFAULT_PROFILE_DIRECTORY})")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="with --profile, also report the top memory allocation sites")
+    parser.add_argument("--profile-top", type=int, default=25, help="entries in each profile report")
+
+def profile_options_from_args(args: 'argparse.Namespace') -> Optional[ProfileOptions]:
+    """
+    Get the profiling settings from arguments added by add_profile_arguments.
+
+    Returns:
+        Optional[ProfileOptions]: The settings, or None if profiling was not requested
+    """
+    if args.profile is None:
+        return None
+    return ProfileOptions(args.profile, args.profile_memory, args.profile_top)
+
+def hottest_functions(stats: 'pstats.Stats', top: int) -> List[Tuple[str, int, float, float]]:
+    """
+    Get the focus functions with the most time spent in their own code.
+
+    Args:
+        stats (pstats.Stats): Collected profile
+        top (int): Maximum number of functions
+
+    Returns:
+        List[Tuple[str, int, float, float]]: (Class.function:line, calls, own seconds, cumulative seconds)
+    """
+    entries = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        for owner, module in FOCUS_MODULES.items():
+            if filename.endswith(module):
+                entries.append((f"{owner}.{function}:{line}", calls, own, cumulative))
+    entries.sort(key=lambda entry: entry[2], reverse=True)
+    return entries[:top]
+
+def _write_summary(path: str, label: str, seconds: float, stats: 'pstats.Stats', top: int,
+                   hottest: List[Tuple[str, int, float, float]]) -> None:
+    """Write the readable profile report."""
+    import pstats
+
+    listing = io.StringIO()
+    stats.stream = listing
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f"Profile of {label}: {seconds:.3f}s wall clock, {stats.total_calls} calls\n\n")
+        file.write(f"Hottest functions in {', '.join(FOCUS_MODULES)} (by own time)\n")
+        file.write(f"{'Calls':>10} {'Own s':>9} {'Cumul. s':>9}  Function\n")
+        for name, calls, own, cumulative in hottest:
+            file.write(f"{calls:>10} {own:>9.4f} {cumulative:>9.4f}  {name}\n")
+        if not hottest:
+            file.write("  (none were called)\n")
+        file.write(f"\nTop {top} functions by cumulative time\n")
+        file.write(listing.getvalue())
+
+def _write_allocations(path: str, label: str, snapshot: 'tracemalloc.Snapshot', peak: int, top: int) -> None:
+    """Write the top allocation sites of a tracemalloc snapshot."""
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    statistics = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f"Allocations of {label}: peak {peak / 1e6:.2f} MB, "
+                   f"{sum(stat.size for stat in statistics) / 1e6:.2f} MB still allocated at the end\n\n")
+        file.write(f"{'KiB':>10} {'Blocks':>9}  Location\n")
+        for stat in statistics[:top]:
+            frame = stat.traceback[0]
+            file.write(f"{stat.size / 1024:>10.1f} {stat.count:>9}  {frame.filename}:{frame.lineno}\n")
+
+@contextmanager
+def profiled(label: str, options: Optional[ProfileOptions]) -> Iterator[Optional[ProfileResult]]:
+    """
+    Profile the code run inside the with block.
+
+    Args:
+        label (str): Name of the operation, used in the file names
+        options (Optional[ProfileOptions]): Settings; None runs the block without profiling
+
+    Yields:
+        Optional[ProfileResult]: Filled in when the block exits, or None without profiling
+    """
+    if options is None:
+        yield None
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    os.makedirs(options.directory, exist_ok=True)
+    base = os.path.join(options.directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}")
+    if os.path.exists(base + ".pstats"):
+        # Several runs of one operation within a second
+        base += f"-{sum(1 for name in os.listdir(options.directory) if name.startswith(os.path.basename(base)))}"
+    result = ProfileResult(label)
+    trace_memory = options.memory and not tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.start(options.frames)
+    profile = cProfile.Profile()
+    started = time.perf_counter()
+    profile.enable()
+    try:
+        yield result
+    finally:
+        profile.disable()
+        result.seconds = time.perf_counter() - started
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            result.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result.allocations_path = base + "-allocations.txt"
+            _write_allocations(result.allocations_path, label, snapshot, result.peak_bytes, options.top)
+
+        result.pstats_path = base + ".pstats"
+        profile.dump_stats(result.pstats_path)
+        stats = pstats.Stats(profile)
+        result.hottest = hottest_functions(stats, options.top)
+        result.summary_path = base + ".txt"
+        _write_summary(result.summary_path, label, result.seconds, stats, options.top, result.hottest)
+
+def describe_result(result: ProfileResult, hottest: int = 5) -> str:
+    """
+    Summarize a profile in a few lines for the console.
+
+    Args:
+        result (ProfileResult): Finished profile
+        hottest (int): Number of focus functions to list
+
+    Returns:
+        str: Where the reports are and which focus functions were hottest
+    """
+    lines = [f"Profiled {result.label} in {result.seconds:.3f}s: {result.summary_path}"]
+    if result.peak_bytes is not None:
+        lines.append(f"  Peak traced memory {result.peak_bytes / 1e6:.2f} MB: {result.allocations_path}")
+    for name, calls, own, cumulative in result.hottest[:hottest]:
+        lines.append(f"  {own:8.4f}s own {cumulative:8.4f}s cumulative {calls:>8} calls  {name}")
+    return "\n".join(lines)
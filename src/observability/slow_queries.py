@@ -0,0 +1,452 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the slow-query log for SQLite connections.
+
+This module is responsible for:
+- Timing every statement run through a DatabaseConfig connection
+- Logging statements slower than a threshold with their parameter shape
+  and EXPLAIN QUERY PLAN
+- Aggregating statements by shape into a top-N report
+- Publishing the per-shape totals to the metrics registry
+
+Timing is done by the TimingConnection and TimingCursor subclasses, which
+DatabaseConfig uses when a SlowQueryLog is attached. A statement's time
+includes both execute() and fetching its rows, since SQLite produces rows
+lazily while they are fetched.
+
+The log is off unless it is configured with configure_slow_query_log() or
+the SR90_SLOW_QUERY_MS environment variable is set (e.g. SR90_SLOW_QUERY_MS=50).
+"""
+
+import itertools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.observability.metrics import REGISTRY, LabelSet
+
+logger = logging.getLogger(__name__)
+
+# Statements SQLite can produce a query plan for
+EXPLAINABLE_VERBS = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+# Distinct shapes kept per log; further shapes are counted under OTHER_SHAPE
+MAX_SHAPES = 500
+OTHER_SHAPE = "<other statements>"
+
+# Longest statement shape used as a metric label
+SHAPE_LABEL_LENGTH = 120
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(sql: str) -> str:
+    """
+    Reduce a statement to its shape, so executions that differ only in values are grouped.
+
+    Literals become "?", lists of placeholders collapse to "(?, ...)" and
+    whitespace is normalized.
+
+    Args:
+        sql (str): Statement text
+
+    Returns:
+        str: The statement shape
+    """
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?, ...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+def parameter_shape(parameters: Any) -> str:
+    """
+    Describe bound parameters by their types, e.g. "(str, int, null)".
+
+    Args:
+        parameters (Any): Sequence or mapping of bound parameters
+
+    Returns:
+        str: The parameter shape
+    """
+    def type_name(value: Any) -> str:
+        return "null" if value is None else type(value).__name__
+
+    if not parameters:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type_name(value)}" for name, value in parameters.items()) + "}"
+    return "(" + ", ".join(type_name(value) for value in parameters) + ")"
+
+def explain_query_plan(connection: sqlite3.Connection, sql: str, parameters: Any = ()) -> List[str]:
+    """
+    Get the EXPLAIN QUERY PLAN of a statement as indented lines.
+
+    Args:
+        connection (sqlite3.Connection): Connection the statement ran on
+        sql (str): Statement text
+        parameters (Any): Parameters the statement was bound with
+
+    Returns:
+        List[str]: One line per plan step, indented by depth; empty if the
+        statement has no plan
+    """
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if verb not in EXPLAINABLE_VERBS:
+        return []
+    try:
+        # A plain cursor, so explaining is not itself timed and logged
+        cursor = sqlite3.Cursor(connection)
+        try:
+            rows = cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters or ()).fetchall()
+        finally:
+            cursor.close()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depths: Dict[int, int] = {}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[node_id] + detail)
+    return lines
+
+@dataclass
+class StatementStats:
+    """
+    Aggregated timings of one statement shape.
+
+    Attributes:
+        shape (str): Normalized statement text
+        calls (int): Executions
+        total_seconds (float): Combined time of all executions
+        max_seconds (float): Slowest execution
+        slow_calls (int): Executions above the threshold
+        parameter_shape (str): Parameter types of the latest execution
+        plan (Optional[List[str]]): Query plan, captured on the first execution
+    """
+    shape: str
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    slow_calls: int = 0
+    parameter_shape: str = "()"
+    plan: Optional[List[str]] = None
+
+    @property
+    def mean_seconds(self) -> float:
+        """float: Mean time per execution."""
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the statistics to a JSON-friendly dictionary."""
+        return {
+            'shape': self.shape,
+            'calls': self.calls,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'mean_ms': round(self.mean_seconds * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'slow_calls': self.slow_calls,
+            'parameter_shape': self.parameter_shape,
+            'plan': list(self.plan or [])
+        }
+
+class SlowQueryLog:
+    """
+    A class to collect statement timings and report slow statements.
+
+    This class is responsible for:
+    1. Aggregating statement timings by shape
+    2. Logging statements slower than the threshold with their query plan
+    3. Reporting the top-N shapes by total time, slowest call or call count
+
+    Attributes:
+        threshold (float): Seconds above which a statement is logged as slow
+        top_n (int): Number of shapes in a default report
+    """
+
+    def __init__(self, threshold: float = 0.1, top_n: int = 10):
+        """
+        Initialize the log.
+
+        Args:
+            threshold (float): Seconds above which a statement is logged as slow (default: 0.1)
+            top_n (int): Number of shapes in a default report (default: 10)
+        """
+        self.threshold = threshold
+        self.top_n = top_n
+        self._stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        _live_logs.add(self)
+
+    def record(self, sql: str, parameters: Any, seconds: float,
+               connection: Optional[sqlite3.Connection] = None) -> None:
+        """
+        Record one statement execution.
+
+        Args:
+            sql (str): Statement text
+            parameters (Any): Bound parameters (the first set for executemany)
+            seconds (float): Time spent executing and fetching
+            connection (Optional[sqlite3.Connection]): Connection used, for EXPLAIN QUERY PLAN
+        """
+        shape = statement_shape(sql)
+        slow = seconds >= self.threshold
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                if len(self._stats) >= MAX_SHAPES:
+                    shape = OTHER_SHAPE
+                stats = self._stats.setdefault(shape, StatementStats(shape))
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.parameter_shape = parameter_shape(parameters)
+            if slow:
+                stats.slow_calls += 1
+            needs_plan = stats.plan is None and shape != OTHER_SHAPE and connection is not None
+            if needs_plan:
+                # Claimed under the lock so only one thread explains each shape
+                stats.plan = []
+        if needs_plan:
+            stats.plan = explain_query_plan(connection, sql, parameters)
+        if not slow:
+            return
+        REGISTRY.inc("slow_queries_total")
+        logger.warning("Slow query (%.1f ms): %s | parameters %s | plan: %s",
+                       seconds * 1000, stats.shape, stats.parameter_shape, "; ".join(stats.plan or []) or "n/a")
+
+    def top(self, n: Optional[int] = None, by: str = "total") -> List[StatementStats]:
+        """
+        Get the statement shapes that cost the most.
+
+        Args:
+            n (Optional[int]): Number of shapes (default: top_n)
+            by (str): "total" time, "max" single call, "mean" time or "calls"
+
+        Returns:
+            List[StatementStats]: Copies of the statistics, most expensive first
+
+        Raises:
+            ValueError: If by is not a known ordering
+        """
+        keys = {
+            'total': lambda stats: stats.total_seconds,
+            'max': lambda stats: stats.max_seconds,
+            'mean': lambda stats: stats.mean_seconds,
+            'calls': lambda stats: stats.calls
+        }
+        if by not in keys:
+            raise ValueError(f"Unknown ordering: {by}")
+        with self._lock:
+            stats = [StatementStats(**vars(entry)) for entry in self._stats.values()]
+        stats.sort(key=keys[by], reverse=True)
+        return stats[:n if n is not None else self.top_n]
+
+    def report(self, n: Optional[int] = None, by: str = "total") -> str:
+        """
+        Format the top statement shapes as a text table with their query plans.
+
+        Args:
+            n (Optional[int]): Number of shapes (default: top_n)
+            by (str): Ordering, as in top()
+
+        Returns:
+            str: The report
+        """
+        lines = [f"Top statements by {by} (slow threshold {self.threshold * 1000:.1f} ms)"]
+        lines.append(f"{'Calls':>8} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9} {'Slow':>6}  Statement")
+        for stats in self.top(n, by):
+            lines.append(f"{stats.calls:>8} {stats.total_seconds * 1000:>10.2f} {stats.mean_seconds * 1000:>9.3f} "
+                         f"{stats.max_seconds * 1000:>9.3f} {stats.slow_calls:>6}  {stats.shape}")
+            lines.append(f"{'':>46}parameters {stats.parameter_shape}")
+            lines.extend(f"{'':>46}{line}" for line in stats.plan or [])
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Discard every recorded timing."""
+        with self._lock:
+            self._stats = {}
+
+class TimingCursor(sqlite3.Cursor):
+    """
+    A cursor that times its statements and reports them to the connection's SlowQueryLog.
+
+    A statement is timed from execute() until its rows are exhausted, the
+    next statement starts, or the cursor is closed or discarded.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__(connection)
+        self._pending: Optional[Tuple[str, Any]] = None
+        self._elapsed = 0.0
+
+    def _start(self, sql: str, parameters: Any, started: float) -> None:
+        self._elapsed = time.perf_counter() - started
+        self._pending = (sql, parameters)
+        if self.description is None:
+            # Nothing to fetch, so the statement is complete
+            self._finish()
+
+    def _finish(self) -> None:
+        if self._pending is not None:
+            sql, parameters = self._pending
+            self._pending = None
+            slow_query_log = getattr(self.connection, 'slow_query_log', None)
+            if slow_query_log is not None:
+                slow_query_log.record(sql, parameters, self._elapsed, self.connection)
+
+    def execute(self, sql: str, parameters: Any = ()) -> 'TimingCursor':
+        self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._start(sql, parameters, started)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> 'TimingCursor':
+        self._finish()
+        # Keep the first parameter set for the shape and the query plan
+        parameters = iter(seq_of_parameters)
+        first = next(parameters, None)
+        started = time.perf_counter()
+        super().executemany(sql, itertools.chain([first], parameters) if first is not None else [])
+        self._start(sql, first, started)
+        return self
+
+    def executescript(self, sql_script: str) -> 'TimingCursor':
+        self._finish()
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        self._start(sql_script, (), started)
+        return self
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> list:
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._elapsed += time.perf_counter() - started
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._finish()
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class TimingConnection(sqlite3.Connection):
+    """
+    A connection whose statements are timed through TimingCursor.
+
+    Attributes:
+        slow_query_log (Optional[SlowQueryLog]): Log that receives the timings
+    """
+
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        return super().cursor(factory or TimingCursor)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        return self.cursor().executescript(sql_script)
+
+# Every log still in use, for the metrics collector
+_live_logs: 'weakref.WeakSet[SlowQueryLog]' = weakref.WeakSet()
+
+def _default_from_environment() -> Optional[SlowQueryLog]:
+    """Create the process-wide log if SR90_SLOW_QUERY_MS is set."""
+    threshold_ms = os.environ.get("SR90_SLOW_QUERY_MS")
+    if not threshold_ms:
+        return None
+    try:
+        return SlowQueryLog(float(threshold_ms) / 1000)
+    except ValueError:
+        logger.warning("Ignoring invalid SR90_SLOW_QUERY_MS: %s", threshold_ms)
+        return None
+
+_default_log = _default_from_environment()
+
+def configure_slow_query_log(threshold_ms: Optional[float], top_n: int = 10) -> Optional[SlowQueryLog]:
+    """
+    Set the process-wide slow-query log used by DatabaseConfig connections opened afterwards.
+
+    Args:
+        threshold_ms (Optional[float]): Slow threshold in milliseconds; None turns the log off
+        top_n (int): Number of shapes in a default report
+
+    Returns:
+        Optional[SlowQueryLog]: The new log, or None if turned off
+    """
+    global _default_log
+    _default_log = SlowQueryLog(threshold_ms / 1000, top_n) if threshold_ms is not None else None
+    return _default_log
+
+def default_slow_query_log() -> Optional[SlowQueryLog]:
+    """Get the process-wide slow-query log, if one is configured."""
+    return _default_log
+
+def _collect() -> Dict[str, Dict[LabelSet, float]]:
+    """Report the calls and total time of each log's top statement shapes."""
+    calls: Dict[LabelSet, float] = {}
+    seconds: Dict[LabelSet, float] = {}
+    for slow_query_log in list(_live_logs):
+        for stats in slow_query_log.top():
+            shape = stats.shape if len(stats.shape) <= SHAPE_LABEL_LENGTH else stats.shape[:SHAPE_LABEL_LENGTH - 3] + "..."
+            labels = (("shape", shape),)
+            calls[labels] = calls.get(labels, 0) + stats.calls
+            seconds[labels] = seconds.get(labels, 0.0) + stats.total_seconds
+    if not calls:
+        return {}
+    return {'statement_calls': calls, 'statement_seconds': seconds}
+
+REGISTRY.add_collector(_collect)
+REGISTRY.describe("slow_queries_total", "SQL statements slower than the slow-query threshold")
+REGISTRY.describe("statement_calls", "Executions of the most expensive statement shapes")
+REGISTRY.describe("statement_seconds", "Total time of the most expensive statement shapes")
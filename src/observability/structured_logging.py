@@ -0,0 +1,205 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the logging setup shared by the application entry points.
+
+This module is responsible for:
+- Formatting log records as key=value text or JSON lines, with structured fields
+- Writing log output from a background thread through a queue
+- Reporting the progress of bulk operations at a limited rate
+
+Library modules only create loggers with logging.getLogger(__name__) and
+attach fields with fields(); entry points call configure_logging() once.
+The default level is WARNING, so per-record messages (logged at DEBUG) cost
+a level check and no I/O. Set SR90_LOG_LEVEL (e.g. INFO or DEBUG) or pass
+a level to see more, and SR90_LOG_FORMAT=json for JSON lines.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional, TextIO, Union
+
+DEFAULT_LEVEL = "WARNING"
+
+# Attributes every LogRecord has; anything else was passed through "extra"
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# logging.handlers is imported by configure_logging(), which only entry points call
+_listener: "Optional[logging.handlers.QueueListener]" = None
+
+def fields(**values: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the "extra" argument that attaches structured fields to a log call.
+
+    Example: logger.info("Imported batch", extra=fields(batch=3, rows=1000))
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Value for the extra keyword
+    """
+    return {'fields': values}
+
+class StructuredFormatter(logging.Formatter):
+    """
+    A formatter that adds a record's structured fields to its message.
+
+    Text output looks like:
+        2025-07-13T10:00:00 INFO src.persistence.data_migration Migration completed total=647 failed=0
+    JSON output has one object per line with time, level, logger, message and the fields.
+    """
+
+    def __init__(self, json_lines: bool = False):
+        """
+        Initialize the formatter.
+
+        Args:
+            json_lines (bool): Write JSON objects instead of key=value text
+        """
+        super().__init__(datefmt="%Y-%m-%dT%H:%M:%S")
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        values = dict(getattr(record, 'fields', None) or {})
+        values.update((key, value) for key, value in vars(record).items()
+                      if key not in _STANDARD_ATTRIBUTES and key != 'fields')
+        timestamp = self.formatTime(record, self.datefmt)
+        if self.json_lines:
+            entry = {'time': timestamp, 'level': record.levelname, 'logger': record.name,
+                     'message': record.getMessage()}
+            entry.update(values)
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+        text = f"{timestamp} {record.levelname} {record.name} {record.getMessage()}"
+        if values:
+            text += " " + " ".join(f"{key}={_format_field(value)}" for key, value in values.items())
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+def _format_field(value: Any) -> str:
+    """Format a field value, quoting strings that contain spaces."""
+    text = str(value)
+    return json.dumps(text) if (" " in text or not text) else text
+
+def configure_logging(level: Optional[Union[int, str]] = None,
+                      json_lines: Optional[bool] = None,
+                      stream: Optional[TextIO] = None) -> None:
+    """
+    Send log output to a stream through a background thread.
+
+    Records are put on an in-memory queue by the calling thread and written
+    by a QueueListener thread, so slow terminals and pipes never block the
+    code that logs. Calling it again replaces the previous setup.
+
+    Args:
+        level (Optional[Union[int, str]]): Level of the root logger (default: SR90_LOG_LEVEL or WARNING)
+        json_lines (Optional[bool]): Write JSON lines (default: SR90_LOG_FORMAT == "json")
+        stream (Optional[TextIO]): Destination (default: sys.stderr)
+    """
+    global _listener
+    import logging.handlers
+    import queue
+
+    if level is None:
+        level = os.environ.get("SR90_LOG_LEVEL", DEFAULT_LEVEL)
+    if isinstance(level, str):
+        level = level.upper()
+    if json_lines is None:
+        json_lines = os.environ.get("SR90_LOG_FORMAT", "").lower() == "json"
+
+    shutdown_logging()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(json_lines))
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in [handler for handler in root.handlers if isinstance(handler, logging.handlers.QueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+
+def shutdown_logging() -> None:
+    """Write out any queued records and stop the background thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+class ProgressReporter:
+    """
+    A class to log the progress of a bulk operation without flooding the log.
+
+    A message is logged at most once per interval, plus once when the
+    operation finishes, whatever the number of advance() calls.
+
+    Attributes:
+        done (int): Units of work completed so far
+        total (Optional[int]): Units of work expected, if known
+    """
+
+    def __init__(self, logger: logging.Logger, operation: str, total: Optional[int] = None,
+                 interval: float = 2.0, level: int = logging.INFO):
+        """
+        Initialize the reporter.
+
+        Args:
+            logger (logging.Logger): Logger to write to
+            operation (str): Name of the operation, used in the messages
+            total (Optional[int]): Units of work expected, if known
+            interval (float): Minimum seconds between progress messages
+            level (int): Level of the messages
+        """
+        self.logger = logger
+        self.operation = operation
+        self.total = total
+        self.interval = interval
+        self.level = level
+        self.done = 0
+        self._started = time.monotonic()
+        self._last_report = self._started
+
+    def advance(self, count: int = 1) -> None:
+        """
+        Record completed work, logging if the interval has passed.
+
+        Args:
+            count (int): Units of work just completed
+        """
+        self.done += count
+        now = time.monotonic()
+        if now - self._last_report >= self.interval and self.logger.isEnabledFor(self.level):
+            self._last_report = now
+            self._log("progress", now)
+
+    def finish(self) -> float:
+        """
+        Log the final count and rate.
+
+        Returns:
+            float: Seconds since the reporter was created
+        """
+        now = time.monotonic()
+        if self.logger.isEnabledFor(self.level):
+            self._log("finished", now)
+        return now - self._started
+
+    def _log(self, state: str, now: float) -> None:
+        elapsed = now - self._started
+        values: Dict[str, Any] = {'done': self.done}
+        if self.total:
+            values['total'] = self.total
+            values['percent'] = round(100.0 * self.done / self.total, 1)
+        values['per_second'] = round(self.done / elapsed, 1) if elapsed > 0 else 0.0
+        values['seconds'] = round(elapsed, 3)
+        self.logger.log(self.level, "%s %s", self.operation, state, extra=fields(**values))
@@ -0,0 +1,437 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the ColumnarCache class, an on-disk column store of the
+whole dataset that opens without parsing or copying any rows. It is part of
+the Persistence Layer.
+
+This module is responsible for:
+- Building the cache once from a repository or the source CSV file
+- Recording a fingerprint of the source in a manifest
+- Opening the column files with mmap and exposing them as typed memoryviews
+- Telling callers when a cache no longer matches its source
+
+Cache directory layout:
+    manifest.json      version, row count, byte order, columns and source fingerprint
+    dictionary.json    distinct values of every string column, indexed by code
+    <column>.<type>    one fixed-width native-endian array per column:
+                         id            int64
+                         sr90_*        float64, NaN marks a missing value
+                         start_day,
+                         stop_day      int32 day ordinals, 0 when the date cannot be parsed
+                         string fields int32 codes into dictionary.json
+"""
+
+import sys
+import os
+import hashlib
+import json
+import logging
+import math
+import mmap
+import shutil
+import time
+from array import array
+from dataclasses import fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+from src.observability.structured_logging import fields as log_fields
+from src.persistence.data_migration import DataMigration
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DICTIONARY_FILE = "dictionary.json"
+
+STRING_COLUMNS = tuple(field.name for field in fields(MilkSampleRecord) if not field.name.startswith('sr90'))
+FLOAT_COLUMNS = tuple(field.name for field in fields(MilkSampleRecord) if field.name.startswith('sr90'))
+DAY_COLUMNS = ('start_day', 'stop_day')
+
+# (array typecode, file suffix) of each kind of column
+COLUMN_TYPES = {
+    'int64': ('q', 'i64'),
+    'int32': ('i', 'i32'),
+    'float64': ('d', 'f64')
+}
+
+def _column_kinds() -> Dict[str, str]:
+    """Get the storage type of every column, in file order."""
+    kinds = {'id': 'int64'}
+    kinds.update((name, 'int32') for name in STRING_COLUMNS)
+    kinds.update((name, 'float64') for name in FLOAT_COLUMNS)
+    kinds.update((name, 'int32') for name in DAY_COLUMNS)
+    return kinds
+
+def repository_fingerprint(repository) -> Dict[str, Any]:
+    """
+    Describe the current state of a repository.
+
+    The change log sequence moves on every write, so together with the row
+    count it identifies one version of the data.
+
+    Args:
+        repository (SampleRepository): The source repository
+
+    Returns:
+        Dict[str, Any]: Fingerprint stored in and compared with the manifest
+    """
+    return {
+        'kind': 'repository',
+        'engine': type(repository).__name__,
+        'sample_count': repository.get_sample_count(),
+        'latest_change_seq': repository.get_latest_change_seq()
+    }
+
+def csv_fingerprint(csv_path: str) -> Dict[str, Any]:
+    """
+    Describe the current contents of a CSV file.
+
+    Args:
+        csv_path (str): Path of the CSV file
+
+    Returns:
+        Dict[str, Any]: Fingerprint stored in and compared with the manifest
+    """
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    stat = os.stat(csv_path)
+    return {
+        'kind': 'csv',
+        'path': os.path.abspath(csv_path),
+        'size': stat.st_size,
+        'sha256': digest.hexdigest()
+    }
+
+def build_columnar_cache(rows: Iterable[Tuple[int, MilkSampleRecord]],
+                         directory: str,
+                         source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write a cache from (id, record) rows.
+
+    Columns are appended to their files as rows arrive, so building needs
+    memory for the string dictionaries only. The cache is built next to the
+    destination and moved into place when complete.
+
+    Args:
+        rows (Iterable[Tuple[int, MilkSampleRecord]]): Rows in the order they should be stored
+        directory (str): Cache directory to create or replace
+        source (Dict[str, Any]): Fingerprint of the source, taken before reading any rows
+
+    Returns:
+        Dict[str, Any]: The manifest written
+    """
+    started = time.perf_counter()
+    kinds = _column_kinds()
+    staging = directory.rstrip(os.sep) + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in STRING_COLUMNS}
+    files = {name: f"{name}.{COLUMN_TYPES[kind][1]}" for name, kind in kinds.items()}
+    outputs = {name: open(os.path.join(staging, file_name), "wb") for name, file_name in files.items()}
+    row_count = 0
+    try:
+        block: List[Tuple[int, MilkSampleRecord]] = []
+        for row in rows:
+            block.append(row)
+            if len(block) >= 65536:
+                _write_block(block, outputs, dictionaries)
+                row_count += len(block)
+                block = []
+        _write_block(block, outputs, dictionaries)
+        row_count += len(block)
+    except BaseException:
+        for output in outputs.values():
+            output.close()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    for output in outputs.values():
+        output.close()
+
+    with open(os.path.join(staging, DICTIONARY_FILE), "w", encoding="utf-8") as file:
+        json.dump({name: list(values) for name, values in dictionaries.items()}, file, ensure_ascii=False)
+    manifest = {
+        'version': CACHE_VERSION,
+        'row_count': row_count,
+        'byteorder': sys.byteorder,
+        'columns': {name: {'type': kind, 'file': files[name]} for name, kind in kinds.items()},
+        'source': source,
+        'built_at': time.time(),
+        'build_seconds': time.perf_counter() - started
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+
+    # Readers keep their mappings of the old files, which stay valid after the directory is removed
+    retired = directory.rstrip(os.sep) + ".old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, retired)
+    os.replace(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    logger.info("Built columnar cache", extra=log_fields(directory=directory, rows=row_count,
+                                                         seconds=round(manifest['build_seconds'], 3)))
+    return manifest
+
+def _write_block(block: List[Tuple[int, MilkSampleRecord]], outputs: Dict[str, Any],
+                 dictionaries: Dict[str, Dict[str, int]]) -> None:
+    """Append one block of rows to the column files."""
+    if not block:
+        return
+    array('q', (record_id for record_id, _ in block)).tofile(outputs['id'])
+    for name in STRING_COLUMNS:
+        dictionary = dictionaries[name]
+        codes = array('i')
+        for _, record in block:
+            value = getattr(record, name)
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary)
+            codes.append(code)
+        codes.tofile(outputs[name])
+    for name in FLOAT_COLUMNS:
+        values = (getattr(record, name) for _, record in block)
+        array('d', (math.nan if value is None else value for value in values)).tofile(outputs[name])
+    for name, source in zip(DAY_COLUMNS, ('start_date', 'stop_date')):
+        days = (parse_sample_date(getattr(record, source)) for _, record in block)
+        array('i', (day.toordinal() if day else 0 for day in days)).tofile(outputs[name])
+
+class ColumnarCache:
+    """
+    A read-only view of a columnar cache directory.
+
+    This class is responsible for:
+    1. Mapping every column file into memory without reading it
+    2. Exposing columns as typed memoryviews over the mappings
+    3. Decoding rows back into MilkSampleRecord objects on demand
+    4. Comparing the manifest with the current state of a source
+
+    Opening costs a few small JSON reads and one mmap per column whatever
+    the number of rows; pages are read by the OS as they are touched.
+    Views returned by column() are only valid until close().
+
+        with ColumnarCache("cache") as cache:
+            activity = cache.column("sr90_activity")
+            mean = sum(activity) / len(activity)
+
+    Attributes:
+        directory (str): The cache directory
+        manifest (Dict[str, Any]): Parsed manifest.json
+        row_count (int): Number of rows
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open a cache directory.
+
+        Args:
+            directory (str): Directory written by build_columnar_cache
+
+        Raises:
+            FileNotFoundError: If the directory or one of its files is missing
+            ValueError: If the cache was written by another version or platform, or a file is truncated
+        """
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        if self.manifest.get('version') != CACHE_VERSION:
+            raise ValueError(f"Unsupported columnar cache version: {self.manifest.get('version')}")
+        if self.manifest.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Columnar cache was built on a {self.manifest.get('byteorder')}-endian machine")
+        self.row_count = self.manifest['row_count']
+        with open(os.path.join(directory, DICTIONARY_FILE), encoding="utf-8") as file:
+            self._dictionaries: Dict[str, List[str]] = json.load(file)
+
+        self._maps: List[mmap.mmap] = []
+        self._views: Dict[str, memoryview] = {}
+        try:
+            for name, column in self.manifest['columns'].items():
+                self._views[name] = self._map_column(column)
+        except BaseException:
+            self.close()
+            raise
+
+    def _map_column(self, column: Dict[str, str]) -> memoryview:
+        """Map one column file and cast it to its element type."""
+        typecode = COLUMN_TYPES[column['type']][0]
+        path = os.path.join(self.directory, column['file'])
+        expected_size = self.row_count * array(typecode).itemsize
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size != expected_size:
+                raise ValueError(f"Columnar cache file {path} has {size} bytes, expected {expected_size}")
+            if size == 0:
+                # mmap cannot map an empty file
+                return memoryview(b"").cast(typecode)
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapping)
+        return memoryview(mapping).cast(typecode)
+
+    def __enter__(self) -> 'ColumnarCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def column_names(self) -> List[str]:
+        """Names of the stored columns."""
+        return list(self._views)
+
+    def column(self, name: str) -> memoryview:
+        """
+        Get a column as a typed memoryview over the mapped file.
+
+        String columns hold int32 codes into dictionary(name). Float columns
+        use NaN for missing values and day columns use 0 for unparseable dates.
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            memoryview: Zero-copy view of the column
+
+        Raises:
+            KeyError: If there is no such column
+        """
+        return self._views[name]
+
+    def dictionary(self, name: str) -> List[str]:
+        """
+        Get the distinct values of a string column, indexed by code.
+
+        Args:
+            name (str): String column name
+
+        Returns:
+            List[str]: Values by code
+        """
+        return self._dictionaries[name]
+
+    def codes_for(self, name: str, value: str) -> Optional[int]:
+        """
+        Get the code of a string value, so a column can be filtered without decoding it.
+
+        Args:
+            name (str): String column name
+            value (str): Value to look up
+
+        Returns:
+            Optional[int]: The code, or None if the value never occurs
+        """
+        try:
+            return self._dictionaries[name].index(value)
+        except ValueError:
+            return None
+
+    def record(self, index: int) -> Tuple[int, MilkSampleRecord]:
+        """
+        Decode one row.
+
+        Args:
+            index (int): Row position (0-based)
+
+        Returns:
+            Tuple[int, MilkSampleRecord]: Tuple containing (id, record)
+        """
+        values: Dict[str, Any] = {}
+        for name in STRING_COLUMNS:
+            values[name] = self._dictionaries[name][self._views[name][index]]
+        for name in FLOAT_COLUMNS:
+            value = self._views[name][index]
+            values[name] = None if math.isnan(value) else value
+        return self._views['id'][index], MilkSampleRecord(**values)
+
+    def iter_records(self) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Decode every row in stored order.
+
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+        """
+        for index in range(self.row_count):
+            yield self.record(index)
+
+    def matches(self, fingerprint: Dict[str, Any]) -> bool:
+        """
+        Check whether the cache was built from the source in the given state.
+
+        Args:
+            fingerprint (Dict[str, Any]): Current fingerprint of the source
+
+        Returns:
+            bool: True if the cache is current
+        """
+        return self.manifest.get('source') == fingerprint
+
+    def close(self) -> None:
+        """Release the column views and unmap the files."""
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        for mapping in self._maps:
+            try:
+                mapping.close()
+            except BufferError:
+                # A caller still holds a view derived from the mapping; it is unmapped when that is freed
+                pass
+        self._maps = []
+
+def load_columnar_cache(directory: str,
+                        repository=None,
+                        csv_path: Optional[str] = None,
+                        batch_size: int = 10000) -> ColumnarCache:
+    """
+    Open a cache, building or rebuilding it first if it does not match its source.
+
+    Exactly one source must be given. Rows from a repository keep their IDs;
+    rows from a CSV file are numbered from 1 in file order, as a migration
+    into an empty database would number them.
+
+    Args:
+        directory (str): Cache directory
+        repository (Optional[SampleRepository]): Source repository
+        csv_path (Optional[str]): Source CSV file in the DataMigration format
+            (relative paths are resolved from the project root, as DataMigration does)
+        batch_size (int): Records read from the repository per batch
+
+    Returns:
+        ColumnarCache: An open, current cache
+
+    Raises:
+        ValueError: If not exactly one source is given
+    """
+    if (repository is None) == (csv_path is None):
+        raise ValueError("Give exactly one of repository or csv_path")
+    if repository is not None:
+        fingerprint = repository_fingerprint(repository)
+    else:
+        migration = DataMigration(csv_path)
+        fingerprint = csv_fingerprint(migration.csv_path)
+
+    try:
+        cache = ColumnarCache(directory)
+    except (OSError, ValueError, KeyError):
+        cache = None
+    if cache is not None:
+        if cache.matches(fingerprint):
+            return cache
+        cache.close()
+
+    if repository is not None:
+        rows = repository.iter_samples(batch_size)
+    else:
+        rows = enumerate(migration.read_csv_data(), start=1)
+    build_columnar_cache(rows, directory, fingerprint)
+    return ColumnarCache(directory)
@@ -12,18 +12,29 @@ This module is responsible for:
 - Converting CSV data to database records
 - Populating the database with all sample data
 - Providing migration status and statistics
+
+Run it directly to import the CSV file, optionally under the profiler:
+    python -m src.persistence.data_migration [--csv FILE] [--db milk_samples.db]
+        [--batch-size 1000] [--profile [DIR]] [--profile-memory]
 """
 
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import csv
-from typing import List, Tuple
+import logging
+from typing import Callable, List, Optional, Tuple
 from src.model.milk_sample_record import MilkSampleRecord
+from src.observability.profiling import add_profile_arguments, describe_result, profile_options_from_args, profiled
+from src.observability.structured_logging import ProgressReporter, configure_logging, fields
 from src.persistence.database_config import DatabaseConfig
 from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
 
+logger = logging.getLogger(__name__)
+
 class DataMigration:
     """
     A class to handle data migration from CSV to database.
@@ -36,16 +47,27 @@ class DataMigration:
     5. Error handling during migration
     """
     
-    def __init__(self, csv_filename: str = "nms_strontium90_milk_ssn_strontium90_lait.csv"):
+    def __init__(self, csv_filename: str = "nms_strontium90_milk_ssn_strontium90_lait.csv",
+                 db_repository: Optional[MilkSampleDBRepository] = None):
         """
         Initialize the data migration utility.
         
         Args:
-            csv_filename (str): Name of the CSV file to migrate
+            csv_filename (str): Name or path of the CSV file to migrate
+                (relative paths are resolved from the project root)
+            db_repository (Optional[MilkSampleDBRepository]): Repository to migrate
+                into (default: the milk_samples.db repository)
         """
         current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self.csv_path = os.path.join(current_dir, csv_filename)
-        self.db_repository = MilkSampleDBRepository()
+        self._db_repository = db_repository
+    
+    @property
+    def db_repository(self) -> MilkSampleDBRepository:
+        """Repository to migrate into, opened on first use so read_csv_data needs no database."""
+        if self._db_repository is None:
+            self._db_repository = MilkSampleDBRepository()
+        return self._db_repository
         
     def read_csv_data(self) -> List[MilkSampleRecord]:
         """
@@ -73,7 +95,7 @@ class DataMigration:
                     stripped_values = [v.strip() for v in values]
                     # Only skip if required fields are missing (first 7 columns)
                     if len(stripped_values) < 7 or any(not stripped_values[i] for i in range(7)):
-                        print(f"Skipping row {row_num}: Missing required values (need first 7 fields non-empty)")
+                        logger.debug("Skipping row with missing required values", extra=fields(row=row_num))
                         skipped_rows += 1
                         continue
                     # Fill missing optional fields with empty string
@@ -93,34 +115,31 @@ class DataMigration:
                         )
                         records.append(record)
                     except (ValueError, IndexError) as e:
-                        print(f"Error parsing row {row_num}: {str(e)}")
+                        logger.debug("Skipping row that cannot be parsed", extra=fields(row=row_num, error=str(e)))
                         skipped_rows += 1
                         continue
                         
         except FileNotFoundError:
-            print(f"Error: File '{self.csv_path}' not found.")
-            print(f"Current working directory: {os.getcwd()}")
-            print("Directory contents:")
-            for file in os.listdir(os.getcwd()):
-                print(f"  - {file}")
+            logger.error("CSV file not found", extra=fields(path=self.csv_path, cwd=os.getcwd()))
             raise
         except Exception as e:
-            print(f"Unexpected error reading CSV file: {str(e)}")
+            logger.error("Unexpected error reading CSV file: %s", e, extra=fields(path=self.csv_path))
             raise
-            
-        print(f"\nCSV File Statistics:")
-        print(f"Total rows processed: {total_rows}")
-        print(f"Rows skipped: {skipped_rows}")
-        print(f"Rows successfully parsed: {len(records)}")
+        
+        logger.info("Read CSV file",
+                   extra=fields(path=self.csv_path, rows=total_rows, skipped=skipped_rows, parsed=len(records)))
         
         return records
     
-    def migrate_data(self, batch_size: int = 100) -> Tuple[int, int, int]:
+    def migrate_data(self, batch_size: int = 100,
+                     progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, int, int]:
         """
         Migrate all data from CSV to database.
         
         Args:
             batch_size (int): Number of records to insert in each batch
+            progress (Optional[Callable[[int, int], None]]): Called after each batch
+                with (records_processed, total_records)
             
         Returns:
             Tuple[int, int, int]: (total_records, successful_inserts, failed_inserts)
@@ -129,55 +148,58 @@ class DataMigration:
             FileNotFoundError: If the CSV file is not found
             sqlite3.Error: If there's an error inserting into database
         """
-        print("Starting data migration from CSV to database...")
+        logger.info("Starting data migration", extra=fields(path=self.csv_path))
         
         # Clear existing data
-        print("Clearing existing database records...")
         self.db_repository.clear_all_samples()
         
         # Read CSV data
-        print("Reading CSV data...")
         records = self.read_csv_data()
         total_records = len(records)
         
         if total_records == 0:
-            print("No records found in CSV file. Migration aborted.")
+            logger.warning("No records found in CSV file, migration aborted", extra=fields(path=self.csv_path))
             return 0, 0, 0
         
         # Insert records in batches
         successful_inserts = 0
         failed_inserts = 0
         
-        print(f"Inserting {total_records} records into database in batches of {batch_size}...")
+        reporter = ProgressReporter(logger, "migrate_data", total_records)
         
         for i in range(0, total_records, batch_size):
             batch = records[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (total_records + batch_size - 1) // batch_size
             
-            print(f"Processing batch {batch_num}/{total_batches} ({len(batch)} records)...")
+            try:
+                # Insert the whole batch in one transaction; the cube is rebuilt below
+                successful_inserts += self.db_repository.create_samples(batch, update_cube=False)
+            except Exception as e:
+                logger.warning("Batch insert failed, inserting records individually: %s", e,
+                               extra=fields(first_row=i, rows=len(batch)))
+                for record in batch:
+                    try:
+                        self.db_repository.create_sample(record)
+                        successful_inserts += 1
+                    except Exception as e:
+                        logger.warning("Failed to insert record: %s", e)
+                        failed_inserts += 1
             
-            for record in batch:
-                try:
-                    self.db_repository.create_sample(record)
-                    successful_inserts += 1
-                except Exception as e:
-                    print(f"Failed to insert record: {str(e)}")
-                    failed_inserts += 1
-        
-        print(f"\nMigration completed!")
-        print(f"Total records processed: {total_records}")
-        print(f"Successful inserts: {successful_inserts}")
-        print(f"Failed inserts: {failed_inserts}")
+            reporter.advance(len(batch))
+            if progress is not None:
+                progress(i + len(batch), total_records)
+        
+        # Build the aggregate cube in one grouped pass over the new data
+        cube_cells = self.db_repository.rebuild_cube()
+        reporter.finish()
         
         # Verify migration
         db_count = self.db_repository.get_sample_count()
-        print(f"Records in database: {db_count}")
-        
+        summary = fields(total=total_records, successful=successful_inserts, failed=failed_inserts,
+                         in_database=db_count, cube_cells=cube_cells)
         if db_count == successful_inserts:
-            print("✓ Migration verification successful!")
+            logger.info("Migration completed", extra=summary)
         else:
-            print("⚠ Migration verification failed - record count mismatch!")
+            logger.warning("Migration completed with a record count mismatch", extra=summary)
         
         return total_records, successful_inserts, failed_inserts
     
@@ -196,19 +218,16 @@ class DataMigration:
             # Count records in database
             db_count = self.db_repository.get_sample_count()
             
-            print(f"\nMigration Verification:")
-            print(f"Records in CSV: {csv_count}")
-            print(f"Records in database: {db_count}")
-            
             if csv_count == db_count:
-                print("✓ Migration verification successful!")
+                logger.info("Migration verified", extra=fields(in_csv=csv_count, in_database=db_count))
                 return True
             else:
-                print("⚠ Migration verification failed - record count mismatch!")
+                logger.warning("Migration verification failed, record count mismatch",
+                               extra=fields(in_csv=csv_count, in_database=db_count))
                 return False
                 
         except Exception as e:
-            print(f"Error during migration verification: {str(e)}")
+            logger.error("Error during migration verification: %s", e)
             return False
     
     def get_migration_statistics(self) -> dict:
@@ -244,5 +263,27 @@ class DataMigration:
             return stats
             
         except Exception as e:
-            print(f"Error getting migration statistics: {str(e)}")
-            return {} 
\ No newline at end of file
+            logger.error("Error getting migration statistics: %s", e)
+            return {}
+
+def main(argv: Optional[list] = None) -> None:
+    """Import the CSV file into a database from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import the strontium-90 milk sample CSV file into the database")
+    parser.add_argument("--csv", default="nms_strontium90_milk_ssn_strontium90_lait.csv", help="CSV file to import")
+    parser.add_argument("--db", default="milk_samples.db", help="database path or SQLite URI")
+    parser.add_argument("--batch-size", type=int, default=1000, help="records inserted per transaction")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    migration = DataMigration(args.csv, MilkSampleDBRepository(DatabaseConfig(args.db)))
+    with profiled("migrate_data", profile_options_from_args(args)) as profile:
+        total, successful, failed = migration.migrate_data(args.batch_size)
+    print(f"Imported {successful} of {total} records into {args.db} ({failed} failed)")
+    if profile is not None:
+        print(describe_result(profile))
+
+if __name__ == "__main__":
+    main()
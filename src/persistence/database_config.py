@@ -15,9 +15,92 @@ This module is responsible for:
 
 import sqlite3
 import os
-from typing import Optional
+import itertools
+import logging
+import re
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
 from contextlib import contextmanager
 
+from src.observability.metrics import REGISTRY, count_statement
+from src.observability.structured_logging import fields
+from src.observability.slow_queries import SlowQueryLog, TimingConnection, default_slow_query_log
+
+logger = logging.getLogger(__name__)
+
+# Names for in-memory databases, unique within the process
+_memory_database_ids = itertools.count(1)
+
+# Stored in PRAGMA user_version once every table, index and trigger exists;
+# bump it when initialize_database() gains new statements
+SCHEMA_VERSION = 1
+
+# Configurations returned by DatabaseConfig.shared(), by database path
+_shared_configs: Dict[str, 'DatabaseConfig'] = {}
+_shared_configs_lock = threading.Lock()
+
+# Connection settings that can be tuned through DatabaseConfig(pragmas=...)
+TUNABLE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store',
+                   'wal_autocheckpoint', 'locking_mode')
+
+# Named pragma sets for common workloads
+PRAGMA_PRESETS: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    # Readers never block the writer and commits skip the fsync of every transaction
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    # WAL with a larger page cache and memory-mapped reads for read-heavy traffic
+    'wal-read-heavy': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536,
+                       'mmap_size': 268435456, 'temp_store': 'MEMORY'},
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+def parse_pragmas(preset: str, overrides: List[str]) -> Dict[str, Any]:
+    """
+    Combine a pragma preset with name=value overrides from the command line.
+    
+    Args:
+        preset (str): Key of PRAGMA_PRESETS
+        overrides (List[str]): Settings such as "cache_size=-16000"; later ones win
+        
+    Returns:
+        Dict[str, Any]: Pragmas for DatabaseConfig
+        
+    Raises:
+        ValueError: If an override is not in name=value form
+    """
+    pragmas = dict(PRAGMA_PRESETS[preset])
+    for override in overrides:
+        name, separator, value = override.partition("=")
+        if not separator:
+            raise ValueError(f"Expected name=value, got '{override}'")
+        pragmas[name.strip()] = value.strip()
+    return pragmas
+
+@dataclass
+class BackupReport:
+    """
+    Summary of a completed backup or snapshot.
+    
+    Attributes:
+        destination (str): Path of the file written
+        pages (int): Database pages copied
+        bytes_copied (int): Size of the copied pages in bytes
+        seconds (float): Wall-clock time of the copy
+    """
+    destination: str
+    pages: int
+    bytes_copied: int
+    seconds: float
+    
+    @property
+    def megabytes_per_second(self) -> float:
+        """float: Copy throughput in MB/s."""
+        return self.bytes_copied / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
 class DatabaseConfig:
     """
     A class to handle database configuration and connection management.
@@ -27,22 +110,229 @@ class DatabaseConfig:
     2. Creating the database file if it doesn't exist
     3. Managing database connections
     4. Providing connection context management
+    5. Loading a prebuilt database snapshot with the backup API
+    6. Backing up the live database and exporting compact snapshots
+    7. Timing statements for the slow-query log
+    8. Applying tuning pragmas and the busy timeout to every connection
+    9. Creating the schema once per database rather than once per repository
+    
+    Each thread gets its own connection, created on first use and reused
+    afterwards, so one configuration can be shared by worker threads.
+    
+    The database can be a file path (relative to the project root or
+    absolute), a SQLite URI starting with "file:", or ":memory:". A
+    ":memory:" configuration gets its own shared-cache in-memory database, so
+    every thread sees the same data; it lives until close() is called.
+    
+    Attributes:
+        db_path (str): File path or URI passed to sqlite3.connect
+        uri (bool): Whether db_path is a SQLite URI
+        is_memory (bool): Whether the database only exists in memory
+        slow_query_log (Optional[SlowQueryLog]): Log that times every statement, if any
+        pragmas (Dict[str, Any]): Pragmas set on every new connection
+        busy_timeout (float): Seconds a statement waits for a lock before SQLITE_BUSY
     """
     
-    def __init__(self, db_name: str = "milk_samples.db"):
+    def __init__(self, db_name: str = "milk_samples.db", slow_query_log: Optional[SlowQueryLog] = None,
+                 pragmas: Optional[Dict[str, Any]] = None, busy_timeout: float = 5.0):
         """
         Initialize the database configuration.
         
         Args:
-            db_name (str): Name of the database file (default: milk_samples.db)
+            db_name (str): Database file name, path, "file:" URI or ":memory:"
+                (default: milk_samples.db)
+            slow_query_log (Optional[SlowQueryLog]): Log that times every statement
+                (default: the process-wide log from configure_slow_query_log, if any)
+            pragmas (Optional[Dict[str, Any]]): Pragmas from TUNABLE_PRAGMAS to set on
+                every connection, e.g. PRAGMA_PRESETS['wal'] (default: SQLite defaults)
+            busy_timeout (float): Seconds a statement waits for a lock held by
+                another connection before failing with SQLITE_BUSY (default: 5.0)
+            
+        Raises:
+            ValueError: If a pragma is not tunable or its value is not a plain word or number
+        """
+        self.slow_query_log = slow_query_log or default_slow_query_log()
+        self.pragmas = dict(pragmas or {})
+        for name, value in self.pragmas.items():
+            if name not in TUNABLE_PRAGMAS:
+                raise ValueError(f"Pragma cannot be tuned: {name}")
+            if not _PRAGMA_VALUE.match(str(value)):
+                raise ValueError(f"Invalid value for pragma {name}: {value!r}")
+        self.busy_timeout = busy_timeout
+        if db_name == ":memory:":
+            db_name = f"file:memdb_{os.getpid()}_{next(_memory_database_ids)}?mode=memory&cache=shared"
+        self.uri = db_name.startswith("file:")
+        if self.uri:
+            self.db_path = db_name
+        else:
+            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.db_path = os.path.join(current_dir, db_name)
+        self.is_memory = self.uri and "mode=memory" in db_name
+        self._local = threading.local()
+        self._connections: Set[sqlite3.Connection] = set()
+        # Connections inside get_db_context(), with how many contexts (including
+        # suspended generators) use each, and stale ones to close when released
+        self._in_use: Dict[sqlite3.Connection, int] = {}
+        self._stale: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._owned_file: Optional[str] = None
+        # Bumped by reopen(); threads holding an older connection reconnect
+        self._epoch = 0
+        # Set once initialize_database() has found or created the current schema
+        self._schema_ready = False
+        # A shared in-memory database is discarded when its last connection
+        # closes, so one connection is held open for the life of the configuration
+        self._keeper = self._connect() if self.is_memory else None
+    
+    @classmethod
+    def shared(cls, db_name: str = "milk_samples.db") -> 'DatabaseConfig':
+        """
+        Get the process-wide configuration of a database file.
+        
+        Repositories, migrations and reloaders created without an explicit
+        configuration share this one, so they share its per-thread
+        connections and only check the schema once.
+        
+        Args:
+            db_name (str): Database file name or path (default: milk_samples.db)
+            
+        Returns:
+            DatabaseConfig: The same instance for every call with the same database
+        """
+        with _shared_configs_lock:
+            config = _shared_configs.get(db_name)
+            if config is None:
+                config = _shared_configs[db_name] = cls(db_name)
+            return config
+    
+    @classmethod
+    def temporary(cls, directory: Optional[str] = None, **options: Any) -> 'DatabaseConfig':
+        """
+        Create a configuration for a new, empty database in a temporary file.
+        
+        The file is deleted by close().
+        
+        Args:
+            directory (Optional[str]): Directory for the file (default: the system temp directory)
+            **options: Other DatabaseConfig arguments, such as pragmas
+            
+        Returns:
+            DatabaseConfig: Configuration for the temporary database
+        """
+        import tempfile
+        
+        handle, path = tempfile.mkstemp(prefix="milk_samples_", suffix=".db", dir=directory)
+        os.close(handle)
+        config = cls(path, **options)
+        config._owned_file = path
+        return config
+    
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str, db_name: str = ":memory:") -> 'DatabaseConfig':
+        """
+        Create a configuration whose database starts as a copy of a snapshot.
+        
+        Args:
+            snapshot_path (str): Path of the prebuilt database to copy
+            db_name (str): Target database, in-memory by default
+            
+        Returns:
+            DatabaseConfig: Configuration for the populated database
+            
+        Raises:
+            sqlite3.Error: If the snapshot cannot be read
+        """
+        config = cls(db_name)
+        config.load_snapshot(snapshot_path)
+        return config
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection to the configured database."""
+        # Connections stay with the thread that opened them, but generators
+        # created in one thread may be resumed from another
+        if self.slow_query_log is None:
+            connection = sqlite3.connect(self.db_path, uri=self.uri, check_same_thread=False,
+                                         timeout=self.busy_timeout)
+        else:
+            connection = sqlite3.connect(self.db_path, uri=self.uri, check_same_thread=False,
+                                         timeout=self.busy_timeout, factory=TimingConnection)
+            connection.slow_query_log = self.slow_query_log
+        connection.row_factory = sqlite3.Row  # Enable row factory for named access
+        for name, value in self.pragmas.items():
+            # Names and values were validated in __init__; pragmas cannot take bound parameters
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+    
+    def read_pragmas(self) -> Dict[str, Any]:
+        """
+        Read the tunable pragmas as the calling thread's connection sees them.
+        
+        Useful to confirm a setting took effect: an in-memory database, for
+        example, stays in "memory" journal mode when WAL is requested.
+        
+        Returns:
+            Dict[str, Any]: Current value of each pragma in TUNABLE_PRAGMAS (None if
+            it does not apply to this database)
+        """
+        values = {}
+        with self.get_db_context() as conn:
+            for name in TUNABLE_PRAGMAS:
+                row = conn.execute(f"PRAGMA {name}").fetchone()
+                values[name] = row[0] if row is not None else None
+        return values
+    
+    def enable_slow_query_log(self, threshold_ms: float = 100.0, top_n: int = 10) -> SlowQueryLog:
+        """
+        Start timing every statement, logging those slower than a threshold.
+        
+        Threads reconnect on their next call so their new connections are timed.
+        
+        Args:
+            threshold_ms (float): Slow threshold in milliseconds
+            top_n (int): Number of statement shapes in a default report
+            
+        Returns:
+            SlowQueryLog: The log, for reports
         """
-        current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.db_path = os.path.join(current_dir, db_name)
-        self.connection: Optional[sqlite3.Connection] = None
+        self.slow_query_log = SlowQueryLog(threshold_ms / 1000, top_n)
+        self.reopen()
+        return self.slow_query_log
+    
+    def load_snapshot(self, snapshot_path: str, pages: int = -1) -> None:
+        """
+        Replace the contents of the database with a copy of a snapshot.
+        
+        The copy uses the SQLite online backup API, which copies pages
+        directly instead of replaying SQL, so a populated database is ready
+        in milliseconds.
+        
+        Args:
+            snapshot_path (str): Path of the prebuilt database to copy
+            pages (int): Pages copied per step (-1 copies everything in one step)
+            
+        Raises:
+            sqlite3.Error: If the snapshot cannot be read
+        """
+        source_uri = f"file:{os.path.abspath(snapshot_path)}?mode=ro"
+        try:
+            source = sqlite3.connect(source_uri, uri=True)
+            try:
+                source.backup(self.get_connection(), pages=pages)
+            finally:
+                source.close()
+            logger.info("Loaded database snapshot", extra=fields(snapshot=snapshot_path))
+        except sqlite3.Error as e:
+            logger.error("Error loading database snapshot: %s", e)
+            raise
+    
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
+        """Optional[sqlite3.Connection]: The calling thread's connection, if it has one."""
+        return getattr(self._local, 'connection', None)
         
     def get_connection(self) -> sqlite3.Connection:
         """
-        Get a database connection, creating it if necessary.
+        Get the calling thread's database connection, creating it if necessary.
         
         Returns:
             sqlite3.Connection: Database connection
@@ -50,22 +340,233 @@ class DatabaseConfig:
         Raises:
             sqlite3.Error: If there's an error connecting to the database
         """
+        if self.connection is not None and getattr(self._local, 'epoch', 0) != self._epoch:
+            # A connection from before reopen() reads the old file; close it
+            # now unless a generator is still reading through it
+            self._retire(self.connection)
+            self._local.connection = None
         if self.connection is None:
             try:
-                self.connection = sqlite3.connect(self.db_path)
-                self.connection.row_factory = sqlite3.Row  # Enable row factory for named access
-                print(f"Connected to database: {self.db_path}")
+                epoch = self._epoch
+                connection = self._connect()
+                self._local.connection = connection
+                self._local.epoch = epoch
+                self._local.counting = False
+                with self._connections_lock:
+                    self._connections.add(connection)
+                logger.debug("Connected to database", extra=fields(database=self.db_path))
             except sqlite3.Error as e:
-                print(f"Error connecting to database: {e}")
+                logger.error("Error connecting to database: %s", e)
                 raise
-        return self.connection
+        connection = self.connection
+        if self._local.counting != REGISTRY.enabled:
+            # The trace callback runs on every statement, so it is only
+            # installed while metrics are on, and removed when they are turned off
+            self._local.counting = REGISTRY.enabled
+            connection.set_trace_callback(count_statement if self._local.counting else None)
+        return connection
     
     def close_connection(self) -> None:
-        """Close the database connection if it exists."""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            print("Database connection closed")
+        """Close the calling thread's database connection if it exists."""
+        connection = self.connection
+        if connection:
+            with self._connections_lock:
+                self._connections.discard(connection)
+                self._in_use.pop(connection, None)
+                self._stale.discard(connection)
+            connection.close()
+            self._local.connection = None
+            logger.debug("Database connection closed", extra=fields(database=self.db_path))
+    
+    def close_all_connections(self) -> None:
+        """
+        Close the database connections of every thread.
+        
+        Threads that use the configuration afterwards open a new connection.
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+            self._in_use = {}
+            self._stale = set()
+        for connection in connections:
+            connection.close()
+        # A fresh thread-local store makes every thread reconnect on next use
+        self._local = threading.local()
+    
+    def backup(self,
+               destination: str,
+               pages_per_step: int = 256,
+               progress: Optional[Callable[[int, int], None]] = None,
+               sleep: float = 0.005) -> BackupReport:
+        """
+        Copy the live database to a file while it stays in use.
+        
+        The SQLite online backup API copies a few pages at a time on its own
+        connection and sleeps between steps, so writers are only blocked
+        briefly. If the database is written during the backup, SQLite
+        restarts the copy, so the result is always a consistent snapshot.
+        The copy is written next to the destination and renamed into place
+        when complete.
+        
+        Args:
+            destination (str): Path of the backup file (replaced if it exists)
+            pages_per_step (int): Pages copied per step (-1 copies everything at once)
+            progress (Optional[Callable[[int, int], None]]): Called after each
+                step with (pages_copied, total_pages)
+            sleep (float): Seconds to pause between steps
+            
+        Returns:
+            BackupReport: Pages copied, size and elapsed time
+            
+        Raises:
+            sqlite3.Error: If the backup fails
+        """
+        partial = destination + ".partial"
+        started = time.perf_counter()
+        
+        def on_step(status: int, remaining: int, total: int) -> None:
+            if progress is not None:
+                progress(total - remaining, total)
+        
+        try:
+            source = self._connect()
+            target = sqlite3.connect(partial)
+            try:
+                source.backup(target, pages=pages_per_step, progress=on_step, sleep=sleep)
+                page_size = target.execute("PRAGMA page_size").fetchone()[0]
+                pages = target.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                target.close()
+                source.close()
+            os.replace(partial, destination)
+        except (sqlite3.Error, OSError) as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            logger.error("Error backing up database: %s", e)
+            raise
+        
+        report = BackupReport(destination, pages, pages * page_size, time.perf_counter() - started)
+        logger.info("Backed up database", extra=fields(destination=destination, pages=report.pages,
+                                                       seconds=round(report.seconds, 3),
+                                                       mb_per_second=round(report.megabytes_per_second, 1)))
+        return report
+    
+    def export_snapshot(self, destination: str, read_only: bool = True) -> BackupReport:
+        """
+        Write a compact point-in-time copy of the database with VACUUM INTO.
+        
+        Unlike backup(), the copy is rebuilt from a single read transaction,
+        leaving out free pages and defragmenting tables and indexes.
+        
+        Args:
+            destination (str): Path of the snapshot file (must not exist)
+            read_only (bool): Remove write permission from the snapshot file
+            
+        Returns:
+            BackupReport: Pages written, size and elapsed time
+            
+        Raises:
+            FileExistsError: If the destination already exists
+            sqlite3.Error: If the snapshot fails
+        """
+        if os.path.exists(destination):
+            raise FileExistsError(f"Snapshot destination already exists: {destination}")
+        started = time.perf_counter()
+        try:
+            with self.get_db_context() as conn:
+                conn.execute("VACUUM INTO ?", (destination,))
+            snapshot = sqlite3.connect(f"file:{os.path.abspath(destination)}?mode=ro", uri=True)
+            try:
+                page_size = snapshot.execute("PRAGMA page_size").fetchone()[0]
+                pages = snapshot.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                snapshot.close()
+        except sqlite3.Error as e:
+            logger.error("Error exporting database snapshot: %s", e)
+            raise
+        if read_only:
+            os.chmod(destination, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        
+        report = BackupReport(destination, pages, pages * page_size, time.perf_counter() - started)
+        logger.info("Exported database snapshot", extra=fields(destination=destination, pages=report.pages,
+                                                               seconds=round(report.seconds, 3)))
+        return report
+    
+    def reopen(self) -> None:
+        """
+        Make every thread open a new connection on its next database call.
+        
+        Used after the database file has been replaced. Connections that are
+        not in use are closed at once; those still inside get_db_context(),
+        such as a suspended generator's, keep reading the file they opened
+        and are closed when the context ends. New calls see the new file.
+        """
+        with self._connections_lock:
+            self._epoch += 1
+            # The new file may hold an older schema
+            self._schema_ready = False
+            idle = [connection for connection in self._connections if connection not in self._in_use]
+            self._stale.update(connection for connection in self._connections if connection in self._in_use)
+            self._connections.difference_update(idle)
+        for connection in idle:
+            connection.close()
+    
+    def _retire(self, connection: sqlite3.Connection) -> None:
+        """Close a connection from before reopen(), or mark it to be closed once no longer in use."""
+        with self._connections_lock:
+            if connection not in self._connections:
+                # Already closed by reopen() or close_all_connections()
+                return
+            if connection in self._in_use:
+                self._stale.add(connection)
+                return
+            self._connections.discard(connection)
+        connection.close()
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """Get the calling thread's connection and count it as in use."""
+        while True:
+            connection = self.get_connection()
+            with self._connections_lock:
+                # reopen() may have closed it between the two steps; if so, connect again
+                if connection in self._connections and connection not in self._stale:
+                    self._in_use[connection] = self._in_use.get(connection, 0) + 1
+                    return connection
+    
+    def _release(self, connection: sqlite3.Connection) -> None:
+        """Stop counting a use of a connection, closing it if it went stale meanwhile."""
+        with self._connections_lock:
+            remaining = self._in_use.get(connection, 0) - 1
+            if remaining > 0:
+                self._in_use[connection] = remaining
+                return
+            self._in_use.pop(connection, None)
+            if connection not in self._stale:
+                return
+            self._stale.discard(connection)
+            self._connections.discard(connection)
+        connection.close()
+    
+    def keep_file(self) -> None:
+        """Stop close() from deleting the file of a temporary() database."""
+        self._owned_file = None
+    
+    def close(self) -> None:
+        """
+        Release the database entirely.
+        
+        Closes every connection, which discards an in-memory database, and
+        deletes the file of a temporary() database.
+        """
+        self.close_all_connections()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+        if self._owned_file is not None:
+            for suffix in ("", "-journal", "-wal", "-shm"):
+                if os.path.exists(self._owned_file + suffix):
+                    os.remove(self._owned_file + suffix)
+            self._owned_file = None
     
     @contextmanager
     def get_db_context(self):
@@ -78,26 +579,38 @@ class DatabaseConfig:
         Yields:
             sqlite3.Connection: Database connection
         """
-        connection = self.get_connection()
+        connection = self._acquire()
         try:
             yield connection
         except Exception as e:
             connection.rollback()
             raise
         finally:
-            # Don't close the connection here as it might be reused
-            pass
+            # The connection stays open for reuse; releasing it lets reopen() close it
+            self._release(connection)
     
-    def initialize_database(self) -> None:
+    def initialize_database(self) -> bool:
         """
         Initialize the database by creating the milk_samples table.
         
         This method creates the database table with the appropriate schema
-        based on the CSV column structure.
+        based on the CSV column structure, along with the derived
+        milk_samples_decay_corrected table, the anomaly side tables, the
+        sample_cube aggregate table and the sample_changes log with its triggers.
+        
+        A database whose user_version is already SCHEMA_VERSION is left alone
+        after that one pragma read, and later calls on this configuration
+        return immediately.
+        
+        Returns:
+            bool: True if the schema was created or upgraded, False if it was current
         
         Raises:
             sqlite3.Error: If there's an error creating the table
         """
+        if self._schema_ready:
+            return False
+        
         create_table_sql = """
         CREATE TABLE IF NOT EXISTS milk_samples (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -115,15 +628,94 @@ class DatabaseConfig:
         )
         """
         
+        create_decay_table_sql = """
+        CREATE TABLE IF NOT EXISTS milk_samples_decay_corrected (
+            sample_id INTEGER PRIMARY KEY,
+            reference_date TEXT NOT NULL,
+            decay_factor REAL NOT NULL,
+            corrected_activity REAL NOT NULL,
+            corrected_error REAL,
+            corrected_activity_per_calcium REAL,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        
+        create_anomaly_tables_sql = """
+        CREATE TABLE IF NOT EXISTS sample_anomalies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sample_id INTEGER NOT NULL,
+            rule TEXT NOT NULL,
+            score REAL NOT NULL,
+            detail TEXT,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (sample_id, rule)
+        );
+        CREATE TABLE IF NOT EXISTS anomaly_scan_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_sample_id INTEGER NOT NULL
+        );
+        """
+        
+        create_cube_table_sql = """
+        CREATE TABLE IF NOT EXISTS sample_cube (
+            province TEXT NOT NULL,
+            station_name TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            quarter INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            sample_count INTEGER NOT NULL,
+            activity_sum REAL NOT NULL,
+            activity_sum_sq REAL NOT NULL,
+            PRIMARY KEY (province, station_name, year, quarter, type)
+        ) WITHOUT ROWID
+        """
+        
+        # Append-only change log filled by triggers, so every write path
+        # (including bulk migration inserts) is recorded
+        create_change_log_sql = """
+        CREATE TABLE IF NOT EXISTS sample_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete', 'reset')),
+            sample_id INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            truncated_through INTEGER NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS milk_samples_log_insert AFTER INSERT ON milk_samples
+        BEGIN
+            INSERT INTO sample_changes (op, sample_id) VALUES ('insert', NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS milk_samples_log_update AFTER UPDATE ON milk_samples
+        BEGIN
+            INSERT INTO sample_changes (op, sample_id) VALUES ('update', NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS milk_samples_log_delete AFTER DELETE ON milk_samples
+        BEGIN
+            INSERT INTO sample_changes (op, sample_id) VALUES ('delete', OLD.id);
+        END;
+        """
+        
         try:
             with self.get_db_context() as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+                    self._schema_ready = True
+                    return False
                 cursor = conn.cursor()
                 cursor.execute(create_table_sql)
+                cursor.execute(create_decay_table_sql)
+                cursor.executescript(create_anomaly_tables_sql)
+                cursor.execute(create_cube_table_sql)
+                cursor.executescript(create_change_log_sql)
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
                 conn.commit()
-                print("Database table 'milk_samples' created successfully")
+                logger.debug("Database tables created", extra=fields(database=self.db_path))
         except sqlite3.Error as e:
-            print(f"Error creating database table: {e}")
+            logger.error("Error creating database table: %s", e)
             raise
+        self._schema_ready = True
+        return True
     
     def drop_table(self) -> None:
         """
@@ -138,8 +730,10 @@ class DatabaseConfig:
             with self.get_db_context() as conn:
                 cursor = conn.cursor()
                 cursor.execute(drop_table_sql)
+                cursor.execute("PRAGMA user_version = 0")
                 conn.commit()
-                print("Database table 'milk_samples' dropped successfully")
+                self._schema_ready = False
+                logger.info("Database table dropped", extra=fields(table="milk_samples"))
         except sqlite3.Error as e:
-            print(f"Error dropping database table: {e}")
+            logger.error("Error dropping database table: %s", e)
             raise 
\ No newline at end of file
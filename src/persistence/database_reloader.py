@@ -0,0 +1,248 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the DatabaseReloader class which rebuilds the database from
+the CSV file without interrupting readers. It is part of the Persistence Layer.
+
+This module is responsible for:
+- Importing the CSV into a new temporary database file on a background thread
+- Reporting progress while the import runs
+- Verifying the new database before it is used
+- Atomically swapping the new file in place of the live database, or copying
+  it in with the backup API when the live database is in WAL mode
+"""
+
+import os
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src.persistence.data_migration import DataMigration
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+logger = logging.getLogger(__name__)
+
+# Progress callback: (stage, done, total). Stages are "import", "verify" and "swap".
+ProgressCallback = Callable[[str, int, int], None]
+
+@dataclass
+class ReloadResult:
+    """
+    Outcome of a database reload.
+
+    Attributes:
+        total_records (int): Rows read from the CSV file
+        successful_inserts (int): Rows imported into the new database
+        failed_inserts (int): Rows that could not be imported
+        seconds (float): Wall-clock time of the whole reload
+        swapped (bool): Whether the new database replaced the live one
+        error (Optional[str]): Why the reload stopped, if it did not swap
+    """
+    total_records: int = 0
+    successful_inserts: int = 0
+    failed_inserts: int = 0
+    seconds: float = 0.0
+    swapped: bool = False
+    error: Optional[str] = None
+
+class DatabaseReloader:
+    """
+    A background reloader that replaces the live database with a fresh import.
+
+    This class is responsible for:
+    1. Building a new database next to the live file, so the swap is a rename
+    2. Running the CSV import on a worker thread with progress callbacks
+    3. Checking the integrity and row count of the new database
+    4. Replacing the live file with os.replace (or, in WAL mode, copying the
+       new database into it) and reopening connections
+
+    Readers keep using the live database while the import runs. Queries
+    already in progress when the swap happens finish against the old data;
+    later calls see the new one. Writes made to the live database during a
+    reload are lost when the new file is swapped in, and other processes
+    must reopen the database to see it.
+
+    Attributes:
+        repository (MilkSampleDBRepository): Repository whose database is reloaded
+        csv_filename (str): CSV file to import
+        batch_size (int): Number of records inserted per transaction
+        progress (Optional[ProgressCallback]): Called as the reload advances
+        result (Optional[ReloadResult]): Outcome of the last finished reload
+    """
+
+    def __init__(self,
+                 repository: MilkSampleDBRepository,
+                 csv_filename: str = "nms_strontium90_milk_ssn_strontium90_lait.csv",
+                 batch_size: int = 1000,
+                 progress: Optional[ProgressCallback] = None):
+        """
+        Initialize the reloader.
+
+        Args:
+            repository (MilkSampleDBRepository): Repository whose database is reloaded
+            csv_filename (str): CSV file to import
+            batch_size (int): Number of records inserted per transaction
+            progress (Optional[ProgressCallback]): Called as (stage, done, total)
+
+        Raises:
+            ValueError: If the repository's database is not a file
+        """
+        if repository.db_config.uri:
+            raise ValueError("Only file databases can be reloaded by swapping")
+        self.repository = repository
+        self.csv_filename = csv_filename
+        self.batch_size = batch_size
+        self.progress = progress
+        self.result: Optional[ReloadResult] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start a reload on a background thread.
+
+        Raises:
+            RuntimeError: If a reload is already running
+        """
+        if self.is_running():
+            raise RuntimeError("A reload is already running")
+        self.result = None
+        self._thread = threading.Thread(target=self.run, name="database-reload", daemon=True)
+        self._thread.start()
+
+    def is_running(self) -> bool:
+        """
+        Check whether a background reload is in progress.
+
+        Returns:
+            bool: True while the worker thread is alive
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[ReloadResult]:
+        """
+        Wait for the background reload to finish.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait (None waits indefinitely)
+
+        Returns:
+            Optional[ReloadResult]: The result, or None if still running
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return None if self.is_running() else self.result
+
+    def run(self) -> ReloadResult:
+        """
+        Reload the database in the calling thread.
+
+        Returns:
+            ReloadResult: Outcome of the reload; failures are reported in error
+        """
+        started = time.perf_counter()
+        result = ReloadResult()
+        live_path = self.repository.db_config.db_path
+        staging = DatabaseConfig.temporary(os.path.dirname(live_path))
+        try:
+            staging_repository = MilkSampleDBRepository(staging)
+            # Continue the change log numbering so consumers see a reset, not a gap
+            staging_repository.start_change_log_after(self.repository.get_latest_change_seq())
+            migration = DataMigration(self.csv_filename, staging_repository)
+            report = (lambda done, total: self.progress("import", done, total)) if self.progress else None
+            (result.total_records, result.successful_inserts,
+             result.failed_inserts) = migration.migrate_data(self.batch_size, report)
+
+            self._report("verify", 0, 1)
+            self._verify(staging, result.successful_inserts)
+            self._report("verify", 1, 1)
+
+            staging.close_all_connections()
+            self._report("swap", 0, 1)
+            if self._swap(staging.db_path, live_path):
+                # The file now belongs to the live database and must not be deleted
+                staging.keep_file()
+            result.swapped = True
+            self._report("swap", 1, 1)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            result.error = str(e)
+            logger.error("Error reloading database: %s", e)
+        finally:
+            staging.close()
+            result.seconds = time.perf_counter() - started
+            self.result = result
+        return result
+
+    def _report(self, stage: str, done: int, total: int) -> None:
+        """Call the progress callback if there is one."""
+        if self.progress is not None:
+            self.progress(stage, done, total)
+
+    @staticmethod
+    def _verify(staging: DatabaseConfig, expected_count: int) -> None:
+        """
+        Check that the new database is intact and complete.
+
+        Raises:
+            ValueError: If the database is corrupt, empty or has the wrong row count
+        """
+        connection = staging.get_connection()
+        integrity = connection.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != "ok":
+            raise ValueError(f"New database failed the integrity check: {integrity}")
+        count = connection.execute("SELECT COUNT(*) FROM milk_samples").fetchone()[0]
+        if count == 0 or count != expected_count:
+            raise ValueError(f"New database has {count} records, expected {expected_count}")
+
+    def _swap(self, new_path: str, live_path: str) -> bool:
+        """
+        Put the new database in place of the live one and point connections at it.
+
+        A live database in WAL mode is overwritten with the backup API
+        rather than renamed over: its -wal and -shm files are found by name
+        by every connection, in any process, so a new file renamed into
+        place would be read together with the old file's WAL. The backup
+        writes through SQLite's own locking, and readers in the middle of a
+        query keep their snapshot.
+
+        Otherwise the new file is renamed over the live one while a write
+        lock is held, so no connection is part way through a transaction,
+        with a rollback journal that would be taken for the new file's, at
+        the moment of the swap. reopen() then closes the idle connections
+        to the old file; one a generator is still reading is closed when
+        the generator finishes.
+
+        Returns:
+            bool: True if the new file was renamed into place, False if it was copied
+        """
+        db_config = self.repository.db_config
+        live = sqlite3.connect(live_path, timeout=db_config.busy_timeout, isolation_level=None)
+        try:
+            renamed = False
+            if live.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+                live.execute("BEGIN IMMEDIATE")
+                try:
+                    os.replace(new_path, live_path)
+                    renamed = True
+                except PermissionError:
+                    # Windows cannot replace a file that is open, so copy into it instead
+                    pass
+                finally:
+                    live.execute("ROLLBACK")
+            if not renamed:
+                source = sqlite3.connect(f"file:{os.path.abspath(new_path)}?mode=ro", uri=True)
+                try:
+                    source.backup(live)
+                finally:
+                    source.close()
+        finally:
+            live.close()
+        db_config.reopen()
+        self.repository.generation += 1
+        return renamed
@@ -0,0 +1,694 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the InMemoryMilkSampleRepository class which keeps milk
+sample records entirely in memory. It is part of the Persistence Layer.
+
+This module is responsible for:
+- Storing records in a hash table keyed by ID
+- Maintaining hash indexes on province and station name
+- Maintaining a sorted index on the sample start date
+- Maintaining the aggregate cube incrementally
+- Recording changes for incremental consumers
+- Keeping anomaly flags and decay-corrected values
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+from src.observability.metrics import instrumented
+from src.persistence.milk_sample_db_repository import (CUBE_DIMENSIONS, ChangeLogPolicy, ChangeLogTruncatedError,
+                                                      sample_quarter, sample_year)
+
+@instrumented
+class InMemoryMilkSampleRepository:
+    """
+    A repository that keeps milk sample records in memory.
+
+    This class implements the SampleRepository protocol without any database,
+    which makes it suitable for tests, benchmarks and read replicas. It is
+    responsible for:
+    1. Storing records in a dictionary keyed by ID
+    2. Keeping sorted ID lists per province and per station (hash indexes)
+    3. Keeping a sorted (start date ordinal, ID) index for date range queries
+    4. Keeping the aggregate cube up to date on every write
+    5. Recording every write in a change log
+    6. Keeping anomaly flags, the anomaly scan watermark and decay-corrected values
+
+    All operations are guarded by a re-entrant lock, and records are copied
+    on the way in and out so callers cannot change stored data by accident.
+
+    Attributes:
+        generation (int): Write generation, incremented on every write
+    """
+
+    def __init__(self, records: Optional[Iterable[MilkSampleRecord]] = None):
+        """
+        Initialize an empty repository, optionally loaded with records.
+
+        Args:
+            records (Optional[Iterable[MilkSampleRecord]]): Records to load
+        """
+        self._lock = threading.RLock()
+        self._records: Dict[int, MilkSampleRecord] = {}
+        # Every stored ID in ascending order; IDs are never reused, so new ones are appended
+        self._ids: List[int] = []
+        self._by_province: Dict[str, List[int]] = {}
+        self._by_station: Dict[str, List[int]] = {}
+        self._by_start_date: List[Tuple[int, int]] = []
+        self._cube: Dict[Tuple, List[float]] = {}
+        self._next_id = 1
+        # Change log entries: (seq, op, sample_id, changed_at)
+        self._changes: List[Tuple[int, str, Optional[int], str]] = []
+        self._change_seq = 0
+        self._truncated_through = 0
+        # Anomaly flags by (sample_id, rule): (score, detail, detected_at)
+        self._anomalies: Dict[Tuple[int, str], Tuple[float, str, str]] = {}
+        self._anomaly_watermark = 0
+        # Decay-corrected values by sample ID: (reference_date, decay_factor, activity, error, per_calcium)
+        self._decay_corrected: Dict[int, Tuple] = {}
+        self.generation = 0
+        if records is not None:
+            self.create_samples(list(records))
+
+    def _index(self, record_id: int, record: MilkSampleRecord, sign: int) -> None:
+        """Add a record to (sign=1) or remove it from (sign=-1) every index."""
+        start = parse_sample_date(record.start_date)
+        for index, key in ((self._by_province, record.province), (self._by_station, record.station_name)):
+            ids = index.setdefault(key, [])
+            if sign > 0:
+                insort(ids, record_id)
+            else:
+                del ids[bisect_left(ids, record_id)]
+                if not ids:
+                    del index[key]
+        if start is not None:
+            entry = (start.toordinal(), record_id)
+            if sign > 0:
+                insort(self._by_start_date, entry)
+            else:
+                del self._by_start_date[bisect_left(self._by_start_date, entry)]
+
+        key = (record.province, record.station_name, sample_year(record.start_date),
+               sample_quarter(record.start_date), record.type)
+        cell = self._cube.setdefault(key, [0, 0.0, 0.0])
+        cell[0] += sign
+        cell[1] += sign * record.sr90_activity
+        cell[2] += sign * record.sr90_activity * record.sr90_activity
+        if cell[0] <= 0:
+            del self._cube[key]
+
+    @staticmethod
+    def _timestamp() -> str:
+        """Get the current UTC time formatted like SQLite's CURRENT_TIMESTAMP."""
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _log_change(self, op: str, record_id: Optional[int]) -> None:
+        """Append an entry to the change log."""
+        self._change_seq += 1
+        self._changes.append((self._change_seq, op, record_id, self._timestamp()))
+
+    def _id_range(self, after_id: int, through_id: Optional[int], limit: int) -> List[int]:
+        """
+        Get up to limit stored IDs in (after_id, through_id], in ascending order.
+
+        Must be called with the lock held. Finding the start is a binary
+        search of the ID list, so paging through it costs O(log n + limit)
+        per page rather than a copy of every ID.
+        """
+        start = bisect_right(self._ids, after_id)
+        end = len(self._ids) if through_id is None else bisect_right(self._ids, through_id)
+        return self._ids[start:min(end, start + limit)]
+
+    def _page(self, ids: Iterable[int], limit: Optional[int], offset: int) -> List[Tuple[int, MilkSampleRecord]]:
+        """Copy one page of records from an ascending ID sequence."""
+        end = offset + limit if limit else None
+        return [(record_id, replace(self._records[record_id])) for record_id in islice(ids, offset, end)]
+
+    def initialize_database(self) -> None:
+        """Nothing to create; present for protocol compatibility."""
+
+    def get_generation(self) -> int:
+        """
+        Get the write generation of the repository.
+
+        Returns:
+            int: Current write generation
+        """
+        return self.generation
+
+    def create_sample(self, record: MilkSampleRecord) -> int:
+        """
+        Store a new record.
+
+        Args:
+            record (MilkSampleRecord): Record to create
+
+        Returns:
+            int: ID of the newly created record
+        """
+        with self._lock:
+            record_id = self._next_id
+            self._next_id += 1
+            stored = replace(record)
+            self._records[record_id] = stored
+            self._ids.append(record_id)
+            self._index(record_id, stored, 1)
+            self._log_change('insert', record_id)
+            self.generation += 1
+            return record_id
+
+    def create_samples(self, records: Sequence[MilkSampleRecord], update_cube: bool = True) -> int:
+        """
+        Store many records.
+
+        Args:
+            records (Sequence[MilkSampleRecord]): Records to create
+            update_cube (bool): Ignored; the cube is always kept up to date
+
+        Returns:
+            int: Number of records created
+        """
+        with self._lock:
+            for record in records:
+                self.create_sample(record)
+            return len(records)
+
+    def read_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
+        """
+        Read a record by its ID.
+
+        Args:
+            record_id (int): ID of the record to retrieve
+
+        Returns:
+            Optional[MilkSampleRecord]: The requested record or None if not found
+        """
+        with self._lock:
+            record = self._records.get(record_id)
+            return replace(record) if record else None
+
+    def update_sample(self, record_id: int, record: MilkSampleRecord) -> bool:
+        """
+        Replace an existing record.
+
+        Args:
+            record_id (int): ID of the record to update
+            record (MilkSampleRecord): Updated record data
+
+        Returns:
+            bool: True if record was updated, False if not found
+        """
+        with self._lock:
+            old_record = self._records.get(record_id)
+            if old_record is None:
+                return False
+            self._index(record_id, old_record, -1)
+            stored = replace(record)
+            self._records[record_id] = stored
+            self._index(record_id, stored, 1)
+            self._log_change('update', record_id)
+            self.generation += 1
+            return True
+
+    def delete_sample(self, record_id: int) -> bool:
+        """
+        Delete a record.
+
+        Args:
+            record_id (int): ID of the record to delete
+
+        Returns:
+            bool: True if record was deleted, False if not found
+        """
+        with self._lock:
+            old_record = self._records.pop(record_id, None)
+            if old_record is None:
+                return False
+            del self._ids[bisect_left(self._ids, record_id)]
+            self._index(record_id, old_record, -1)
+            self._log_change('delete', record_id)
+            self.generation += 1
+            return True
+
+    def clear_all_samples(self) -> int:
+        """
+        Delete every record. IDs are not reused afterwards.
+
+        Returns:
+            int: Number of records deleted
+        """
+        with self._lock:
+            deleted_count = len(self._records)
+            for record_id in self._records:
+                self._log_change('delete', record_id)
+            self._records.clear()
+            self._ids.clear()
+            self._by_province.clear()
+            self._by_station.clear()
+            self._by_start_date.clear()
+            self._cube.clear()
+            self.generation += 1
+            return deleted_count
+
+    def iter_samples(self, batch_size: int = 1000) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream all records in ID order.
+
+        Each batch is read under the lock starting after the last ID of the
+        previous one, so records deleted while iterating are skipped.
+
+        Args:
+            batch_size (int): Number of records copied under the lock at a time
+
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                batch = self._page(self._id_range(last_id, None, batch_size), None, 0)
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1][0]
+
+    def iter_measurement_batches(self, batch_size: int = 10000, after_id: int = 0,
+                                 through_id: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Stream the measurement columns of every record in column-oriented batches.
+
+        Args:
+            batch_size (int): Number of rows per batch
+            after_id (int): Only include records with an ID greater than this
+            through_id (Optional[int]): Only include records with an ID up to this
+
+        Yields:
+            Dict[str, List[Any]]: Same columns as MilkSampleDBRepository.iter_measurement_batches
+        """
+        while True:
+            with self._lock:
+                rows = [(record_id, self._records[record_id])
+                        for record_id in self._id_range(after_id, through_id, batch_size)]
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield {
+                'id': [record_id for record_id, _ in rows],
+                'station_name': [record.station_name for _, record in rows],
+                'start_date': [record.start_date for _, record in rows],
+                'stop_date': [record.stop_date for _, record in rows],
+                'sr90_activity': [record.sr90_activity for _, record in rows],
+                'sr90_error': [record.sr90_error for _, record in rows],
+                'sr90_activity_per_calcium': [record.sr90_activity_per_calcium for _, record in rows]
+            }
+
+    def read_all_samples(self, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Read a page of records in ID order.
+
+        Args:
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of records to skip
+
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+        """
+        with self._lock:
+            return self._page(self._ids[offset:offset + limit if limit else None], None, 0)
+
+    def read_all_samples_simple(self, limit: Optional[int] = None, offset: int = 0) -> List[MilkSampleRecord]:
+        """
+        Read a page of records (without IDs).
+
+        Args:
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of records to skip
+
+        Returns:
+            List[MilkSampleRecord]: List of milk sample records
+        """
+        return [record for _, record in self.read_all_samples(limit, offset)]
+
+    def read_samples_by_province(self, province: str) -> List[MilkSampleRecord]:
+        """
+        Read every record from a province using the province index.
+
+        Args:
+            province (str): Province to filter by
+
+        Returns:
+            List[MilkSampleRecord]: List of milk sample records for the province
+        """
+        with self._lock:
+            return [record for _, record in self._page(self._by_province.get(province, []), None, 0)]
+
+    def read_samples_by_station(self, station_name: str) -> List[MilkSampleRecord]:
+        """
+        Read every record from a station using the station index.
+
+        Args:
+            station_name (str): Station name to filter by
+
+        Returns:
+            List[MilkSampleRecord]: List of milk sample records for the station
+        """
+        with self._lock:
+            return [record for _, record in self._page(self._by_station.get(station_name, []), None, 0)]
+
+    def query_samples(self,
+                      province: Optional[str] = None,
+                      station_name: Optional[str] = None,
+                      start_from: Optional[date] = None,
+                      start_until: Optional[date] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0,
+                      after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Read records matching every given filter.
+
+        The smallest matching index is used as the candidate list and the
+        remaining filters are checked as set lookups.
+
+        Args:
+            province (Optional[str]): Province to filter by
+            station_name (Optional[str]): Station name to filter by
+            start_from (Optional[date]): Earliest start date (inclusive)
+            start_until (Optional[date]): Latest start date (inclusive)
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of matching records to skip
+            after_id (int): Only include records with an ID greater than this
+                (keyset paging: pass the last ID of the previous page)
+
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+        """
+        with self._lock:
+            candidates: List[List[int]] = []
+            if province is not None:
+                candidates.append(self._by_province.get(province, []))
+            if station_name is not None:
+                candidates.append(self._by_station.get(station_name, []))
+            if start_from is not None or start_until is not None:
+                low = bisect_left(self._by_start_date, (start_from.toordinal() if start_from else -1, 0))
+                high = bisect_right(self._by_start_date,
+                                    (start_until.toordinal() if start_until else 10 ** 7, float('inf')))
+                candidates.append(sorted(record_id for _, record_id in self._by_start_date[low:high]))
+            if not candidates:
+                candidates.append(self._ids)
+
+            candidates.sort(key=len)
+            first = candidates[0]
+            others = [set(ids) for ids in candidates[1:]]
+            # Index from the keyset position; islice would step through every earlier ID
+            start = bisect_right(first, after_id)
+            matches = (first[index] for index in range(start, len(first))
+                       if all(first[index] in other for other in others))
+            return self._page(matches, limit, offset)
+
+    def get_sample_count(self) -> int:
+        """
+        Get the number of stored records.
+
+        Returns:
+            int: Total number of records
+        """
+        return len(self._records)
+
+    def read_distinct_values(self, column: str) -> List[str]:
+        """
+        Read the distinct values of a text column from its index.
+
+        Args:
+            column (str): Either 'province' or 'station_name'
+
+        Returns:
+            List[str]: Sorted distinct values
+
+        Raises:
+            ValueError: If the column is not supported
+        """
+        indexes = {'province': self._by_province, 'station_name': self._by_station}
+        if column not in indexes:
+            raise ValueError(f"Unsupported column: {column}")
+        with self._lock:
+            return sorted(indexes[column])
+
+    def summarize_samples(self) -> Dict[str, Any]:
+        """
+        Compute the partial statistics used by MilkSampleDBService.get_statistics.
+
+        Returns:
+            Dict[str, Any]: Same keys as MilkSampleDBRepository.summarize_samples
+        """
+        with self._lock:
+            positive = [record.sr90_activity for record in self._records.values() if record.sr90_activity > 0]
+            return {
+                'total_samples': len(self._records),
+                'activity_sum': sum(positive),
+                'valid_activity_readings': len(positive),
+                'provinces': set(self._by_province),
+                'stations': set(self._by_station)
+            }
+
+    def query_cube(self, group_by: Sequence[str], filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate the in-memory cube along some of its dimensions.
+
+        Args:
+            group_by (Sequence[str]): Dimensions to group by, from CUBE_DIMENSIONS
+            filters (Optional[Dict[str, Any]]): Dimension values to filter on
+
+        Returns:
+            List[Dict[str, Any]]: Same rows as MilkSampleDBRepository.query_cube
+
+        Raises:
+            ValueError: If an unknown dimension is requested
+        """
+        filters = filters or {}
+        for dimension in list(group_by) + list(filters):
+            if dimension not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+        positions = {dimension: i for i, dimension in enumerate(CUBE_DIMENSIONS)}
+
+        groups: Dict[Tuple, List[float]] = {}
+        with self._lock:
+            for key, (count, total, total_sq) in self._cube.items():
+                if any(key[positions[dimension]] != value for dimension, value in filters.items()):
+                    continue
+                group_key = tuple(key[positions[dimension]] for dimension in group_by)
+                group = groups.setdefault(group_key, [0, 0.0, 0.0])
+                group[0] += count
+                group[1] += total
+                group[2] += total_sq
+        return [
+            dict(zip(group_by, group_key), sample_count=count, activity_sum=total, activity_sum_sq=total_sq)
+            for group_key, (count, total, total_sq) in sorted(groups.items())
+        ]
+
+    def rebuild_cube(self) -> int:
+        """
+        Recompute the cube from the stored records.
+
+        Returns:
+            int: Number of cube cells
+        """
+        with self._lock:
+            self._cube.clear()
+            for record in self._records.values():
+                key = (record.province, record.station_name, sample_year(record.start_date),
+                       sample_quarter(record.start_date), record.type)
+                cell = self._cube.setdefault(key, [0, 0.0, 0.0])
+                cell[0] += 1
+                cell[1] += record.sr90_activity
+                cell[2] += record.sr90_activity * record.sr90_activity
+            return len(self._cube)
+
+    def get_max_sample_id(self) -> int:
+        """
+        Get the highest record ID.
+
+        Returns:
+            int: Highest ID, or 0 if there are no records
+        """
+        with self._lock:
+            return self._ids[-1] if self._ids else 0
+
+    def replace_decay_corrected(self, reference_date: str, rows: Iterable[Sequence[Tuple]]) -> int:
+        """
+        Replace every stored decay-corrected value.
+
+        Args:
+            reference_date (str): ISO reference date the values were corrected to
+            rows (Iterable[Sequence[Tuple]]): Batches of (sample_id, decay_factor,
+                corrected_activity, corrected_error, corrected_activity_per_calcium) rows
+
+        Returns:
+            int: Number of rows written
+        """
+        corrected = {row[0]: (reference_date,) + tuple(row[1:]) for batch in rows for row in batch}
+        with self._lock:
+            self._decay_corrected = corrected
+            return len(corrected)
+
+    def get_anomaly_watermark(self) -> int:
+        """
+        Get the ID of the last record checked by the anomaly detector.
+
+        Returns:
+            int: Last checked record ID, or 0 if no scan has run
+        """
+        return self._anomaly_watermark
+
+    def store_anomalies(self, flags: Iterable[Tuple[int, str, float, str]], watermark: int,
+                        replace_all: bool = False) -> int:
+        """
+        Store anomaly flags and advance the scan watermark.
+
+        Flags for records that no longer exist are removed at the same time.
+
+        Args:
+            flags (Iterable[Tuple[int, str, float, str]]): (sample_id, rule, score, detail) rows
+            watermark (int): ID of the last record checked
+            replace_all (bool): Remove all existing flags first (used by full rescans)
+
+        Returns:
+            int: Number of flags written
+        """
+        detected_at = self._timestamp()
+        with self._lock:
+            if replace_all:
+                self._anomalies.clear()
+            else:
+                for key in [key for key in self._anomalies if key[0] not in self._records]:
+                    del self._anomalies[key]
+            written = 0
+            for sample_id, rule, score, detail in flags:
+                self._anomalies[(sample_id, rule)] = (score, detail, detected_at)
+                written += 1
+            self._anomaly_watermark = watermark
+            return written
+
+    def read_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read stored anomaly flags with the station and province of their record.
+
+        Args:
+            rule (Optional[str]): Only return flags raised by this rule
+
+        Returns:
+            List[Dict[str, Any]]: Same rows as MilkSampleDBRepository.read_anomalies
+        """
+        with self._lock:
+            flags = []
+            for (sample_id, flag_rule), (score, detail, detected_at) in sorted(self._anomalies.items()):
+                record = self._records.get(sample_id)
+                if record is None or (rule is not None and flag_rule != rule):
+                    continue
+                flags.append({
+                    'sample_id': sample_id,
+                    'rule': flag_rule,
+                    'score': score,
+                    'detail': detail,
+                    'detected_at': detected_at,
+                    'station_name': record.station_name,
+                    'province': record.province,
+                    'start_date': record.start_date,
+                    'sr90_activity': record.sr90_activity
+                })
+            return flags
+
+    def read_changes(self, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read change log entries after a sequence number.
+
+        Args:
+            since_seq (int): Sequence number the consumer has already seen
+            limit (Optional[int]): Maximum number of entries to return
+
+        Returns:
+            List[Dict[str, Any]]: Same entries as MilkSampleDBRepository.read_changes
+
+        Raises:
+            ChangeLogTruncatedError: If entries after since_seq were removed by retention
+        """
+        with self._lock:
+            if since_seq < self._truncated_through:
+                raise ChangeLogTruncatedError(
+                    f"Changes through {self._truncated_through} were removed; resync required")
+            start = bisect_right(self._changes, since_seq, key=lambda entry: entry[0])
+            entries = []
+            for seq, op, sample_id, changed_at in self._changes[start:start + limit if limit else None]:
+                record = self._records.get(sample_id) if op != 'delete' else None
+                entries.append({
+                    'seq': seq,
+                    'op': op,
+                    'sample_id': sample_id,
+                    'changed_at': changed_at,
+                    'record': replace(record) if record else None
+                })
+            return entries
+
+    def get_latest_change_seq(self) -> int:
+        """
+        Get the last sequence number ever assigned in the change log.
+
+        Returns:
+            int: Latest sequence number, or 0 if nothing has been logged
+        """
+        return self._change_seq
+
+    def compact_change_log(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """
+        Compact the change log according to a policy.
+
+        Args:
+            policy (Optional[ChangeLogPolicy]): Compaction policy (default: coalesce only)
+
+        Returns:
+            int: Number of entries removed
+        """
+        policy = policy or ChangeLogPolicy()
+        with self._lock:
+            before = len(self._changes)
+            if policy.coalesce:
+                latest = {sample_id: seq for seq, _, sample_id, _ in self._changes if sample_id is not None}
+                self._changes = [entry for entry in self._changes
+                                 if entry[2] is None or latest[entry[2]] == entry[0]]
+
+            truncate_through = 0
+            if policy.max_entries is not None:
+                truncate_through = self._change_seq - policy.max_entries
+            if policy.retention_days is not None:
+                cutoff = (datetime.now(timezone.utc)
+                          - timedelta(days=policy.retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+                expired = [seq for seq, _, _, changed_at in self._changes if changed_at < cutoff]
+                truncate_through = max(truncate_through, expired[-1] if expired else 0)
+            if truncate_through > 0:
+                self._changes = [entry for entry in self._changes if entry[0] > truncate_through]
+                self._truncated_through = max(self._truncated_through, truncate_through)
+            return before - len(self._changes)
+
+    def start_change_log_after(self, seq: int) -> None:
+        """
+        Continue the change log of replaced data in this repository.
+
+        Numbering resumes after seq and the log starts with a 'reset' entry.
+
+        Args:
+            seq (int): Latest sequence number of the data being replaced
+        """
+        with self._lock:
+            self._changes = []
+            self._truncated_through = 0
+            self._change_seq = seq
+            self._log_change('reset', None)
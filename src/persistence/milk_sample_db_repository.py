@@ -14,15 +14,60 @@ This module replaces the file-based repository with database operations includin
 - DELETE: Remove milk sample records
 """
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
+import logging
 import sqlite3
-from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator, Sequence
 from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+from src.observability.metrics import instrumented
+from src.observability.structured_logging import fields
 from src.persistence.database_config import DatabaseConfig
 
+logger = logging.getLogger(__name__)
+
+# Dimensions of the sample_cube aggregate table, in key order
+CUBE_DIMENSIONS = ('province', 'station_name', 'year', 'quarter', 'type')
+
+def sample_year(start_date: Optional[str]) -> int:
+    """Get the year of a sample start date, or 0 if it cannot be parsed."""
+    start = parse_sample_date(start_date)
+    return start.year if start else 0
+
+def sample_quarter(start_date: Optional[str]) -> int:
+    """Get the quarter (1-4) of a sample start date, or 0 if it cannot be parsed."""
+    start = parse_sample_date(start_date)
+    return (start.month - 1) // 3 + 1 if start else 0
+
+def sample_ordinal(start_date: Optional[str]) -> Optional[int]:
+    """Get a sample start date as a day ordinal, or None if it cannot be parsed."""
+    start = parse_sample_date(start_date)
+    return start.toordinal() if start else None
+
+@dataclass
+class ChangeLogPolicy:
+    """
+    How the sample_changes log is compacted.
+    
+    Coalescing keeps only the latest entry for each sample, which is enough
+    for a consumer that fetches current row state, so it never forces a
+    resync. Retention limits drop old entries outright; a consumer whose
+    position falls in the dropped range must resync from scratch.
+    
+    Attributes:
+        coalesce (bool): Keep only the latest entry per sample
+        max_entries (Optional[int]): Keep at most this many of the newest sequence numbers
+        retention_days (Optional[float]): Drop entries older than this many days
+    """
+    coalesce: bool = True
+    max_entries: Optional[int] = None
+    retention_days: Optional[float] = None
+
+class ChangeLogTruncatedError(ValueError):
+    """Raised when changes after a sequence number were removed by retention."""
+
+@instrumented
 class MilkSampleDBRepository:
     """
     A class to handle database operations for milk sample data.
@@ -36,19 +81,42 @@ class MilkSampleDBRepository:
     6. Error handling for database operations
     """
     
+    # Columns needed to compute the cube contribution of one stored row
+    _CUBE_ROW_SQL = "SELECT province, station_name, start_date, type, sr90_activity FROM milk_samples WHERE id = ?"
+    
     def __init__(self, db_config: Optional[DatabaseConfig] = None):
         """
         Initialize the repository with database configuration.
         
         Args:
             db_config (Optional[DatabaseConfig]): Database configuration instance
+                (default: the shared milk_samples.db configuration)
         """
-        self.db_config = db_config or DatabaseConfig()
+        self.db_config = db_config or DatabaseConfig.shared()
+        # Incremented on every write through this repository; see get_generation
+        self.generation = 0
         self.initialize_database()
     
     def initialize_database(self) -> None:
-        """Initialize the database table."""
-        self.db_config.initialize_database()
+        """Initialize the database table and build the cube if it is missing."""
+        # Only a database that predates the current schema can lack its cube
+        if self.db_config.initialize_database():
+            self.ensure_cube()
+    
+    def get_generation(self) -> int:
+        """
+        Get the write generation of the database.
+        
+        The generation changes whenever records are created, updated or deleted,
+        so it can be used as a cache key. It adds this repository's own write
+        counter to the change log position, which every writer advances
+        through the triggers, so writes made by other repositories or
+        processes on the same file change it too.
+        
+        Returns:
+            int: Current write generation
+        """
+        return self.generation + self.get_latest_change_seq()
     
     def _row_to_record(self, row: sqlite3.Row) -> MilkSampleRecord:
         """
@@ -123,12 +191,57 @@ class MilkSampleDBRepository:
                     data['stop_date'], data['station_name'], data['province'],
                     data['sr90_activity'], data['sr90_error'], data['sr90_activity_per_calcium']
                 ))
+                self._apply_cube_deltas(cursor, self._cube_deltas([(data, 1)]))
                 conn.commit()
+                self.generation += 1
                 record_id = cursor.lastrowid
-                print(f"Created new milk sample record with ID: {record_id}")
+                logger.debug("Created milk sample record", extra=fields(record_id=record_id))
                 return record_id
         except sqlite3.Error as e:
-            print(f"Error creating milk sample record: {e}")
+            logger.error("Error creating milk sample record: %s", e)
+            raise
+    
+    def create_samples(self, records: Sequence[MilkSampleRecord], update_cube: bool = True) -> int:
+        """
+        Create many milk sample records in a single transaction.
+        
+        Args:
+            records (Sequence[MilkSampleRecord]): Records to create
+            update_cube (bool): Apply the records to the sample_cube table. Bulk
+                loads can pass False and call rebuild_cube() once at the end.
+            
+        Returns:
+            int: Number of records created
+            
+        Raises:
+            sqlite3.Error: If there's an error inserting the records; no records
+                from the batch are stored in that case
+        """
+        insert_sql = """
+        INSERT INTO milk_samples (
+            sample_type, type, start_date, stop_date, station_name, 
+            province, sr90_activity, sr90_error, sr90_activity_per_calcium
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                rows = [self._record_to_dict(record) for record in records]
+                cursor.executemany(insert_sql, (
+                    (data['sample_type'], data['type'], data['start_date'],
+                     data['stop_date'], data['station_name'], data['province'],
+                     data['sr90_activity'], data['sr90_error'], data['sr90_activity_per_calcium'])
+                    for data in rows
+                ))
+                if update_cube:
+                    self._apply_cube_deltas(cursor, self._cube_deltas((data, 1) for data in rows))
+                conn.commit()
+                self.generation += 1
+                logger.debug("Created milk sample records", extra=fields(rows=len(rows)))
+                return len(rows)
+        except sqlite3.Error as e:
+            logger.error("Error creating milk sample records: %s", e)
             raise
     
     def read_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
@@ -156,7 +269,36 @@ class MilkSampleDBRepository:
                     return self._row_to_record(row)
                 return None
         except sqlite3.Error as e:
-            print(f"Error reading milk sample record: {e}")
+            logger.error("Error reading milk sample record: %s", e)
+            raise
+    
+    def read_samples_by_ids(self, record_ids: Iterable[int]) -> Dict[int, MilkSampleRecord]:
+        """
+        Read many milk sample records by ID, a few hundred per query.
+        
+        Args:
+            record_ids (Iterable[int]): IDs of the records to retrieve
+            
+        Returns:
+            Dict[int, MilkSampleRecord]: Records found, keyed by ID; missing IDs are left out
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the records
+        """
+        ids = sorted(set(record_ids))
+        records: Dict[int, MilkSampleRecord] = {}
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                # Stay well below SQLite's limit on bound parameters per statement
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    for row in conn.execute(f"SELECT * FROM milk_samples WHERE id IN ({placeholders})", chunk):
+                        records[row['id']] = self._row_to_record(row)
+            return records
+        except sqlite3.Error as e:
+            logger.error("Error reading milk sample records: %s", e)
             raise
     
     def read_all_samples(self, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
@@ -192,10 +334,10 @@ class MilkSampleDBRepository:
                     record = self._row_to_record(row)
                     records.append((record_id, record))
                 
-                print(f"Retrieved {len(records)} milk sample records")
+                logger.debug("Retrieved milk sample records", extra=fields(rows=len(records)))
                 return records
         except sqlite3.Error as e:
-            print(f"Error reading milk sample records: {e}")
+            logger.error("Error reading milk sample records: %s", e)
             raise
     
     def read_all_samples_simple(self, limit: Optional[int] = None, offset: int = 0) -> List[MilkSampleRecord]:
@@ -215,6 +357,38 @@ class MilkSampleDBRepository:
         samples_with_ids = self.read_all_samples(limit, offset)
         return [record for _, record in samples_with_ids]
     
+    def iter_samples(self, batch_size: int = 1000) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream all milk sample records from the database in ID order.
+        
+        Rows are fetched in batches so memory use stays constant no matter
+        how many records the table holds.
+        
+        Args:
+            batch_size (int): Number of rows fetched from the cursor at a time
+            
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the records
+        """
+        select_sql = "SELECT * FROM milk_samples ORDER BY id"
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                cursor.execute(select_sql)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row['id'], self._row_to_record(row)
+        except sqlite3.Error as e:
+            logger.error("Error streaming milk sample records: %s", e)
+            raise
+    
     def read_samples_by_province(self, province: str) -> List[MilkSampleRecord]:
         """
         Read milk sample records filtered by province.
@@ -240,10 +414,10 @@ class MilkSampleDBRepository:
                 for row in rows:
                     records.append(self._row_to_record(row))
                 
-                print(f"Retrieved {len(records)} milk sample records for province: {province}")
+                logger.debug("Retrieved milk sample records by province", extra=fields(province=province, rows=len(records)))
                 return records
         except sqlite3.Error as e:
-            print(f"Error reading milk sample records by province: {e}")
+            logger.error("Error reading milk sample records by province: %s", e)
             raise
     
     def read_samples_by_station(self, station_name: str) -> List[MilkSampleRecord]:
@@ -271,10 +445,74 @@ class MilkSampleDBRepository:
                 for row in rows:
                     records.append(self._row_to_record(row))
                 
-                print(f"Retrieved {len(records)} milk sample records for station: {station_name}")
+                logger.debug("Retrieved milk sample records by station", extra=fields(station=station_name, rows=len(records)))
                 return records
         except sqlite3.Error as e:
-            print(f"Error reading milk sample records by station: {e}")
+            logger.error("Error reading milk sample records by station: %s", e)
+            raise
+    
+    def query_samples(self,
+                      province: Optional[str] = None,
+                      station_name: Optional[str] = None,
+                      start_from: Optional[date] = None,
+                      start_until: Optional[date] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0,
+                      after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Read milk sample records matching every given filter.
+        
+        Records whose start date cannot be parsed never match a date filter.
+        
+        Args:
+            province (Optional[str]): Province to filter by
+            station_name (Optional[str]): Station name to filter by
+            start_from (Optional[date]): Earliest start date (inclusive)
+            start_until (Optional[date]): Latest start date (inclusive)
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of matching records to skip
+            after_id (int): Only include records with an ID greater than this
+                (keyset paging: pass the last ID of the previous page)
+            
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the records
+        """
+        conditions = []
+        params: List[Any] = []
+        if after_id:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if province is not None:
+            conditions.append("province = ?")
+            params.append(province)
+        if station_name is not None:
+            conditions.append("station_name = ?")
+            params.append(station_name)
+        if start_from is not None:
+            conditions.append("sample_ordinal(start_date) >= ?")
+            params.append(start_from.toordinal())
+        if start_until is not None:
+            conditions.append("sample_ordinal(start_date) <= ?")
+            params.append(start_until.toordinal())
+        
+        select_sql = "SELECT * FROM milk_samples"
+        if conditions:
+            select_sql += " WHERE " + " AND ".join(conditions)
+        select_sql += " ORDER BY id"
+        if limit or offset:
+            select_sql += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit else -1, offset])
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                conn.create_function("sample_ordinal", 1, sample_ordinal, deterministic=True)
+                rows = conn.execute(select_sql, params).fetchall()
+                return [(row['id'], self._row_to_record(row)) for row in rows]
+        except sqlite3.Error as e:
+            logger.error("Error querying milk sample records: %s", e)
             raise
     
     def update_sample(self, record_id: int, record: MilkSampleRecord) -> bool:
@@ -303,22 +541,28 @@ class MilkSampleDBRepository:
             with self.db_config.get_db_context() as conn:
                 cursor = conn.cursor()
                 data = self._record_to_dict(record)
+                cursor.execute(self._CUBE_ROW_SQL, (record_id,))
+                old_row = cursor.fetchone()
                 cursor.execute(update_sql, (
                     data['sample_type'], data['type'], data['start_date'],
                     data['stop_date'], data['station_name'], data['province'],
                     data['sr90_activity'], data['sr90_error'], data['sr90_activity_per_calcium'],
                     record_id
                 ))
+                updated_count = cursor.rowcount
+                if updated_count > 0:
+                    self._apply_cube_deltas(cursor, self._cube_deltas([(old_row, -1), (data, 1)]))
                 conn.commit()
                 
-                if cursor.rowcount > 0:
-                    print(f"Updated milk sample record with ID: {record_id}")
+                if updated_count > 0:
+                    self.generation += 1
+                    logger.debug("Updated milk sample record", extra=fields(record_id=record_id))
                     return True
                 else:
-                    print(f"No milk sample record found with ID: {record_id}")
+                    logger.debug("No milk sample record found", extra=fields(record_id=record_id))
                     return False
         except sqlite3.Error as e:
-            print(f"Error updating milk sample record: {e}")
+            logger.error("Error updating milk sample record: %s", e)
             raise
     
     def delete_sample(self, record_id: int) -> bool:
@@ -339,17 +583,23 @@ class MilkSampleDBRepository:
         try:
             with self.db_config.get_db_context() as conn:
                 cursor = conn.cursor()
+                cursor.execute(self._CUBE_ROW_SQL, (record_id,))
+                old_row = cursor.fetchone()
                 cursor.execute(delete_sql, (record_id,))
+                deleted_count = cursor.rowcount
+                if deleted_count > 0:
+                    self._apply_cube_deltas(cursor, self._cube_deltas([(old_row, -1)]))
                 conn.commit()
                 
-                if cursor.rowcount > 0:
-                    print(f"Deleted milk sample record with ID: {record_id}")
+                if deleted_count > 0:
+                    self.generation += 1
+                    logger.debug("Deleted milk sample record", extra=fields(record_id=record_id))
                     return True
                 else:
-                    print(f"No milk sample record found with ID: {record_id}")
+                    logger.debug("No milk sample record found", extra=fields(record_id=record_id))
                     return False
         except sqlite3.Error as e:
-            print(f"Error deleting milk sample record: {e}")
+            logger.error("Error deleting milk sample record: %s", e)
             raise
     
     def get_sample_count(self) -> int:
@@ -371,9 +621,69 @@ class MilkSampleDBRepository:
                 count = cursor.fetchone()[0]
                 return count
         except sqlite3.Error as e:
-            print(f"Error counting milk sample records: {e}")
+            logger.error("Error counting milk sample records: %s", e)
+            raise
+    
+    def read_distinct_values(self, column: str) -> List[str]:
+        """
+        Read the distinct values of a text column.
+        
+        Args:
+            column (str): Either 'province' or 'station_name'
+            
+        Returns:
+            List[str]: Sorted distinct values
+            
+        Raises:
+            ValueError: If the column is not supported
+            sqlite3.Error: If there's an error reading the values
+        """
+        if column not in ('province', 'station_name'):
+            raise ValueError(f"Unsupported column: {column}")
+        select_sql = f"SELECT DISTINCT {column} FROM milk_samples ORDER BY {column}"
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                return [row[0] for row in conn.execute(select_sql).fetchall()]
+        except sqlite3.Error as e:
+            logger.error("Error reading distinct %s values: %s", column, e)
             raise
     
+    def summarize_samples(self) -> Dict[str, Any]:
+        """
+        Compute the partial statistics used by MilkSampleDBService.get_statistics.
+        
+        The result only contains sums, counts and sets, so partial results
+        from several databases can be merged by adding them together.
+        
+        Returns:
+            Dict[str, Any]: total_samples, activity_sum, valid_activity_readings
+            (readings above zero), provinces (set) and stations (set)
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the records
+        """
+        totals_sql = """
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN sr90_activity > 0 THEN sr90_activity END), 0.0),
+               COUNT(CASE WHEN sr90_activity > 0 THEN 1 END)
+        FROM milk_samples
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                total, activity_sum, valid_count = conn.execute(totals_sql).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Error summarizing milk sample records: %s", e)
+            raise
+        return {
+            'total_samples': total,
+            'activity_sum': activity_sum,
+            'valid_activity_readings': valid_count,
+            'provinces': set(self.read_distinct_values('province')),
+            'stations': set(self.read_distinct_values('station_name'))
+        }
+    
     def clear_all_samples(self) -> int:
         """
         Delete all milk sample records from the database.
@@ -390,10 +700,499 @@ class MilkSampleDBRepository:
             with self.db_config.get_db_context() as conn:
                 cursor = conn.cursor()
                 cursor.execute(delete_sql)
-                conn.commit()
                 deleted_count = cursor.rowcount
-                print(f"Deleted {deleted_count} milk sample records")
+                cursor.execute("DELETE FROM sample_cube")
+                conn.commit()
+                self.generation += 1
+                logger.info("Deleted all milk sample records", extra=fields(rows=deleted_count))
                 return deleted_count
         except sqlite3.Error as e:
-            print(f"Error clearing milk sample records: {e}")
-            raise 
\ No newline at end of file
+            logger.error("Error clearing milk sample records: %s", e)
+            raise
+    
+    def iter_measurement_batches(self, batch_size: int = 10000, after_id: int = 0,
+                                 through_id: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Stream the measurement columns of every record in column-oriented batches.
+        
+        Each batch is a dictionary mapping column name to a list of values, which
+        lets callers run whole-column calculations without building a
+        MilkSampleRecord for every row.
+        
+        Args:
+            batch_size (int): Number of rows fetched per batch
+            after_id (int): Only include records with an ID greater than this
+            through_id (Optional[int]): Only include records with an ID up to this
+            
+        Yields:
+            Dict[str, List[Any]]: Columns id, station_name, start_date, stop_date,
+            sr90_activity, sr90_error and sr90_activity_per_calcium for one batch of rows
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the records
+        """
+        select_sql = """
+        SELECT id, station_name, start_date, stop_date, sr90_activity, sr90_error, sr90_activity_per_calcium
+        FROM milk_samples WHERE id > ? AND id <= ? ORDER BY id
+        """
+        upper_id = through_id if through_id is not None else 2 ** 63 - 1
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                cursor.execute(select_sql, (after_id, upper_id))
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    ids, stations, start_dates, stop_dates, activities, errors, per_calcium = zip(*rows)
+                    yield {
+                        'id': list(ids),
+                        'station_name': list(stations),
+                        'start_date': list(start_dates),
+                        'stop_date': list(stop_dates),
+                        'sr90_activity': list(activities),
+                        'sr90_error': list(errors),
+                        'sr90_activity_per_calcium': list(per_calcium)
+                    }
+        except sqlite3.Error as e:
+            logger.error("Error reading milk sample measurements: %s", e)
+            raise
+    
+    def replace_decay_corrected(self, reference_date: str, rows: Iterable[Sequence[Tuple]]) -> int:
+        """
+        Replace the contents of the milk_samples_decay_corrected table in one transaction.
+        
+        Args:
+            reference_date (str): ISO reference date the values were corrected to
+            rows (Iterable[Sequence[Tuple]]): Batches of (sample_id, decay_factor,
+                corrected_activity, corrected_error, corrected_activity_per_calcium) rows
+                
+        Returns:
+            int: Number of rows written
+            
+        Raises:
+            sqlite3.Error: If there's an error writing the rows
+        """
+        insert_sql = """
+        INSERT INTO milk_samples_decay_corrected (
+            sample_id, reference_date, decay_factor, corrected_activity,
+            corrected_error, corrected_activity_per_calcium
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM milk_samples_decay_corrected")
+                written = 0
+                for batch in rows:
+                    cursor.executemany(insert_sql, (
+                        (row[0], reference_date, row[1], row[2], row[3], row[4]) for row in batch
+                    ))
+                    written += len(batch)
+                conn.commit()
+                logger.info("Stored decay-corrected milk sample values", extra=fields(rows=written))
+                return written
+        except sqlite3.Error as e:
+            logger.error("Error storing decay-corrected values: %s", e)
+            raise
+    
+    def get_max_sample_id(self) -> int:
+        """
+        Get the highest record ID in the database.
+        
+        Returns:
+            int: Highest ID, or 0 if the table is empty
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the table
+        """
+        try:
+            with self.db_config.get_db_context() as conn:
+                row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM milk_samples").fetchone()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.error("Error reading highest milk sample ID: %s", e)
+            raise
+    
+    def get_anomaly_watermark(self) -> int:
+        """
+        Get the ID of the last record checked by the anomaly detector.
+        
+        Returns:
+            int: Last checked record ID, or 0 if no scan has run
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the scan state
+        """
+        try:
+            with self.db_config.get_db_context() as conn:
+                row = conn.execute("SELECT last_sample_id FROM anomaly_scan_state WHERE id = 1").fetchone()
+                return row[0] if row else 0
+        except sqlite3.Error as e:
+            logger.error("Error reading anomaly scan state: %s", e)
+            raise
+    
+    def store_anomalies(self, flags: Iterable[Tuple[int, str, float, str]], watermark: int,
+                        replace_all: bool = False) -> int:
+        """
+        Store anomaly flags and advance the scan watermark in one transaction.
+        
+        Flags for records that no longer exist are removed at the same time.
+        
+        Args:
+            flags (Iterable[Tuple[int, str, float, str]]): (sample_id, rule, score, detail) rows
+            watermark (int): ID of the last record checked
+            replace_all (bool): Remove all existing flags first (used by full rescans)
+            
+        Returns:
+            int: Number of flags written
+            
+        Raises:
+            sqlite3.Error: If there's an error writing the flags
+        """
+        insert_sql = """
+        INSERT OR REPLACE INTO sample_anomalies (sample_id, rule, score, detail)
+        VALUES (?, ?, ?, ?)
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                if replace_all:
+                    cursor.execute("DELETE FROM sample_anomalies")
+                else:
+                    cursor.execute(
+                        "DELETE FROM sample_anomalies WHERE sample_id NOT IN (SELECT id FROM milk_samples)")
+                cursor.executemany(insert_sql, flags)
+                written = cursor.rowcount
+                cursor.execute(
+                    "INSERT OR REPLACE INTO anomaly_scan_state (id, last_sample_id) VALUES (1, ?)",
+                    (watermark,))
+                conn.commit()
+                return written
+        except sqlite3.Error as e:
+            logger.error("Error storing anomaly flags: %s", e)
+            raise
+    
+    def read_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read stored anomaly flags joined with their station and province.
+        
+        Args:
+            rule (Optional[str]): Only return flags raised by this rule
+            
+        Returns:
+            List[Dict[str, Any]]: Flags ordered by sample ID and rule
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the flags
+        """
+        select_sql = """
+        SELECT a.sample_id, a.rule, a.score, a.detail, a.detected_at,
+               s.station_name, s.province, s.start_date, s.sr90_activity
+        FROM sample_anomalies a JOIN milk_samples s ON s.id = a.sample_id
+        WHERE (? IS NULL OR a.rule = ?)
+        ORDER BY a.sample_id, a.rule
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                rows = conn.execute(select_sql, (rule, rule)).fetchall()
+                return [dict(row) for row in rows]
+        except sqlite3.Error as e:
+            logger.error("Error reading anomaly flags: %s", e)
+            raise
+    
+    def read_changes(self, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read change log entries after a sequence number.
+        
+        Each entry carries the current state of its record, which is None
+        for deletes and for records deleted since the change. A 'reset'
+        entry means every earlier record is gone (the database was reloaded).
+        
+        Args:
+            since_seq (int): Sequence number the consumer has already seen
+            limit (Optional[int]): Maximum number of entries to return
+            
+        Returns:
+            List[Dict[str, Any]]: Entries with seq, op, sample_id, changed_at and record
+            
+        Raises:
+            ChangeLogTruncatedError: If entries after since_seq were removed by retention
+            sqlite3.Error: If there's an error reading the log
+        """
+        select_sql = """
+        SELECT c.seq, c.op, c.sample_id, c.changed_at, m.id AS record_id,
+               m.sample_type, m.type, m.start_date, m.stop_date, m.station_name, m.province,
+               m.sr90_activity, m.sr90_error, m.sr90_activity_per_calcium
+        FROM sample_changes c
+        LEFT JOIN milk_samples m ON m.id = c.sample_id AND c.op != 'delete'
+        WHERE c.seq > ?
+        ORDER BY c.seq
+        LIMIT ?
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                state = conn.execute("SELECT truncated_through FROM change_log_state WHERE id = 1").fetchone()
+                if state and since_seq < state['truncated_through']:
+                    raise ChangeLogTruncatedError(
+                        f"Changes through {state['truncated_through']} were removed; resync required")
+                rows = conn.execute(select_sql, (since_seq, limit if limit else -1)).fetchall()
+                return [{
+                    'seq': row['seq'],
+                    'op': row['op'],
+                    'sample_id': row['sample_id'],
+                    'changed_at': row['changed_at'],
+                    'record': self._row_to_record(row) if row['record_id'] is not None else None
+                } for row in rows]
+        except sqlite3.Error as e:
+            logger.error("Error reading change log: %s", e)
+            raise
+    
+    def get_latest_change_seq(self) -> int:
+        """
+        Get the last sequence number ever assigned in the change log.
+        
+        Returns:
+            int: Latest sequence number, or 0 if nothing has been logged
+            
+        Raises:
+            sqlite3.Error: If there's an error reading the log
+        """
+        try:
+            with self.db_config.get_db_context() as conn:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sample_changes'").fetchone()
+                return row['seq'] if row else 0
+        except sqlite3.Error as e:
+            logger.error("Error reading change log position: %s", e)
+            raise
+    
+    def compact_change_log(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """
+        Compact the change log according to a policy.
+        
+        Args:
+            policy (Optional[ChangeLogPolicy]): Compaction policy (default: coalesce only)
+            
+        Returns:
+            int: Number of entries removed
+            
+        Raises:
+            sqlite3.Error: If there's an error compacting the log
+        """
+        policy = policy or ChangeLogPolicy()
+        coalesce_sql = """
+        DELETE FROM sample_changes
+        WHERE sample_id IS NOT NULL
+          AND seq < (SELECT MAX(seq) FROM sample_changes latest WHERE latest.sample_id = sample_changes.sample_id)
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                removed = 0
+                if policy.coalesce:
+                    cursor.execute(coalesce_sql)
+                    removed += cursor.rowcount
+                
+                truncate_through = 0
+                if policy.max_entries is not None:
+                    latest = cursor.execute(
+                        "SELECT seq FROM sqlite_sequence WHERE name = 'sample_changes'").fetchone()
+                    truncate_through = max(truncate_through, (latest['seq'] if latest else 0) - policy.max_entries)
+                if policy.retention_days is not None:
+                    expired = cursor.execute(
+                        "SELECT MAX(seq) FROM sample_changes WHERE changed_at < datetime('now', ?)",
+                        (f"-{policy.retention_days} days",)).fetchone()[0]
+                    truncate_through = max(truncate_through, expired or 0)
+                if truncate_through > 0:
+                    cursor.execute("DELETE FROM sample_changes WHERE seq <= ?", (truncate_through,))
+                    removed += cursor.rowcount
+                    cursor.execute("""
+                    INSERT INTO change_log_state (id, truncated_through) VALUES (1, ?)
+                    ON CONFLICT (id) DO UPDATE SET truncated_through = MAX(truncated_through, excluded.truncated_through)
+                    """, (truncate_through,))
+                conn.commit()
+                logger.info("Compacted change log", extra=fields(removed=removed))
+                return removed
+        except sqlite3.Error as e:
+            logger.error("Error compacting change log: %s", e)
+            raise
+    
+    def start_change_log_after(self, seq: int) -> None:
+        """
+        Continue the change log of a replaced database in a new, empty database.
+        
+        Numbering resumes after seq and the log starts with a 'reset' entry,
+        so consumers of the old database know to discard what they have.
+        
+        Args:
+            seq (int): Latest sequence number of the database being replaced
+            
+        Raises:
+            sqlite3.Error: If there's an error writing the log
+        """
+        try:
+            with self.db_config.get_db_context() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM sample_changes")
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'sample_changes'")
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('sample_changes', ?)", (seq,))
+                cursor.execute("INSERT INTO sample_changes (op) VALUES ('reset')")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Error starting change log: %s", e)
+            raise
+    
+    def _cube_deltas(self, changes: Iterable[Tuple[Any, int]]) -> Dict[Tuple, List[float]]:
+        """
+        Combine row changes into per-cell cube deltas.
+        
+        Args:
+            changes (Iterable[Tuple[Any, int]]): (row, sign) pairs, where row is a
+                mapping with province, station_name, start_date, type and
+                sr90_activity, and sign is 1 for an added row or -1 for a removed row
+                
+        Returns:
+            Dict[Tuple, List[float]]: Cube key mapped to [count, sum, sum of squares] deltas
+        """
+        deltas: Dict[Tuple, List[float]] = {}
+        for row, sign in changes:
+            if row is None:
+                continue
+            key = (row['province'], row['station_name'], sample_year(row['start_date']),
+                   sample_quarter(row['start_date']), row['type'])
+            activity = row['sr90_activity']
+            delta = deltas.setdefault(key, [0, 0.0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * activity
+            delta[2] += sign * activity * activity
+        return deltas
+    
+    def _apply_cube_deltas(self, cursor: sqlite3.Cursor, deltas: Dict[Tuple, List[float]]) -> None:
+        """
+        Apply cube deltas inside the caller's transaction.
+        
+        Args:
+            cursor (sqlite3.Cursor): Cursor of the open transaction
+            deltas (Dict[Tuple, List[float]]): Deltas from _cube_deltas
+        """
+        upsert_sql = """
+        INSERT INTO sample_cube (
+            province, station_name, year, quarter, type,
+            sample_count, activity_sum, activity_sum_sq
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (province, station_name, year, quarter, type) DO UPDATE SET
+            sample_count = sample_count + excluded.sample_count,
+            activity_sum = activity_sum + excluded.activity_sum,
+            activity_sum_sq = activity_sum_sq + excluded.activity_sum_sq
+        """
+        changed = [key + tuple(delta) for key, delta in deltas.items() if delta[0] != 0 or delta[1] != 0]
+        if not changed:
+            return
+        cursor.executemany(upsert_sql, changed)
+        if any(delta[0] < 0 for delta in deltas.values()):
+            cursor.execute("DELETE FROM sample_cube WHERE sample_count <= 0")
+    
+    def rebuild_cube(self) -> int:
+        """
+        Rebuild the sample_cube table from milk_samples in one grouped pass.
+        
+        Returns:
+            int: Number of cube cells written
+            
+        Raises:
+            sqlite3.Error: If there's an error rebuilding the cube
+        """
+        rebuild_sql = """
+        INSERT INTO sample_cube (
+            province, station_name, year, quarter, type,
+            sample_count, activity_sum, activity_sum_sq
+        )
+        SELECT province, station_name, sample_year(start_date), sample_quarter(start_date), type,
+               COUNT(*), SUM(sr90_activity), SUM(sr90_activity * sr90_activity)
+        FROM milk_samples
+        GROUP BY 1, 2, 3, 4, 5
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                conn.create_function("sample_year", 1, sample_year, deterministic=True)
+                conn.create_function("sample_quarter", 1, sample_quarter, deterministic=True)
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM sample_cube")
+                cursor.execute(rebuild_sql)
+                cells = cursor.rowcount
+                conn.commit()
+                return cells
+        except sqlite3.Error as e:
+            logger.error("Error rebuilding sample cube: %s", e)
+            raise
+    
+    def ensure_cube(self) -> None:
+        """
+        Build the sample_cube table if it is empty but samples exist.
+        
+        This covers databases created before the cube table was introduced.
+        
+        Raises:
+            sqlite3.Error: If there's an error checking or rebuilding the cube
+        """
+        check_sql = """
+        SELECT EXISTS (SELECT 1 FROM milk_samples), EXISTS (SELECT 1 FROM sample_cube)
+        """
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                has_samples, has_cube = conn.execute(check_sql).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Error checking sample cube: %s", e)
+            raise
+        if has_samples and not has_cube:
+            self.rebuild_cube()
+    
+    def query_cube(self, group_by: Sequence[str], filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate the sample_cube table along some of its dimensions.
+        
+        Grouping by fewer dimensions rolls the cube up; grouping by more
+        dimensions and filtering drills down.
+        
+        Args:
+            group_by (Sequence[str]): Dimensions to group by, from CUBE_DIMENSIONS
+            filters (Optional[Dict[str, Any]]): Dimension values to filter on
+            
+        Returns:
+            List[Dict[str, Any]]: One row per group with the dimension values,
+            sample_count, activity_sum and activity_sum_sq
+            
+        Raises:
+            ValueError: If an unknown dimension is requested
+            sqlite3.Error: If there's an error reading the cube
+        """
+        filters = filters or {}
+        for dimension in list(group_by) + list(filters):
+            if dimension not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+        
+        columns = ", ".join(group_by)
+        select_sql = "SELECT "
+        select_sql += f"{columns}, " if group_by else ""
+        select_sql += "SUM(sample_count) AS sample_count, SUM(activity_sum) AS activity_sum, "
+        select_sql += "SUM(activity_sum_sq) AS activity_sum_sq FROM sample_cube"
+        if filters:
+            select_sql += " WHERE " + " AND ".join(f"{dimension} = ?" for dimension in filters)
+        if group_by:
+            select_sql += f" GROUP BY {columns} ORDER BY {columns}"
+        
+        try:
+            with self.db_config.get_db_context() as conn:
+                rows = conn.execute(select_sql, tuple(filters.values())).fetchall()
+                return [dict(row) for row in rows if row['sample_count']]
+        except sqlite3.Error as e:
+            logger.error("Error querying sample cube: %s", e)
+            raise
\ No newline at end of file
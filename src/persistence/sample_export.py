@@ -0,0 +1,301 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the writers and reader for exported milk sample files.
+It is part of the Persistence Layer.
+
+This module is responsible for:
+- Writing CSV files with the header of the original dataset
+- Writing JSON Lines files
+- Writing and reading the compact block-columnar binary format
+- Optional gzip compression and atomic replacement of the destination
+
+Columnar file layout (all integers little-endian):
+    magic        8 bytes  b"SR90COL1"
+    columns      u16 count, then per column: u8 type, u16 name length, UTF-8 name
+    blocks       repeated: u32 row count (0 ends the file), then per column:
+                   int64   row count x 8 bytes
+                   float64 row count x 8 bytes (NaN marks a missing value)
+                   string  u32 new dictionary entries, each u32 length + UTF-8 bytes,
+                           then row count x int32 codes into the column dictionary
+"""
+
+import sys
+import os
+import csv
+import gzip
+import io
+import json
+import math
+import struct
+import time
+from array import array
+from dataclasses import asdict, fields
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'columnar')
+
+# Header of nms_strontium90_milk_ssn_strontium90_lait.csv, so exports can be re-imported by DataMigration
+CSV_HEADER = [
+    "Sample Type/ Type d'échantillon",
+    "Type",
+    "Start Date/ Date de Début",
+    "Stop Date/ Date de Fin",
+    "Station Name/ Nom de Station",
+    "Province",
+    "Sr90 Activity/ Activité (Bq/L)",
+    "Sr90 Error/ Erreur (Bq/L)",
+    "Sr90 Activity/Calcium / Activité/Calcium  (Bq/g)"
+]
+
+COLUMNAR_MAGIC = b"SR90COL1"
+COLUMN_INT64 = 1
+COLUMN_FLOAT64 = 2
+COLUMN_STRING = 3
+
+# (name, type) of every column in a columnar file, ID first then the record fields
+COLUMNAR_COLUMNS = [('id', COLUMN_INT64)] + [
+    (field.name, COLUMN_FLOAT64 if field.name.startswith('sr90') else COLUMN_STRING)
+    for field in fields(MilkSampleRecord)
+]
+
+# Buffer size for exported files
+WRITE_BUFFER_SIZE = 1 << 20
+
+def _little_endian(values: array) -> bytes:
+    """Get the bytes of an array in little-endian order."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    """Build an array from little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+class ColumnarWriter:
+    """
+    A writer for the block-columnar binary export format.
+
+    Rows are buffered into blocks of column arrays. String columns are
+    dictionary-encoded with one dictionary per column for the whole file;
+    each block carries only the entries first seen in that block.
+
+    Attributes:
+        block_size (int): Rows per block
+        rows_written (int): Rows written so far
+    """
+
+    def __init__(self, stream: BinaryIO, block_size: int = 65536):
+        """
+        Initialize the writer and write the file header.
+
+        Args:
+            stream (BinaryIO): Binary stream to write to
+            block_size (int): Rows per block
+        """
+        self._stream = stream
+        self.block_size = block_size
+        self.rows_written = 0
+        self._dictionaries: Dict[str, Dict[str, int]] = {
+            name: {} for name, kind in COLUMNAR_COLUMNS if kind == COLUMN_STRING}
+        self._block: List[Tuple[int, MilkSampleRecord]] = []
+
+        header = [COLUMNAR_MAGIC, struct.pack("<H", len(COLUMNAR_COLUMNS))]
+        for name, kind in COLUMNAR_COLUMNS:
+            encoded = name.encode("utf-8")
+            header.append(struct.pack("<BH", kind, len(encoded)) + encoded)
+        stream.write(b"".join(header))
+
+    def write(self, record_id: int, record: MilkSampleRecord) -> None:
+        """
+        Add one row, writing a block when it is full.
+
+        Args:
+            record_id (int): ID of the record
+            record (MilkSampleRecord): The record
+        """
+        self._block.append((record_id, record))
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def close(self) -> None:
+        """Write the last block and the end marker. Does not close the stream."""
+        self._flush_block()
+        self._stream.write(struct.pack("<I", 0))
+
+    def _flush_block(self) -> None:
+        """Encode and write the buffered rows as one block."""
+        if not self._block:
+            return
+        parts = [struct.pack("<I", len(self._block))]
+        for name, kind in COLUMNAR_COLUMNS:
+            if kind == COLUMN_INT64:
+                parts.append(_little_endian(array('q', (record_id for record_id, _ in self._block))))
+            elif kind == COLUMN_FLOAT64:
+                values = (getattr(record, name) for _, record in self._block)
+                parts.append(_little_endian(array('d', (math.nan if value is None else value for value in values))))
+            else:
+                dictionary = self._dictionaries[name]
+                first_new = len(dictionary)
+                codes = array('i')
+                for _, record in self._block:
+                    value = getattr(record, name)
+                    code = dictionary.get(value)
+                    if code is None:
+                        code = dictionary[value] = len(dictionary)
+                    codes.append(code)
+                new_entries = list(dictionary)[first_new:]
+                parts.append(struct.pack("<I", len(new_entries)))
+                for value in new_entries:
+                    encoded = value.encode("utf-8")
+                    parts.append(struct.pack("<I", len(encoded)) + encoded)
+                parts.append(_little_endian(codes))
+        self._stream.write(b"".join(parts))
+        self.rows_written += len(self._block)
+        self._block = []
+
+def iter_columnar_file(path: str) -> Iterator[Tuple[int, MilkSampleRecord]]:
+    """
+    Read a columnar export file block by block.
+
+    Args:
+        path (str): Path of the file (gzip-compressed files are detected)
+
+    Yields:
+        Tuple[int, MilkSampleRecord]: Tuples containing (id, record)
+
+    Raises:
+        ValueError: If the file is not a columnar export
+    """
+    with _open_input(path) as stream:
+        if stream.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"Not a columnar export file: {path}")
+        column_count, = struct.unpack("<H", stream.read(2))
+        columns = []
+        for _ in range(column_count):
+            kind, name_length = struct.unpack("<BH", stream.read(3))
+            columns.append((stream.read(name_length).decode("utf-8"), kind))
+        dictionaries: Dict[str, List[str]] = {name: [] for name, kind in columns if kind == COLUMN_STRING}
+
+        while True:
+            row_count, = struct.unpack("<I", stream.read(4))
+            if row_count == 0:
+                return
+            block: Dict[str, Any] = {}
+            for name, kind in columns:
+                if kind == COLUMN_INT64:
+                    block[name] = _from_little_endian('q', stream.read(8 * row_count))
+                elif kind == COLUMN_FLOAT64:
+                    block[name] = [None if math.isnan(value) else value
+                                   for value in _from_little_endian('d', stream.read(8 * row_count))]
+                else:
+                    dictionary = dictionaries[name]
+                    new_entries, = struct.unpack("<I", stream.read(4))
+                    for _ in range(new_entries):
+                        length, = struct.unpack("<I", stream.read(4))
+                        dictionary.append(stream.read(length).decode("utf-8"))
+                    block[name] = [dictionary[code] for code in _from_little_endian('i', stream.read(4 * row_count))]
+
+            record_names = [field.name for field in fields(MilkSampleRecord)]
+            for row in range(row_count):
+                yield block['id'][row], MilkSampleRecord(**{name: block[name][row] for name in record_names})
+
+def _open_input(path: str) -> BinaryIO:
+    """Open a file for reading, decompressing it if it starts with the gzip magic number."""
+    with open(path, "rb") as probe:
+        compressed = probe.read(2) == b"\x1f\x8b"
+    return gzip.open(path, "rb") if compressed else open(path, "rb", buffering=WRITE_BUFFER_SIZE)
+
+def _format_float(value: Optional[float]) -> str:
+    """Format an optional float for CSV the way the source file does (empty when missing)."""
+    return "" if value is None else repr(value)
+
+def write_samples(rows: Iterable[Tuple[int, MilkSampleRecord]],
+                  destination: str,
+                  fmt: str = "csv",
+                  compress: Optional[bool] = None,
+                  block_size: int = 65536) -> Dict[str, Any]:
+    """
+    Stream (id, record) rows to a file in constant memory.
+
+    The file is written next to the destination and renamed into place when
+    complete, so readers never see a partial export.
+
+    Args:
+        rows (Iterable[Tuple[int, MilkSampleRecord]]): Rows to export
+        destination (str): Output path
+        fmt (str): One of EXPORT_FORMATS
+        compress (Optional[bool]): gzip the output (default: when the path ends in .gz)
+        block_size (int): Rows per block for the columnar format
+
+    Returns:
+        Dict[str, Any]: Export summary with format, rows, bytes, seconds and destination
+
+    Raises:
+        ValueError: If the format is unknown
+        OSError: If the file cannot be written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    if compress is None:
+        compress = destination.endswith(".gz")
+
+    started = time.perf_counter()
+    partial = destination + ".partial"
+    count = 0
+    try:
+        with open(partial, "wb", buffering=WRITE_BUFFER_SIZE) as raw:
+            binary: BinaryIO = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) if compress else raw
+            try:
+                if fmt == "columnar":
+                    writer = ColumnarWriter(binary, block_size)
+                    for record_id, record in rows:
+                        writer.write(record_id, record)
+                    writer.close()
+                    count = writer.rows_written
+                else:
+                    text = io.TextIOWrapper(binary, encoding="utf-8", newline="", write_through=False)
+                    if fmt == "csv":
+                        csv_writer = csv.writer(text)
+                        csv_writer.writerow(CSV_HEADER)
+                        for _, record in rows:
+                            csv_writer.writerow([
+                                record.sample_type, record.type, record.start_date, record.stop_date,
+                                record.station_name, record.province, repr(record.sr90_activity),
+                                _format_float(record.sr90_error), _format_float(record.sr90_activity_per_calcium)
+                            ])
+                            count += 1
+                    else:
+                        for record_id, record in rows:
+                            text.write(json.dumps(dict(id=record_id, **asdict(record))))
+                            text.write("\n")
+                            count += 1
+                    text.flush()
+                    text.detach()
+            finally:
+                if compress:
+                    binary.close()
+        os.replace(partial, destination)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    summary = {
+        'format': fmt,
+        'rows': count,
+        'bytes': os.path.getsize(destination),
+        'seconds': time.perf_counter() - started,
+        'destination': destination
+    }
+    return summary
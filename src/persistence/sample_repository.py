@@ -0,0 +1,165 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the SampleRepository protocol which describes the storage
+operations MilkSampleDBService relies on. It is part of the Persistence Layer.
+
+The protocol is implemented by:
+- MilkSampleDBRepository: a single SQLite database file
+- ShardedMilkSampleDBRepository: one SQLite file per province or hash bucket
+- InMemoryMilkSampleRepository: hash and sorted indexes held in memory
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.milk_sample_db_repository import ChangeLogPolicy
+
+@runtime_checkable
+class SampleRepository(Protocol):
+    """
+    Storage operations for milk sample records.
+
+    The operations fall into seven groups:
+    1. CRUD: create_sample, create_samples, read_sample_by_id, update_sample,
+       delete_sample, clear_all_samples
+    2. Streaming reads: iter_samples, iter_measurement_batches
+    3. Filtered queries: read_all_samples, read_all_samples_simple,
+       read_samples_by_province, read_samples_by_station, query_samples
+    4. Aggregates: get_sample_count, read_distinct_values, summarize_samples,
+       query_cube, rebuild_cube, get_max_sample_id
+    5. Bookkeeping: initialize_database, get_generation
+    6. Change log: read_changes, get_latest_change_seq, compact_change_log,
+       start_change_log_after
+    7. Derived tables: read_anomalies, replace_decay_corrected
+
+    AnomalyDetector also needs get_anomaly_watermark and store_anomalies,
+    which the SQLite and in-memory engines provide. Their IDs only grow, so
+    one watermark covers them. A repository that offers
+    get_shard_repositories, as the sharded engine does, is scanned shard
+    by shard instead.
+
+    Records are returned in ascending ID order, except that the column batches
+    of iter_measurement_batches may arrive in any order. The write generation
+    changes after every successful write.
+    """
+
+    def initialize_database(self) -> None:
+        """Create any storage structures that do not exist yet."""
+        ...
+
+    def get_generation(self) -> int:
+        """Get a counter that changes after every write, including writes by other connections."""
+        ...
+
+    def create_sample(self, record: MilkSampleRecord) -> int:
+        """Store a record and return its new ID."""
+        ...
+
+    def create_samples(self, records: Sequence[MilkSampleRecord], update_cube: bool = True) -> int:
+        """Store many records at once and return how many were stored."""
+        ...
+
+    def read_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
+        """Get a record by ID, or None if it does not exist."""
+        ...
+
+    def update_sample(self, record_id: int, record: MilkSampleRecord) -> bool:
+        """Replace a record; return False if it does not exist."""
+        ...
+
+    def delete_sample(self, record_id: int) -> bool:
+        """Delete a record; return False if it does not exist."""
+        ...
+
+    def clear_all_samples(self) -> int:
+        """Delete every record and return how many were deleted."""
+        ...
+
+    def iter_samples(self, batch_size: int = 1000) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """Stream every (id, record) pair."""
+        ...
+
+    def iter_measurement_batches(self, batch_size: int = 10000, after_id: int = 0,
+                                 through_id: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """Stream measurement columns in column-oriented batches, in no particular order."""
+        ...
+
+    def read_all_samples(self, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """Get a page of (id, record) pairs."""
+        ...
+
+    def read_all_samples_simple(self, limit: Optional[int] = None, offset: int = 0) -> List[MilkSampleRecord]:
+        """Get a page of records without their IDs."""
+        ...
+
+    def read_samples_by_province(self, province: str) -> List[MilkSampleRecord]:
+        """Get every record from a province."""
+        ...
+
+    def read_samples_by_station(self, station_name: str) -> List[MilkSampleRecord]:
+        """Get every record from a station."""
+        ...
+
+    def query_samples(self,
+                      province: Optional[str] = None,
+                      station_name: Optional[str] = None,
+                      start_from: Optional[date] = None,
+                      start_until: Optional[date] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0,
+                      after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """Get a page of (id, record) pairs with ID above after_id matching every given filter."""
+        ...
+
+    def get_sample_count(self) -> int:
+        """Get the number of stored records."""
+        ...
+
+    def read_distinct_values(self, column: str) -> List[str]:
+        """Get the sorted distinct values of 'province' or 'station_name'."""
+        ...
+
+    def summarize_samples(self) -> Dict[str, Any]:
+        """Get mergeable partial statistics used by get_statistics."""
+        ...
+
+    def query_cube(self, group_by: Sequence[str], filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Aggregate count, sum and sum of squares of activity by cube dimensions."""
+        ...
+
+    def rebuild_cube(self) -> int:
+        """Recompute the aggregate cube from the stored records."""
+        ...
+
+    def get_max_sample_id(self) -> int:
+        """Get the highest record ID, or 0 if there are no records."""
+        ...
+
+    def read_changes(self, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get change log entries after a sequence number, with current record state."""
+        ...
+
+    def get_latest_change_seq(self) -> int:
+        """Get the last sequence number assigned in the change log."""
+        ...
+
+    def compact_change_log(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """Coalesce and expire change log entries; return how many were removed."""
+        ...
+
+    def start_change_log_after(self, seq: int) -> None:
+        """Empty the change log and continue its numbering after seq with a 'reset' entry."""
+        ...
+
+    def read_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get stored anomaly flags with the station and province of their record."""
+        ...
+
+    def replace_decay_corrected(self, reference_date: str, rows: Iterable[Sequence[Tuple]]) -> int:
+        """Replace every stored decay-corrected value; return how many rows were written."""
+        ...
@@ -0,0 +1,832 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the ShardedMilkSampleDBRepository class which spreads
+milk sample records over one SQLite file per province (or per hash bucket).
+It is part of the Persistence Layer.
+
+This module is responsible for:
+- Keeping a catalog that maps provinces to shard files
+- Routing province-keyed reads and writes to a single shard
+- Fanning cross-shard reads and aggregates out over worker threads
+- Merging the partial results of every shard
+- Merging the change logs of every shard into one sequence
+"""
+
+import os
+import heapq
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.observability.metrics import instrumented
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import ChangeLogPolicy, ChangeLogTruncatedError, MilkSampleDBRepository
+
+# Global IDs are local_id * MAX_SHARDS + shard_number
+MAX_SHARDS = 1024
+
+CATALOG_FILENAME = "shards.json"
+
+# Database in the shard directory that holds the change log merged from every shard
+CHANGES_FILENAME = "changes.db"
+
+# Number of shard change log entries merged per read
+CHANGE_MERGE_BATCH_SIZE = 1000
+
+MERGED_CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS merged_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    shard INTEGER,
+    op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete', 'reset')),
+    sample_id INTEGER,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS shard_change_positions (
+    shard INTEGER PRIMARY KEY,
+    local_seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS change_log_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    truncated_through INTEGER NOT NULL
+);
+"""
+
+@instrumented
+class ShardedMilkSampleDBRepository:
+    """
+    A repository that stores milk sample records in one SQLite file per shard.
+
+    This class offers the same operations as MilkSampleDBRepository, so it can
+    be passed to MilkSampleDBService unchanged. It is responsible for:
+    1. Creating shards on demand and recording them in a catalog file
+    2. Encoding the shard number into every record ID
+    3. Sending province-keyed operations to the matching shard only
+    4. Running cross-shard reads and aggregates on a thread pool and merging them
+    5. Merging the change log of every shard into one sequence of its own
+
+    Shards are keyed by province, or by a CRC32 hash bucket of the province
+    when buckets is given. Adding a shard never touches the existing ones.
+    A record's province cannot be changed to one that lives on another
+    shard; delete and re-create the record instead.
+
+    Attributes:
+        shard_dir (str): Directory that holds the catalog and shard files
+        buckets (Optional[int]): Number of hash buckets, or None for one shard per province
+        max_workers (int): Number of threads used for fan-out queries
+    """
+
+    def __init__(self, shard_dir: str, buckets: Optional[int] = None, max_workers: int = 8):
+        """
+        Initialize the sharded repository, opening any shards already in the catalog.
+
+        Args:
+            shard_dir (str): Directory for the catalog and shard files (created if missing)
+            buckets (Optional[int]): Number of hash buckets, or None to shard by province
+            max_workers (int): Number of threads used for fan-out queries
+
+        Raises:
+            ValueError: If the settings do not match an existing catalog
+        """
+        if buckets is not None and not 0 < buckets <= MAX_SHARDS:
+            raise ValueError(f"Number of buckets must be between 1 and {MAX_SHARDS}")
+        self.shard_dir = os.path.abspath(shard_dir)
+        self.buckets = buckets
+        self.max_workers = max_workers
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard")
+        self._shards: Dict[int, MilkSampleDBRepository] = {}
+        self._shard_numbers: Dict[str, int] = {}
+        self._generation = 0
+        # Shard change logs are merged into one sequence on demand; see read_changes
+        self._changes_config = DatabaseConfig(os.path.join(self.shard_dir, CHANGES_FILENAME))
+        self._changes_lock = threading.Lock()
+        self._changes_ready = False
+        self._load_catalog()
+
+    @property
+    def _catalog_path(self) -> str:
+        """str: Path of the catalog file."""
+        return os.path.join(self.shard_dir, CATALOG_FILENAME)
+
+    def _load_catalog(self) -> None:
+        """Open every shard listed in the catalog file."""
+        if not os.path.exists(self._catalog_path):
+            return
+        with open(self._catalog_path, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+        if catalog.get('buckets') != self.buckets:
+            raise ValueError(f"Shard directory was created with buckets={catalog.get('buckets')}")
+        for shard in catalog['shards']:
+            self._open_shard(shard['key'], shard['number'], shard['file'])
+
+    def _save_catalog(self) -> None:
+        """Write the catalog file atomically."""
+        catalog = {
+            'buckets': self.buckets,
+            'shards': [
+                {'key': key, 'number': number,
+                 'file': os.path.basename(self._shards[number].db_config.db_path)}
+                for key, number in sorted(self._shard_numbers.items(), key=lambda item: item[1])
+            ]
+        }
+        temp_path = self._catalog_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(temp_path, self._catalog_path)
+
+    def _open_shard(self, key: str, number: int, filename: str) -> MilkSampleDBRepository:
+        """Open the repository of one shard and register it."""
+        repository = MilkSampleDBRepository(DatabaseConfig(os.path.join(self.shard_dir, filename)))
+        self._shards[number] = repository
+        self._shard_numbers[key] = number
+        return repository
+
+    def shard_key(self, province: str) -> str:
+        """
+        Get the shard key a province is stored under.
+
+        Args:
+            province (str): Province of a record
+
+        Returns:
+            str: The province itself, or the name of its hash bucket
+        """
+        if self.buckets is None:
+            return province
+        return f"bucket_{zlib.crc32(province.encode('utf-8')) % self.buckets}"
+
+    def _shard_for_province(self, province: str, create: bool) -> Optional[Tuple[int, MilkSampleDBRepository]]:
+        """
+        Find (and optionally create) the shard that holds a province.
+
+        Args:
+            province (str): Province of a record
+            create (bool): Create the shard if it does not exist yet
+
+        Returns:
+            Optional[Tuple[int, MilkSampleDBRepository]]: (shard_number, repository), or None
+        """
+        key = self.shard_key(province)
+        number = self._shard_numbers.get(key)
+        if number is not None:
+            return number, self._shards[number]
+        if not create:
+            return None
+        with self._lock:
+            number = self._shard_numbers.get(key)
+            if number is None:
+                number = len(self._shards)
+                if number >= MAX_SHARDS:
+                    raise ValueError(f"Cannot create more than {MAX_SHARDS} shards")
+                safe_name = re.sub(r'[^A-Za-z0-9]+', '_', key).strip('_') or "shard"
+                self._open_shard(key, number, f"milk_samples_{number:04d}_{safe_name}.db")
+                self._save_catalog()
+            return number, self._shards[number]
+
+    def _shard_for_id(self, record_id: int) -> Tuple[Optional[MilkSampleDBRepository], int]:
+        """Decode a global ID into (shard repository, local ID)."""
+        return self._shards.get(record_id % MAX_SHARDS), record_id // MAX_SHARDS
+
+    @staticmethod
+    def _global_id(number: int, local_id: int) -> int:
+        """Encode a shard number and local ID into a global ID."""
+        return local_id * MAX_SHARDS + number
+
+    def _fan_out(self, operation: Callable[[int, MilkSampleDBRepository], Any]) -> List[Any]:
+        """
+        Run an operation on every shard in parallel.
+
+        Args:
+            operation (Callable[[int, MilkSampleDBRepository], Any]): Called with
+                (shard_number, repository) for each shard
+
+        Returns:
+            List[Any]: Results in shard-number order
+        """
+        shards = sorted(self._shards.items())
+        if len(shards) <= 1:
+            return [operation(number, repository) for number, repository in shards]
+        futures = [self._executor.submit(operation, number, repository) for number, repository in shards]
+        return [future.result() for future in futures]
+
+    def get_shard_names(self) -> List[str]:
+        """
+        Get the keys of all shards.
+
+        Returns:
+            List[str]: Shard keys in shard-number order
+        """
+        return [key for key, _ in sorted(self._shard_numbers.items(), key=lambda item: item[1])]
+
+    def get_shard_repositories(self) -> List[Tuple[str, MilkSampleDBRepository]]:
+        """
+        Get the repository of every shard, for work that is done shard by shard.
+
+        Record IDs inside a shard repository are local to that shard.
+
+        Returns:
+            List[Tuple[str, MilkSampleDBRepository]]: (shard key, repository) in shard-number order
+        """
+        return [(key, self._shards[number])
+                for key, number in sorted(self._shard_numbers.items(), key=lambda item: item[1])]
+
+    def close(self) -> None:
+        """Stop the worker threads and close every shard connection."""
+        self._executor.shutdown(wait=True)
+        for repository in self._shards.values():
+            repository.db_config.close_all_connections()
+        self._changes_config.close_all_connections()
+
+    def initialize_database(self) -> None:
+        """Initialize the tables of every shard."""
+        self._fan_out(lambda number, repository: repository.initialize_database())
+
+    def get_generation(self) -> int:
+        """
+        Get the write generation of the repository.
+
+        Returns:
+            int: Current write generation
+        """
+        return self._generation + sum(repository.get_generation() for repository in self._shards.values())
+
+    def create_sample(self, record: MilkSampleRecord) -> int:
+        """
+        Create a record on the shard of its province.
+
+        Args:
+            record (MilkSampleRecord): Record to create
+
+        Returns:
+            int: Global ID of the new record
+        """
+        number, repository = self._shard_for_province(record.province, create=True)
+        return self._global_id(number, repository.create_sample(record))
+
+    def create_samples(self, records: Sequence[MilkSampleRecord], update_cube: bool = True) -> int:
+        """
+        Create many records, one bulk insert per shard, with shards written in parallel.
+
+        Args:
+            records (Sequence[MilkSampleRecord]): Records to create
+            update_cube (bool): Apply the records to each shard's sample cube
+
+        Returns:
+            int: Number of records created
+        """
+        by_shard: Dict[int, List[MilkSampleRecord]] = {}
+        for record in records:
+            number, _ = self._shard_for_province(record.province, create=True)
+            by_shard.setdefault(number, []).append(record)
+        futures = [self._executor.submit(self._shards[number].create_samples, batch, update_cube)
+                   for number, batch in by_shard.items()]
+        return sum(future.result() for future in futures)
+
+    def read_sample_by_id(self, record_id: int) -> Optional[MilkSampleRecord]:
+        """
+        Read a record by its global ID.
+
+        Args:
+            record_id (int): Global ID of the record
+
+        Returns:
+            Optional[MilkSampleRecord]: The record, or None if not found
+        """
+        repository, local_id = self._shard_for_id(record_id)
+        return repository.read_sample_by_id(local_id) if repository else None
+
+    def iter_samples(self, batch_size: int = 1000) -> Iterator[Tuple[int, MilkSampleRecord]]:
+        """
+        Stream every record from all shards in global ID order.
+
+        Args:
+            batch_size (int): Number of rows fetched from each shard at a time
+
+        Yields:
+            Tuple[int, MilkSampleRecord]: Tuples containing (global_id, record)
+        """
+        def stream(number: int, repository: MilkSampleDBRepository) -> Iterator[Tuple[int, MilkSampleRecord]]:
+            for local_id, record in repository.iter_samples(batch_size):
+                yield self._global_id(number, local_id), record
+
+        streams = [stream(number, repository) for number, repository in sorted(self._shards.items())]
+        return heapq.merge(*streams, key=lambda item: item[0])
+
+    def read_all_samples(self, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Read records from all shards in global ID order.
+
+        Each shard is asked for at most offset + limit rows in parallel and
+        the sorted results are merged.
+
+        Args:
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of records to skip
+
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+        """
+        per_shard_limit = offset + limit if limit else None
+        results = self._fan_out(lambda number, repository: [
+            (self._global_id(number, local_id), record)
+            for local_id, record in repository.read_all_samples(per_shard_limit, 0)
+        ])
+        merged = heapq.merge(*results, key=lambda item: item[0])
+        return list(islice(merged, offset, offset + limit if limit else None))
+
+    def read_all_samples_simple(self, limit: Optional[int] = None, offset: int = 0) -> List[MilkSampleRecord]:
+        """
+        Read records from all shards (without IDs).
+
+        Args:
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of records to skip
+
+        Returns:
+            List[MilkSampleRecord]: List of milk sample records
+        """
+        return [record for _, record in self.read_all_samples(limit, offset)]
+
+    def read_samples_by_province(self, province: str) -> List[MilkSampleRecord]:
+        """
+        Read the records of one province from its shard only.
+
+        Args:
+            province (str): Province to filter by
+
+        Returns:
+            List[MilkSampleRecord]: Records for the province
+        """
+        shard = self._shard_for_province(province, create=False)
+        return shard[1].read_samples_by_province(province) if shard else []
+
+    def read_samples_by_station(self, station_name: str) -> List[MilkSampleRecord]:
+        """
+        Read the records of one station from every shard in parallel.
+
+        Args:
+            station_name (str): Station name to filter by
+
+        Returns:
+            List[MilkSampleRecord]: Records for the station
+        """
+        results = self._fan_out(lambda number, repository: repository.read_samples_by_station(station_name))
+        return [record for shard_records in results for record in shard_records]
+
+    def query_samples(self,
+                      province: Optional[str] = None,
+                      station_name: Optional[str] = None,
+                      start_from: Optional[date] = None,
+                      start_until: Optional[date] = None,
+                      limit: Optional[int] = None,
+                      offset: int = 0,
+                      after_id: int = 0) -> List[Tuple[int, MilkSampleRecord]]:
+        """
+        Read records matching every given filter, in global ID order.
+
+        A province filter is answered by one shard; otherwise every shard is
+        queried in parallel for at most offset + limit rows and the results merged.
+
+        Args:
+            province (Optional[str]): Province to filter by
+            station_name (Optional[str]): Station name to filter by
+            start_from (Optional[date]): Earliest start date (inclusive)
+            start_until (Optional[date]): Latest start date (inclusive)
+            limit (Optional[int]): Maximum number of records to retrieve
+            offset (int): Number of matching records to skip
+            after_id (int): Only include records with a global ID greater than this
+
+        Returns:
+            List[Tuple[int, MilkSampleRecord]]: List of tuples containing (id, record)
+        """
+        per_shard_limit = offset + limit if limit else None
+
+        def query(number: int, repository: MilkSampleDBRepository) -> List[Tuple[int, MilkSampleRecord]]:
+            # local_id * MAX_SHARDS + number > after_id  <=>  local_id > (after_id - number) // MAX_SHARDS
+            local_after = max(0, (after_id - number) // MAX_SHARDS) if after_id else 0
+            return [(self._global_id(number, local_id), record)
+                    for local_id, record in repository.query_samples(
+                        province, station_name, start_from, start_until, per_shard_limit, 0, local_after)]
+
+        if province is not None:
+            shard = self._shard_for_province(province, create=False)
+            results = [query(*shard)] if shard else []
+        else:
+            results = self._fan_out(query)
+        merged = heapq.merge(*results, key=lambda item: item[0])
+        return list(islice(merged, offset, offset + limit if limit else None))
+
+    def update_sample(self, record_id: int, record: MilkSampleRecord) -> bool:
+        """
+        Update a record on its shard.
+
+        Args:
+            record_id (int): Global ID of the record
+            record (MilkSampleRecord): Updated record data
+
+        Returns:
+            bool: True if the record was updated, False if not found
+
+        Raises:
+            ValueError: If the new province belongs to a different shard
+        """
+        repository, local_id = self._shard_for_id(record_id)
+        if repository is None:
+            return False
+        if self._shard_numbers.get(self.shard_key(record.province)) != record_id % MAX_SHARDS:
+            raise ValueError("Cannot move a sample to another shard; delete and re-create it instead")
+        return repository.update_sample(local_id, record)
+
+    def delete_sample(self, record_id: int) -> bool:
+        """
+        Delete a record from its shard.
+
+        Args:
+            record_id (int): Global ID of the record
+
+        Returns:
+            bool: True if the record was deleted, False if not found
+        """
+        repository, local_id = self._shard_for_id(record_id)
+        return repository.delete_sample(local_id) if repository else False
+
+    def get_sample_count(self) -> int:
+        """
+        Count the records on every shard in parallel.
+
+        Returns:
+            int: Total number of records
+        """
+        return sum(self._fan_out(lambda number, repository: repository.get_sample_count()))
+
+    def clear_all_samples(self) -> int:
+        """
+        Delete every record on every shard.
+
+        Returns:
+            int: Number of records deleted
+        """
+        self._generation += 1
+        return sum(self._fan_out(lambda number, repository: repository.clear_all_samples()))
+
+    def read_distinct_values(self, column: str) -> List[str]:
+        """
+        Read the distinct values of a text column across all shards.
+
+        Args:
+            column (str): Either 'province' or 'station_name'
+
+        Returns:
+            List[str]: Sorted distinct values
+        """
+        results = self._fan_out(lambda number, repository: repository.read_distinct_values(column))
+        return sorted(set().union(*results))
+
+    def summarize_samples(self) -> Dict[str, Any]:
+        """
+        Compute partial statistics on every shard in parallel and merge them.
+
+        Returns:
+            Dict[str, Any]: Same keys as MilkSampleDBRepository.summarize_samples
+        """
+        merged: Dict[str, Any] = {
+            'total_samples': 0,
+            'activity_sum': 0.0,
+            'valid_activity_readings': 0,
+            'provinces': set(),
+            'stations': set()
+        }
+        for partial in self._fan_out(lambda number, repository: repository.summarize_samples()):
+            merged['total_samples'] += partial['total_samples']
+            merged['activity_sum'] += partial['activity_sum']
+            merged['valid_activity_readings'] += partial['valid_activity_readings']
+            merged['provinces'] |= partial['provinces']
+            merged['stations'] |= partial['stations']
+        return merged
+
+    def iter_measurement_batches(self, batch_size: int = 10000, after_id: int = 0,
+                                 through_id: Optional[int] = None) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Stream the measurement columns of every shard, with IDs translated to global IDs.
+
+        Batches are produced shard by shard, so IDs are not in global order.
+
+        Args:
+            batch_size (int): Number of rows fetched per batch
+            after_id (int): Only include records with a global ID greater than this
+            through_id (Optional[int]): Only include records with a global ID up to this
+
+        Yields:
+            Dict[str, List[Any]]: Column batches, as MilkSampleDBRepository.iter_measurement_batches
+        """
+        for number, repository in sorted(self._shards.items()):
+            # Translate the global bounds to local ones, as query_samples does
+            local_after = max(0, (after_id - number) // MAX_SHARDS) if after_id else 0
+            local_through = (through_id - number) // MAX_SHARDS if through_id is not None else None
+            if local_through is not None and local_through <= local_after:
+                continue
+            for columns in repository.iter_measurement_batches(batch_size, local_after, local_through):
+                columns['id'] = [self._global_id(number, local_id) for local_id in columns['id']]
+                yield columns
+
+    def replace_decay_corrected(self, reference_date: str, rows: Iterable[Sequence[Tuple]]) -> int:
+        """
+        Replace the decay-corrected values on every shard.
+
+        Rows are grouped by the shard their global sample ID belongs to, then
+        each shard's table is replaced in its own transaction, in parallel.
+        A shard with no rows is emptied.
+
+        Args:
+            reference_date (str): ISO reference date the values were corrected to
+            rows (Iterable[Sequence[Tuple]]): Batches of rows, as MilkSampleDBRepository.replace_decay_corrected,
+                with global sample IDs
+
+        Returns:
+            int: Number of rows written across all shards
+        """
+        by_shard: Dict[int, List[Tuple]] = {number: [] for number in self._shards}
+        for batch in rows:
+            for row in batch:
+                by_shard[row[0] % MAX_SHARDS].append((row[0] // MAX_SHARDS,) + tuple(row[1:]))
+        return sum(self._fan_out(lambda number, repository: repository.replace_decay_corrected(
+            reference_date, [by_shard[number]])))
+
+    def read_anomalies(self, rule: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read the anomaly flags of every shard in parallel, with global sample IDs.
+
+        Flags are written shard by shard by AnomalyDetector, which keeps one
+        scan watermark per shard.
+
+        Args:
+            rule (Optional[str]): Only return flags raised by this rule
+
+        Returns:
+            List[Dict[str, Any]]: Flags ordered by global sample ID and rule
+        """
+        results = self._fan_out(lambda number, repository: [
+            dict(flag, sample_id=self._global_id(number, flag['sample_id']))
+            for flag in repository.read_anomalies(rule)
+        ])
+        return sorted((flag for flags in results for flag in flags),
+                      key=lambda flag: (flag['sample_id'], flag['rule']))
+
+    def get_max_sample_id(self) -> int:
+        """
+        Get the highest global ID across all shards.
+
+        Returns:
+            int: Highest ID, or 0 if there are no records
+        """
+        local_ids = self._fan_out(lambda number, repository: (number, repository.get_max_sample_id()))
+        return max((self._global_id(number, local_id) for number, local_id in local_ids if local_id), default=0)
+
+    def rebuild_cube(self) -> int:
+        """
+        Rebuild the sample cube of every shard in parallel.
+
+        Returns:
+            int: Total number of cube cells written
+        """
+        return sum(self._fan_out(lambda number, repository: repository.rebuild_cube()))
+
+    def query_cube(self, group_by: Sequence[str], filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Query the sample cube of every shard in parallel and merge the groups.
+
+        Args:
+            group_by (Sequence[str]): Dimensions to group by
+            filters (Optional[Dict[str, Any]]): Dimension values to filter on
+
+        Returns:
+            List[Dict[str, Any]]: Same rows as MilkSampleDBRepository.query_cube
+        """
+        merged: Dict[Tuple, Dict[str, Any]] = {}
+        for rows in self._fan_out(lambda number, repository: repository.query_cube(group_by, filters)):
+            for row in rows:
+                key = tuple(row[dimension] for dimension in group_by)
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = dict(row)
+                    continue
+                for measure in ('sample_count', 'activity_sum', 'activity_sum_sq'):
+                    total[measure] += row[measure]
+        return [merged[key] for key in sorted(merged)]
+
+    def _changes_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the merged change log, creating its tables once."""
+        connection = self._changes_config.get_connection()
+        if not self._changes_ready:
+            connection.executescript(MERGED_CHANGES_SCHEMA)
+            self._changes_ready = True
+        return connection
+
+    def _merge_shard_changes(self, conn: sqlite3.Connection) -> None:
+        """
+        Copy the shard change log entries not merged yet into the merged log.
+
+        Entries get the next merged sequence numbers with their sample IDs
+        translated to global IDs. Each shard's entries keep their order;
+        entries of different shards are merged shard by shard, since writes
+        to different shards have no order between them. If a shard's log
+        was truncated past the merged position, the merged log is marked
+        truncated through a new sequence number so every consumer resyncs.
+        """
+        def positions() -> Dict[int, int]:
+            return {row['shard']: row['local_seq']
+                    for row in conn.execute("SELECT shard, local_seq FROM shard_change_positions")}
+
+        # Cheap check first, so reads of an unchanged log take no write lock
+        merged = positions()
+        if all(repository.get_latest_change_seq() == merged.get(number, 0)
+               for number, repository in self._shards.items()):
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            merged = positions()
+            for number, repository in sorted(self._shards.items()):
+                position = merged.get(number, 0)
+                try:
+                    while True:
+                        entries = repository.read_changes(position, CHANGE_MERGE_BATCH_SIZE)
+                        if not entries:
+                            break
+                        conn.executemany(
+                            "INSERT INTO merged_changes (shard, op, sample_id, changed_at) VALUES (?, ?, ?, ?)",
+                            [(number, entry['op'],
+                              self._global_id(number, entry['sample_id']) if entry['sample_id'] is not None else None,
+                              entry['changed_at']) for entry in entries])
+                        position = entries[-1]['seq']
+                except ChangeLogTruncatedError:
+                    # Skip the lost entries and use up one sequence number, so even a
+                    # consumer that had read everything merged is behind the truncation
+                    position = repository.get_latest_change_seq()
+                    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'merged_changes'").fetchone()
+                    truncated_through = (row['seq'] if row else 0) + 1
+                    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'merged_changes'")
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('merged_changes', ?)",
+                                 (truncated_through,))
+                    self._truncate_merged_changes(conn, truncated_through)
+                conn.execute("INSERT OR REPLACE INTO shard_change_positions (shard, local_seq) VALUES (?, ?)",
+                             (number, position))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def _truncate_merged_changes(conn: sqlite3.Connection, truncate_through: int) -> int:
+        """Drop merged entries through a sequence number and record that consumers behind it must resync."""
+        removed = conn.execute("DELETE FROM merged_changes WHERE seq <= ?", (truncate_through,)).rowcount
+        conn.execute("""
+        INSERT INTO change_log_state (id, truncated_through) VALUES (1, ?)
+        ON CONFLICT (id) DO UPDATE SET truncated_through = MAX(truncated_through, excluded.truncated_through)
+        """, (truncate_through,))
+        return removed
+
+    def read_changes(self, since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read merged change log entries after a sequence number.
+
+        Shard logs are merged into the change log of the shard directory
+        first, so the sequence numbers cover every shard; see
+        _merge_shard_changes for the order of entries.
+
+        Args:
+            since_seq (int): Sequence number the consumer has already seen
+            limit (Optional[int]): Maximum number of entries to return
+
+        Returns:
+            List[Dict[str, Any]]: Same entries as MilkSampleDBRepository.read_changes, with global sample IDs
+
+        Raises:
+            ChangeLogTruncatedError: If entries after since_seq were removed by retention
+        """
+        with self._changes_lock:
+            conn = self._changes_connection()
+            self._merge_shard_changes(conn)
+            state = conn.execute("SELECT truncated_through FROM change_log_state WHERE id = 1").fetchone()
+            if state and since_seq < state['truncated_through']:
+                raise ChangeLogTruncatedError(
+                    f"Changes through {state['truncated_through']} were removed; resync required")
+            rows = conn.execute("SELECT seq, op, sample_id, changed_at FROM merged_changes "
+                                "WHERE seq > ? ORDER BY seq LIMIT ?", (since_seq, limit if limit else -1)).fetchall()
+            conn.commit()
+
+        # Current record states are read with one batched query per shard, in parallel
+        wanted: Dict[int, List[int]] = {}
+        for row in rows:
+            if row['op'] != 'delete' and row['sample_id'] is not None:
+                wanted.setdefault(row['sample_id'] % MAX_SHARDS, []).append(row['sample_id'] // MAX_SHARDS)
+        futures = {number: self._executor.submit(self._shards[number].read_samples_by_ids, local_ids)
+                   for number, local_ids in wanted.items() if number in self._shards}
+        records = {self._global_id(number, local_id): record
+                   for number, future in futures.items() for local_id, record in future.result().items()}
+        return [{
+            'seq': row['seq'],
+            'op': row['op'],
+            'sample_id': row['sample_id'],
+            'changed_at': row['changed_at'],
+            'record': records.get(row['sample_id']) if row['op'] != 'delete' else None
+        } for row in rows]
+
+    def get_latest_change_seq(self) -> int:
+        """
+        Get the last sequence number ever assigned in the merged change log.
+
+        Returns:
+            int: Latest sequence number, or 0 if nothing has been logged
+        """
+        with self._changes_lock:
+            conn = self._changes_connection()
+            self._merge_shard_changes(conn)
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'merged_changes'").fetchone()
+            conn.commit()
+            return row['seq'] if row else 0
+
+    def compact_change_log(self, policy: Optional[ChangeLogPolicy] = None) -> int:
+        """
+        Compact the merged change log according to a policy.
+
+        Retention limits apply to the merged log only. Each shard's own log
+        is just coalesced, if the policy coalesces, so no entry is dropped
+        from a shard before it has been merged.
+
+        Args:
+            policy (Optional[ChangeLogPolicy]): Compaction policy (default: coalesce only)
+
+        Returns:
+            int: Number of entries removed from the merged log
+        """
+        policy = policy or ChangeLogPolicy()
+        with self._changes_lock:
+            conn = self._changes_connection()
+            self._merge_shard_changes(conn)
+            try:
+                removed = 0
+                if policy.coalesce:
+                    removed += conn.execute("""
+                    DELETE FROM merged_changes
+                    WHERE sample_id IS NOT NULL
+                      AND seq < (SELECT MAX(seq) FROM merged_changes latest
+                                 WHERE latest.sample_id = merged_changes.sample_id)
+                    """).rowcount
+
+                truncate_through = 0
+                if policy.max_entries is not None:
+                    latest = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'merged_changes'").fetchone()
+                    truncate_through = max(truncate_through, (latest['seq'] if latest else 0) - policy.max_entries)
+                if policy.retention_days is not None:
+                    expired = conn.execute("SELECT MAX(seq) FROM merged_changes WHERE changed_at < datetime('now', ?)",
+                                           (f"-{policy.retention_days} days",)).fetchone()[0]
+                    truncate_through = max(truncate_through, expired or 0)
+                if truncate_through > 0:
+                    removed += self._truncate_merged_changes(conn, truncate_through)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        if policy.coalesce:
+            self._fan_out(lambda number, repository: repository.compact_change_log(ChangeLogPolicy()))
+        return removed
+
+    def start_change_log_after(self, seq: int) -> None:
+        """
+        Restart the merged change log after a sequence number with a 'reset' entry.
+
+        Shard entries not merged yet are skipped, since the reset covers them.
+
+        Args:
+            seq (int): Latest sequence number of the data being replaced
+        """
+        with self._changes_lock:
+            conn = self._changes_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM merged_changes")
+                conn.execute("DELETE FROM change_log_state")
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = 'merged_changes'")
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('merged_changes', ?)", (seq,))
+                conn.execute("INSERT INTO merged_changes (op) VALUES ('reset')")
+                conn.executemany("INSERT OR REPLACE INTO shard_change_positions (shard, local_seq) VALUES (?, ?)",
+                                 [(number, repository.get_latest_change_seq())
+                                  for number, repository in sorted(self._shards.items())])
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
@@ -0,0 +1,438 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains a generator of synthetic strontium-90 milk sample data
+for load testing. It is part of the Persistence Layer.
+
+This module is responsible for:
+- Learning per-station distributions, trends, seasonality and missing-field
+  rates from the real CSV file
+- Generating any number of records deterministically from a seed
+- Writing the records as CSV in the format DataMigration reads
+- Inserting the records directly into a repository
+
+Usage:
+    python -m src.persistence.synthetic_dataset synthetic.csv --rows 1000000 --seed 7
+    python -m src.persistence.synthetic_dataset --db synthetic.db --rows 100000
+
+The generated series are the real stations' sampling schedules, replicated
+as often as needed. Replica r > 0 of a station is named "<STATION> <r+1>".
+"""
+
+import sys
+import os
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import csv
+import gzip
+import io
+import logging
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import islice
+from statistics import median
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+from src.observability.structured_logging import ProgressReporter, configure_logging
+from src.persistence.data_migration import DataMigration
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.sample_export import CSV_HEADER, WRITE_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Spread of log activity used when a station has too few samples to estimate its own
+DEFAULT_LOG_STD = 0.5
+
+# Activities further than this from a station's median in log space (a factor of about 150) are ignored
+OUTLIER_LOG_DISTANCE = 5.0
+
+MONTH_ABBREVIATIONS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+@dataclass
+class StationProfile:
+    """
+    What was learned about one station.
+
+    Activities are modelled as log-normal around a linear trend in log
+    space, shifted by a quarterly seasonal offset shared by all stations.
+
+    Attributes:
+        station_name (str): Station name
+        province (str): Province of the station
+        kinds (List[Tuple[str, str, float]]): (sample_type, type, weight) combinations
+        periods (List[Tuple[date, date]]): Sampling periods in schedule order
+        log_intercept (float): Log activity at reference_year
+        log_slope (float): Change in log activity per year
+        log_std (float): Standard deviation of the residuals
+        reference_year (float): Year the trend is centred on
+        error_missing_rate (float): Fraction of samples without sr90_error
+        calcium_missing_rate (float): Fraction of samples without sr90_activity_per_calcium
+    """
+    station_name: str
+    province: str
+    kinds: List[Tuple[str, str, float]]
+    periods: List[Tuple[date, date]]
+    log_intercept: float
+    log_slope: float
+    log_std: float
+    reference_year: float
+    error_missing_rate: float
+    calcium_missing_rate: float
+
+@dataclass
+class DatasetProfile:
+    """
+    Distributions learned from a source CSV file.
+
+    Attributes:
+        stations (List[StationProfile]): One profile per source station, sorted by name
+        quarter_offsets (List[float]): Seasonal log-activity offset for quarters 1-4
+        error_ratio (Tuple[float, float]): Mean and std of log(sr90_error / sr90_activity)
+        calcium_ratio (Tuple[float, float]): Mean and std of log(per_calcium / sr90_activity)
+    """
+    stations: List[StationProfile] = field(default_factory=list)
+    quarter_offsets: List[float] = field(default_factory=lambda: [0.0] * 4)
+    error_ratio: Tuple[float, float] = (math.log(0.1), 0.3)
+    calcium_ratio: Tuple[float, float] = (0.0, 0.3)
+
+    @property
+    def rows_per_cycle(self) -> int:
+        """Number of records in one replica of every station."""
+        return sum(len(station.periods) for station in self.stations)
+
+def _mean_std(values: Sequence[float], default_std: float) -> Tuple[float, float]:
+    """Get the mean and sample standard deviation, falling back for tiny samples."""
+    if not values:
+        return 0.0, default_std
+    mean = sum(values) / len(values)
+    if len(values) < 3:
+        return mean, default_std
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    return mean, math.sqrt(variance) or default_std
+
+def _quarter(day: date) -> int:
+    """Get the quarter (0-3) of a date."""
+    return (day.month - 1) // 3
+
+def _fractional_year(day: date) -> float:
+    """Get a date as a year with a fractional part, e.g. 1984.5 for early July 1984."""
+    return day.year + (day.timetuple().tm_yday - 1) / 365.25
+
+def learn_profile(records: Sequence[MilkSampleRecord]) -> DatasetProfile:
+    """
+    Learn a DatasetProfile from real records.
+
+    Records without a parseable start date or with a non-positive activity
+    still count towards kinds, schedules and missing rates but not towards
+    the activity model.
+
+    Args:
+        records (Sequence[MilkSampleRecord]): Source records
+
+    Returns:
+        DatasetProfile: The learned profile
+
+    Raises:
+        ValueError: If there are no records
+    """
+    if not records:
+        raise ValueError("Cannot learn a profile from an empty dataset")
+
+    by_station: Dict[str, List[MilkSampleRecord]] = defaultdict(list)
+    for record in records:
+        by_station[record.station_name].append(record)
+
+    # First pass: per-station trend in log space
+    fits = {}
+    for name, station_records in by_station.items():
+        points = []
+        for record in station_records:
+            start = parse_sample_date(record.start_date)
+            if start is not None and record.sr90_activity > 0:
+                points.append((_fractional_year(start), math.log(record.sr90_activity), _quarter(start)))
+        if points:
+            # Drop values off by orders of magnitude (the source has a few entries around 1E-09)
+            typical = median(point[1] for point in points)
+            points = [point for point in points if abs(point[1] - typical) <= OUTLIER_LOG_DISTANCE]
+            reference_year = sum(point[0] for point in points) / len(points)
+            mean_log = sum(point[1] for point in points) / len(points)
+            spread = sum((point[0] - reference_year) ** 2 for point in points)
+            slope = (sum((year - reference_year) * (value - mean_log) for year, value, _ in points) / spread
+                     if spread > 0 and len(points) >= 4 else 0.0)
+        else:
+            reference_year, mean_log, slope = 1990.0, math.log(0.05), 0.0
+        fits[name] = (reference_year, mean_log, slope, points)
+
+    # Shared seasonality from the trend residuals, then per-station spread after removing it
+    residuals_by_quarter: Dict[int, List[float]] = defaultdict(list)
+    for name, (reference_year, mean_log, slope, points) in fits.items():
+        for year, value, quarter in points:
+            residuals_by_quarter[quarter].append(value - mean_log - slope * (year - reference_year))
+    quarter_offsets = [_mean_std(residuals_by_quarter[quarter], 0.0)[0] for quarter in range(4)]
+
+    error_ratios = []
+    calcium_ratios = []
+    stations = []
+    for name in sorted(by_station):
+        station_records = by_station[name]
+        reference_year, mean_log, slope, points = fits[name]
+        residuals = []
+        for year, value, quarter in points:
+            residuals.append(value - mean_log - slope * (year - reference_year) - quarter_offsets[quarter])
+        _, log_std = _mean_std(residuals, DEFAULT_LOG_STD)
+
+        periods = []
+        for record in station_records:
+            start = parse_sample_date(record.start_date)
+            stop = parse_sample_date(record.stop_date)
+            if start is not None:
+                periods.append((start, stop or start + timedelta(days=90)))
+        periods.sort()
+
+        for record in station_records:
+            if record.sr90_activity > 0:
+                if record.sr90_error:
+                    error_ratios.append(math.log(record.sr90_error / record.sr90_activity))
+                if record.sr90_activity_per_calcium:
+                    calcium_ratios.append(math.log(record.sr90_activity_per_calcium / record.sr90_activity))
+
+        kinds = Counter((record.sample_type, record.type) for record in station_records)
+        stations.append(StationProfile(
+            station_name=name,
+            province=Counter(record.province for record in station_records).most_common(1)[0][0],
+            kinds=[(sample_type, kind, count / len(station_records))
+                   for (sample_type, kind), count in sorted(kinds.items())],
+            periods=periods,
+            log_intercept=mean_log,
+            log_slope=slope,
+            log_std=log_std,
+            reference_year=reference_year,
+            error_missing_rate=sum(1 for record in station_records if record.sr90_error is None) / len(station_records),
+            calcium_missing_rate=sum(1 for record in station_records
+                                     if record.sr90_activity_per_calcium is None) / len(station_records)
+        ))
+
+    return DatasetProfile(stations, quarter_offsets, _mean_std(error_ratios, 0.3), _mean_std(calcium_ratios, 0.3))
+
+def learn_profile_from_csv(csv_filename: str = "nms_strontium90_milk_ssn_strontium90_lait.csv") -> DatasetProfile:
+    """
+    Learn a DatasetProfile from a CSV file in the DataMigration format.
+
+    Args:
+        csv_filename (str): Name or path of the CSV file (relative paths are resolved from the project root)
+
+    Returns:
+        DatasetProfile: The learned profile
+    """
+    return learn_profile(DataMigration(csv_filename).read_csv_data())
+
+def _format_date(day: date) -> str:
+    """Format a date the way the source file does, e.g. 01-Jan-84."""
+    return f"{day.day:02d}-{MONTH_ABBREVIATIONS[day.month - 1]}-{day.year % 100:02d}"
+
+class SyntheticDatasetGenerator:
+    """
+    A seeded generator of synthetic milk sample records.
+
+    This class is responsible for:
+    1. Walking the learned station schedules, replicating stations until the
+       requested number of records is reached
+    2. Drawing activities, errors and calcium ratios from the profile
+    3. Producing identical output for identical seeds and profiles
+
+    Each station replica draws from its own random stream, so the records of
+    one replica do not depend on how many records were generated before it.
+
+    Attributes:
+        profile (DatasetProfile): Learned distributions
+        seed (int): Random seed
+    """
+
+    def __init__(self, profile: DatasetProfile, seed: int = 0):
+        """
+        Initialize the generator.
+
+        Args:
+            profile (DatasetProfile): Learned distributions
+            seed (int): Random seed
+
+        Raises:
+            ValueError: If the profile has no sampling periods
+        """
+        if profile.rows_per_cycle == 0:
+            raise ValueError("The profile has no sampling periods to generate from")
+        self.profile = profile
+        self.seed = seed
+        # Date strings and seasonal offsets are the same for every replica, so format them once
+        self._schedules = [
+            [(_format_date(start), _format_date(stop),
+              _fractional_year(start) - station.reference_year,
+              profile.quarter_offsets[_quarter(start)])
+             for start, stop in station.periods]
+            for station in profile.stations
+        ]
+
+    def iter_rows(self, count: int) -> Iterator[Tuple[str, ...]]:
+        """
+        Generate records as CSV field tuples, ready for csv.writer.
+
+        Args:
+            count (int): Number of records to generate
+
+        Yields:
+            Tuple[str, ...]: The nine fields in CSV_HEADER order
+        """
+        error_mean, error_std = self.profile.error_ratio
+        calcium_mean, calcium_std = self.profile.calcium_ratio
+        remaining = count
+        replica = 0
+        while remaining > 0:
+            for number, (station, schedule) in enumerate(zip(self.profile.stations, self._schedules)):
+                if remaining <= 0:
+                    return
+                if not schedule:
+                    continue
+                rng = random.Random((self.seed * 1_000_003 + replica) * 4099 + number)
+                gauss = rng.gauss
+                uniform = rng.random
+                name = station.station_name if replica == 0 else f"{station.station_name} {replica + 1}"
+                kinds = [(sample_type, kind) for sample_type, kind, _ in station.kinds]
+                weights = [weight for _, _, weight in station.kinds]
+                single_kind = kinds[0] if len(kinds) == 1 else None
+
+                for start, stop, years, seasonal in islice(schedule, remaining):
+                    log_activity = station.log_intercept + station.log_slope * years + seasonal
+                    activity = math.exp(gauss(log_activity, station.log_std))
+                    error = ("" if uniform() < station.error_missing_rate
+                             else f"{activity * math.exp(gauss(error_mean, error_std)):.2E}")
+                    calcium = ("" if uniform() < station.calcium_missing_rate
+                               else f"{activity * math.exp(gauss(calcium_mean, calcium_std)):.2E}")
+                    sample_type, kind = single_kind or rng.choices(kinds, weights)[0]
+                    yield (sample_type, kind, start, stop, name, station.province, f"{activity:.2E}", error, calcium)
+                remaining -= min(remaining, len(schedule))
+            replica += 1
+
+    def iter_records(self, count: int) -> Iterator[MilkSampleRecord]:
+        """
+        Generate records as MilkSampleRecord objects.
+
+        Args:
+            count (int): Number of records to generate
+
+        Yields:
+            MilkSampleRecord: Generated records
+        """
+        for row in self.iter_rows(count):
+            yield MilkSampleRecord(*row)
+
+    def write_csv(self, destination: str, count: int, compress: Optional[bool] = None) -> Dict[str, float]:
+        """
+        Write generated records to a CSV file that DataMigration can import.
+
+        Args:
+            destination (str): Output path
+            count (int): Number of records
+            compress (Optional[bool]): gzip the output (default: when the path ends in .gz)
+
+        Returns:
+            Dict[str, float]: rows, bytes, seconds and rows_per_second
+        """
+        if compress is None:
+            compress = destination.endswith(".gz")
+        started = time.perf_counter()
+        partial = destination + ".partial"
+        try:
+            with open(partial, "wb", buffering=WRITE_BUFFER_SIZE) as raw:
+                binary = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) if compress else raw
+                text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+                writer = csv.writer(text)
+                writer.writerow(CSV_HEADER)
+                rows = self.iter_rows(count)
+                while True:
+                    block = list(islice(rows, 65536))
+                    if not block:
+                        break
+                    writer.writerows(block)
+                text.flush()
+                text.detach()
+                if compress:
+                    binary.close()
+            os.replace(partial, destination)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        seconds = time.perf_counter() - started
+        return {'rows': count, 'bytes': os.path.getsize(destination), 'seconds': seconds,
+                'rows_per_second': count / seconds if seconds else 0.0}
+
+    def populate(self, repository, count: int, batch_size: int = 10000, clear: bool = True) -> Dict[str, float]:
+        """
+        Insert generated records directly into a repository.
+
+        Args:
+            repository (SampleRepository): Repository to fill
+            count (int): Number of records
+            batch_size (int): Records inserted per transaction
+            clear (bool): Remove existing records first
+
+        Returns:
+            Dict[str, float]: rows, seconds and rows_per_second
+        """
+        started = time.perf_counter()
+        if clear:
+            repository.clear_all_samples()
+        records = self.iter_records(count)
+        inserted = 0
+        reporter = ProgressReporter(logger, "populate", count)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            inserted += repository.create_samples(batch, update_cube=False)
+            reporter.advance(len(batch))
+        repository.rebuild_cube()
+        reporter.finish()
+        seconds = time.perf_counter() - started
+        return {'rows': inserted, 'seconds': seconds, 'rows_per_second': inserted / seconds if seconds else 0.0}
+
+def main(argv: Optional[list] = None) -> None:
+    """Generate a synthetic dataset from the command line."""
+    parser = argparse.ArgumentParser(description="Generate synthetic strontium-90 milk sample data")
+    parser.add_argument("destination", nargs="?", help="CSV file to write (.gz to compress)")
+    parser.add_argument("--db", help="populate this database instead of writing a CSV file")
+    parser.add_argument("--rows", type=int, default=10000, help="number of records")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--source", default="nms_strontium90_milk_ssn_strontium90_lait.csv",
+                        help="real CSV file to learn from")
+    args = parser.parse_args(argv)
+    if bool(args.destination) == bool(args.db):
+        parser.error("give either a destination CSV file or --db")
+    configure_logging()
+
+    generator = SyntheticDatasetGenerator(learn_profile_from_csv(args.source), args.seed)
+    if args.destination:
+        result = generator.write_csv(args.destination, args.rows)
+        print(f"Wrote {result['rows']} records ({result['bytes']} bytes) to {args.destination} "
+              f"in {result['seconds']:.1f}s ({result['rows_per_second']:.0f} records/s)")
+    else:
+        repository = MilkSampleDBRepository(DatabaseConfig(args.db))
+        result = generator.populate(repository, args.rows)
+        print(f"Inserted {result['rows']} records into {args.db} "
+              f"in {result['seconds']:.1f}s ({result['rows_per_second']:.0f} records/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the non-interactive command-line interface for scripts,
+cron and batch jobs. It is part of the Presentation Layer.
+
+This module is responsible for:
+- Parsing subcommands and the database, logging and profiling options they share
+- Opening the database only when, and as far as, a subcommand needs it
+- Printing machine-readable results and returning a process exit status
+
+Usage:
+    python -m src.presentation.cli [--db PATH] [--pragmas wal] COMMAND ...
+
+Commands:
+    import   Import the CSV file (in place, or --swap to rebuild beside the live file)
+    upgrade  Update the schema of a database created by an older version
+    sync     Write the changes since the last run as JSON Lines (--state remembers the position)
+    query    Print matching samples as JSON Lines or a table
+    stats    Print the sample statistics as JSON
+    export   Export samples to CSV, JSON Lines or columnar files
+    bench    Run benchmarks/run_benchmarks.py with the remaining arguments
+    backup   Copy the database with the online backup API (or --snapshot for VACUUM INTO)
+
+Unlike the interactive viewer, nothing is reloaded at startup: "stats" opens
+the existing database read-only and runs one aggregate query. Commands that
+read the database never change the file: they exit with status 1 if it does
+not exist or its schema is out of date. Modules only some
+commands need are imported by those commands.
+"""
+
+import sys
+import os
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import json
+import sqlite3
+from dataclasses import asdict
+from datetime import date
+from typing import Any, Callable, Dict, Optional, TextIO
+from urllib.request import pathname2url
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.observability.profiling import add_profile_arguments, describe_result, profile_options_from_args, profiled
+from src.observability.slow_queries import configure_slow_query_log
+from src.observability.structured_logging import configure_logging
+from src.persistence.database_config import PRAGMA_PRESETS, SCHEMA_VERSION, DatabaseConfig, parse_pragmas
+from src.persistence.milk_sample_db_repository import ChangeLogTruncatedError, MilkSampleDBRepository
+from src.presentation.export_cli import add_export_arguments, run_export
+
+DEFAULT_CSV_FILE = "nms_strontium90_milk_ssn_strontium90_lait.csv"
+
+# Exit status of a sync whose position was compacted away
+EXIT_RESYNC_REQUIRED = 3
+
+class CommandContext:
+    """
+    Database handles for one command, created on first use.
+
+    Subcommands that only copy the file (backup) never build a repository,
+    and those that do not touch the database (bench) never open it. Those
+    that only read it (sync, query, stats, export, backup) open the file
+    read-only, refuse a missing file rather than create an empty one, and
+    refuse an out-of-date schema rather than upgrade it.
+
+    Attributes:
+        args (argparse.Namespace): Parsed command line
+        stdout (TextIO): Where results are printed
+    """
+
+    def __init__(self, args: argparse.Namespace, stdout: Optional[TextIO] = None):
+        """
+        Initialize the context without opening anything.
+
+        Args:
+            args (argparse.Namespace): Parsed command line
+            stdout (Optional[TextIO]): Where results are printed (default: sys.stdout)
+        """
+        self.args = args
+        self.stdout = stdout or sys.stdout
+        self._db_config: Optional[DatabaseConfig] = None
+        self._repository: Optional[MilkSampleDBRepository] = None
+        self._service: Optional[MilkSampleDBService] = None
+
+    @property
+    def reads_only(self) -> bool:
+        """Whether the command only reads the database."""
+        return getattr(self.args, 'reads_database', False)
+
+    @property
+    def db_config(self) -> DatabaseConfig:
+        """
+        The database configuration, with the requested pragmas and busy timeout.
+
+        Commands that only read a database file open it with mode=ro. URIs
+        are used as given, since their own mode says what is allowed.
+
+        Raises:
+            FileNotFoundError: If the command only reads and the database file does not exist
+        """
+        if self._db_config is None:
+            pragmas = parse_pragmas(self.args.pragmas, self.args.pragma)
+            busy_timeout = self.args.busy_timeout_ms / 1000.0
+            db_config = DatabaseConfig(self.args.db, pragmas=pragmas, busy_timeout=busy_timeout)
+            if self.reads_only and not db_config.uri:
+                if not os.path.exists(db_config.db_path):
+                    raise FileNotFoundError(f"Database not found: {db_config.db_path}")
+                # The journal mode is stored in the file, and a read-only connection cannot change it
+                pragmas.pop('journal_mode', None)
+                db_config = DatabaseConfig(f"file:{pathname2url(db_config.db_path)}?mode=ro",
+                                           pragmas=pragmas, busy_timeout=busy_timeout)
+            self._db_config = db_config
+        return self._db_config
+
+    @property
+    def repository(self) -> MilkSampleDBRepository:
+        """
+        The repository, which creates the schema if the database is new.
+
+        Raises:
+            ValueError: If the command only reads and the schema is not the current version
+        """
+        if self._repository is None:
+            if self.reads_only:
+                version = self.schema_version()
+                if version != SCHEMA_VERSION:
+                    raise ValueError(f"Database schema is version {version}, expected {SCHEMA_VERSION}; "
+                                     f"run the upgrade command to update it")
+            self._repository = MilkSampleDBRepository(self.db_config)
+        return self._repository
+
+    def schema_version(self) -> int:
+        """Read the schema version stored in the database."""
+        with self.db_config.get_db_context() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    @property
+    def service(self) -> MilkSampleDBService:
+        """The service over the repository."""
+        if self._service is None:
+            self._service = MilkSampleDBService(self.repository)
+        return self._service
+
+    def print_json(self, value: Any) -> None:
+        """Print a value as indented JSON."""
+        print(json.dumps(value, indent=2, default=str), file=self.stdout)
+
+    def close(self) -> None:
+        """Close whatever was opened."""
+        if self._db_config is not None:
+            self._db_config.close_all_connections()
+
+def _sample_to_dict(record_id: int, record) -> Dict[str, Any]:
+    """Convert an (id, record) row to JSON-compatible values."""
+    return dict(id=record_id, **asdict(record))
+
+def _change_to_dict(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a change log entry to JSON-compatible values."""
+    record = entry['record']
+    return dict(entry, record=asdict(record) if record is not None else None)
+
+def run_import(context: CommandContext, args: argparse.Namespace) -> int:
+    """Import the CSV file into the database."""
+    from src.persistence.data_migration import DataMigration
+    from src.persistence.database_reloader import DatabaseReloader
+
+    if args.swap:
+        result = DatabaseReloader(context.repository, args.csv, args.batch_size).run()
+        context.print_json({'total': result.total_records, 'successful': result.successful_inserts,
+                            'failed': result.failed_inserts, 'seconds': round(result.seconds, 3),
+                            'swapped': result.swapped, 'error': result.error})
+        return 0 if result.swapped else 1
+    total, successful, failed = DataMigration(args.csv, context.repository).migrate_data(args.batch_size)
+    context.print_json({'total': total, 'successful': successful, 'failed': failed})
+    return 0 if total and not failed else 1
+
+def run_upgrade(context: CommandContext, args: argparse.Namespace) -> int:
+    """Bring the schema of an existing database up to date."""
+    if not context.db_config.uri and not os.path.exists(context.db_config.db_path):
+        raise FileNotFoundError(f"Database not found: {context.db_config.db_path}")
+    version = context.schema_version()
+    context.repository
+    context.print_json({'schema_version': SCHEMA_VERSION, 'upgraded': version != SCHEMA_VERSION})
+    return 0
+
+def run_sync(context: CommandContext, args: argparse.Namespace) -> int:
+    """Write the change log entries after a position as JSON Lines."""
+    since = args.since
+    if since is None and args.state and os.path.exists(args.state):
+        with open(args.state, encoding="utf-8") as file:
+            since = int(file.read().strip() or 0)
+    since = since or 0
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else context.stdout
+    last_seq = since
+    try:
+        for entry in context.service.changes_since(since, args.limit):
+            output.write(json.dumps(_change_to_dict(entry)) + "\n")
+            last_seq = entry['seq']
+    except ChangeLogTruncatedError as e:
+        print(f"{e}; export the full data set and restart from seq 0", file=sys.stderr)
+        return EXIT_RESYNC_REQUIRED
+    finally:
+        if args.output:
+            output.close()
+
+    if args.state:
+        partial = args.state + ".partial"
+        with open(partial, "w", encoding="utf-8") as file:
+            file.write(f"{last_seq}\n")
+        os.replace(partial, args.state)
+    return 0
+
+def run_query(context: CommandContext, args: argparse.Namespace) -> int:
+    """Print the samples matching the filters."""
+    rows = context.service.iter_query_samples(args.province, args.station, args.start_from, args.start_until,
+                                              args.limit, args.offset)
+    for record_id, record in rows:
+        if args.format == "table":
+            activity = "N/A" if record.sr90_activity is None else f"{record.sr90_activity:.4f}"
+            print(f"{record_id:>7}  {record.start_date:<10} {record.stop_date:<10} {record.province:<4} "
+                  f"{record.station_name:<20} {activity:>9}", file=context.stdout)
+        else:
+            print(json.dumps(_sample_to_dict(record_id, record)), file=context.stdout)
+    return 0
+
+def run_stats(context: CommandContext, args: argparse.Namespace) -> int:
+    """Print the sample statistics."""
+    if args.group_by:
+        context.print_json(context.service.query_cube([column for column in args.group_by.split(",") if column]))
+    elif args.detailed:
+        context.print_json(context.service.get_detailed_statistics())
+    else:
+        context.print_json(context.service.get_statistics())
+    return 0
+
+def run_export_command(context: CommandContext, args: argparse.Namespace) -> int:
+    """Export the samples matching the filters to a file."""
+    context.print_json(run_export(context.service, args))
+    return 0
+
+def run_bench(context: CommandContext, args: argparse.Namespace) -> int:
+    """Run the benchmark suite, which builds its own synthetic databases."""
+    try:
+        from benchmarks.run_benchmarks import main as run_benchmarks
+    except ImportError:
+        print("The benchmark suite is only available in a source checkout", file=sys.stderr)
+        return 2
+    return run_benchmarks(args.bench_args)
+
+def run_backup(context: CommandContext, args: argparse.Namespace) -> int:
+    """Copy the database to a file."""
+    if args.snapshot:
+        report = context.db_config.export_snapshot(args.destination, read_only=not args.writable)
+    else:
+        report = context.db_config.backup(args.destination, args.pages_per_step)
+    context.print_json({'destination': report.destination, 'pages': report.pages, 'bytes': report.bytes_copied,
+                        'seconds': round(report.seconds, 3)})
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser with every subcommand.
+
+    Returns:
+        argparse.ArgumentParser: Parser whose results carry the command's handler
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.presentation.cli",
+                                     description="Script imports, queries, exports and maintenance of the milk sample database")
+    parser.add_argument("--db", default="milk_samples.db", help="database path or SQLite URI")
+    parser.add_argument("--pragmas", choices=sorted(PRAGMA_PRESETS), default="default", help="pragma preset")
+    parser.add_argument("--pragma", action="append", default=[], metavar="NAME=VALUE",
+                        help="set one pragma, overriding the preset (repeatable)")
+    parser.add_argument("--busy-timeout-ms", type=float, default=5000.0,
+                        help="how long SQLite waits for a lock before SQLITE_BUSY")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="log SQL statements slower than this and print the top statements to stderr")
+    parser.add_argument("--log-level", help="logging level (default: SR90_LOG_LEVEL or WARNING)")
+    add_profile_arguments(parser)
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    command = commands.add_parser("import", help="import the CSV file")
+    command.add_argument("--csv", default=DEFAULT_CSV_FILE, help="CSV file to import")
+    command.add_argument("--batch-size", type=int, default=1000, help="records inserted per transaction")
+    command.add_argument("--swap", action="store_true",
+                         help="build a new file and swap it in, so readers never see a partial import")
+    command.set_defaults(handler=run_import)
+
+    command = commands.add_parser("upgrade", help="update the schema of an existing database")
+    command.set_defaults(handler=run_upgrade)
+
+    command = commands.add_parser("sync", help="write the changes since a position as JSON Lines")
+    command.add_argument("--since", type=int, help="sequence number of the last change already applied")
+    command.add_argument("--state", help="file holding the position; read at start and updated at the end")
+    command.add_argument("--limit", type=int, help="maximum number of changes")
+    command.add_argument("--output", help="append to this file instead of printing")
+    command.set_defaults(handler=run_sync, reads_database=True)
+
+    command = commands.add_parser("query", help="print matching samples")
+    command.add_argument("--province", help="only samples from this province")
+    command.add_argument("--station", help="only samples from this station")
+    command.add_argument("--start-from", type=date.fromisoformat, help="earliest start date (YYYY-MM-DD)")
+    command.add_argument("--start-until", type=date.fromisoformat, help="latest start date (YYYY-MM-DD)")
+    command.add_argument("--limit", type=int, help="maximum number of samples")
+    command.add_argument("--offset", type=int, default=0, help="matching samples to skip")
+    command.add_argument("--format", choices=("jsonl", "table"), default="jsonl", help="output format")
+    command.set_defaults(handler=run_query, reads_database=True)
+
+    command = commands.add_parser("stats", help="print sample statistics as JSON")
+    command.add_argument("--detailed", action="store_true",
+                         help="activity statistics per province, station and year (scans every sample)")
+    command.add_argument("--group-by", metavar="COLUMNS", help="comma-separated cube dimensions, e.g. province,year")
+    command.set_defaults(handler=run_stats, reads_database=True)
+
+    command = commands.add_parser("export", help="export samples to a file")
+    add_export_arguments(command)
+    command.set_defaults(handler=run_export_command, reads_database=True)
+
+    command = commands.add_parser("bench", help="run the benchmark suite; other arguments are passed on to it")
+    command.set_defaults(handler=run_bench)
+
+    command = commands.add_parser("backup", help="copy the database to a file")
+    command.add_argument("destination", help="backup file")
+    command.add_argument("--snapshot", action="store_true", help="write a compacted copy with VACUUM INTO")
+    command.add_argument("--writable", action="store_true", help="with --snapshot, leave the copy writable")
+    command.add_argument("--pages-per-step", type=int, default=256, help="pages copied per backup step")
+    command.set_defaults(handler=run_backup, reads_database=True)
+    return parser
+
+def main(argv: Optional[list] = None, stdout: Optional[TextIO] = None) -> int:
+    """
+    Run one command.
+
+    Args:
+        argv (Optional[list]): Command line (default: sys.argv[1:])
+        stdout (Optional[TextIO]): Where results are printed (default: sys.stdout)
+
+    Returns:
+        int: Process exit status (1 when the command failed)
+    """
+    parser = build_parser()
+    # Options the benchmark suite understands are left for it
+    args, args.bench_args = parser.parse_known_args(argv)
+    if args.bench_args and args.command != "bench":
+        parser.error(f"unrecognized arguments: {' '.join(args.bench_args)}")
+    configure_logging(args.log_level)
+    try:
+        parse_pragmas(args.pragmas, args.pragma)
+    except ValueError as e:
+        parser.error(str(e))
+
+    slow_query_log = configure_slow_query_log(args.slow_query_ms) if args.slow_query_ms is not None else None
+    context = CommandContext(args, stdout)
+    handler: Callable[[CommandContext, argparse.Namespace], int] = args.handler
+    try:
+        with profiled(args.command, profile_options_from_args(args)) as profile:
+            status = handler(context, args)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); stop without a traceback at exit
+        if context.stdout is sys.stdout:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"{args.command} failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        context.close()
+        if slow_query_log is not None:
+            configure_slow_query_log(None)
+            print(slow_query_log.report(), file=sys.stderr)
+    if profile is not None:
+        print(describe_result(profile), file=sys.stderr)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
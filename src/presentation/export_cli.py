@@ -0,0 +1,105 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the command-line entry point for exporting milk samples.
+It is part of the Presentation Layer.
+
+Usage:
+    python -m src.presentation.export_cli samples.csv.gz --province ON
+    python -m src.presentation.export_cli samples.jsonl --start-from 1990-01-01
+    python -m src.presentation.export_cli samples.sr90 --format columnar
+
+The format defaults from the file extension (.csv, .jsonl, anything else is
+columnar) and a trailing .gz turns on gzip compression.
+"""
+
+import sys
+import os
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import json
+from datetime import date
+from typing import Optional
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.observability.structured_logging import configure_logging
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.sample_export import EXPORT_FORMATS
+
+def guess_format(destination: str) -> str:
+    """
+    Pick an export format from a file name.
+
+    Args:
+        destination (str): Output path, optionally ending in .gz
+
+    Returns:
+        str: 'csv', 'jsonl' or 'columnar'
+    """
+    name = destination[:-3] if destination.endswith(".gz") else destination
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "columnar"
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the export options to an argument parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend
+    """
+    parser.add_argument("destination", help="output file (.gz to compress)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="output format (default: from the extension)")
+    parser.add_argument("--gzip", action="store_true", default=None, help="compress even without a .gz extension")
+    parser.add_argument("--province", help="only export samples from this province")
+    parser.add_argument("--station", help="only export samples from this station")
+    parser.add_argument("--start-from", type=date.fromisoformat, help="earliest start date (YYYY-MM-DD)")
+    parser.add_argument("--start-until", type=date.fromisoformat, help="latest start date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, help="maximum number of samples")
+    parser.add_argument("--page-size", type=int, default=5000, help="samples fetched per query")
+
+def run_export(service: MilkSampleDBService, args: argparse.Namespace) -> dict:
+    """
+    Run an export described by parsed arguments.
+
+    Args:
+        service (MilkSampleDBService): Service to export from
+        args (argparse.Namespace): Arguments from a parser set up by add_export_arguments
+
+    Returns:
+        dict: Export summary from MilkSampleDBService.export_samples
+    """
+    return service.export_samples(
+        args.destination,
+        args.format or guess_format(args.destination),
+        args.gzip,
+        args.page_size,
+        province=args.province,
+        station_name=args.station,
+        start_from=args.start_from,
+        start_until=args.start_until,
+        limit=args.limit
+    )
+
+def main(argv: Optional[list] = None) -> None:
+    """Export samples from the command line and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description="Export milk samples to CSV, JSON Lines or columnar files")
+    parser.add_argument("--db", default="milk_samples.db", help="database path or SQLite URI")
+    add_export_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    service = MilkSampleDBService(MilkSampleDBRepository(DatabaseConfig(args.db)))
+    print(json.dumps(run_export(service, args), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains a small read-only HTTP/JSON server over MilkSampleDBService.
+It is part of the Presentation Layer.
+
+Endpoints (all GET):
+- /health                   Liveness check
+- /samples/<id>             One sample as a JSON object
+- /samples                  Samples as JSON Lines; filters: province, station,
+                            start_from, start_until (YYYY-MM-DD), limit, offset
+- /stats                    Summary statistics
+- /provinces, /stations     Distinct values
+- /cube                     Cube roll-up; group_by=year,province plus dimension filters
+- /changes                  Change log as JSON Lines; since, limit
+- /metrics                  Instrumentation metrics; format=prometheus (default), json or text
+
+Every data response carries an ETag built from the data generation, and a
+matching If-None-Match request is answered with 304 Not Modified.
+"""
+
+import sys
+import os
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import json
+import logging
+import selectors
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import chain
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import DatabaseConfig
+from src.observability.metrics import REGISTRY
+from src.observability.slow_queries import configure_slow_query_log
+from src.observability.structured_logging import configure_logging
+from src.persistence.milk_sample_db_repository import CUBE_DIMENSIONS, ChangeLogTruncatedError, MilkSampleDBRepository
+
+# Rows fetched from the database per page when streaming JSON Lines
+STREAM_PAGE_SIZE = 1000
+
+# Seconds a keep-alive connection may stay idle, or take to send a request, before it is closed
+KEEP_ALIVE_TIMEOUT = 15.0
+
+# Cube dimensions stored as integers
+INTEGER_DIMENSIONS = ('year', 'quarter')
+
+logger = logging.getLogger(__name__)
+
+class BadRequest(Exception):
+    """Raised by request parsing when a query parameter is invalid."""
+
+class PooledHTTPServer(HTTPServer):
+    """
+    An HTTP server that handles requests on a fixed pool of worker threads.
+
+    ThreadingHTTPServer starts a new thread per connection, and every new
+    thread would open a new SQLite connection. A fixed pool keeps one open
+    connection per worker, reused across requests.
+
+    A worker only holds a connection while a request is being answered.
+    New connections, and keep-alive connections between requests, wait in
+    a selector on a watcher thread, which hands a connection to the pool
+    once the client sends something and closes it after idle_timeout
+    seconds of silence. Idle clients therefore never tie up the workers.
+
+    Attributes:
+        service (MilkSampleDBService): Service answering the queries
+        instance_id (str): Random per-process token included in ETags
+        idle_timeout (float): Seconds an idle connection is kept open
+    """
+
+    def __init__(self, address: Tuple[str, int], service: MilkSampleDBService, max_workers: int = 8):
+        """
+        Initialize the server, its worker pool and the idle connection watcher.
+
+        Args:
+            address (Tuple[str, int]): Host and port to listen on (port 0 picks a free port)
+            service (MilkSampleDBService): Service answering the queries
+            max_workers (int): Number of worker threads
+        """
+        super().__init__(address, SampleRequestHandler)
+        self.service = service
+        # The generation counter restarts with the process, so ETags include a per-process token
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.idle_timeout = self.RequestHandlerClass.timeout
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="http-worker")
+
+        # Connections are parked by worker threads and picked up by the watcher,
+        # which is the only thread that touches the selector
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ)
+        self._parked_lock = threading.Lock()
+        self._to_park = []
+        self._closing = False
+        self._watcher = threading.Thread(target=self._watch_connections, name="http-idle-watcher", daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address) -> None:
+        """Wait for the new connection's first request without holding a worker."""
+        self._park(request, client_address)
+
+    def _park(self, request, client_address) -> None:
+        """Hand a connection with no pending request to the watcher thread."""
+        with self._parked_lock:
+            if not self._closing:
+                self._to_park.append((request, client_address))
+                request = None
+        if request is not None:
+            self.shutdown_request(request)
+            return
+        self._wake_writer.send(b"\0")
+
+    def _watch_connections(self) -> None:
+        """Dispatch parked connections that became readable and close those left idle."""
+        while not self._closing:
+            events = self._selector.select(timeout=min(1.0, self.idle_timeout))
+            now = time.monotonic()
+            for key, _ in events:
+                if key.fileobj is self._wake_reader:
+                    try:
+                        while self._wake_reader.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._selector.unregister(key.fileobj)
+                request, client_address, _ = key.data
+                self._pool.submit(self._process_request_worker, request, client_address)
+
+            with self._parked_lock:
+                parked, self._to_park = self._to_park, []
+            for request, client_address in parked:
+                self._selector.register(request, selectors.EVENT_READ, (request, client_address, now))
+
+            for key in list(self._selector.get_map().values()):
+                if key.data is not None and now - key.data[2] >= self.idle_timeout:
+                    self._selector.unregister(key.fileobj)
+                    self.shutdown_request(key.fileobj)
+
+    def _process_request_worker(self, request, client_address) -> None:
+        """Answer the requests a client has sent, then park or close its connection."""
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        else:
+            self._park(request, client_address)
+
+    def server_close(self) -> None:
+        """Stop accepting connections, wait for the workers and close idle connections."""
+        super().server_close()
+        with self._parked_lock:
+            self._closing = True
+        self._wake_writer.send(b"\0")
+        self._watcher.join()
+        self._pool.shutdown(wait=True)
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                self.shutdown_request(key.fileobj)
+        for request, _ in self._to_park:
+            self.shutdown_request(request)
+        self._to_park = []
+        self._selector.close()
+        self._wake_reader.close()
+        self._wake_writer.close()
+
+class SampleRequestHandler(BaseHTTPRequestHandler):
+    """
+    A request handler for the sample query endpoints.
+
+    HTTP/1.1 keep-alive is used so clients can reuse connections; streamed
+    responses use chunked transfer encoding. Each handler answers only the
+    requests already sent on its connection; PooledHTTPServer waits for the
+    next one.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Deadline for reading a request; the server also closes connections idle this long
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body are separate writes; with Nagle's algorithm the body
+    # waits for the client's delayed ACK, adding ~40 ms to every response
+    disable_nagle_algorithm = True
+    server: PooledHTTPServer
+
+    def log_message(self, format: str, *args) -> None:
+        """Suppress per-request logging to stderr."""
+
+    def handle(self) -> None:
+        """Answer one request, and any further requests the client has already pipelined."""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._input_pending():
+            self.handle_one_request()
+
+    def _input_pending(self) -> bool:
+        """Check, without blocking, whether more request data has arrived or is buffered."""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def do_GET(self) -> None:
+        """Route a GET request to its endpoint."""
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        started = time.perf_counter()
+        try:
+            self._route(parts, params, url.path)
+        finally:
+            endpoint = "samples/<id>" if len(parts) == 2 and parts[0] == "samples" else "/".join(parts[:1])
+            REGISTRY.observe("http_request_seconds", (("endpoint", endpoint or "/"),),
+                             time.perf_counter() - started)
+
+    def _route(self, parts: list, params: Dict[str, str], path: str) -> None:
+        """Dispatch a GET request by its path segments."""
+        try:
+            if parts == ["health"]:
+                self._send_json({'status': 'ok'})
+                return
+            if parts == ["metrics"]:
+                self._send_metrics(params.get("format", "prometheus"))
+                return
+            if self._not_modified():
+                return
+            if parts == ["samples"]:
+                self._send_json_lines(self._iter_samples(params))
+            elif len(parts) == 2 and parts[0] == "samples":
+                self._get_sample(parts[1])
+            elif parts == ["stats"]:
+                self._send_json(self.server.service.get_statistics())
+            elif parts == ["provinces"]:
+                self._send_json(self.server.service.get_available_provinces())
+            elif parts == ["stations"]:
+                self._send_json(self.server.service.get_available_stations())
+            elif parts == ["cube"]:
+                self._send_json(self._query_cube(params))
+            elif parts == ["changes"]:
+                since = _int_param(params, "since", 0)
+                entries = self.server.service.changes_since(since, _int_param(params, "limit", None))
+                self._send_json_lines(_change_to_dict(entry) for entry in entries)
+            else:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {path}")
+        except (BadRequest, ValueError) as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+
+    def _etag(self) -> str:
+        """Get the ETag of the current data generation."""
+        return f'"{self.server.instance_id}-{self.server.service.get_data_generation()}"'
+
+    def _not_modified(self) -> bool:
+        """Answer 304 if the client already has the current generation."""
+        requested = self.headers.get("If-None-Match")
+        if requested is None:
+            return False
+        etag = self._etag()
+        if requested != etag:
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def _get_sample(self, raw_id: str) -> None:
+        """Send one sample by ID."""
+        try:
+            record_id = int(raw_id)
+        except ValueError:
+            raise BadRequest(f"Invalid sample ID: {raw_id}")
+        record = self.server.service.get_sample_by_id(record_id)
+        if record is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No sample with ID {record_id}")
+        else:
+            self._send_json(dict(id=record_id, **asdict(record)))
+
+    def _iter_samples(self, params: Dict[str, str]) -> Iterable[Dict[str, Any]]:
+        """Page through the samples matching the query parameters."""
+        filters = {
+            'province': params.get("province"),
+            'station_name': params.get("station"),
+            'start_from': _date_param(params, "start_from"),
+            'start_until': _date_param(params, "start_until")
+        }
+        limit = _int_param(params, "limit", None)
+        offset = _int_param(params, "offset", 0)
+        rows = self.server.service.iter_query_samples(limit=limit, offset=offset,
+                                                      page_size=STREAM_PAGE_SIZE, **filters)
+        return (dict(id=record_id, **asdict(record)) for record_id, record in rows)
+
+    def _query_cube(self, params: Dict[str, str]) -> Any:
+        """Run a cube query from the group_by and dimension parameters."""
+        group_by = [name for name in params.get("group_by", "").split(",") if name]
+        filters: Dict[str, Any] = {}
+        for name, value in params.items():
+            if name == "group_by":
+                continue
+            if name not in CUBE_DIMENSIONS:
+                raise BadRequest(f"Unknown cube dimension: {name}")
+            filters[name] = _int_param(params, name, None) if name in INTEGER_DIMENSIONS else value
+        return self.server.service.query_cube(group_by, **filters)
+
+    def _send_json(self, payload: Any) -> None:
+        """Send a JSON response with the current ETag."""
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self._etag())
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self, export_format: str) -> None:
+        """Send the metrics registry in the requested format."""
+        if export_format == "prometheus":
+            body, content_type = REGISTRY.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif export_format == "json":
+            body, content_type = REGISTRY.to_json(), "application/json"
+        elif export_format == "text":
+            body, content_type = REGISTRY.to_text(), "text/plain; charset=utf-8"
+        else:
+            raise BadRequest(f"Unknown metrics format: {export_format}")
+        data = body.encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json_lines(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Stream rows as JSON Lines with chunked transfer encoding.
+
+        The ETag is taken before the first row is read, so a write during
+        the stream makes the next conditional request fetch fresh data.
+        Errors raised while reading the first row are reported as a normal
+        error response; later errors end the stream early.
+        """
+        etag = self._etag()
+        rows = iter(rows)
+        try:
+            first = next(rows, None)
+        except ChangeLogTruncatedError as e:
+            self._send_error(HTTPStatus.GONE, str(e))
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+        buffer = []
+        size = 0
+        try:
+            for row in chain([first] if first is not None else [], rows):
+                line = json.dumps(row) + "\n"
+                buffer.append(line)
+                size += len(line)
+                if size >= 64 * 1024:
+                    self._write_chunk("".join(buffer).encode("utf-8"))
+                    buffer, size = [], 0
+        except Exception as e:
+            # Headers are already sent; dropping the connection without the
+            # final chunk tells the client the response is incomplete
+            logger.exception("Error streaming response: %s", e)
+            self.close_connection = True
+            return
+        if buffer:
+            self._write_chunk("".join(buffer).encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes) -> None:
+        """Write one chunk of a chunked response."""
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        """Send a JSON error response."""
+        body = json.dumps({'error': message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    """Parse a non-negative integer query parameter."""
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        raise BadRequest(f"Parameter '{name}' must be an integer")
+    if value < 0:
+        raise BadRequest(f"Parameter '{name}' must not be negative")
+    return value
+
+def _date_param(params: Dict[str, str], name: str) -> Optional[date]:
+    """Parse a YYYY-MM-DD query parameter."""
+    if name not in params:
+        return None
+    try:
+        return date.fromisoformat(params[name])
+    except ValueError:
+        raise BadRequest(f"Parameter '{name}' must be a date in YYYY-MM-DD format")
+
+def _change_to_dict(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a change log entry to JSON-compatible values."""
+    record = entry['record']
+    return dict(entry, record=asdict(record) if record is not None else None)
+
+def create_server(service: Optional[MilkSampleDBService] = None, host: str = "127.0.0.1",
+                  port: int = 8080, max_workers: int = 8) -> PooledHTTPServer:
+    """
+    Create a server bound to an address; call serve_forever() to run it.
+
+    Args:
+        service (Optional[MilkSampleDBService]): Service to expose (default: milk_samples.db)
+        host (str): Interface to listen on
+        port (int): Port to listen on (0 picks a free port)
+        max_workers (int): Number of worker threads
+
+    Returns:
+        PooledHTTPServer: The bound server
+    """
+    return PooledHTTPServer((host, port), service or MilkSampleDBService(), max_workers)
+
+def main(argv: Optional[list] = None) -> None:
+    """Run the server from the command line."""
+    parser = argparse.ArgumentParser(description="Serve milk sample data over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--db", default="milk_samples.db", help="database path or SQLite URI")
+    parser.add_argument("--workers", type=int, default=8, help="number of worker threads")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="log SQL statements slower than this and report the top statements on exit")
+    parser.add_argument("--log-level", help="logging level (default: SR90_LOG_LEVEL or WARNING)")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    slow_query_log = configure_slow_query_log(args.slow_query_ms) if args.slow_query_ms is not None else None
+    service = MilkSampleDBService(MilkSampleDBRepository(DatabaseConfig(args.db)))
+    server = create_server(service, args.host, args.port, args.workers)
+    print(f"Serving milk sample data on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if slow_query_log is not None:
+            print(slow_query_log.report())
+
+if __name__ == "__main__":
+    main()
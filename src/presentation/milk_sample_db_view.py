@@ -8,16 +8,31 @@ This module contains the MilkSampleDBView class which handles user interaction a
 display of milk sample data using database operations. It is part of the Presentation Layer.
 
 This version uses the database service instead of file-based operations.
+
+Run it with --profile [DIR] to profile the startup import and every menu
+action chosen (see src.observability.profiling), and with --skip-reload to
+open the existing database instead of importing the CSV file again.
+
+Lists of samples are shown a page at a time (see src.presentation.sample_renderer);
+--page-size, --wide and --columns choose how.
 """
 
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if not __package__:
+    # Run as a script rather than with python -m: make the src package importable
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+from typing import Optional
 
 from src.business.milk_sample_db_service import MilkSampleDBService
 from src.model.milk_sample_record import MilkSampleRecord
-from src.persistence.data_migration import DataMigration
-from src.persistence.database_config import DatabaseConfig
+from src.observability.profiling import (ProfileOptions, add_profile_arguments, describe_result,
+                                         profile_options_from_args, profiled)
+from src.observability.structured_logging import configure_logging
+from src.persistence.database_reloader import DatabaseReloader
+from src.presentation.sample_renderer import DEFAULT_COLUMNS, SamplePager, SampleRenderer, parse_columns
 
 # Author information
 AUTHOR_NAME = "Himanish Rishi"
@@ -31,63 +46,89 @@ class MilkSampleDBView:
     2. Handling user interaction
     3. Coordinating with the database business layer
     4. Managing database operations
+    5. Profiling the selected operations when asked to
     """
     
-    def __init__(self):
-        """Initialize the view with a database service instance."""
+    def __init__(self, profile: Optional[ProfileOptions] = None, reload_on_start: bool = True,
+                 renderer: Optional[SampleRenderer] = None, page_size: int = 20):
+        """
+        Initialize the view with a database service instance.
+        
+        Args:
+            profile (Optional[ProfileOptions]): Profile the startup import and each menu action
+            reload_on_start (bool): Import the CSV file before showing the menu; when False
+                an empty database is still imported, any other is used as it is
+            renderer (Optional[SampleRenderer]): Formats sample lists (default: compact table)
+            page_size (int): Samples per page when listing
+        """
         self.service = MilkSampleDBService()
-        self.initialize_database()
+        self.renderer = renderer or SampleRenderer()
+        self.page_size = page_size
+        self.reloader = DatabaseReloader(self.service.repository, progress=self.report_reload_progress)
+        self.profile = profile
+        self._reload_step = 0
+        self._reload_pending = False
+        if reload_on_start or self.service.get_sample_count() == 0:
+            self.run_action(self.initialize_database)
+    
+    def run_action(self, action):
+        """
+        Run one operation, under the profiler if profiling is on.
+        
+        Args:
+            action (Callable[[], None]): The operation, named after its method in the reports
+        """
+        with profiled(action.__name__, self.profile) as result:
+            action()
+        if result is not None:
+            print(describe_result(result))
     
     def initialize_database(self):
-        """Initialize the database by clearing existing data and reloading from CSV."""
-        try:
-            print("Initializing database...")
-            
-            # Close all database connections more aggressively
-            try:
-                if hasattr(self.service.repository, 'db_config'):
-                    self.service.repository.db_config.close_connection()
-                if hasattr(self.service, 'repository') and hasattr(self.service.repository, 'db_config'):
-                    self.service.repository.db_config.close_connection()
-            except Exception as e:
-                print(f"Warning: Could not close some connections: {e}")
-            
-            # Force garbage collection to release file handles
-            import gc
-            gc.collect()
-            
-            # More aggressive approach: Delete and recreate database file
-            db_config = DatabaseConfig()
-            if os.path.exists(db_config.db_path):
-                print(f"Removing existing database file: {db_config.db_path}")
-                try:
-                    os.remove(db_config.db_path)
-                    print("Database file removed successfully")
-                except PermissionError:
-                    print("Warning: Could not delete database file (may be in use). Continuing with existing file.")
-                except Exception as e:
-                    print(f"Warning: Error deleting database file: {e}. Continuing with existing file.")
-            
-            # Create fresh database and table
-            print("Creating fresh database...")
-            db_config.initialize_database()
-            
-            # Always clear existing data first (in case there's any)
-            migration = DataMigration()
-            print("Clearing existing database records...")
-            migration.db_repository.clear_all_samples()
-            
-            # Reload fresh data from CSV
-            print("Migrating fresh data from CSV...")
-            total, successful, failed = migration.migrate_data()
-            print(f"Migration completed: {successful} records imported")
-            
-            # Verify the data
-            count = self.service.get_sample_count()
-            print(f"Database now contains {count} records")
-            
-        except Exception as e:
-            print(f"Error initializing database: {e}")
+        """
+        Initialize the database by reloading it from the CSV file.
+        
+        The fresh database is built in a temporary file and swapped in when
+        complete, so the existing database is never missing or empty.
+        """
+        print("Initializing database...")
+        result = self.reloader.run()
+        if result.swapped:
+            print(f"Migration completed: {result.successful_inserts} records imported")
+            print(f"Database now contains {self.service.get_sample_count()} records")
+        else:
+            print(f"Error initializing database: {result.error}")
+            print(f"Continuing with the existing database ({self.service.get_sample_count()} records)")
+    
+    def report_reload_progress(self, stage: str, done: int, total: int):
+        """
+        Print the progress of a background reload at 25% steps.
+        
+        Args:
+            stage (str): Reload stage ("import", "verify" or "swap")
+            done (int): Units of work completed in the stage
+            total (int): Units of work in the stage
+        """
+        if stage == "import":
+            step = done * 4 // total if total else 4
+            if step > self._reload_step:
+                self._reload_step = step
+                print(f"\n[reload] Imported {done}/{total} records")
+        elif done == 0:
+            print(f"\n[reload] Starting {stage}...")
+    
+    def check_reload(self):
+        """Report a background reload that has finished since the last check."""
+        if self._reload_pending and not self.reloader.is_running():
+            self._reload_pending = False
+            result = self.reloader.result
+            if result is not None and result.swapped:
+                print(f"\nReload finished in {result.seconds:.2f}s: "
+                      f"{result.successful_inserts} records imported "
+                      f"({result.failed_inserts} failed)")
+                print(f"Database now contains {self.service.get_sample_count()} records")
+            else:
+                error = result.error if result is not None else "unknown error"
+                print(f"\nReload failed, the previous data is still in use: {error}")
     
     def display_header(self):
         """Display the application header with author information."""
@@ -121,85 +162,46 @@ class MilkSampleDBView:
             sample (MilkSampleRecord): The sample to display
             sample_id (int): The sample's database ID (optional)
         """
-        if sample_id is not None:
-            print(f"\nSample ID: {sample_id}")
-        print("-"*40)
-        print(f"Sample Type: {sample.sample_type}")
-        print(f"Type: {sample.type}")
-        print(f"Date Range: {sample.start_date} to {sample.stop_date}")
-        print(f"Location: {sample.station_name}, {sample.province}")
-        print(f"Sr-90 Activity: {sample.sr90_activity:.2e} Bq/L")
-        if sample.sr90_error is not None:
-            print(f"Sr-90 Error: {sample.sr90_error:.2e} Bq/L")
-        if sample.sr90_activity_per_calcium is not None:
-            print(f"Sr-90 Activity/Calcium: {sample.sr90_activity_per_calcium:.2e} Bq/g")
-        print("-"*40)
-        print(f"Program by {AUTHOR_NAME}".center(80))
+        print(self.renderer.render_card(sample, sample_id) + "\n" + f"Program by {AUTHOR_NAME}".center(80))
+    
+    def page_samples(self, **filters) -> int:
+        """
+        Show the samples matching the filters a page at a time.
+        
+        Each page is read from the database only when it is shown.
+        
+        Args:
+            **filters: Filters accepted by MilkSampleDBService.iter_query_samples
+            
+        Returns:
+            int: Number of samples shown
+        """
+        rows = self.service.iter_query_samples(page_size=self.page_size, **filters)
+        pager = SamplePager(rows, self.renderer, self.page_size, footer=f"Program by {AUTHOR_NAME}".center(80))
+        return pager.run()
     
     def display_all_samples(self):
         """Display all samples from database."""
         try:
-            samples_with_ids = self.service.get_all_samples_with_ids(limit=50)  # Limit to first 50 for display
-            print(f"\nDisplaying first {len(samples_with_ids)} samples from database:")
-            for record_id, sample in samples_with_ids:
-                self.display_sample(sample, record_id)  # Use actual database ID
-                if record_id % 5 == 0:  # Add separator every 5 samples
-                    print("\n" + "="*80)
-                    print(f"Program by {AUTHOR_NAME}".center(80))
-                    print("="*80 + "\n")
+            print(f"\nDisplaying {self.service.get_sample_count()} samples from database:")
+            self.page_samples()
         except Exception as e:
             print(f"Error displaying samples: {e}")
     
     def handle_reload(self):
-        """Handle reloading data from CSV to database with aggressive refresh."""
-        try:
-            print("\nReloading data from CSV to database...")
-            
-            # Close all database connections more aggressively
-            try:
-                if hasattr(self.service.repository, 'db_config'):
-                    self.service.repository.db_config.close_connection()
-                if hasattr(self.service, 'repository') and hasattr(self.service.repository, 'db_config'):
-                    self.service.repository.db_config.close_connection()
-            except Exception as e:
-                print(f"Warning: Could not close some connections: {e}")
-            
-            # Force garbage collection to release file handles
-            import gc
-            gc.collect()
-            
-            # More aggressive approach: Delete and recreate database file
-            db_config = DatabaseConfig()
-            if os.path.exists(db_config.db_path):
-                print(f"Removing existing database file: {db_config.db_path}")
-                try:
-                    os.remove(db_config.db_path)
-                    print("Database file removed successfully")
-                except PermissionError:
-                    print("Warning: Could not delete database file (may be in use). Continuing with existing file.")
-                except Exception as e:
-                    print(f"Warning: Error deleting database file: {e}. Continuing with existing file.")
-            
-            # Create fresh database and table
-            print("Creating fresh database...")
-            db_config.initialize_database()
-            
-            # Always clear existing data first (in case there's any)
-            migration = DataMigration()
-            print("Clearing existing database records...")
-            migration.db_repository.clear_all_samples()
-            
-            # Reload fresh data from CSV
-            print("Migrating fresh data from CSV...")
-            total, successful, failed = migration.migrate_data()
-            print(f"Migration completed: {successful} records imported")
-            
-            # Verify the data
-            count = self.service.get_sample_count()
-            print(f"Database now contains {count} records")
-            
-        except Exception as e:
-            print(f"Error reloading data: {str(e)}")
+        """
+        Start reloading data from CSV to database in the background.
+        
+        The menu stays usable while the reload runs, and reads are served
+        from the current data until the new database is swapped in.
+        """
+        if self.reloader.is_running():
+            print("\nA reload is already running.")
+        else:
+            print("\nReloading data from CSV to database in the background...")
+            self._reload_step = 0
+            self._reload_pending = True
+            self.reloader.start()
         print(f"Program by {AUTHOR_NAME}".center(80))
     
     def handle_display_single(self):
@@ -223,10 +225,9 @@ class MilkSampleDBView:
             province = input("Enter province name: ").strip()
             
             if province in provinces:
-                samples = self.service.get_samples_by_province(province)
-                print(f"\nFound {len(samples)} samples from {province}:")
-                for i, sample in enumerate(samples, 1):
-                    self.display_sample(sample, i)
+                count = sum(cell['sample_count'] for cell in self.service.query_cube(province=province))
+                print(f"\nFound {count} samples from {province}:")
+                self.page_samples(province=province)
             else:
                 print("Province not found.")
         except Exception as e:
@@ -241,10 +242,9 @@ class MilkSampleDBView:
             station = input("Enter station name: ").strip()
             
             if station in stations:
-                samples = self.service.get_samples_by_station(station)
-                print(f"\nFound {len(samples)} samples from {station}:")
-                for i, sample in enumerate(samples, 1):
-                    self.display_sample(sample, i)
+                count = sum(cell['sample_count'] for cell in self.service.query_cube(station_name=station))
+                print(f"\nFound {count} samples from {station}:")
+                self.page_samples(station_name=station)
             else:
                 print("Station not found.")
         except Exception as e:
@@ -444,28 +444,25 @@ class MilkSampleDBView:
         """Run the main application loop."""
         try:
             self.display_header()
+            actions = {
+                "1": self.handle_reload,
+                "2": self.display_all_samples,
+                "3": self.handle_display_single,
+                "4": self.handle_display_by_province,
+                "5": self.handle_display_by_station,
+                "6": self.handle_create_sample,
+                "7": self.handle_edit_sample,
+                "8": self.handle_delete_sample,
+                "9": self.handle_show_statistics,
+            }
             while True:
+                self.check_reload()
                 self.display_menu()
                 choice = input("\nEnter your choice (1-10): ")
+                self.check_reload()
                 
-                if choice == "1":
-                    self.handle_reload()
-                elif choice == "2":
-                    self.display_all_samples()
-                elif choice == "3":
-                    self.handle_display_single()
-                elif choice == "4":
-                    self.handle_display_by_province()
-                elif choice == "5":
-                    self.handle_display_by_station()
-                elif choice == "6":
-                    self.handle_create_sample()
-                elif choice == "7":
-                    self.handle_edit_sample()
-                elif choice == "8":
-                    self.handle_delete_sample()
-                elif choice == "9":
-                    self.handle_show_statistics()
+                if choice in actions:
+                    self.run_action(actions[choice])
                 elif choice == "10":
                     print("\nThank you for using the Milk Sample Data Viewer!")
                     print(f"Program by {AUTHOR_NAME}".center(80))
@@ -478,9 +475,27 @@ class MilkSampleDBView:
             print(f"An error occurred: {str(e)}")
             print(f"Program by {AUTHOR_NAME}".center(80))
 
-def main():
+def main(argv: Optional[list] = None):
     """Main entry point for the application."""
-    view = MilkSampleDBView()
+    parser = argparse.ArgumentParser(description="Milk sample data viewer")
+    parser.add_argument("--skip-reload", action="store_true",
+                        help="use the existing database instead of importing the CSV file at startup")
+    parser.add_argument("--page-size", type=int, default=20, help="samples per page when listing")
+    parser.add_argument("--wide", action="store_true", help="list samples in auto-sized rows instead of a compact table")
+    parser.add_argument("--columns", default=",".join(DEFAULT_COLUMNS),
+                        help="comma-separated columns to list (id, sample_type, type, start_date, stop_date, "
+                             "station_name, province, sr90_activity, sr90_error, sr90_activity_per_calcium)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        renderer = SampleRenderer("wide" if args.wide else "table", parse_columns(args.columns))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    configure_logging()
+    view = MilkSampleDBView(profile_options_from_args(args), reload_on_start=not args.skip_reload,
+                            renderer=renderer, page_size=args.page_size)
     view.run()
 
 if __name__ == "__main__":
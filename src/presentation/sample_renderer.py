@@ -0,0 +1,297 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains the SampleRenderer and SamplePager classes, which format
+milk samples for the terminal. It is part of the Presentation Layer.
+
+This module is responsible for:
+- Formatting a whole page of samples into one string, written with a single call
+- A compact fixed-width table, an auto-sized wide-row mode and a detailed card
+- Choosing which columns are shown
+- Paging through an iterator of samples, so only the rows shown are fetched
+
+A terminal is slow to receive many small writes; building each page in
+memory and writing it once keeps large result sets from being bound by
+terminal I/O.
+"""
+
+import itertools
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from src.model.milk_sample_record import MilkSampleRecord
+
+# A sample with its database ID, as returned by the service's query methods
+Row = Tuple[int, MilkSampleRecord]
+
+RENDER_MODES = ('table', 'wide')
+
+@dataclass(frozen=True)
+class Column:
+    """
+    A column that can be shown for a sample.
+
+    Attributes:
+        name (str): Name used to select the column: "id" or a MilkSampleRecord field
+        header (str): Column heading
+        width (int): Width in the compact table; longer values are cut
+        numeric (bool): Right-align the values
+    """
+    name: str
+    header: str
+    width: int
+    numeric: bool = False
+
+COLUMNS: Dict[str, Column] = {column.name: column for column in (
+    Column('id', "ID", 6, True),
+    Column('sample_type', "Sample", 6),
+    Column('type', "Type", 8),
+    Column('start_date', "Start", 9),
+    Column('stop_date', "Stop", 9),
+    Column('station_name', "Station", 18),
+    Column('province', "Prov", 4),
+    Column('sr90_activity', "Sr90 Bq/L", 9, True),
+    Column('sr90_error', "Error", 9, True),
+    Column('sr90_activity_per_calcium', "Bq/g Ca", 9, True),
+)}
+
+# Columns of the compact table, 70 characters wide
+DEFAULT_COLUMNS = ('id', 'start_date', 'stop_date', 'station_name', 'province', 'sr90_activity', 'sr90_error')
+
+def parse_columns(text: str) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated column list, e.g. "id,province,sr90_activity".
+
+    Args:
+        text (str): Column names from COLUMNS
+
+    Returns:
+        Tuple[str, ...]: The names, in the order given
+
+    Raises:
+        ValueError: If a name is unknown or the list is empty
+    """
+    names = tuple(name.strip() for name in text.split(",") if name.strip())
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}; expected some of {', '.join(COLUMNS)}")
+    if not names:
+        raise ValueError("At least one column is required")
+    return names
+
+def _cell(name: str, record_id: int, record: MilkSampleRecord) -> str:
+    """Format one value of a sample."""
+    if name == 'id':
+        return str(record_id)
+    value = getattr(record, name)
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2e}"
+    return str(value)
+
+class SampleRenderer:
+    """
+    A class to format samples as text, one page at a time.
+
+    This class is responsible for:
+    1. Rendering pages of samples as a compact table or as wide rows
+    2. Projecting the rows onto the selected columns
+    3. Rendering a single sample as a detailed card
+
+    In "table" mode every column has a fixed width and longer values are
+    cut, so rows line up from page to page. In "wide" mode each column is as
+    wide as its longest value on the page and nothing is cut.
+
+    Attributes:
+        mode (str): One of RENDER_MODES
+        columns (Tuple[str, ...]): Names of the columns shown, from COLUMNS
+    """
+
+    def __init__(self, mode: str = "table", columns: Sequence[str] = DEFAULT_COLUMNS):
+        """
+        Initialize the renderer.
+
+        Args:
+            mode (str): One of RENDER_MODES
+            columns (Sequence[str]): Names of the columns to show, from COLUMNS
+
+        Raises:
+            ValueError: If the mode or a column is unknown
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode '{mode}'; expected one of {', '.join(RENDER_MODES)}")
+        self.mode = mode
+        self.columns = parse_columns(",".join(columns))
+
+    def toggle_mode(self) -> None:
+        """Switch between the table and wide modes."""
+        self.mode = "wide" if self.mode == "table" else "table"
+
+    def render_page(self, rows: Sequence[Row], title: Optional[str] = None) -> str:
+        """
+        Format a page of samples.
+
+        Args:
+            rows (Sequence[Row]): (id, record) pairs to show
+            title (Optional[str]): Line printed above the column headings
+
+        Returns:
+            str: The page, without a trailing newline
+        """
+        columns = [COLUMNS[name] for name in self.columns]
+        cells = [[_cell(column.name, record_id, record) for column in columns] for record_id, record in rows]
+        if self.mode == "wide":
+            widths = [max([len(column.header)] + [len(row[index]) for row in cells])
+                      for index, column in enumerate(columns)]
+        else:
+            widths = [column.width for column in columns]
+            cells = [[text[:width] for text, width in zip(row, widths)] for row in cells]
+
+        lines: List[str] = [] if title is None else [title]
+        heading = self._line([column.header for column in columns], columns, widths)
+        lines.append(heading)
+        lines.append("-" * len(heading))
+        lines.extend(self._line(row, columns, widths) for row in cells)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _line(texts: Sequence[str], columns: Sequence[Column], widths: Sequence[int]) -> str:
+        """Align the cells of one line."""
+        return " ".join(text.rjust(width) if column.numeric else text.ljust(width)
+                        for text, column, width in zip(texts, columns, widths)).rstrip()
+
+    @staticmethod
+    def render_card(sample: MilkSampleRecord, sample_id: Optional[int] = None) -> str:
+        """
+        Format every field of one sample on its own line.
+
+        Args:
+            sample (MilkSampleRecord): The sample
+            sample_id (Optional[int]): Its database ID, shown first if given
+
+        Returns:
+            str: The card, without a trailing newline
+        """
+        lines = [f"\nSample ID: {sample_id}"] if sample_id is not None else []
+        lines += [
+            "-" * 40,
+            f"Sample Type: {sample.sample_type}",
+            f"Type: {sample.type}",
+            f"Date Range: {sample.start_date} to {sample.stop_date}",
+            f"Location: {sample.station_name}, {sample.province}",
+            f"Sr-90 Activity: {sample.sr90_activity:.2e} Bq/L",
+        ]
+        if sample.sr90_error is not None:
+            lines.append(f"Sr-90 Error: {sample.sr90_error:.2e} Bq/L")
+        if sample.sr90_activity_per_calcium is not None:
+            lines.append(f"Sr-90 Activity/Calcium: {sample.sr90_activity_per_calcium:.2e} Bq/g")
+        lines.append("-" * 40)
+        return "\n".join(lines)
+
+class SamplePager:
+    """
+    A pager that shows samples from an iterator one page at a time.
+
+    This class is responsible for:
+    1. Taking one page of rows from the iterator only when it is shown
+    2. Writing each rendered page to the output in one call
+    3. Moving forward and back, switching modes, and quitting on command
+
+    Pages already shown are kept, so going back does not query again. Pass
+    an iterator that fetches lazily (such as the service's
+    iter_query_samples with a page_size equal to this pager's) and the rows
+    after the last page viewed are never read.
+
+    Attributes:
+        renderer (SampleRenderer): Formats the pages
+        page_size (int): Rows per page
+    """
+
+    def __init__(self,
+                 rows: Iterable[Row],
+                 renderer: SampleRenderer,
+                 page_size: int = 20,
+                 output: Optional[TextIO] = None,
+                 read_command: Callable[[str], str] = input,
+                 footer: Optional[str] = None):
+        """
+        Initialize the pager.
+
+        Args:
+            rows (Iterable[Row]): (id, record) pairs to page through
+            renderer (SampleRenderer): Formats the pages
+            page_size (int): Rows per page
+            output (Optional[TextIO]): Where pages are written (default: sys.stdout)
+            read_command (Callable[[str], str]): Shows a prompt and returns the reply
+            footer (Optional[str]): Line written under every page
+
+        Raises:
+            ValueError: If page_size is not positive
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        self.renderer = renderer
+        self.page_size = page_size
+        self._rows = iter(rows)
+        self._output = output or sys.stdout
+        self._read_command = read_command
+        self._footer = footer
+        self._pages: List[List[Row]] = []
+        self._exhausted = False
+
+    def _page(self, index: int) -> List[Row]:
+        """Get a page, fetching it from the iterator if it is the next one."""
+        if index == len(self._pages) and not self._exhausted:
+            page = list(itertools.islice(self._rows, self.page_size))
+            if len(page) < self.page_size:
+                self._exhausted = True
+            if page:
+                self._pages.append(page)
+        return self._pages[index] if index < len(self._pages) else []
+
+    def _write(self, text: str) -> None:
+        """Write a block of text at once."""
+        self._output.write(text + "\n")
+        self._output.flush()
+
+    def run(self) -> int:
+        """
+        Show pages until the last one is passed or the user quits.
+
+        Commands: Enter or n for the next page, p for the previous one,
+        w to switch between table and wide rows, q to quit.
+
+        Returns:
+            int: Number of rows fetched from the iterator
+        """
+        index = 0
+        page = self._page(0)
+        if not page:
+            self._write("No samples to display.")
+            return 0
+        while True:
+            first = index * self.page_size + 1
+            text = self.renderer.render_page(page, f"\nPage {index + 1}: samples {first}-{first + len(page) - 1}")
+            self._write(text if self._footer is None else f"{text}\n{self._footer}")
+
+            is_last = self._exhausted and index == len(self._pages) - 1
+            options = ([] if is_last else ["[Enter] next"]) + (["p previous"] if index else []) + ["w wide/table", "q quit"]
+            command = self._read_command(f"{', '.join(options)}: ").strip().lower()
+            if command == "q":
+                break
+            if command == "p":
+                index = max(index - 1, 0)
+            elif command in ("", "n"):
+                if is_last or not self._page(index + 1):
+                    self._write("End of samples.")
+                    break
+                index += 1
+            elif command == "w":
+                self.renderer.toggle_mode()
+            page = self._pages[index]
+        return sum(len(page) for page in self._pages)
@@ -0,0 +1,74 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the AnomalyDetector class.
+
+The tests verify:
+- A units error like CALGARY Q4-84 is flagged by the robust z-score and jump rules
+- A large error-to-activity ratio is flagged
+- Later scans only check newly ingested rows
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.anomaly_detection import RULE_ERROR_RATIO, RULE_MAGNITUDE_JUMP, RULE_ROBUST_Z
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+class TestAnomalyDetection(unittest.TestCase):
+    """Test class for the anomaly detection batch job."""
+
+    def setUp(self):
+        """Create a service backed by a temporary database with one station."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_config = DatabaseConfig(os.path.join(self.temp_dir.name, "anomaly.db"))
+        self.service = MilkSampleDBService(MilkSampleDBRepository(db_config))
+        self.ids = []
+        activities = [0.105, 0.0628, 0.058, 5.5e-09, 0.0898, 0.071, 0.066, 0.074]
+        for month, activity in zip(range(1, 9), activities):
+            record_id, _ = self.service.create_new_sample(
+                "MILK", "WHOLE", f"1984-{month:02d}-01", f"1984-{month:02d}-28",
+                "CALGARY", "AB", activity, activity * 0.1)
+            self.ids.append(record_id)
+
+    def tearDown(self):
+        """Close the database and remove the temporary directory."""
+        self.service.repository.db_config.close_connection()
+        self.temp_dir.cleanup()
+
+    def test_units_error_is_flagged(self):
+        """Test that the near-zero reading is flagged by the robust rules."""
+        summary = self.service.detect_anomalies()
+        self.assertEqual(summary['rows_checked'], len(self.ids))
+        flagged = {(flag['sample_id'], flag['rule']) for flag in self.service.get_anomalies()}
+        self.assertIn((self.ids[3], RULE_ROBUST_Z), flagged)
+        self.assertIn((self.ids[3], RULE_MAGNITUDE_JUMP), flagged)
+        self.assertNotIn((self.ids[0], RULE_ROBUST_Z), flagged)
+
+    def test_incremental_scan_checks_only_new_rows(self):
+        """Test that a second scan only checks rows added since the first."""
+        self.service.detect_anomalies()
+        self.assertEqual(self.service.detect_anomalies()['rows_checked'], 0)
+
+        new_id, _ = self.service.create_new_sample(
+            "MILK", "WHOLE", "1984-10-01", "1984-10-28", "CALGARY", "AB", 0.07, 0.2)
+        summary = self.service.detect_anomalies()
+        self.assertEqual(summary['rows_checked'], 1)
+        self.assertEqual(summary['flags_by_rule'], {RULE_ERROR_RATIO: 1})
+        self.assertEqual([flag['sample_id'] for flag in self.service.get_anomalies(RULE_ERROR_RATIO)], [new_id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the AsyncMilkSampleDBService class.
+
+The tests verify:
+- Hundreds of concurrent reads and writes complete with consistent results
+- Writes run one at a time on the writer thread
+- A cancelled write that has not started is never applied
+- Samples and changes can be streamed with async for
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.async_milk_sample_db_service import AsyncMilkSampleDBService
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+class BlockingDeleteService(MilkSampleDBService):
+    """A service whose deletes wait for an event, to hold up the writer."""
+
+    def __init__(self, repository):
+        super().__init__(repository)
+        self.release = threading.Event()
+        self.writer_threads = set()
+
+    def delete_sample(self, record_id):
+        self.release.wait(5)
+        return super().delete_sample(record_id)
+
+    def create_new_sample(self, *args, **kwargs):
+        self.writer_threads.add(threading.current_thread().name)
+        return super().create_new_sample(*args, **kwargs)
+
+
+class TestAsyncService(unittest.IsolatedAsyncioTestCase):
+    """Test class for the asyncio facade."""
+
+    def setUp(self):
+        """Create a facade over a temporary database."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_config = DatabaseConfig(os.path.join(self.temp_dir.name, "async.db"))
+        self.service = BlockingDeleteService(MilkSampleDBRepository(self.db_config))
+        self.async_service = AsyncMilkSampleDBService(self.service, max_workers=4, max_concurrency=16)
+
+    def tearDown(self):
+        """Close the database and remove the temporary directory."""
+        self.db_config.close_all_connections()
+        self.temp_dir.cleanup()
+
+    async def create(self, index):
+        """Create one sample for a numbered station."""
+        return await self.async_service.create_new_sample(
+            "MILK", "WHOLE", "2024-01-01", "2024-01-07", f"Station {index % 5}", "ON", 0.1 + index / 1000)
+
+    async def test_concurrent_reads_and_writes(self):
+        """Test that interleaved reads and writes all complete and writes are serialized."""
+        async with self.async_service:
+            writes = [self.create(index) for index in range(100)]
+            reads = [self.async_service.get_sample_count() for _ in range(200)]
+            results = await asyncio.gather(*writes, *reads)
+
+            record_ids = [record_id for record_id, _ in results[:100]]
+            self.assertEqual(sorted(record_ids), list(range(1, 101)))
+            self.assertTrue(all(0 <= count <= 100 for count in results[100:]))
+            self.assertEqual(await self.async_service.get_sample_count(), 100)
+            self.assertEqual(len(await self.async_service.get_samples_by_station("Station 0")), 20)
+            self.assertEqual(len(self.service.writer_threads), 1)
+
+            # The generation is read from the database, so it is read on a reader thread too
+            threads = []
+            get_data_generation = self.service.get_data_generation
+            self.service.get_data_generation = lambda: threads.append(threading.current_thread()) or \
+                get_data_generation()
+            self.assertEqual(await self.async_service.get_data_generation(), get_data_generation())
+            self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_cancelled_queued_write_is_skipped(self):
+        """Test that a write cancelled while waiting behind another write never runs."""
+        async with self.async_service:
+            record_id, _ = await self.create(0)
+            blocked = asyncio.create_task(self.async_service.delete_sample(record_id))
+            queued = asyncio.create_task(self.create(1))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            self.service.release.set()
+            self.assertTrue((await blocked)[0])
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            self.assertEqual(await self.async_service.get_sample_count(), 0)
+
+    async def test_async_iterators(self):
+        """Test streaming samples and changes with async for, including leaving early."""
+        async with self.async_service:
+            for index in range(7):
+                await self.create(index)
+            samples = [record_id async for record_id, _ in self.async_service.iter_samples(batch_size=3)]
+            self.assertEqual(samples, list(range(1, 8)))
+
+            changes = [change['op'] async for change in self.async_service.changes_since(0, limit=5, batch_size=2)]
+            self.assertEqual(changes, ['insert'] * 5)
+
+            async for record_id, _ in self.async_service.iter_samples(batch_size=2):
+                break
+            self.assertEqual(record_id, 1)
+
+            # Each batch is a fresh keyset query, so rows written between batches are seen
+            streamed = []
+            async for record_id, _ in self.async_service.iter_samples(batch_size=4):
+                if record_id == 4:
+                    await self.create(7)
+                streamed.append(record_id)
+            self.assertEqual(streamed, list(range(1, 9)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the scriptable command-line interface.
+
+The tests verify:
+- import, query, stats, export, sync and backup run against a database file
+- The database is opened only as far as the command needs
+- Failures are reported through the exit status
+- Commands that read never change the database file, even to upgrade its schema
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.presentation import cli
+
+CSV_FILE = os.path.join(project_root, "nms_strontium90_milk_ssn_strontium90_lait.csv")
+
+
+@unittest.skipUnless(os.path.exists(CSV_FILE), "sample CSV not available")
+class TestCli(unittest.TestCase):
+    """Test class for the command-line interface."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Import the CSV file once into a database the tests copy."""
+        cls.directory = tempfile.mkdtemp()
+        cls.template = os.path.join(cls.directory, "template.db")
+        status, output = cls.run_cli(cls.template, "import", "--csv", CSV_FILE)
+        assert status == 0, output
+        cls.imported = json.loads(output)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the databases."""
+        shutil.rmtree(cls.directory)
+
+    @staticmethod
+    def run_cli(db_path, *argv):
+        """Run one command and return its exit status and output."""
+        stdout = io.StringIO()
+        status = cli.main(["--db", db_path, *argv], stdout)
+        return status, stdout.getvalue()
+
+    def setUp(self):
+        """Give each test its own copy of the imported database."""
+        self.db_path = os.path.join(self.directory, f"{self._testMethodName}.db")
+        shutil.copyfile(self.template, self.db_path)
+
+    def test_import_and_stats(self):
+        """Test that stats report what import loaded."""
+        self.assertEqual(self.imported['failed'], 0)
+        status, output = self.run_cli(self.db_path, "stats")
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output)['total_samples'], self.imported['successful'])
+
+        status, output = self.run_cli(self.db_path, "stats", "--group-by", "province")
+        cells = json.loads(output)
+        self.assertEqual(sum(cell['sample_count'] for cell in cells), self.imported['successful'])
+
+    def test_query(self):
+        """Test filtered queries in both output formats."""
+        status, output = self.run_cli(self.db_path, "query", "--province", "ON", "--limit", "3")
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(status, 0)
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row['province'] == "ON" for row in rows))
+        self.assertEqual(rows, sorted(rows, key=lambda row: row['id']))
+
+        status, output = self.run_cli(self.db_path, "query", "--province", "ON", "--limit", "3", "--format", "table")
+        self.assertEqual(len(output.splitlines()), 3)
+        self.assertIn(str(rows[0]['id']), output.splitlines()[0])
+
+    def test_export_and_backup(self):
+        """Test exports and both kinds of backup."""
+        destination = os.path.join(self.directory, "on.jsonl")
+        status, output = self.run_cli(self.db_path, "export", destination, "--province", "ON")
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output)['format'], "jsonl")
+        self.assertTrue(os.path.getsize(destination) > 0)
+
+        for options in ([], ["--snapshot", "--writable"]):
+            copy = os.path.join(self.directory, f"copy{len(options)}.db")
+            status, output = self.run_cli(self.db_path, "backup", copy, *options)
+            self.assertEqual(status, 0)
+            status, output = self.run_cli(copy, "stats")
+            self.assertEqual(json.loads(output)['total_samples'], self.imported['successful'])
+
+    def test_sync_resumes_from_state(self):
+        """Test that a second sync only writes the changes made since the first."""
+        state = os.path.join(self.directory, "sync.state")
+        status, output = self.run_cli(self.db_path, "sync", "--state", state)
+        self.assertEqual(status, 0)
+        first = [json.loads(line) for line in output.splitlines()]
+        with open(state, encoding="utf-8") as file:
+            self.assertEqual(int(file.read()), first[-1]['seq'])
+
+        context = cli.CommandContext(cli.build_parser().parse_args(["--db", self.db_path, "import"]))
+        try:
+            record_id, _ = context.service.create_new_sample("MILK", "WHOLE", "01-Jan-24", "31-Mar-24",
+                                                             "OTTAWA", "ON", 0.05, None, None)
+        finally:
+            context.close()
+        status, output = self.run_cli(self.db_path, "sync", "--state", state)
+        second = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([(entry['op'], entry['sample_id']) for entry in second], [("insert", record_id)])
+        self.assertEqual(second[0]['record']['station_name'], "OTTAWA")
+
+    def test_lazy_open(self):
+        """Test that backup copies the file without building a repository."""
+        context = cli.CommandContext(cli.build_parser().parse_args(["--db", self.db_path, "backup", "copy.db"]))
+        try:
+            context.db_config
+            self.assertIsNone(context._repository)
+            self.assertIsNone(context._service)
+        finally:
+            context.close()
+
+    def test_failures(self):
+        """Test that errors become exit statuses instead of tracebacks."""
+        with self.assertLogs("src.persistence", level="ERROR"):
+            status, _ = self.run_cli(self.db_path, "import", "--csv", os.path.join(self.directory, "missing.csv"))
+        self.assertEqual(status, 1)
+        status, _ = self.run_cli(self.db_path, "stats", "--group-by", "colour")
+        self.assertEqual(status, 1)
+        with self.assertRaises(SystemExit):
+            self.run_cli(self.db_path, "--pragma", "synchronous", "stats")
+
+    def test_missing_database(self):
+        """Test that commands which only read refuse a missing database instead of creating it."""
+        missing = os.path.join(self.directory, "typo.db")
+        for argv in (["stats"], ["query"], ["sync"], ["export", os.path.join(self.directory, "out.jsonl")],
+                     ["backup", os.path.join(self.directory, "out.db")]):
+            status, output = self.run_cli(missing, *argv)
+            self.assertEqual(status, 1, argv)
+            self.assertEqual(output, "")
+        self.assertFalse(os.path.exists(missing))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "out.db")))
+
+    def test_reads_leave_file_unchanged(self):
+        """Test that read-only commands leave the bytes and mtime of the file as they were."""
+        def fingerprint():
+            with open(self.db_path, "rb") as file:
+                return hashlib.md5(file.read()).hexdigest(), os.stat(self.db_path).st_mtime_ns
+        before = fingerprint()
+        for argv in (["stats"], ["stats", "--group-by", "province"], ["query", "--limit", "2"], ["sync"],
+                     ["export", os.path.join(self.directory, "unchanged.jsonl")]):
+            status, _ = self.run_cli(self.db_path, *argv)
+            self.assertEqual(status, 0, argv)
+        self.assertEqual(fingerprint(), before)
+        self.assertEqual(sorted(name for name in os.listdir(self.directory) if name.startswith(self._testMethodName)),
+                         [f"{self._testMethodName}.db"])
+
+    def test_old_schema_is_not_upgraded_by_reads(self):
+        """Test that reads refuse an out-of-date schema and the upgrade command updates it."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA user_version = 0")
+        conn.close()
+        with open(self.db_path, "rb") as file:
+            before = file.read()
+        for argv in (["stats"], ["query"]):
+            status, output = self.run_cli(self.db_path, *argv)
+            self.assertEqual((status, output), (1, ""))
+        with open(self.db_path, "rb") as file:
+            self.assertEqual(file.read(), before)
+
+        status, output = self.run_cli(self.db_path, "upgrade")
+        self.assertEqual((status, json.loads(output)['upgraded']), (0, True))
+        self.assertEqual(self.run_cli(self.db_path, "stats")[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the memory-mapped columnar cache.
+
+The tests verify:
+- A cache built from a repository decodes back to the same rows
+- Columns are typed views with NaN and 0 for missing values
+- The cache is reused while the source is unchanged and rebuilt after a write
+- A cache built from the CSV file matches a migration of the same file
+- Truncated files are rejected
+"""
+
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.columnar_cache import ColumnarCache, load_columnar_cache
+from src.persistence.data_migration import DataMigration
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+
+CSV_PATH = os.path.join(project_root, 'nms_strontium90_milk_ssn_strontium90_lait.csv')
+
+SAMPLES = [
+    MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Jan-84", "CALGARY", "AB", 0.123, 0.012, None),
+    MilkSampleRecord("MILK", "WHOLE", "01-Apr-84", "30-Apr-84", "CALGARY", "AB", 0.2, None, 0.15),
+    MilkSampleRecord("MILK", "WHOLE", "1985-06-01", "1985-06-30", "HALIFAX", "NS", 0.05, 0.005, 0.04),
+    MilkSampleRecord("LAIT", "ENTIER", "bad date", "31-Jan-86", "MONTRÉAL", "QC", 0.071, 0.007, 0.06),
+]
+
+
+class TestColumnarCache(unittest.TestCase):
+    """Test class for the columnar cache."""
+
+    def setUp(self):
+        """Create a repository holding SAMPLES and a scratch directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, "cache")
+        self.repository = InMemoryMilkSampleRepository()
+        self.repository.initialize_database()
+        self.ids = [self.repository.create_sample(record) for record in SAMPLES]
+        self.service = MilkSampleDBService(self.repository)
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.temp_dir.cleanup()
+
+    def test_round_trip_and_columns(self):
+        """Test decoding rows and reading typed columns."""
+        with self.service.load_columnar_cache(self.directory) as cache:
+            self.assertEqual(len(cache), len(SAMPLES))
+            self.assertEqual(list(cache.iter_records()), list(zip(self.ids, SAMPLES)))
+
+            activity = cache.column("sr90_activity")
+            self.assertEqual(activity.format, "d")
+            self.assertEqual(list(activity), [record.sr90_activity for record in SAMPLES])
+            self.assertTrue(math.isnan(cache.column("sr90_error")[1]))
+            self.assertEqual(list(cache.column("id")), self.ids)
+            self.assertEqual(cache.column("start_day")[2], 724793)
+            self.assertEqual(cache.column("start_day")[3], 0)
+
+            code = cache.codes_for("province", "AB")
+            self.assertEqual([value == code for value in cache.column("province")], [True, True, False, False])
+            self.assertIsNone(cache.codes_for("province", "YT"))
+            self.assertEqual(cache.dictionary("station_name")[cache.column("station_name")[3]], "MONTRÉAL")
+
+    def test_reused_until_source_changes(self):
+        """Test that an unchanged source reuses the cache and a write triggers a rebuild."""
+        cache = self.service.load_columnar_cache(self.directory)
+        built_at = cache.manifest['built_at']
+        cache.close()
+
+        cache = self.service.load_columnar_cache(self.directory)
+        self.assertEqual(cache.manifest['built_at'], built_at)
+        cache.close()
+
+        self.repository.delete_sample(self.ids[0])
+        with self.service.load_columnar_cache(self.directory) as cache:
+            self.assertNotEqual(cache.manifest['built_at'], built_at)
+            self.assertEqual(list(cache.iter_records()), list(zip(self.ids[1:], SAMPLES[1:])))
+
+    def test_build_from_csv(self):
+        """Test that a cache built from the CSV file matches the parsed records."""
+        records = DataMigration(CSV_PATH).read_csv_data()
+        with load_columnar_cache(self.directory, csv_path=CSV_PATH) as cache:
+            self.assertEqual(len(cache), len(records))
+            self.assertEqual(cache.record(0), (1, records[0]))
+            self.assertEqual(cache.record(len(records) - 1), (len(records), records[-1]))
+            self.assertAlmostEqual(sum(cache.column("sr90_activity")),
+                                   sum(record.sr90_activity for record in records))
+
+    def test_truncated_file_is_rejected(self):
+        """Test that a damaged column file is detected on open and rebuilt by load_columnar_cache."""
+        self.service.load_columnar_cache(self.directory).close()
+        with open(os.path.join(self.directory, "sr90_activity.f64"), "r+b") as file:
+            file.truncate(8)
+        with self.assertRaises(ValueError):
+            ColumnarCache(self.directory)
+        with self.service.load_columnar_cache(self.directory) as cache:
+            self.assertEqual(len(cache.column("sr90_activity")), len(SAMPLES))
+
+    def test_requires_one_source(self):
+        """Test that exactly one source must be given."""
+        with self.assertRaises(ValueError):
+            load_columnar_cache(self.directory)
+        with self.assertRaises(ValueError):
+            load_columnar_cache(self.directory, self.repository, CSV_PATH)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,8 @@ Date: 13/07/2025
 Author: Himanish Rishi
 
 This module contains tests for database operations in the milk sample application.
-It tests the CRUD (Create, Read, Update, Delete) operations using the actual database.
+It tests the CRUD (Create, Read, Update, Delete) operations on an in-memory copy
+of the actual database, so the tests never modify milk_samples.db.
 
 The tests verify:
 - Creating new milk sample records
@@ -13,10 +14,16 @@ The tests verify:
 - Updating record fields
 - Deleting records
 - Listing all records
+- In-memory, URI and temporary file database modes
+- Online backups and read-only snapshots
+- Tuning pragmas and the busy timeout
 """
 
 import os
+import sqlite3
 import sys
+import tempfile
+import threading
 import unittest
 
 # Add the project root directory to Python path
@@ -25,8 +32,10 @@ sys.path.insert(0, project_root)
 
 from src.business.milk_sample_db_service import MilkSampleDBService
 from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.database_config import PRAGMA_PRESETS, SCHEMA_VERSION, DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
 
-# Use the actual database file (as per user request)
+# The actual database file, used as the snapshot every test run starts from
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'milk_samples.db')
 
 
@@ -35,7 +44,7 @@ class TestDatabaseOperations(unittest.TestCase):
     Test class for database operations in the milk sample application.
     
     This class contains unit tests that verify the CRUD operations
-    work correctly with the actual database.
+    work correctly with a copy of the actual database.
     """
     
     @classmethod
@@ -44,10 +53,16 @@ class TestDatabaseOperations(unittest.TestCase):
         Set up the test class by creating a database service instance.
         
         This method is called once before all tests in the class.
-        It creates a MilkSampleDBService instance that uses the actual
-        milk_samples.db database file.
+        It creates a MilkSampleDBService instance that uses an in-memory
+        copy of the milk_samples.db database file.
         """
-        cls.db_service = MilkSampleDBService()
+        cls.db_config = DatabaseConfig.from_snapshot(DB_PATH)
+        cls.db_service = MilkSampleDBService(MilkSampleDBRepository(cls.db_config))
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Discard the in-memory database."""
+        cls.db_config.close()
     
     def test_create_sample(self):
         """
@@ -150,6 +165,233 @@ class TestDatabaseOperations(unittest.TestCase):
         # If there are samples, they should be MilkSampleRecord
         if samples:
             self.assertIsInstance(samples[0], MilkSampleRecord)
+    
+    def test_cube_tracks_crud(self):
+        """
+        Test that the sample cube is kept up to date by create, edit and delete.
+        
+        This test verifies that:
+        1. A created sample is counted in its province cell
+        2. Editing the province moves the sample to the new cell
+        3. Deleting the sample removes it from the cube
+        """
+        record_id, _ = self.db_service.create_new_sample(
+            sample_type="MILK",
+            type="WHOLE",
+            start_date="2024-04-01",
+            stop_date="2024-04-07",
+            station_name="Cube Station",
+            province="Cube Province",
+            sr90_activity=0.5
+        )
+        cell = self.db_service.query_cube(['year', 'quarter'], station_name="Cube Station")
+        self.assertEqual(cell[-1]['year'], 2024)
+        self.assertEqual(cell[-1]['quarter'], 2)
+        
+        self.db_service.edit_sample(record_id, province="Cube Province 2")
+        moved = self.db_service.query_cube(['province'], station_name="Cube Station")
+        self.assertIn("Cube Province 2", [row['province'] for row in moved])
+        
+        before = sum(row['sample_count'] for row in moved)
+        self.db_service.delete_sample(record_id)
+        after = self.db_service.query_cube(station_name="Cube Station")
+        self.assertEqual(sum(row['sample_count'] for row in after), before - 1)
+    
+    def test_changes_since(self):
+        """
+        Test that the change feed reports writes made through the service.
+        
+        This test verifies that:
+        1. Changes are returned in sequence order after the given position
+        2. The limit and batch size page through the log without gaps
+        """
+        start = self.db_service.repository.get_latest_change_seq()
+        record_id, _ = self.db_service.create_new_sample(
+            sample_type="MILK",
+            type="WHOLE",
+            start_date="2024-05-01",
+            stop_date="2024-05-07",
+            station_name="Feed Station",
+            province="Feed Province",
+            sr90_activity=0.3
+        )
+        self.db_service.edit_sample(record_id, sr90_activity=0.4)
+        self.db_service.delete_sample(record_id)
+        
+        changes = list(self.db_service.changes_since(start, batch_size=1))
+        self.assertEqual([change['op'] for change in changes], ['insert', 'update', 'delete'])
+        self.assertEqual({change['sample_id'] for change in changes}, {record_id})
+        self.assertEqual([change['seq'] for change in self.db_service.changes_since(start, limit=2)],
+                         [changes[0]['seq'], changes[1]['seq']])
+
+    def test_cube_cache_sees_other_writers(self):
+        """
+        Test that cached cube results are dropped after a write by another repository.
+
+        This test verifies that:
+        1. A write through a second service on the same file changes the generation
+        2. The first service's cached cube answer includes the new sample
+        3. Callers get copies they can change without affecting the cache
+        """
+        config = DatabaseConfig.temporary()
+        other_config = DatabaseConfig(config.db_path)
+        try:
+            service = MilkSampleDBService(MilkSampleDBRepository(config))
+            other = MilkSampleDBService(MilkSampleDBRepository(other_config))
+            sample = dict(sample_type="MILK", type="WHOLE", start_date="2024-01-01", stop_date="2024-01-07",
+                          station_name="Station", province="ON", sr90_activity=0.1)
+            service.create_new_sample(**sample)
+            rows = service.query_cube(['province'])
+            self.assertEqual(rows[0]['sample_count'], 1)
+            rows[0]['sample_count'] = 99
+
+            generation = service.get_data_generation()
+            other.create_new_sample(**sample)
+            self.assertNotEqual(service.get_data_generation(), generation)
+            self.assertEqual(service.query_cube(['province'])[0]['sample_count'], 2)
+        finally:
+            other_config.close()
+            config.close()
+
+
+class TestDatabaseModes(unittest.TestCase):
+    """Test class for the database locations accepted by DatabaseConfig."""
+    
+    def test_snapshot_copy_is_independent(self):
+        """Test that a snapshot copy has the same rows and leaves the file untouched."""
+        file_config = DatabaseConfig(DB_PATH)
+        file_count = file_config.get_connection().execute("SELECT COUNT(*) FROM milk_samples").fetchone()[0]
+        memory_config = DatabaseConfig.from_snapshot(DB_PATH)
+        try:
+            repository = MilkSampleDBRepository(memory_config)
+            self.assertEqual(repository.get_sample_count(), file_count)
+            repository.clear_all_samples()
+            self.assertEqual(repository.get_sample_count(), 0)
+            count = file_config.get_connection().execute("SELECT COUNT(*) FROM milk_samples").fetchone()[0]
+            self.assertEqual(count, file_count)
+        finally:
+            memory_config.close()
+            file_config.close()
+    
+    def test_memory_database_is_shared_between_threads(self):
+        """Test that every thread sees the same :memory: database, and separate configs do not."""
+        config = DatabaseConfig(":memory:")
+        other = DatabaseConfig(":memory:")
+        try:
+            repository = MilkSampleDBRepository(config)
+            MilkSampleDBRepository(other)
+            repository.create_sample(MilkSampleRecord("MILK", "WHOLE", "2024-01-01", "2024-01-07",
+                                                      "Memory Station", "ON", 0.1, None, None))
+            counts = []
+            worker = threading.Thread(target=lambda: counts.append(repository.get_sample_count()))
+            worker.start()
+            worker.join()
+            self.assertEqual(counts, [1])
+            self.assertEqual(MilkSampleDBRepository(other).get_sample_count(), 0)
+        finally:
+            config.close()
+            other.close()
+    
+    def test_temporary_file_is_removed(self):
+        """Test that a temporary database file is deleted by close()."""
+        config = DatabaseConfig.temporary()
+        MilkSampleDBRepository(config)
+        self.assertTrue(os.path.exists(config.db_path))
+        config.close()
+        self.assertFalse(os.path.exists(config.db_path))
+    
+    def test_backup_and_snapshot(self):
+        """Test that a backup and a snapshot hold the same rows and the snapshot is read-only."""
+        source = DatabaseConfig.from_snapshot(DB_PATH)
+        temp_dir = tempfile.TemporaryDirectory()
+        try:
+            count = MilkSampleDBRepository(source).get_sample_count()
+            steps = []
+            backup_path = os.path.join(temp_dir.name, "backup.db")
+            report = source.backup(backup_path, pages_per_step=4,
+                                   progress=lambda done, total: steps.append((done, total)))
+            self.assertGreater(len(steps), 1)
+            self.assertEqual(steps[-1][0], steps[-1][1])
+            self.assertEqual(report.pages, steps[-1][1])
+            self.assertFalse(os.path.exists(backup_path + ".partial"))
+            
+            snapshot_path = os.path.join(temp_dir.name, "snapshot.db")
+            source.export_snapshot(snapshot_path)
+            for path in (backup_path, snapshot_path):
+                copy = DatabaseConfig(f"file:{path}?mode=ro")
+                connection = copy.get_connection()
+                self.assertEqual(connection.execute("SELECT COUNT(*) FROM milk_samples").fetchone()[0], count)
+                copy.close()
+            if os.name == "posix" and os.geteuid() != 0:
+                with self.assertRaises(sqlite3.OperationalError):
+                    writable = sqlite3.connect(snapshot_path)
+                    try:
+                        writable.execute("DELETE FROM milk_samples")
+                    finally:
+                        writable.close()
+            with self.assertRaises(FileExistsError):
+                source.export_snapshot(snapshot_path)
+        finally:
+            source.close()
+            temp_dir.cleanup()
+    
+    def test_pragmas_and_busy_timeout(self):
+        """Test that pragmas apply to every connection and that bad pragmas are rejected."""
+        config = DatabaseConfig.temporary(pragmas=PRAGMA_PRESETS['wal'], busy_timeout=0)
+        try:
+            MilkSampleDBRepository(config)
+            self.assertEqual(config.read_pragmas()['journal_mode'], "wal")
+            results = []
+            worker = threading.Thread(target=lambda: results.append(config.read_pragmas()['synchronous']))
+            worker.start()
+            worker.join()
+            self.assertEqual(results, [1])
+            
+            # A writer holding the lock makes another writer fail at once with busy_timeout=0
+            blocker = sqlite3.connect(config.db_path)
+            blocker.execute("BEGIN IMMEDIATE")
+            try:
+                with self.assertRaises(sqlite3.OperationalError):
+                    config.get_connection().execute("BEGIN IMMEDIATE")
+            finally:
+                blocker.rollback()
+                blocker.close()
+        finally:
+            config.close()
+        with self.assertRaises(ValueError):
+            DatabaseConfig(":memory:", pragmas={'foreign_keys': 'ON'})
+        with self.assertRaises(ValueError):
+            DatabaseConfig(":memory:", pragmas={'cache_size': '1; DROP TABLE milk_samples'})
+    
+    def test_schema_is_created_once(self):
+        """Test that the schema version is recorded and later opens skip the DDL."""
+        config = DatabaseConfig.temporary()
+        try:
+            self.assertTrue(config.initialize_database())
+            self.assertFalse(config.initialize_database())
+            with config.get_db_context() as conn:
+                self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            
+            # A new configuration of the same file reads the version instead of running the DDL
+            statements = []
+            reopened = DatabaseConfig(config.db_path)
+            try:
+                reopened.get_connection().set_trace_callback(statements.append)
+                self.assertFalse(reopened.initialize_database())
+                self.assertEqual(statements, ["PRAGMA user_version"])
+            finally:
+                reopened.close_all_connections()
+            
+            config.drop_table()
+            self.assertTrue(config.initialize_database())
+            self.assertEqual(MilkSampleDBRepository(config).get_sample_count(), 0)
+        finally:
+            config.close()
+    
+    def test_shared_configuration(self):
+        """Test that default repositories share one configuration per database."""
+        self.assertIs(DatabaseConfig.shared("shared_test.db"), DatabaseConfig.shared("shared_test.db"))
+        self.assertIsNot(DatabaseConfig.shared("shared_test.db"), DatabaseConfig.shared("other_test.db"))
 
 
 if __name__ == '__main__':
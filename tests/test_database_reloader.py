@@ -0,0 +1,153 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the DatabaseReloader class.
+
+The tests verify:
+- A background reload swaps in a complete database and reports progress
+- Readers see the old data until the swap and the new data afterwards
+- A failed reload leaves the existing database in place
+- A database in WAL mode is copied into rather than renamed over
+- Repeated reloads close the connections to the replaced files
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.database_config import PRAGMA_PRESETS, DatabaseConfig
+from src.persistence.database_reloader import DatabaseReloader
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+CSV_FILENAME = "nms_strontium90_milk_ssn_strontium90_lait.csv"
+
+
+class TestDatabaseReloader(unittest.TestCase):
+    """Test class for reloading the database in the background."""
+
+    def setUp(self):
+        """Create a live database holding two records."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_config = DatabaseConfig(os.path.join(self.temp_dir.name, "live.db"))
+        self.repository = MilkSampleDBRepository(self.db_config)
+        for station in ("Old Station", "Old Station 2"):
+            self.repository.create_sample(MilkSampleRecord("MILK", "WHOLE", "2024-01-01", "2024-01-07",
+                                                           station, "ON", 0.1, None, None))
+
+    def tearDown(self):
+        """Close the database and remove the temporary directory."""
+        self.db_config.close_all_connections()
+        self.temp_dir.cleanup()
+
+    def test_background_reload_swaps_database(self):
+        """Test that the reload replaces the data while an old reader keeps working."""
+        events = []
+        reloader = DatabaseReloader(self.repository, CSV_FILENAME,
+                                    progress=lambda stage, done, total: events.append((stage, done, total)))
+        last_seq = self.repository.get_latest_change_seq()
+        old_reader = self.repository.iter_samples(batch_size=1)
+        self.assertEqual(next(old_reader)[1].station_name, "Old Station")
+        generation = self.repository.get_generation()
+
+        reloader.start()
+        result = reloader.wait(timeout=60)
+
+        self.assertTrue(result.swapped, result.error)
+        self.assertGreater(result.successful_inserts, 1)
+        self.assertEqual(self.repository.get_sample_count(), result.successful_inserts)
+        self.assertEqual(self.repository.read_samples_by_station("Old Station"), [])
+        self.assertNotEqual(self.repository.get_generation(), generation)
+        self.assertEqual(events[-1], ("swap", 1, 1))
+        self.assertIn(("import", result.total_records, result.total_records), events)
+        # The reader started before the swap finishes reading the old file
+        self.assertEqual([record.station_name for _, record in old_reader], ["Old Station 2"])
+        # The change log continues after the old one and starts with a reset
+        changes = self.repository.read_changes(last_seq, limit=2)
+        self.assertEqual([(entry['seq'], entry['op']) for entry in changes],
+                         [(last_seq + 1, 'reset'), (last_seq + 2, 'insert')])
+        # Only the live database is left in the directory
+        self.assertEqual(os.listdir(self.temp_dir.name), ["live.db"])
+
+    def test_failed_reload_keeps_existing_data(self):
+        """Test that a reload from a missing CSV file leaves the live database untouched."""
+        reloader = DatabaseReloader(self.repository, os.path.join(self.temp_dir.name, "missing.csv"))
+        result = reloader.run()
+        self.assertFalse(result.swapped)
+        self.assertIsNotNone(result.error)
+        self.assertEqual(self.repository.get_sample_count(), 2)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["live.db"])
+
+    def test_reload_in_wal_mode_keeps_wal_consistent(self):
+        """Test that a WAL database is reloaded in place while a reader keeps its snapshot."""
+        wal_config = DatabaseConfig(os.path.join(self.temp_dir.name, "wal.db"), pragmas=PRAGMA_PRESETS['wal'])
+        other_config = DatabaseConfig(wal_config.db_path, pragmas=PRAGMA_PRESETS['wal'])
+        try:
+            repository = MilkSampleDBRepository(wal_config)
+            other = MilkSampleDBRepository(other_config)
+            for station in ("Old Station", "Old Station 2"):
+                repository.create_sample(MilkSampleRecord("MILK", "WHOLE", "2024-01-01", "2024-01-07",
+                                                          station, "ON", 0.1, None, None))
+            old_reader = other.iter_samples(batch_size=1)
+            self.assertEqual(next(old_reader)[1].station_name, "Old Station")
+
+            result = DatabaseReloader(repository, CSV_FILENAME).run()
+
+            self.assertTrue(result.swapped, result.error)
+            self.assertEqual([record.station_name for _, record in old_reader], ["Old Station 2"])
+            self.assertEqual(repository.get_sample_count(), result.successful_inserts)
+            # A connection opened before the reload sees the new data without reconnecting
+            self.assertEqual(other.get_sample_count(), result.successful_inserts)
+            with wal_config.get_db_context() as conn:
+                self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+                self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertFalse([name for name in os.listdir(self.temp_dir.name) if name.startswith("milk_samples_")])
+        finally:
+            other_config.close_all_connections()
+            wal_config.close_all_connections()
+
+    @staticmethod
+    def open_descriptors():
+        """Count the file descriptors of this process, or None where /proc is not available."""
+        fd_dir = "/proc/self/fd"
+        return len(os.listdir(fd_dir)) if os.path.isdir(fd_dir) else None
+
+    def test_repeated_reloads_close_old_connections(self):
+        """Test that connections and file handles do not pile up over several reloads."""
+        small_csv = os.path.join(self.temp_dir.name, "small.csv")
+        with open(CSV_FILENAME, "rb") as source, open(small_csv, "wb") as target:
+            for _ in range(20):
+                target.write(source.readline())
+        reloader = DatabaseReloader(self.repository, small_csv)
+        self.assertTrue(reloader.run().swapped)
+        self.repository.get_sample_count()
+        connections = len(self.db_config._connections)
+        descriptors = self.open_descriptors()
+
+        for _ in range(3):
+            self.assertTrue(reloader.run().swapped, reloader.result.error)
+            self.assertEqual(self.repository.get_sample_count(), reloader.result.successful_inserts)
+        self.assertEqual(len(self.db_config._connections), connections)
+        self.assertEqual(self.open_descriptors(), descriptors)
+
+        # A reader started before a reload keeps its connection until it finishes
+        reader = self.repository.iter_samples(batch_size=1)
+        next(reader)
+        self.assertTrue(reloader.run().swapped)
+        self.repository.get_sample_count()
+        self.assertEqual(len(self.db_config._connections), connections + 1)
+        self.assertGreater(len(list(reader)), 0)
+        self.assertEqual(len(self.db_config._connections), connections)
+        self.assertEqual(self.open_descriptors(), descriptors)
+
+
+if __name__ == '__main__':
+    unittest.main()
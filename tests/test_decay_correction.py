@@ -0,0 +1,98 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the DecayCorrectionEngine class.
+
+The tests verify:
+- Parsing of both dataset and ISO sample dates
+- Decay correction over one half-life
+- Uncertainty propagation and handling of missing values
+- Bulk storage of corrected values in the derived table
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.decay_correction import DecayCorrectionEngine, DAYS_PER_YEAR
+from src.model.milk_sample_record import MilkSampleRecord
+from src.model.sample_dates import parse_sample_date
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+class TestDecayCorrection(unittest.TestCase):
+    """
+    Test class for the decay correction engine.
+
+    Each test uses a temporary database file so the real
+    milk_samples.db is never modified.
+    """
+
+    def setUp(self):
+        """Create a repository backed by a temporary database file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_config = DatabaseConfig(os.path.join(self.temp_dir.name, "decay.db"))
+        self.repository = MilkSampleDBRepository(db_config)
+        self.engine = DecayCorrectionEngine(self.repository, half_life_uncertainty_years=0.0)
+
+    def tearDown(self):
+        """Close the database and remove the temporary directory."""
+        self.repository.db_config.close_connection()
+        self.temp_dir.cleanup()
+
+    def test_parse_sample_date_formats(self):
+        """Test that dataset and ISO date strings are both parsed."""
+        self.assertEqual(parse_sample_date("01-Jan-84"), date(1984, 1, 1))
+        self.assertEqual(parse_sample_date("2024-01-31"), date(2024, 1, 31))
+        self.assertIsNone(parse_sample_date("not a date"))
+        self.assertIsNone(parse_sample_date(""))
+
+    def test_one_half_life_halves_activity(self):
+        """Test that correcting forward by one half-life halves every value."""
+        midpoint = date(2000, 1, 1)
+        reference = date.fromordinal(midpoint.toordinal() + round(self.engine.half_life_years * DAYS_PER_YEAR))
+        columns = {
+            'id': [1, 2],
+            'start_date': ["2000-01-01", "bad"],
+            'stop_date': ["2000-01-01", "bad"],
+            'sr90_activity': [0.2, 0.3],
+            'sr90_error': [0.02, None],
+            'sr90_activity_per_calcium': [None, 0.1]
+        }
+        batch = self.engine.correct_columns(columns, reference)
+        self.assertEqual(list(batch.ids), [1])
+        self.assertEqual(batch.skipped_ids, [2])
+        self.assertAlmostEqual(batch.activities[0], 0.1, places=4)
+        self.assertAlmostEqual(batch.errors[0], 0.01, places=4)
+        self.assertIsNone(batch.activities_per_calcium[0])
+
+    def test_run_writes_derived_table(self):
+        """Test that run stores one corrected row per sample."""
+        for start, stop in (("01-Jan-84", "31-Mar-84"), ("01-Apr-84", "30-Jun-84")):
+            self.repository.create_sample(MilkSampleRecord(
+                "MILK", "WHOLE", start, stop, "CALGARY", "AB", 0.1, 0.01, 0.09))
+        summary = self.engine.run(date(2020, 1, 1), batch_size=1)
+        self.assertEqual(summary['rows_written'], 2)
+        self.assertEqual(summary['rows_skipped'], 0)
+
+        conn = self.repository.db_config.get_connection()
+        rows = conn.execute(
+            "SELECT corrected_activity, reference_date FROM milk_samples_decay_corrected").fetchall()
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertLess(row['corrected_activity'], 0.1)
+            self.assertEqual(row['reference_date'], "2020-01-01")
+
+
+if __name__ == '__main__':
+    unittest.main()
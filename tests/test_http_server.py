@@ -0,0 +1,163 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the HTTP/JSON query server.
+
+The tests verify:
+- Point reads, missing samples and bad parameters return the right status
+- Filtered queries stream JSON Lines with chunked encoding
+- ETags change with the data generation and conditional requests get 304
+- Idle keep-alive connections do not hold worker threads and are closed after a timeout
+"""
+
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from datetime import date
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.presentation.http_server import create_server
+
+DB_PATH = os.path.join(project_root, 'milk_samples.db')
+
+
+class TestHTTPServer(unittest.TestCase):
+    """Test class for the HTTP/JSON query server."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a server on a free port over an in-memory copy of the database."""
+        cls.db_config = DatabaseConfig.from_snapshot(DB_PATH)
+        cls.service = MilkSampleDBService(MilkSampleDBRepository(cls.db_config))
+        cls.server = create_server(cls.service, port=0, max_workers=4)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the server and discard the database."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.db_config.close()
+
+    def setUp(self):
+        """Open a keep-alive connection to the server."""
+        self.connection = http.client.HTTPConnection(*self.server.server_address, timeout=10)
+
+    def tearDown(self):
+        """Close the connection."""
+        self.connection.close()
+
+    def get(self, path, headers=None):
+        """Send a GET request and return (status, headers, body)."""
+        self.connection.request("GET", path, headers=headers or {})
+        response = self.connection.getresponse()
+        return response.status, response, response.read()
+
+    def test_point_reads(self):
+        """Test reading one sample, a missing sample and an invalid ID."""
+        record_id, record = self.service.get_all_samples_with_ids(limit=1)[0]
+        status, _, body = self.get(f"/samples/{record_id}")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['station_name'], record.station_name)
+        self.assertEqual(self.get("/samples/999999999")[0], 404)
+        self.assertEqual(self.get("/samples/abc")[0], 400)
+        self.assertEqual(self.get("/samples?limit=-1")[0], 400)
+        self.assertEqual(self.get("/nothing")[0], 404)
+
+    def test_streamed_queries(self):
+        """Test that filtered queries stream the same rows as the service."""
+        status, response, body = self.get("/samples?province=AB&start_from=1990-01-01&offset=1&limit=30")
+        self.assertEqual(status, 200)
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        rows = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+        expected = self.service.query_samples(province="AB", start_from=date(1990, 1, 1),
+                                              limit=30, offset=1)
+        self.assertEqual([row['id'] for row in rows], [record_id for record_id, _ in expected])
+
+        status, _, body = self.get("/samples")
+        self.assertEqual(len(body.decode("utf-8").splitlines()), self.service.get_sample_count())
+        status, _, body = self.get("/cube?group_by=province&year=1990")
+        self.assertEqual(status, 200)
+        self.assertEqual(sum(row['sample_count'] for row in json.loads(body)),
+                         len(self.service.query_samples(start_from=date(1990, 1, 1),
+                                                        start_until=date(1990, 12, 31))))
+
+    def test_conditional_get(self):
+        """Test that a matching ETag gets 304 until the data changes."""
+        status, response, _ = self.get("/stats")
+        self.assertEqual(status, 200)
+        etag = response.getheader("ETag")
+        self.assertEqual(self.get("/stats", {"If-None-Match": etag})[0], 304)
+
+        record_id, _ = self.service.create_new_sample("MILK", "WHOLE", "2024-01-01", "2024-01-07",
+                                                      "HTTP Station", "ON", 0.1)
+        status, response, body = self.get("/stats", {"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+        self.assertIn("HTTP Station", json.loads(body)['stations'])
+        self.service.delete_sample(record_id)
+
+    def test_metrics(self):
+        """Test the metrics endpoint in each format."""
+        self.get("/samples/1")
+        status, response, body = self.get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertTrue(response.getheader("Content-Type").startswith("text/plain; version=0.0.4"))
+        text = body.decode("utf-8")
+        self.assertIn('sr90_call_seconds_count{component="MilkSampleDBService",method="get_sample_by_id"}', text)
+        self.assertIn('sr90_http_request_seconds_bucket{endpoint="samples/<id>",le="+Inf"}', text)
+
+        status, _, body = self.get("/metrics?format=json")
+        self.assertEqual(status, 200)
+        self.assertIn("call_seconds", json.loads(body)['histograms'])
+        self.assertEqual(self.get("/metrics?format=text")[0], 200)
+        self.assertEqual(self.get("/metrics?format=xml")[0], 400)
+
+    def test_idle_connections_do_not_hold_workers(self):
+        """Test that idle keep-alive clients leave the workers free and are closed when idle too long."""
+        server = create_server(self.service, port=0, max_workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        idle = [http.client.HTTPConnection(*server.server_address, timeout=5) for _ in range(2)]
+        silent = socket.create_connection(server.server_address, timeout=5)
+        try:
+            for connection in idle:
+                connection.request("GET", "/health")
+                self.assertEqual(connection.getresponse().read(), b'{"status": "ok"}')
+
+            other = http.client.HTTPConnection(*server.server_address, timeout=2)
+            other.request("GET", "/health")
+            self.assertEqual(other.getresponse().status, 200)
+            other.close()
+            # The idle connections are still usable
+            idle[0].request("GET", "/health")
+            self.assertEqual(idle[0].getresponse().status, 200)
+
+            server.idle_timeout = 0.2
+            time.sleep(1.5)
+            self.assertEqual(silent.recv(1), b"")
+        finally:
+            silent.close()
+            for connection in idle:
+                connection.close()
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
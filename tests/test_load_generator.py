@@ -0,0 +1,84 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the mixed-workload load generator in
+benchmarks/load_generator.py.
+
+The tests verify:
+- Operation mixes are parsed and validated
+- Lock errors are recognized for retrying
+- A short run with readers and writers reports throughput and latencies
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.load_generator import is_lock_error, parse_mix, run_load
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.persistence.database_config import PRAGMA_PRESETS, DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.synthetic_dataset import SyntheticDatasetGenerator, learn_profile_from_csv
+
+
+class TestLoadGenerator(unittest.TestCase):
+    """Test class for the load generator."""
+
+    def test_parse_mix(self):
+        """Test weights, defaults and invalid mixes."""
+        operations = {'create': None, 'edit': None, 'delete': None}
+        self.assertEqual(parse_mix("create=3, edit, delete=0", operations), [('create', 3.0), ('edit', 1.0)])
+        for text in ("create=1,drop=1", "create=-1", "delete=0", ""):
+            with self.assertRaises(ValueError):
+                parse_mix(text, operations)
+
+    def test_lock_errors(self):
+        """Test that SQLITE_BUSY is retryable and other errors are not."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "locked.db")
+            holder = sqlite3.connect(path)
+            holder.execute("BEGIN EXCLUSIVE")
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                with self.assertRaises(sqlite3.OperationalError) as context:
+                    other.execute("SELECT 1 FROM sqlite_master")
+                self.assertTrue(is_lock_error(context.exception))
+                holder.rollback()
+                with self.assertRaises(sqlite3.OperationalError) as context:
+                    other.execute("SELECT * FROM missing_table")
+                self.assertFalse(is_lock_error(context.exception))
+            finally:
+                holder.close()
+                other.close()
+
+    def test_short_run(self):
+        """Test a short run with two readers and one writer on a WAL database."""
+        db_config = DatabaseConfig.temporary(pragmas=PRAGMA_PRESETS['wal'])
+        try:
+            service = MilkSampleDBService(MilkSampleDBRepository(db_config))
+            SyntheticDatasetGenerator(learn_profile_from_csv(), 0).populate(service.repository, 300)
+            report = run_load(service, readers=2, writers=1, duration=0.3,
+                              read_mix="get_sample_by_id=3,query_samples=1", write_mix="create=2,delete=1")
+        finally:
+            db_config.close()
+        self.assertEqual(report['reads']['threads'], 2)
+        self.assertGreater(report['reads']['calls'], 0)
+        self.assertGreater(report['writes']['calls'], 0)
+        self.assertEqual(set(report['reads']['operations']), {'get_sample_by_id', 'query_samples'})
+        for role in ('reads', 'writes'):
+            self.assertEqual(report[role]['errors'], 0)
+            self.assertLessEqual(report[role]['p50_ms'], report[role]['p99_ms'])
+            self.assertLessEqual(report[role]['p99_ms'], report[role]['max_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the metrics registry and instrumentation.
+
+The tests verify:
+- Histogram quantiles come from the bucket bounds
+- Instrumented methods record calls, rows, errors and streamed rows
+- Nothing is recorded while the registry is disabled
+- SQL statements and cache lookups are counted
+- Statement counting follows the on/off switch on open connections
+- Calls recorded on other threads, finished or not, are all reported
+- The Prometheus export follows the text exposition format
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.observability.metrics import REGISTRY, Histogram, MetricsRegistry, count_statement, instrumented
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+
+registry = MetricsRegistry()
+
+
+@instrumented(registry=registry)
+class Widget:
+    """A small class to instrument."""
+
+    def items(self, count):
+        return list(range(count))
+
+    def stream(self, count):
+        yield from range(count)
+
+    def fail(self):
+        raise RuntimeError("broken")
+
+    def _private(self):
+        return []
+
+
+def series(snapshot, kind, name, method):
+    """Find the series of a metric for one Widget method."""
+    for entry in snapshot[kind].get(name, []):
+        if entry['labels'].get('method') == method:
+            return entry
+    return None
+
+
+class TestMetrics(unittest.TestCase):
+    """Test class for the metrics registry."""
+
+    def setUp(self):
+        """Start each test with an empty, enabled registry."""
+        registry.reset()
+        registry.set_enabled(True)
+
+    def test_histogram_quantiles(self):
+        """Test that quantiles are reported as bucket upper bounds."""
+        histogram = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.quantile(0.5), 2.0)
+        self.assertEqual(histogram.quantile(0.8), 4.0)
+        self.assertEqual(histogram.quantile(1.0), float('inf'))
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+    def test_instrumented_methods(self):
+        """Test call counts, rows, errors and generator rows."""
+        widget = Widget()
+        widget.items(3)
+        widget.items(4)
+        self.assertEqual(sum(widget.stream(5)), 10)
+        with self.assertRaises(RuntimeError):
+            widget.fail()
+        widget._private()
+
+        snapshot = registry.snapshot()
+        self.assertEqual(series(snapshot, 'histograms', 'call_seconds', 'items')['count'], 2)
+        self.assertEqual(series(snapshot, 'counters', 'rows_returned_total', 'items')['value'], 7)
+        self.assertEqual(series(snapshot, 'counters', 'rows_returned_total', 'stream')['value'], 5)
+        self.assertEqual(series(snapshot, 'counters', 'call_errors_total', 'fail')['value'], 1)
+        self.assertIsNone(series(snapshot, 'histograms', 'call_seconds', '_private'))
+
+    def test_disabled(self):
+        """Test that a disabled registry records nothing and instrumented code still works."""
+        registry.set_enabled(False)
+        self.assertEqual(Widget().items(2), [0, 1])
+        self.assertEqual(list(Widget().stream(2)), [0, 1])
+        self.assertEqual(registry.snapshot()['histograms'], {})
+
+    def test_statements_and_cache(self):
+        """Test SQL statement counting and the cube cache counters of the service."""
+        count_statement("  select 1", registry)
+        count_statement("-- TRIGGER milk_samples_log_insert", registry)
+        verbs = {entry['labels']['verb']: entry['value']
+                 for entry in registry.snapshot()['counters']['sql_statements_total']}
+        self.assertEqual(verbs, {'SELECT': 1, 'TRIGGER': 1})
+
+        def cube_lookups():
+            return {entry['labels']['result']: entry['value']
+                    for entry in REGISTRY.snapshot()['counters'].get('cache_requests_total', [])
+                    if entry['labels']['cache'] == 'cube'}
+        before = cube_lookups()
+        service = MilkSampleDBService(InMemoryMilkSampleRepository())
+        service.query_cube(['province'])
+        service.query_cube(['province'])
+        after = cube_lookups()
+        self.assertEqual(after.get('miss', 0) - before.get('miss', 0), 1)
+        self.assertEqual(after.get('hit', 0) - before.get('hit', 0), 1)
+
+    def test_statement_counting_follows_switch(self):
+        """Test that an open connection stops and resumes counting statements with the switch."""
+        def selects():
+            return sum(entry['value'] for entry in REGISTRY.snapshot()['counters'].get('sql_statements_total', [])
+                       if entry['labels']['verb'] == 'SELECT')
+        db_config = DatabaseConfig(":memory:")
+        enabled = REGISTRY.enabled
+        try:
+            REGISTRY.set_enabled(True)
+            before = selects()
+            with db_config.get_db_context() as conn:
+                conn.execute("SELECT 1")
+            self.assertEqual(selects() - before, 1)
+
+            REGISTRY.set_enabled(False)
+            with db_config.get_db_context() as conn:
+                conn.execute("SELECT 1")
+                self.assertIs(db_config.connection, conn)
+            REGISTRY.set_enabled(True)
+            self.assertEqual(selects() - before, 1)
+            with db_config.get_db_context() as conn:
+                conn.execute("SELECT 1")
+            self.assertEqual(selects() - before, 2)
+        finally:
+            REGISTRY.set_enabled(enabled)
+            db_config.close()
+
+    def test_calls_on_other_threads(self):
+        """Test that calls made on running and finished threads are added up, and reset clears them."""
+        widget = Widget()
+        called = threading.Event()
+        release = threading.Event()
+
+        def call_and_wait():
+            widget.items(2)
+            called.set()
+            release.wait()
+
+        waiting = threading.Thread(target=call_and_wait)
+        waiting.start()
+        called.wait(5)
+        finished = threading.Thread(target=widget.items, args=(3,))
+        finished.start()
+        finished.join()
+        widget.items(1)
+        try:
+            snapshot = registry.snapshot()
+            self.assertEqual(series(snapshot, 'histograms', 'call_seconds', 'items')['count'], 3)
+            self.assertEqual(series(snapshot, 'counters', 'rows_returned_total', 'items')['value'], 6)
+            # Finished threads stay counted once folded into the registry
+            self.assertEqual(series(registry.snapshot(), 'histograms', 'call_seconds', 'items')['count'], 3)
+            registry.reset()
+            self.assertIsNone(series(registry.snapshot(), 'histograms', 'call_seconds', 'items'))
+        finally:
+            release.set()
+            waiting.join()
+
+    def test_prometheus_export(self):
+        """Test the exposition format of counters and histograms."""
+        Widget().items(2)
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE sr90_rows_returned_total counter', text)
+        self.assertIn('sr90_rows_returned_total{component="Widget",method="items"} 2', text)
+        self.assertIn('# TYPE sr90_call_seconds histogram', text)
+        self.assertIn('sr90_call_seconds_bucket{component="Widget",method="items",le="+Inf"} 1', text)
+        self.assertIn('sr90_call_seconds_count{component="Widget",method="items"} 1', text)
+        self.assertIn("Widget.items", registry.to_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
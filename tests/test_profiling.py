@@ -0,0 +1,80 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the profiling mode.
+
+The tests verify:
+- Profiling arguments are parsed into options only when --profile is given
+- A profiled migration writes the pstats, summary and allocation reports
+- The summary lists the hottest DataMigration, repository and record functions
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.observability.profiling import (ProfileOptions, add_profile_arguments, describe_result,
+                                         profile_options_from_args, profiled)
+from src.persistence.data_migration import DataMigration
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+CSV_FILE = os.path.join(project_root, "nms_strontium90_milk_ssn_strontium90_lait.csv")
+
+
+class TestProfiling(unittest.TestCase):
+    """Test class for the profiling mode."""
+
+    def test_arguments(self):
+        """Test that options exist only when profiling is requested."""
+        parser = argparse.ArgumentParser()
+        add_profile_arguments(parser)
+        self.assertIsNone(profile_options_from_args(parser.parse_args([])))
+        self.assertEqual(profile_options_from_args(parser.parse_args(["--profile"])), ProfileOptions())
+        options = profile_options_from_args(parser.parse_args(["--profile", "out", "--profile-memory",
+                                                               "--profile-top", "5"]))
+        self.assertEqual(options, ProfileOptions("out", True, 5))
+
+    def test_disabled(self):
+        """Test that the block runs unprofiled without options."""
+        with profiled("nothing", None) as result:
+            pass
+        self.assertIsNone(result)
+
+    @unittest.skipUnless(os.path.exists(CSV_FILE), "sample CSV not available")
+    def test_profiled_migration(self):
+        """Test the reports of a profiled migration."""
+        db_config = DatabaseConfig(":memory:")
+        try:
+            migration = DataMigration(CSV_FILE, MilkSampleDBRepository(db_config))
+            with tempfile.TemporaryDirectory() as directory:
+                with profiled("migrate_data", ProfileOptions(directory, memory=True, top=10)) as result:
+                    total, successful, _ = migration.migrate_data()
+                self.assertGreater(successful, 0)
+                for path in (result.pstats_path, result.summary_path, result.allocations_path):
+                    self.assertTrue(os.path.exists(path), path)
+                self.assertGreater(result.peak_bytes, 0)
+                self.assertTrue(any(name.startswith("DataMigration.") for name, *_ in result.hottest))
+                with open(result.summary_path, encoding="utf-8") as file:
+                    self.assertIn("Hottest functions in DataMigration", file.read())
+                self.assertIn(result.summary_path, describe_result(result))
+
+                # A second run in the same second gets its own files
+                with profiled("migrate_data", ProfileOptions(directory)) as second:
+                    pass
+                self.assertNotEqual(second.pstats_path, result.pstats_path)
+        finally:
+            db_config.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains conformance tests run against every SampleRepository engine.
+
+The tests verify, for the SQLite, sharded SQLite and in-memory engines:
+- Each engine satisfies the SampleRepository protocol
+- CRUD operations and the write generation behave the same way
+- Pagination, filters and date range queries return the same records in ID order
+- Counts, distinct values, summaries, streaming reads and the cube agree
+- The change log records every write and supports coalescing and retention
+- The service's anomaly scan and decay correction work on every engine
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.anomaly_detection import RULE_ERROR_RATIO, RULE_NON_POSITIVE
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+from src.persistence.milk_sample_db_repository import (ChangeLogPolicy, ChangeLogTruncatedError,
+                                                      MilkSampleDBRepository)
+from src.persistence.sample_repository import SampleRepository
+from src.persistence.sharded_repository import ShardedMilkSampleDBRepository
+
+SAMPLES = [
+    MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Jan-84", "CALGARY", "AB", 0.105, 0.01, 0.088),
+    MilkSampleRecord("MILK", "WHOLE", "01-Apr-84", "30-Apr-84", "CALGARY", "AB", 0.0628, 0.006, None),
+    MilkSampleRecord("MILK", "WHOLE", "1985-07-01", "1985-07-31", "HALIFAX", "NS", 0.058, None, 0.05),
+    MilkSampleRecord("MILK", "SKIM", "1985-10-01", "1985-10-31", "HALIFAX", "NS", 0.0, 0.01, None),
+    MilkSampleRecord("MILK", "WHOLE", "01-Jan-86", "31-Jan-86", "OTTAWA", "ON", 0.071, 0.007, 0.06),
+]
+
+
+class RepositoryConformance:
+    """Tests shared by every engine; subclasses provide make_repository."""
+
+    def make_repository(self):
+        """Create an empty repository for one test."""
+        raise NotImplementedError
+
+    def setUp(self):
+        """Create a repository holding SAMPLES."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repository = self.make_repository()
+        self.repository.initialize_database()
+        self.ids = [self.repository.create_sample(record) for record in SAMPLES]
+
+    def tearDown(self):
+        """Release the repository and remove the temporary directory."""
+        self.release_repository()
+        self.temp_dir.cleanup()
+
+    def release_repository(self):
+        """Close any open files held by the repository."""
+
+    def test_satisfies_protocol(self):
+        """Test that the engine is a SampleRepository."""
+        self.assertIsInstance(self.repository, SampleRepository)
+
+    def test_crud_and_generation(self):
+        """Test create, read, update and delete, and that writes change the generation."""
+        self.assertEqual(len(set(self.ids)), len(SAMPLES))
+        self.assertEqual(self.repository.read_sample_by_id(self.ids[2]), SAMPLES[2])
+
+        generation = self.repository.get_generation()
+        updated = MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Jan-84", "CALGARY", "AB", 0.2, 0.02, None)
+        self.assertTrue(self.repository.update_sample(self.ids[0], updated))
+        self.assertEqual(self.repository.read_sample_by_id(self.ids[0]), updated)
+        self.assertNotEqual(self.repository.get_generation(), generation)
+
+        self.assertTrue(self.repository.delete_sample(self.ids[1]))
+        self.assertIsNone(self.repository.read_sample_by_id(self.ids[1]))
+        self.assertFalse(self.repository.delete_sample(self.ids[1]))
+        self.assertEqual(self.repository.get_sample_count(), len(SAMPLES) - 1)
+
+        self.assertEqual(self.repository.clear_all_samples(), len(SAMPLES) - 1)
+        self.assertEqual(self.repository.get_sample_count(), 0)
+        self.assertEqual(self.repository.get_max_sample_id(), 0)
+
+    def test_returned_records_are_independent(self):
+        """Test that changing a returned record does not change stored data."""
+        record = self.repository.read_sample_by_id(self.ids[0])
+        record.sr90_activity = 99.0
+        self.assertEqual(self.repository.read_sample_by_id(self.ids[0]), SAMPLES[0])
+
+    def test_pagination_and_filters(self):
+        """Test paging in ID order and the province and station filters."""
+        all_rows = self.repository.read_all_samples()
+        self.assertEqual([record_id for record_id, _ in all_rows], sorted(self.ids))
+        self.assertEqual(self.repository.read_all_samples(2, 1), all_rows[1:3])
+        self.assertEqual(self.repository.read_all_samples_simple(2, 3), [record for _, record in all_rows[3:5]])
+        self.assertEqual(self.repository.read_samples_by_province("NS"), SAMPLES[2:4])
+        self.assertEqual(self.repository.read_samples_by_station("CALGARY"), SAMPLES[0:2])
+        self.assertEqual(self.repository.read_samples_by_province("YT"), [])
+
+    def expected(self, predicate):
+        """Get the SAMPLES matching a predicate, in the ID order of this engine."""
+        by_id = dict(zip(self.ids, SAMPLES))
+        return [by_id[record_id] for record_id in sorted(self.ids) if predicate(by_id[record_id])]
+
+    def test_query_samples(self):
+        """Test combined filters, date ranges mixing both date formats, and paging."""
+        rows = self.repository.query_samples(start_from=date(1984, 3, 1), start_until=date(1985, 12, 31))
+        self.assertEqual([record for _, record in rows], self.expected(lambda record: record in SAMPLES[1:4]))
+        by_id = dict(zip(self.ids, SAMPLES))
+        self.assertTrue(all(by_id[record_id] == record for record_id, record in rows))
+
+        rows = self.repository.query_samples(province="NS", start_from=date(1985, 8, 1))
+        self.assertEqual([record for _, record in rows], [SAMPLES[3]])
+        rows = self.repository.query_samples(station_name="CALGARY", start_until=date(1984, 1, 1))
+        self.assertEqual([record for _, record in rows], [SAMPLES[0]])
+        rows = self.repository.query_samples(limit=2, offset=2)
+        self.assertEqual([record for _, record in rows], self.expected(lambda record: True)[2:4])
+        self.assertEqual(self.repository.query_samples(province="YT"), [])
+
+    def test_query_samples_after_id(self):
+        """Test keyset paging with after_id, alone and combined with filters."""
+        all_ids = sorted(self.ids)
+        rows = self.repository.query_samples(limit=2, after_id=all_ids[1])
+        self.assertEqual([record_id for record_id, _ in rows], all_ids[2:4])
+        rows = self.repository.query_samples(after_id=all_ids[-1])
+        self.assertEqual(rows, [])
+
+        calgary = [record_id for record_id, _ in self.repository.query_samples(station_name="CALGARY")]
+        rows = self.repository.query_samples(station_name="CALGARY", after_id=calgary[0])
+        self.assertEqual([record_id for record_id, _ in rows], calgary[1:])
+
+    def test_aggregates(self):
+        """Test distinct values, the summary and the cube."""
+        self.assertEqual(self.repository.read_distinct_values("province"), ["AB", "NS", "ON"])
+        self.assertEqual(self.repository.read_distinct_values("station_name"), ["CALGARY", "HALIFAX", "OTTAWA"])
+        with self.assertRaises(ValueError):
+            self.repository.read_distinct_values("sr90_activity")
+
+        summary = self.repository.summarize_samples()
+        self.assertEqual(summary['total_samples'], len(SAMPLES))
+        self.assertEqual(summary['valid_activity_readings'], 4)
+        self.assertAlmostEqual(summary['activity_sum'], 0.105 + 0.0628 + 0.058 + 0.071)
+        self.assertEqual(summary['provinces'], {"AB", "NS", "ON"})
+
+        rows = self.repository.query_cube(["year"])
+        self.assertEqual([(row['year'], row['sample_count']) for row in rows], [(1984, 2), (1985, 2), (1986, 1)])
+        rows = self.repository.query_cube(["type"], {"province": "NS"})
+        self.assertEqual([(row['type'], row['sample_count']) for row in rows], [("SKIM", 1), ("WHOLE", 1)])
+
+        self.repository.delete_sample(self.ids[4])
+        self.assertEqual(len(self.repository.query_cube(["year"])), 2)
+        self.repository.rebuild_cube()
+        self.assertEqual(len(self.repository.query_cube(["year"])), 2)
+
+    def test_streaming_reads(self):
+        """Test that both streaming reads cover every record exactly once."""
+        streamed = list(self.repository.iter_samples(batch_size=2))
+        self.assertEqual(streamed, self.repository.read_all_samples())
+
+        # Column batches may come in any order, but each row must stay aligned
+        batches = list(self.repository.iter_measurement_batches(batch_size=2))
+        activities = {record_id: activity for columns in batches
+                      for record_id, activity in zip(columns['id'], columns['sr90_activity'])}
+        self.assertEqual(sum(len(columns['id']) for columns in batches), len(SAMPLES))
+        self.assertEqual(activities, {record_id: record.sr90_activity for record_id, record in streamed})
+        first_id, second_id = sorted(self.ids)[:2]
+        after = [record_id for columns in self.repository.iter_measurement_batches(after_id=first_id,
+                                                                                   through_id=second_id)
+                 for record_id in columns['id']]
+        self.assertEqual(after, [second_id])
+
+        self.assertEqual(self.repository.get_max_sample_id(), max(self.ids))
+        create_count = self.repository.create_samples(SAMPLES[:2])
+        self.assertEqual(create_count, 2)
+        self.assertEqual(self.repository.get_sample_count(), len(SAMPLES) + 2)
+
+    def test_change_log(self):
+        """Test that writes are logged in order, and coalescing and retention behave."""
+        self.assertEqual([(entry['op'], entry['sample_id']) for entry in self.repository.read_changes()],
+                         [('insert', record_id) for record_id in self.ids])
+        start = self.repository.get_latest_change_seq()
+        updated = MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Jan-84", "CALGARY", "AB", 0.2, None, None)
+        self.repository.update_sample(self.ids[0], updated)
+        self.repository.delete_sample(self.ids[1])
+        self.repository.create_samples([SAMPLES[1]])
+
+        entries = self.repository.read_changes(start)
+        self.assertEqual([entry['op'] for entry in entries], ['update', 'delete', 'insert'])
+        self.assertEqual(entries[0]['record'], updated)
+        self.assertIsNone(entries[1]['record'])
+        self.assertEqual([entry['seq'] for entry in entries], list(range(start + 1, start + 4)))
+        self.assertEqual(len(self.repository.read_changes(start, limit=2)), 2)
+
+        # Coalescing keeps only the latest entry per sample and never forces a resync
+        self.assertEqual(self.repository.compact_change_log(ChangeLogPolicy()), 2)
+        self.assertEqual(len(self.repository.read_changes(0)), len(SAMPLES) + 1)
+
+        # Retention drops old entries, and consumers behind them must resync
+        self.repository.compact_change_log(ChangeLogPolicy(coalesce=False, max_entries=2))
+        self.assertEqual(len(self.repository.read_changes(start + 1)), 2)
+        with self.assertRaises(ChangeLogTruncatedError):
+            self.repository.read_changes(start)
+
+        # A restarted log continues the numbering with a reset
+        latest = self.repository.get_latest_change_seq()
+        self.repository.start_change_log_after(latest + 10)
+        self.assertEqual([(entry['seq'], entry['op']) for entry in self.repository.read_changes(latest)],
+                         [(latest + 11, 'reset')])
+        self.repository.delete_sample(self.ids[2])
+        self.assertEqual([(entry['op'], entry['sample_id']) for entry in self.repository.read_changes(latest + 11)],
+                         [('delete', self.ids[2])])
+
+    def test_anomalies_and_decay_correction(self):
+        """Test that anomaly scans and decay correction run through the service on the engine."""
+        service = MilkSampleDBService(self.repository)
+        self.assertEqual(service.detect_anomalies()['rows_checked'], len(SAMPLES))
+        self.assertEqual([flag['sample_id'] for flag in service.get_anomalies(RULE_NON_POSITIVE)], [self.ids[3]])
+        self.assertEqual(service.get_anomalies(RULE_NON_POSITIVE)[0]['province'], "NS")
+
+        new_id = self.repository.create_sample(
+            MilkSampleRecord("MILK", "WHOLE", "1985-08-01", "1985-08-31", "HALIFAX", "NS", 0.05, 0.5, None))
+        summary = service.detect_anomalies()
+        self.assertEqual(summary['rows_checked'], 1)
+        self.assertEqual([flag['sample_id'] for flag in service.get_anomalies(RULE_ERROR_RATIO)], [new_id])
+
+        summary = service.apply_decay_correction(date(2000, 1, 1))
+        self.assertEqual(summary['rows_written'] + summary['rows_skipped'], len(SAMPLES) + 1)
+
+
+class TestSQLiteRepository(RepositoryConformance, unittest.TestCase):
+    """Conformance tests for the single-file SQLite engine."""
+
+    def make_repository(self):
+        return MilkSampleDBRepository(DatabaseConfig(os.path.join(self.temp_dir.name, "samples.db")))
+
+    def release_repository(self):
+        self.repository.db_config.close_all_connections()
+
+
+class TestShardedRepository(RepositoryConformance, unittest.TestCase):
+    """Conformance tests for the province-sharded SQLite engine."""
+
+    def make_repository(self):
+        return ShardedMilkSampleDBRepository(self.temp_dir.name, max_workers=2)
+
+    def release_repository(self):
+        self.repository.close()
+
+
+class TestInMemoryRepository(RepositoryConformance, unittest.TestCase):
+    """Conformance tests for the in-memory engine."""
+
+    def make_repository(self):
+        return InMemoryMilkSampleRepository()
+
+
+if __name__ == '__main__':
+    unittest.main()
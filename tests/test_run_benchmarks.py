@@ -0,0 +1,85 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the benchmark suite in benchmarks/run_benchmarks.py.
+
+The tests verify:
+- A small run reports every benchmark as JSON
+- Comparison with a baseline flags only slowdowns beyond the threshold
+- A regression makes the script exit with status 1
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.run_benchmarks import compare, main, measure_startup, parse_importtime
+
+BENCHMARKS = {"migrate_data", "get_sample_by_id", "get_samples_by_province", "get_samples_by_station",
+              "get_statistics", "page_by_offset", "page_by_keyset", "stream_all",
+              "create_sample", "edit_sample", "delete_sample"}
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """Test class for the benchmark suite."""
+
+    def test_compare(self):
+        """Test that only slowdowns beyond the threshold are regressions."""
+        baseline = {'results': [{'name': 'a', 'size': 10, 'median_us': 100.0},
+                                {'name': 'b', 'size': 10, 'median_us': 100.0}]}
+        results = [{'name': 'a', 'size': 10, 'median_us': 120.0},
+                   {'name': 'b', 'size': 10, 'median_us': 130.0},
+                   {'name': 'c', 'size': 10, 'median_us': 1.0}]
+        comparison = compare(results, baseline, 0.25)
+        self.assertEqual([(entry['name'], entry['regression']) for entry in comparison], [('a', False), ('b', True)])
+
+    def test_small_run_and_baseline(self):
+        """Test a tiny end-to-end run against a baseline that is much faster."""
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "report.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = main(["--sizes", "300", "--engine", "in-memory", "--min-seconds", "0",
+                               "--startup-runs", "0", "--output", report_path])
+            self.assertEqual(status, 0)
+            with open(report_path, encoding="utf-8") as file:
+                report = json.load(file)
+            self.assertEqual({entry['name'] for entry in report['results']}, BENCHMARKS)
+            self.assertTrue(all(entry['size'] == 300 and entry['calls'] >= 1 for entry in report['results']))
+
+            for entry in report['results']:
+                entry['median_us'] /= 100.0
+            baseline_path = os.path.join(directory, "baseline.json")
+            with open(baseline_path, "w", encoding="utf-8") as file:
+                json.dump(report, file)
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = main(["--sizes", "300", "--engine", "in-memory", "--min-seconds", "0",
+                               "--startup-runs", "0", "--baseline", baseline_path])
+            self.assertEqual(status, 1)
+
+    def test_startup_budget(self):
+        """Test the import-time report and the budget verdict."""
+        entries = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                                   "import time:       120 |        120 |   _io\n"
+                                   "import time:      2000 |       2500 | src.presentation.cli\n")
+        self.assertEqual(entries, [("_io", 120, 120), ("src.presentation.cli", 2000, 2500)])
+
+        within = measure_startup("src.model.milk_sample_record", 1, budget_ms=10000.0)
+        self.assertFalse(within['over_budget'])
+        self.assertGreater(within['import_median_ms'], 0.0)
+        self.assertTrue(within['heaviest_imports'])
+        self.assertTrue(measure_startup("src.model.milk_sample_record", 1, budget_ms=0.0)['over_budget'])
+
+
+if __name__ == '__main__':
+    unittest.main()
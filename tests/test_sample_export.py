@@ -0,0 +1,133 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for exporting samples to files.
+
+The tests verify:
+- Keyset streaming returns the same rows as a single query, honouring limit and offset
+- CSV exports can be imported again by DataMigration
+- JSON Lines and columnar exports round-trip, with and without gzip
+- Failed exports leave no file behind
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.data_migration import DataMigration
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+from src.persistence.sample_export import iter_columnar_file, write_samples
+from src.presentation.export_cli import guess_format
+
+SAMPLES = [
+    MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Jan-84", "CALGARY", "AB", 0.123, 0.012, None),
+    MilkSampleRecord("MILK", "WHOLE", "01-Apr-84", "30-Apr-84", "CALGARY", "AB", 0.2, None, 0.15),
+    MilkSampleRecord("MILK", "WHOLE", "1985-06-01", "1985-06-30", "HALIFAX", "NS", 0.05, 0.005, 0.04),
+    MilkSampleRecord("MILK", "WHOLE", "01-Sep-85", "30-Sep-85", "HALIFAX", "NS", 0.31, 0.03, 0.25),
+    MilkSampleRecord("LAIT", "ENTIER", "01-Jan-86", "31-Jan-86", "MONTRÉAL", "QC", 0.071, 0.007, 0.06),
+]
+
+
+class TestSampleExport(unittest.TestCase):
+    """Test class for streaming exports."""
+
+    def setUp(self):
+        """Create a service over an in-memory repository and a scratch directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        repository = InMemoryMilkSampleRepository()
+        repository.initialize_database()
+        for _ in range(3):
+            for record in SAMPLES:
+                repository.create_sample(record)
+        self.service = MilkSampleDBService(repository)
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        """Get a path in the scratch directory."""
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_iter_query_samples_matches_query(self):
+        """Test that keyset streaming matches one query for every page size, limit and offset."""
+        for page_size in (1, 2, 4, 100):
+            rows = list(self.service.iter_query_samples(page_size=page_size))
+            self.assertEqual(rows, self.service.query_samples())
+            rows = list(self.service.iter_query_samples(province="AB", page_size=page_size))
+            self.assertEqual(rows, self.service.query_samples(province="AB"))
+            rows = list(self.service.iter_query_samples(limit=5, offset=3, page_size=page_size))
+            self.assertEqual(rows, self.service.query_samples(limit=5, offset=3))
+
+    def test_csv_round_trip_through_migration(self):
+        """Test that an exported CSV file imports back into the same records."""
+        summary = self.service.export_samples(self.path("samples.csv"), "csv", province="NS")
+        self.assertEqual(summary['rows'], 6)
+
+        db_config = DatabaseConfig(":memory:")
+        try:
+            repository = MilkSampleDBRepository(db_config)
+            migration = DataMigration(self.path("samples.csv"), repository)
+            self.assertEqual(migration.migrate_data(), (6, 6, 0))
+            self.assertEqual(repository.read_samples_by_province("NS"),
+                             [record for _, record in self.service.query_samples(province="NS")])
+        finally:
+            db_config.close()
+
+    def test_jsonl_gzip_round_trip(self):
+        """Test JSON Lines output, compressed because of the .gz extension."""
+        summary = self.service.export_samples(self.path("samples.jsonl.gz"), "jsonl")
+        self.assertEqual(summary['rows'], len(SAMPLES) * 3)
+        with gzip.open(self.path("samples.jsonl.gz"), "rt", encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([(row.pop('id'), MilkSampleRecord(**row)) for row in rows], self.service.query_samples())
+
+    def test_columnar_round_trip(self):
+        """Test the columnar format across several blocks, with missing values and non-ASCII strings."""
+        expected = self.service.query_samples()
+        for compress in (False, True):
+            destination = self.path(f"samples-{compress}.sr90")
+            summary = write_samples(self.service.iter_query_samples(page_size=4), destination,
+                                    "columnar", compress, block_size=4)
+            self.assertEqual(summary['rows'], len(expected))
+            self.assertEqual(list(iter_columnar_file(destination)), expected)
+
+        empty = self.path("empty.sr90")
+        write_samples(iter(()), empty, "columnar")
+        self.assertEqual(list(iter_columnar_file(empty)), [])
+
+    def test_failed_export_leaves_no_file(self):
+        """Test that an error while streaming removes the partial file."""
+        def rows():
+            yield self.service.query_samples(limit=1)[0]
+            raise RuntimeError("source failed")
+
+        with self.assertRaises(RuntimeError):
+            write_samples(rows(), self.path("broken.csv"), "csv")
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        with self.assertRaises(ValueError):
+            write_samples(iter(()), self.path("samples.xml"), "xml")
+
+    def test_guess_format(self):
+        """Test picking the format from the file extension."""
+        self.assertEqual(guess_format("out.csv.gz"), "csv")
+        self.assertEqual(guess_format("out.jsonl"), "jsonl")
+        self.assertEqual(guess_format("out.bin"), "columnar")
+
+
+if __name__ == '__main__':
+    unittest.main()
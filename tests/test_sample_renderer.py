@@ -0,0 +1,132 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the terminal rendering layer.
+
+The tests verify:
+- Pages are rendered as a fixed-width table or auto-sized wide rows
+- Only the selected columns are shown, and unknown columns are rejected
+- The pager fetches rows only for the pages shown and writes each page once
+- Navigation moves back without fetching again and stops at the end
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.presentation.sample_renderer import SamplePager, SampleRenderer, parse_columns
+
+ROWS = [(index, MilkSampleRecord("MILK", "WHOLE", "01-Jan-84", "31-Mar-84",
+                                 "SAULT STE. MARIE AND DISTRICT" if index == 3 else "OTTAWA", "ON",
+                                 0.05 * index, None if index % 2 else 0.005, None))
+        for index in range(1, 8)]
+
+
+class CountingWriter(io.StringIO):
+    """A text stream that counts write calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestSampleRenderer(unittest.TestCase):
+    """Test class for SampleRenderer and SamplePager."""
+
+    def test_table_and_wide_modes(self):
+        """Test fixed widths with cut values against auto-sized columns."""
+        renderer = SampleRenderer()
+        lines = renderer.render_page(ROWS[:3], title="Page 1").splitlines()
+        self.assertEqual(lines[0], "Page 1")
+        self.assertTrue(lines[1].startswith("    ID Start"))
+        self.assertEqual(set(lines[2]), {"-"})
+        self.assertIn("SAULT STE. MARIE A ", lines[5])
+        self.assertIn("5.00e-02", lines[3])
+        self.assertTrue(lines[3].endswith("-"))
+
+        renderer.toggle_mode()
+        lines = renderer.render_page(ROWS[:3]).splitlines()
+        self.assertTrue(lines[0].startswith("ID Start"))
+        self.assertIn("SAULT STE. MARIE AND DISTRICT", lines[4])
+        self.assertEqual(len({len(line) for line in lines[2:]}), 1)
+
+    def test_column_projection(self):
+        """Test that only the selected columns are rendered, in order."""
+        renderer = SampleRenderer(columns=parse_columns("province, id"))
+        self.assertEqual(renderer.render_page(ROWS[:1]).splitlines(), ["Prov     ID", "-----------", "ON        1"])
+        with self.assertRaises(ValueError):
+            parse_columns("id,colour")
+        with self.assertRaises(ValueError):
+            parse_columns(" , ")
+        with self.assertRaises(ValueError):
+            SampleRenderer(mode="grid")
+
+    def test_card(self):
+        """Test the detailed card of one sample."""
+        card = SampleRenderer.render_card(ROWS[1][1], 2)
+        self.assertEqual(card.splitlines()[1:4], ["Sample ID: 2", "-" * 40, "Sample Type: MILK"])
+        self.assertIn("Sr-90 Error: 5.00e-03 Bq/L", card)
+        self.assertNotIn("Calcium", card)
+
+    def test_pager_fetches_only_pages_shown(self):
+        """Test that quitting on page two leaves the rest of the iterator unread."""
+        fetched = []
+
+        def rows():
+            for row in ROWS:
+                fetched.append(row[0])
+                yield row
+
+        output = CountingWriter()
+        commands = iter(["", "q"])
+        shown = SamplePager(rows(), SampleRenderer(), page_size=2, output=output,
+                            read_command=lambda prompt: next(commands)).run()
+        self.assertEqual(shown, 4)
+        self.assertEqual(fetched, [1, 2, 3, 4])
+        self.assertEqual(output.writes, 2)
+        self.assertIn("Page 2: samples 3-4", output.getvalue())
+
+    def test_pager_navigation(self):
+        """Test going back, switching modes and running off the end."""
+        output = io.StringIO()
+        commands = iter(["", "p", "w", "", "", "", ""])
+        prompts = []
+
+        def read_command(prompt):
+            prompts.append(prompt)
+            return next(commands)
+
+        shown = SamplePager(ROWS, SampleRenderer(), page_size=3, output=output, read_command=read_command,
+                            footer="footer").run()
+        self.assertEqual(shown, len(ROWS))
+        pages = [line for line in output.getvalue().splitlines() if line.startswith("Page ")]
+        self.assertEqual(pages, ["Page 1: samples 1-3", "Page 2: samples 4-6", "Page 1: samples 1-3",
+                                 "Page 1: samples 1-3", "Page 2: samples 4-6", "Page 3: samples 7-7"])
+        self.assertEqual(output.getvalue().count("footer"), len(pages))
+        self.assertNotIn("[Enter] next", prompts[-1])
+        self.assertIn("p previous", prompts[1])
+        self.assertTrue(output.getvalue().endswith("End of samples.\n"))
+
+    def test_empty(self):
+        """Test an iterator with no rows."""
+        output = io.StringIO()
+        self.assertEqual(SamplePager(iter([]), SampleRenderer(), output=output,
+                                     read_command=lambda prompt: "q").run(), 0)
+        self.assertEqual(output.getvalue(), "No samples to display.\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the ShardedMilkSampleDBRepository class.
+
+The tests verify:
+- Records are routed to one shard per province and the catalog is reopened
+- Hash buckets group provinces into a fixed number of shards
+- Streamed records keep the global ID of their own shard
+- Measurement batches honour global ID bounds on every shard
+- Records cannot be moved to another shard by an update
+- Anomaly scans keep a watermark per shard and flags use global IDs
+- Decay-corrected values are written to every shard
+- Shard change logs are merged into one sequence that survives a reopen
+- A truncated shard log makes every consumer of the merged log resync
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.anomaly_detection import RULE_ERROR_RATIO
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.milk_sample_db_repository import ChangeLogPolicy, ChangeLogTruncatedError
+from src.persistence.sharded_repository import CATALOG_FILENAME, MAX_SHARDS, ShardedMilkSampleDBRepository
+
+
+def make_record(province: str, station: str, month: int, activity: float = 0.07,
+                error: float = 0.007) -> MilkSampleRecord:
+    """Create a record for one month of 1984."""
+    return MilkSampleRecord("MILK", "WHOLE", f"1984-{month:02d}-01", f"1984-{month:02d}-28",
+                            station, province, activity, error, None)
+
+
+class TestShardedRepository(unittest.TestCase):
+    """Test class for the province-sharded repository."""
+
+    def setUp(self):
+        """Create a sharded repository in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repository = ShardedMilkSampleDBRepository(self.temp_dir.name, max_workers=2)
+
+    def tearDown(self):
+        """Close the shards and remove the temporary directory."""
+        self.repository.close()
+        self.temp_dir.cleanup()
+
+    def test_routes_by_province_and_reopens_catalog(self):
+        """Test that each province gets its own shard and the catalog survives a reopen."""
+        ids = {province: self.repository.create_sample(make_record(province, "STATION", 1))
+               for province in ("AB", "NS", "ON")}
+        self.assertEqual(self.repository.get_shard_names(), ["AB", "NS", "ON"])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, CATALOG_FILENAME)))
+        self.assertEqual(len(self.repository.read_samples_by_province("NS")), 1)
+
+        reopened = ShardedMilkSampleDBRepository(self.temp_dir.name, max_workers=2)
+        try:
+            self.assertEqual(reopened.get_shard_names(), ["AB", "NS", "ON"])
+            for province, record_id in ids.items():
+                self.assertEqual(reopened.read_sample_by_id(record_id).province, province)
+            with self.assertRaises(ValueError):
+                ShardedMilkSampleDBRepository(self.temp_dir.name, buckets=4)
+        finally:
+            reopened.close()
+
+    def test_hash_buckets(self):
+        """Test that hash buckets cap the number of shards."""
+        bucketed = ShardedMilkSampleDBRepository(os.path.join(self.temp_dir.name, "buckets"), buckets=2)
+        try:
+            for province in ("AB", "BC", "MB", "NB", "NS", "ON", "QC"):
+                bucketed.create_sample(make_record(province, "STATION", 1))
+            self.assertLessEqual(len(bucketed.get_shard_names()), 2)
+            self.assertEqual(bucketed.get_sample_count(), 7)
+            self.assertEqual(len(bucketed.read_samples_by_province("QC")), 1)
+        finally:
+            bucketed.close()
+
+    def test_streamed_ids_belong_to_their_shard(self):
+        """Test that every streamed row carries the global ID of the shard it came from."""
+        for month in range(1, 4):
+            for province in ("AB", "NS", "ON"):
+                self.repository.create_sample(make_record(province, f"{province} STATION", month))
+
+        streamed = list(self.repository.iter_samples(batch_size=2))
+        self.assertEqual(len(streamed), 9)
+        self.assertEqual([record_id for record_id, _ in streamed], sorted(record_id for record_id, _ in streamed))
+        for record_id, record in streamed:
+            self.assertEqual(self.repository.read_sample_by_id(record_id), record)
+
+    def test_measurement_batches_within_bounds(self):
+        """Test that after_id and through_id select the same rows as filtering the global IDs."""
+        ids = [self.repository.create_sample(make_record(province, "STATION", month))
+               for month in range(1, 6) for province in ("AB", "NS", "ON")]
+        for after_id, through_id in ((0, None), (ids[4], None), (0, ids[9]), (ids[2], ids[11]), (ids[5], ids[5])):
+            streamed = sorted(record_id for batch in self.repository.iter_measurement_batches(2, after_id, through_id)
+                              for record_id in batch['id'])
+            self.assertEqual(streamed, sorted(record_id for record_id in ids
+                                              if record_id > after_id and (through_id is None or record_id <= through_id)))
+
+    def test_update_cannot_move_shards(self):
+        """Test that changing the province to another shard is refused."""
+        record_id = self.repository.create_sample(make_record("AB", "CALGARY", 1))
+        with self.assertRaises(ValueError):
+            self.repository.update_sample(record_id, make_record("NS", "CALGARY", 1))
+        self.assertTrue(self.repository.update_sample(record_id, make_record("AB", "CALGARY", 2)))
+
+    def test_anomaly_scan_keeps_a_watermark_per_shard(self):
+        """
+        Test that a row added to a smaller shard after a scan is still checked.
+
+        Its global ID is below the highest ID already scanned, because the
+        larger shard has used more local IDs.
+        """
+        service = MilkSampleDBService(self.repository)
+        for month in range(1, 11):
+            self.repository.create_sample(make_record("AB", "CALGARY", month))
+        self.repository.create_sample(make_record("NS", "HALIFAX", 1))
+        self.assertEqual(service.detect_anomalies()['rows_checked'], 11)
+
+        new_id, _ = service.create_new_sample("MILK", "WHOLE", "1984-02-01", "1984-02-28",
+                                              "HALIFAX", "NS", 0.07, 0.2)
+        self.assertLess(new_id, self.repository.get_max_sample_id())
+        summary = service.detect_anomalies()
+        self.assertEqual(summary['rows_checked'], 1)
+        self.assertEqual(summary['flags_by_rule'], {RULE_ERROR_RATIO: 1})
+        self.assertEqual(summary['watermark'], {"AB": 10, "NS": 2})
+        self.assertEqual([flag['sample_id'] for flag in service.get_anomalies(RULE_ERROR_RATIO)], [new_id])
+        self.assertEqual(service.detect_anomalies()['rows_checked'], 0)
+
+    def test_decay_correction_on_every_shard(self):
+        """Test that decay-corrected values are written to the shard of each sample."""
+        service = MilkSampleDBService(self.repository)
+        ids = [self.repository.create_sample(make_record(province, "STATION", 1))
+               for province in ("AB", "NS", "NS")]
+        summary = service.apply_decay_correction(date(2000, 1, 1))
+        self.assertEqual(summary['rows_written'], 3)
+
+        for key, shard in self.repository.get_shard_repositories():
+            with shard.db_config.get_db_context() as conn:
+                stored = [row[0] for row in conn.execute("SELECT sample_id FROM milk_samples_decay_corrected")]
+            expected = [record_id // MAX_SHARDS for record_id in ids
+                        if self.repository.read_sample_by_id(record_id).province == key]
+            self.assertEqual(sorted(stored), sorted(expected))
+
+    def test_merged_change_feed(self):
+        """Test that changes on every shard get one sequence with global IDs."""
+        service = MilkSampleDBService(self.repository)
+        first = self.repository.create_sample(make_record("AB", "CALGARY", 1))
+        second = self.repository.create_sample(make_record("NS", "HALIFAX", 1))
+        self.assertEqual(self.repository.get_latest_change_seq(), 2)
+        self.repository.delete_sample(first)
+        third = self.repository.create_sample(make_record("ON", "OTTAWA", 1))
+
+        entries = list(service.changes_since(2))
+        self.assertEqual([(entry['seq'], entry['op'], entry['sample_id']) for entry in entries],
+                         [(3, 'delete', first), (4, 'insert', third)])
+        self.assertIsNone(entries[0]['record'])
+        self.assertEqual(entries[1]['record'].station_name, "OTTAWA")
+
+        # Positions are kept with the merged log, so a reopen neither repeats nor skips entries
+        self.repository.update_sample(second, make_record("NS", "HALIFAX", 2))
+        reopened = ShardedMilkSampleDBRepository(self.temp_dir.name, max_workers=2)
+        try:
+            self.assertEqual([(entry['seq'], entry['op'], entry['sample_id'])
+                              for entry in reopened.read_changes(4)], [(5, 'update', second)])
+        finally:
+            reopened.close()
+
+    def test_change_feed_reads_records_in_one_query_per_shard(self):
+        """Test that the merged feed looks up current records in a batch per shard."""
+        ids = [self.repository.create_sample(make_record(province, "STATION", month))
+               for province in ("AB", "NS") for month in range(1, 6)]
+        calls = []
+        for _, shard in self.repository.get_shard_repositories():
+            shard.read_sample_by_id = lambda record_id: calls.append(record_id)
+            batched = shard.read_samples_by_ids
+            shard.read_samples_by_ids = lambda record_ids, read=batched: calls.append(None) or read(record_ids)
+
+        entries = self.repository.read_changes(0)
+        self.assertEqual(calls, [None, None])
+        self.assertEqual([entry['record'].station_name for entry in entries], ["STATION"] * len(ids))
+        self.assertEqual([entry['sample_id'] for entry in entries], ids)
+
+    def test_truncated_shard_log_forces_resync(self):
+        """Test that entries lost from a shard before they were merged make consumers resync."""
+        self.repository.create_sample(make_record("AB", "CALGARY", 1))
+        latest = self.repository.get_latest_change_seq()
+        for month in range(2, 5):
+            self.repository.create_sample(make_record("AB", "CALGARY", month))
+        _, shard = self.repository.get_shard_repositories()[0]
+        shard.compact_change_log(ChangeLogPolicy(coalesce=False, max_entries=1))
+
+        with self.assertRaises(ChangeLogTruncatedError):
+            self.repository.read_changes(latest)
+        after = self.repository.get_latest_change_seq()
+        new_id = self.repository.create_sample(make_record("AB", "CALGARY", 5))
+        self.assertEqual([entry['sample_id'] for entry in self.repository.read_changes(after)], [new_id])
+
+
+if __name__ == '__main__':
+    unittest.main()
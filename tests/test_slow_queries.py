@@ -0,0 +1,112 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the slow-query log.
+
+The tests verify:
+- Statements are grouped by shape and parameters are described by type
+- DatabaseConfig connections time statements through to their last row
+- Slow statements are logged with their query plan
+- The top-N report and the metrics registry show the expensive shapes
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.observability.metrics import REGISTRY
+from src.observability.slow_queries import SlowQueryLog, parameter_shape, statement_shape
+from src.model.milk_sample_record import MilkSampleRecord
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+class TestSlowQueries(unittest.TestCase):
+    """Test class for the slow-query log."""
+
+    def setUp(self):
+        """Create an in-memory database with a few samples."""
+        self.log = SlowQueryLog(threshold=10.0, top_n=5)
+        self.output = io.StringIO()
+        with contextlib.redirect_stdout(self.output):
+            self.db_config = DatabaseConfig(":memory:", slow_query_log=self.log)
+            self.repository = MilkSampleDBRepository(self.db_config)
+            for index in range(3):
+                self.repository.create_sample(MilkSampleRecord("MILK", "WHOLE", "01-Jan-24", "31-Mar-24",
+                                                               f"STATION {index}", "ON", 0.05, None, None))
+
+    def tearDown(self):
+        """Release the database."""
+        self.db_config.close()
+
+    def stats(self, shape):
+        """Find the statistics of one statement shape."""
+        return next(stats for stats in self.log.top(100) if stats.shape == shape)
+
+    def test_shapes(self):
+        """Test statement and parameter shapes."""
+        self.assertEqual(statement_shape("SELECT *  FROM t\n WHERE a = 'x''y' AND b > 1.5e3 AND c IN (?, ?, ?)"),
+                         "SELECT * FROM t WHERE a = ? AND b > ? AND c IN (?, ...)")
+        self.assertEqual(statement_shape("SELECT sr90_activity FROM t LIMIT 10"), "SELECT sr90_activity FROM t LIMIT ?")
+        self.assertEqual(parameter_shape(("ON", 3, None)), "(str, int, null)")
+        self.assertEqual(parameter_shape({'id': 1.0}), "{id: float}")
+        self.assertEqual(parameter_shape(()), "()")
+
+    def test_statements_are_timed_with_plans(self):
+        """Test that reads are grouped by shape and carry their query plan."""
+        with contextlib.redirect_stdout(self.output):
+            self.repository.read_samples_by_province("ON")
+            self.repository.read_samples_by_province("QC")
+            list(self.repository.iter_samples(batch_size=2))
+        stats = self.stats("SELECT * FROM milk_samples WHERE province = ? ORDER BY id")
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.parameter_shape, "(str)")
+        self.assertEqual(stats.slow_calls, 0)
+        self.assertTrue(stats.plan and "milk_samples" in stats.plan[0])
+        self.assertGreater(stats.total_seconds, 0.0)
+
+    def test_slow_statements_are_logged(self):
+        """Test that statements above the threshold are logged and counted."""
+        self.log.threshold = 0.0
+        with self.assertLogs("src.observability.slow_queries", level="WARNING") as captured, \
+                contextlib.redirect_stdout(self.output):
+            self.repository.read_sample_by_id(1)
+        message = next(line for line in captured.output if "WHERE id = ?" in line)
+        self.assertIn("parameters (int)", message)
+        self.assertIn("USING INTEGER PRIMARY KEY", message)
+        self.assertEqual(self.stats("SELECT * FROM milk_samples WHERE id = ?").slow_calls, 1)
+
+    def test_report_and_metrics(self):
+        """Test the top-N ordering, the text report and the metrics gauges."""
+        with contextlib.redirect_stdout(self.output):
+            for _ in range(5):
+                self.repository.read_sample_by_id(1)
+        by_calls = self.log.top(by="calls")
+        self.assertEqual(by_calls[0].shape, "SELECT * FROM milk_samples WHERE id = ?")
+        self.assertEqual(by_calls[0].calls, 5)
+        self.assertLessEqual(len(by_calls), 5)
+        with self.assertRaises(ValueError):
+            self.log.top(by="rows")
+
+        report = self.log.report(by="calls")
+        self.assertIn("SELECT * FROM milk_samples WHERE id = ?", report)
+        self.assertIn("parameters (int)", report)
+
+        # The gauges cover each log's top_n shapes by total time
+        self.log.top_n = 100
+        calls = {entry['labels']['shape']: entry['value']
+                 for entry in REGISTRY.snapshot()['gauges'].get('statement_calls', [])}
+        self.assertGreaterEqual(calls.get("SELECT * FROM milk_samples WHERE id = ?", 0), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the one-pass streaming statistics.
+
+The tests verify:
+- Welford mean and variance against the statistics module
+- Quantile estimates within the sketch's relative accuracy
+- Merging partial aggregators gives the same result as one pass
+"""
+
+import os
+import random
+import statistics
+import sys
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.streaming_statistics import QuantileSketch, RunningStats, SampleStatisticsAggregator
+from src.model.milk_sample_record import MilkSampleRecord
+
+
+class TestStreamingStatistics(unittest.TestCase):
+    """Test class for the streaming statistics aggregator."""
+
+    def setUp(self):
+        """Create a reproducible set of readings."""
+        generator = random.Random(42)
+        self.values = [generator.lognormvariate(-2.5, 0.6) for _ in range(2000)]
+
+    def test_running_stats_match_statistics_module(self):
+        """Test that split-and-merge Welford results match an exact calculation."""
+        left, right = RunningStats(), RunningStats()
+        for value in self.values[:700]:
+            left.add(value)
+        for value in self.values[700:]:
+            right.add(value)
+        left.merge(right)
+        self.assertEqual(left.count, len(self.values))
+        self.assertAlmostEqual(left.mean, statistics.mean(self.values))
+        self.assertAlmostEqual(left.stddev, statistics.stdev(self.values))
+        self.assertEqual(left.minimum, min(self.values))
+        self.assertEqual(left.maximum, max(self.values))
+
+    def test_quantile_sketch_relative_accuracy(self):
+        """Test that quantile estimates stay within the configured accuracy."""
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+        ordered = sorted(self.values)
+        for q in (0.5, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.011)
+
+    def test_aggregator_merge_matches_single_pass(self):
+        """Test that per-group summaries are the same when built in two chunks."""
+        records = [
+            MilkSampleRecord("MILK", "WHOLE", f"01-Jan-{84 + i % 3}", f"31-Mar-{84 + i % 3}",
+                             f"STATION {i % 4}", "AB" if i % 2 else "ON", value, None, None)
+            for i, value in enumerate(self.values)
+        ]
+        single = SampleStatisticsAggregator().add_all(records).summary()
+        merged = (SampleStatisticsAggregator().add_all(records[:999])
+                  .merge(SampleStatisticsAggregator().add_all(records[999:])).summary())
+
+        self.assertEqual(sorted(single['by_year']), [1984, 1985, 1986])
+        self.assertEqual(single['overall']['count'], len(records))
+        for dimension in ('by_province', 'by_station', 'by_year'):
+            for key, summary in single[dimension].items():
+                self.assertEqual(summary['count'], merged[dimension][key]['count'])
+                self.assertAlmostEqual(summary['stddev'], merged[dimension][key]['stddev'])
+                self.assertEqual(summary['p95'], merged[dimension][key]['p95'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the structured logging setup.
+
+The tests verify:
+- Records are formatted as key=value text or JSON lines with their fields
+- configure_logging writes through the background queue
+- Progress reports are rate limited
+- Repository hot paths log nothing at the default level
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.model.milk_sample_record import MilkSampleRecord
+from src.observability.structured_logging import (ProgressReporter, StructuredFormatter, configure_logging,
+                                                  fields, shutdown_logging)
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+def make_record(message, level=logging.INFO, **values):
+    """Create a log record with structured fields."""
+    record = logging.LogRecord("src.test", level, __file__, 1, message, (), None)
+    record.fields = values
+    return record
+
+
+class TestStructuredLogging(unittest.TestCase):
+    """Test class for the structured logging setup."""
+
+    def test_text_and_json_formats(self):
+        """Test both output formats."""
+        record = make_record("Migration completed", total=647, path="a b.csv")
+        text = StructuredFormatter().format(record)
+        self.assertTrue(text.endswith('INFO src.test Migration completed total=647 path="a b.csv"'))
+
+        entry = json.loads(StructuredFormatter(json_lines=True).format(record))
+        self.assertEqual(entry['message'], "Migration completed")
+        self.assertEqual(entry['level'], "INFO")
+        self.assertEqual(entry['total'], 647)
+
+    def test_configure_logging(self):
+        """Test that records reach the stream through the queue at the configured level."""
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        stream = io.StringIO()
+        try:
+            configure_logging("INFO", stream=stream)
+            logger = logging.getLogger("src.test")
+            logger.debug("hidden")
+            logger.info("Imported batch", extra=fields(rows=100))
+            shutdown_logging()
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        self.assertNotIn("hidden", stream.getvalue())
+        self.assertIn("Imported batch rows=100", stream.getvalue())
+
+    def test_progress_is_rate_limited(self):
+        """Test that many advances produce one final message inside the interval."""
+        logger = logging.getLogger("src.test.progress")
+        with self.assertLogs(logger, level="INFO") as captured:
+            reporter = ProgressReporter(logger, "import", total=1000, interval=60.0)
+            for _ in range(1000):
+                reporter.advance()
+            reporter.finish()
+        self.assertEqual(len(captured.records), 1)
+        self.assertEqual(captured.records[0].fields['done'], 1000)
+        self.assertEqual(captured.records[0].fields['percent'], 100.0)
+
+    def test_hot_paths_are_silent(self):
+        """Test that per-record repository operations log below WARNING."""
+        db_config = DatabaseConfig(":memory:")
+        try:
+            repository = MilkSampleDBRepository(db_config)
+            with self.assertNoLogs("src.persistence", level="INFO"):
+                record_id = repository.create_sample(MilkSampleRecord("MILK", "WHOLE", "01-Jan-24", "31-Mar-24",
+                                                                      "OTTAWA", "ON", 0.05, None, None))
+                repository.read_sample_by_id(record_id)
+                repository.read_samples_by_province("ON")
+                repository.delete_sample(record_id)
+        finally:
+            db_config.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the synthetic dataset generator.
+
+The tests verify:
+- The profile learned from the real CSV covers every station
+- Output is deterministic for a seed and has exactly the requested size
+- Stations are replicated under new names once the real schedules run out
+- Generated CSV files import through DataMigration
+- Records can be inserted directly into a repository
+"""
+
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.persistence.data_migration import DataMigration
+from src.persistence.in_memory_repository import InMemoryMilkSampleRepository
+from src.persistence.synthetic_dataset import SyntheticDatasetGenerator, learn_profile_from_csv
+
+
+class TestSyntheticDataset(unittest.TestCase):
+    """Test class for the synthetic dataset generator."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Learn the profile once from the bundled CSV file."""
+        cls.records = DataMigration().read_csv_data()
+        cls.profile = learn_profile_from_csv()
+
+    def test_profile(self):
+        """Test that every real station is profiled with its schedule and sensible rates."""
+        self.assertEqual({station.station_name for station in self.profile.stations},
+                         {record.station_name for record in self.records})
+        self.assertEqual(self.profile.rows_per_cycle, len(self.records))
+        for station in self.profile.stations:
+            self.assertTrue(0.0 <= station.error_missing_rate <= 1.0)
+            self.assertTrue(0.0 <= station.calcium_missing_rate <= 1.0)
+            self.assertGreater(station.log_std, 0.0)
+            self.assertAlmostEqual(sum(weight for _, _, weight in station.kinds), 1.0)
+
+    def test_deterministic_and_sized(self):
+        """Test that a seed fixes the output and the count is exact."""
+        first = list(SyntheticDatasetGenerator(self.profile, seed=3).iter_rows(1500))
+        second = list(SyntheticDatasetGenerator(self.profile, seed=3).iter_rows(1500))
+        other = list(SyntheticDatasetGenerator(self.profile, seed=4).iter_rows(1500))
+        self.assertEqual(len(first), 1500)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        # A shorter run is a prefix of a longer one
+        self.assertEqual(list(SyntheticDatasetGenerator(self.profile, seed=3).iter_rows(700)), first[:700])
+
+    def test_replicas(self):
+        """Test that records beyond one cycle come from renamed copies of the stations."""
+        count = self.profile.rows_per_cycle * 2 + 10
+        records = list(SyntheticDatasetGenerator(self.profile).iter_records(count))
+        names = {record.station_name for record in records}
+        self.assertIn("OTTAWA", names)
+        self.assertIn("OTTAWA 2", names)
+        self.assertIn(f"{self.profile.stations[0].station_name} 3", names)
+        self.assertTrue(all(record.sr90_activity > 0 for record in records))
+
+        missing = sum(record.sr90_activity_per_calcium is None for record in records) / len(records)
+        expected = sum(record.sr90_activity_per_calcium is None for record in self.records) / len(self.records)
+        self.assertLess(abs(missing - expected), 0.05)
+        mean_log = sum(math.log(record.sr90_activity) for record in records) / len(records)
+        self.assertTrue(-6.0 < mean_log < -1.0)
+
+    def test_csv_imports_through_migration(self):
+        """Test that a generated CSV file imports completely."""
+        generator = SyntheticDatasetGenerator(self.profile, seed=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synthetic.csv")
+            result = generator.write_csv(path, 2000)
+            self.assertEqual(result['rows'], 2000)
+            repository = InMemoryMilkSampleRepository()
+            repository.initialize_database()
+            self.assertEqual(DataMigration(path, repository).migrate_data(batch_size=500), (2000, 2000, 0))
+            self.assertEqual([record for _, record in repository.read_all_samples(5)],
+                             list(generator.iter_records(5)))
+
+    def test_populate(self):
+        """Test inserting generated records directly."""
+        repository = InMemoryMilkSampleRepository()
+        repository.initialize_database()
+        result = SyntheticDatasetGenerator(self.profile, seed=2).populate(repository, 1234, batch_size=100)
+        self.assertEqual(result['rows'], 1234)
+        self.assertEqual(repository.get_sample_count(), 1234)
+        self.assertEqual(repository.query_cube([])[0]['sample_count'], 1234)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+CST8002 - Practical Project 3
+Professor: Tyler DeLay
+Date: 13/07/2025
+Author: Himanish Rishi
+
+This module contains tests for the TrendAnalysisService class.
+
+The tests verify:
+- The exponential fit recovers a known half-life
+- Station fits give the same results in-process and in a process pool
+- Results are cached until the data generation changes
+"""
+
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.business.milk_sample_db_service import MilkSampleDBService
+from src.business.trend_analysis import TrendAnalysisService
+from src.persistence.database_config import DatabaseConfig
+from src.persistence.milk_sample_db_repository import MilkSampleDBRepository
+
+
+class TestTrendAnalysis(unittest.TestCase):
+    """Test class for the per-station trend analysis."""
+
+    def setUp(self):
+        """Create a service backed by a temporary database with two stations."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_config = DatabaseConfig(os.path.join(self.temp_dir.name, "trend.db"))
+        self.service = MilkSampleDBService(MilkSampleDBRepository(db_config))
+        for year in range(1984, 1994):
+            for station, half_life in (("DECAYING", 10.0), ("STEADY", None)):
+                activity = 0.1 * math.exp(-math.log(2) * (year - 1984) / half_life) if half_life else 0.05
+                self.service.create_new_sample("MILK", "WHOLE", f"{year}-01-01", f"{year}-12-31",
+                                               station, "ON", activity)
+
+    def tearDown(self):
+        """Close the database and remove the temporary directory."""
+        self.service.repository.db_config.close_connection()
+        self.temp_dir.cleanup()
+
+    def test_exponential_fit_recovers_half_life(self):
+        """Test that the fitted half-life matches the generated data."""
+        trends = TrendAnalysisService(self.service, max_workers=1).analyze()
+        decaying = trends["DECAYING"]
+        self.assertEqual(decaying.sample_count, 10)
+        self.assertAlmostEqual(decaying.half_life_years, 10.0, delta=0.1)
+        self.assertGreater(decaying.exponential_r_squared, 0.99)
+        self.assertLess(decaying.linear_slope, 0)
+        self.assertIsNone(trends["STEADY"].half_life_years)
+
+    def test_process_pool_matches_in_process(self):
+        """Test that fanning out to worker processes gives identical results."""
+        in_process = TrendAnalysisService(self.service, max_workers=1).analyze()
+        pooled = TrendAnalysisService(self.service, max_workers=2, parallel_threshold=0).analyze()
+        self.assertEqual(in_process, pooled)
+
+    def test_results_cached_by_generation(self):
+        """Test that results are reused until a sample is written."""
+        analysis = TrendAnalysisService(self.service, max_workers=1)
+        first = analysis.analyze()
+        self.assertIs(analysis.analyze(), first)
+        self.service.create_new_sample("MILK", "WHOLE", "1995-01-01", "1995-12-31", "STEADY", "ON", 0.05)
+        second = analysis.analyze()
+        self.assertIsNot(second, first)
+        self.assertEqual(second["STEADY"].sample_count, 11)
+
+
+if __name__ == '__main__':
+    unittest.main()